@@ -10,6 +10,60 @@ APIM_NAME="${APIM_NAME:-apim-dev}"
 API_ID="${API_ID:-sample-api}"
 API_PATH="${API_PATH:-sample}"
 OPENAPI_FILE="${OPENAPI_FILE:-src/functions-sample/openapi.json}"
+# Set to true to drop components no operation refers to before uploading
+PRUNE_UNUSED="${PRUNE_UNUSED:-false}"
+# Manifest written by openapi_utils.py --shard: imports every shard as its own API, in parallel
+SHARD_MANIFEST="${SHARD_MANIFEST:-}"
+# Set to true (or pass --skip-if-unchanged) to skip APIs whose spec is semantically unchanged
+# since their last successful import; the hashes are kept in IMPORT_STATE_DIR
+SKIP_IF_UNCHANGED="${SKIP_IF_UNCHANGED:-false}"
+IMPORT_STATE_DIR="${IMPORT_STATE_DIR:-.apim-import-state}"
+# Set to true to import SHARD_MANIFEST shards with the pooled Python importer
+# (tools/migration/openapi_import.py) instead of one az CLI call per shard
+BULK_IMPORT="${BULK_IMPORT:-false}"
+CONCURRENCY="${CONCURRENCY:-8}"
+
+for ARG in "$@"; do
+  case "$ARG" in
+    --skip-if-unchanged) SKIP_IF_UNCHANGED=true ;;
+    *) echo "Error: Unknown argument: $ARG"; exit 1 ;;
+  esac
+done
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+CANONICAL="$SCRIPT_DIR/../tools/migration/openapi_canonical.py"
+
+# State line of an API: semantic hash of its spec plus the import settings that are not in the spec
+# (path, display name and any further settings in $4); fails when the spec cannot be hashed
+import_state() {
+  local FILE="$1" API_PATH_="$2" DISPLAY_NAME="$3" OUTPUT HASH
+  if ! OUTPUT="$(python3 "$CANONICAL" "$FILE")"; then
+    echo "Error: Cannot compute the semantic hash of $FILE" >&2
+    return 1
+  fi
+  HASH="${OUTPUT%% *}"
+  if [ -z "$HASH" ]; then
+    echo "Error: Empty semantic hash for $FILE" >&2
+    return 1
+  fi
+  echo "$HASH $API_PATH_ $DISPLAY_NAME${4:+ $4}"
+}
+
+state_file() {
+  echo "$IMPORT_STATE_DIR/$APIM_NAME.$1.state"
+}
+
+# True when the last successful import of API id $1 recorded state $2
+unchanged() {
+  [ "$SKIP_IF_UNCHANGED" = "true" ] && [ -f "$(state_file "$1")" ] && [ "$(cat "$(state_file "$1")")" = "$2" ]
+}
+
+record_state() {
+  if [ "$SKIP_IF_UNCHANGED" = "true" ]; then
+    mkdir -p "$IMPORT_STATE_DIR"
+    echo "$2" > "$(state_file "$1")"
+  fi
+}
 
 echo "=== Importing OpenAPI to APIM ==="
 echo "APIM: $APIM_NAME"
@@ -24,12 +78,98 @@ if ! az account show &> /dev/null; then
   exit 1
 fi
 
+# Sharded spec: one API per shard, "<API_ID>-<shard>" under "<API_PATH>/<api_path>"
+if [ -n "$SHARD_MANIFEST" ]; then
+  if [ ! -f "$SHARD_MANIFEST" ]; then
+    echo "Error: Shard manifest not found: $SHARD_MANIFEST"
+    exit 1
+  fi
+  if [ "$BULK_IMPORT" = "true" ]; then
+    BULK_ARGS=(--manifest "$SHARD_MANIFEST" --api-id "$API_ID" --api-path "$API_PATH"
+      --subscription "$(az account show --query id -o tsv)" --resource-group "$RESOURCE_GROUP"
+      --service "$APIM_NAME" --concurrency "$CONCURRENCY" --state-dir "$IMPORT_STATE_DIR")
+    if [ "$SKIP_IF_UNCHANGED" = "true" ]; then
+      BULK_ARGS+=(--skip-if-unchanged)
+    fi
+    exec python3 "$SCRIPT_DIR/../tools/migration/openapi_import.py" "${BULK_ARGS[@]}"
+  fi
+  MANIFEST_DIR="$(dirname "$SHARD_MANIFEST")"
+  LOG_DIR="$(mktemp -d)"
+  trap 'rm -rf "$LOG_DIR"' EXIT
+  PIDS=()
+  NAMES=()
+  while IFS=$'\t' read -r NAME FILE SHARD_PATH DISPLAY_NAME; do
+    STATE=""
+    if [ "$SKIP_IF_UNCHANGED" = "true" ]; then
+      STATE="$(import_state "$MANIFEST_DIR/$FILE" "$API_PATH/$SHARD_PATH" "$DISPLAY_NAME")" || exit 1
+      if unchanged "$API_ID-$NAME" "$STATE"; then
+        echo "Skipping shard $NAME: unchanged since its last import"
+        continue
+      fi
+    fi
+    echo "Importing shard $NAME: $MANIFEST_DIR/$FILE → /$API_PATH/$SHARD_PATH"
+    (az apim api import \
+      --resource-group "$RESOURCE_GROUP" \
+      --service-name "$APIM_NAME" \
+      --path "$API_PATH/$SHARD_PATH" \
+      --api-id "$API_ID-$NAME" \
+      --specification-format OpenApi \
+      --specification-path "$MANIFEST_DIR/$FILE" \
+      --display-name "$DISPLAY_NAME" \
+      --protocols https && record_state "$API_ID-$NAME" "$STATE") > "$LOG_DIR/$NAME.log" 2>&1 &
+    PIDS+=("$!")
+    NAMES+=("$NAME")
+  done < <(python3 -c '
+import json, sys
+for shard in json.load(open(sys.argv[1]))["shards"]:
+    print("\t".join((shard["name"], shard["file"], shard["api_path"], shard["display_name"])))
+' "$SHARD_MANIFEST")
+
+  FAILED=0
+  for i in "${!PIDS[@]}"; do
+    if ! wait "${PIDS[$i]}"; then
+      echo "Error: Import of shard ${NAMES[$i]} failed:"
+      cat "$LOG_DIR/${NAMES[$i]}.log"
+      FAILED=1
+    fi
+  done
+  if [ "$FAILED" -ne 0 ]; then
+    exit 1
+  fi
+  echo ""
+  echo "${#PIDS[@]} shard(s) imported successfully!"
+  echo "Test at: https://$APIM_NAME.azure-api.net/$API_PATH/<api_path>"
+  exit 0
+fi
+
 # Validate OpenAPI file exists
 if [ ! -f "$OPENAPI_FILE" ]; then
   echo "Error: OpenAPI file not found: $OPENAPI_FILE"
   exit 1
 fi
 
+# Skip the upload when nothing an import would see has changed since the last one
+STATE=""
+if [ "$SKIP_IF_UNCHANGED" = "true" ]; then
+  STATE="$(import_state "$OPENAPI_FILE" "$API_PATH" "Sample API" "prune-unused=$PRUNE_UNUSED")" || exit 1
+  if unchanged "$API_ID" "$STATE"; then
+    echo "API unchanged since its last import, skipping (delete $(state_file "$API_ID") to force it)."
+    exit 0
+  fi
+fi
+
+# Shrink the upload: unreferenced definitions/components only slow the import
+if [ "$PRUNE_UNUSED" = "true" ]; then
+  PRUNE_DIR="$(mktemp -d)"
+  trap 'rm -rf "$PRUNE_DIR"' EXIT
+  PRUNED_FILE="$PRUNE_DIR/$(basename "$OPENAPI_FILE")"
+  echo "Pruning unreferenced components..."
+  python3 "$SCRIPT_DIR/../tools/migration/openapi_utils.py" "$OPENAPI_FILE" "$PRUNED_FILE" \
+    --prune-unused --no-convert --no-operationid
+  OPENAPI_FILE="$PRUNED_FILE"
+  echo ""
+fi
+
 # Import API using current best practices
 # Uses --specification-format OpenApi (supports OpenAPI 3.x)
 az apim api import \
@@ -41,6 +181,7 @@ az apim api import \
   --specification-path "$OPENAPI_FILE" \
   --display-name "Sample API" \
   --protocols https
+record_state "$API_ID" "$STATE"
 
 echo ""
 echo "API imported successfully!"
@@ -0,0 +1,11 @@
+"""
+Benchmarks for the migration tools.
+
+  specgen.py            — parametric Swagger 2.0 / OpenAPI 3.0 spec generator
+  run_benchmarks.py     — timed suite over the public openapi_utils API, JSON results
+  bench_pipeline.py     — stage-by-stage vs fused pipeline
+  bench_walkers.py      — explicit-stack vs recursive tree walkers
+  bench_serializers.py  — serializer backends
+
+Every module is also a standalone script: python3 benchmarks/<name>.py --help
+"""
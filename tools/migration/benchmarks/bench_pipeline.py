@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py
+
+Compare the stage-by-stage migration pipeline (clean → convert →
+ensure_operation_ids → validate) with the fused process_spec() pipeline, with
+and without copy-on-write, on a synthetic AWS-style Swagger 2.0 export.
+
+Reports the best wall time over several runs and the tracemalloc peak of a
+single run for each variant.
+
+Usage:
+  python3 benchmarks/bench_pipeline.py [--paths N] [--definitions N] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+# Allow importing openapi_utils from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_utils as utils
+
+
+def make_aws_export(paths: int, definitions: int) -> dict:
+    """Build a Swagger 2.0 spec shaped like an AWS API Gateway export."""
+    spec: dict = {
+        "swagger": "2.0",
+        "info": {"title": "Synthetic AWS export", "version": "1.0"},
+        "host": "abc123.execute-api.us-east-1.amazonaws.com",
+        "basePath": "/prod",
+        "schemes": ["https"],
+        "consumes": ["application/json"],
+        "produces": ["application/json"],
+        "x-amazon-apigateway-policy": {"Version": "2012-10-17", "Statement": []},
+        "securityDefinitions": {
+            "api_key": {"type": "apiKey", "name": "x-api-key", "in": "header"},
+        },
+        "definitions": {},
+        "paths": {},
+    }
+    for i in range(definitions):
+        spec["definitions"][f"Model{i}"] = {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "child": {"$ref": f"#/definitions/Model{(i + 1) % definitions}"},
+                "tags": {"type": "array", "items": {"type": "string"}},
+            },
+        }
+    for i in range(paths):
+        model = f"#/definitions/Model{i % max(definitions, 1)}"
+        spec["paths"][f"/resource{i}/{{id}}"] = {
+            "get": {
+                "parameters": [{"in": "path", "name": "id", "required": True, "type": "string"}],
+                "responses": {"200": {"description": "OK", "schema": {"$ref": model}}},
+                "x-amazon-apigateway-integration": {
+                    "type": "aws_proxy",
+                    "httpMethod": "POST",
+                    "uri": f"arn:aws:apigateway:us-east-1:lambda:path/functions/fn{i}/invocations",
+                    "responses": {"default": {"statusCode": "200"}},
+                },
+            },
+            "put": {
+                "parameters": [
+                    {"in": "path", "name": "id", "required": True, "type": "string"},
+                    {"in": "body", "name": "body", "schema": {"$ref": model}},
+                ],
+                "responses": {"204": {"description": "Updated"}},
+                "x-amazon-apigateway-integration": {"type": "aws_proxy", "httpMethod": "POST"},
+            },
+        }
+    return spec
+
+
+def staged(spec: dict) -> tuple:
+    """The pipeline as main() ran it before process_spec() existed."""
+    spec = utils.clean_aws_extensions(spec)
+    spec = utils.convert_swagger_to_openapi3(spec)
+    spec = utils.ensure_operation_ids(spec)
+    return spec, utils.validate_apim_requirements(spec)
+
+
+def fused(spec: dict) -> tuple:
+    return utils.process_spec(spec, source="aws")
+
+
+def fused_cow(spec: dict) -> tuple:
+    return utils.process_spec(spec, source="aws", copy_on_write=True)
+
+
+def measure(func, spec: dict, repeat: int) -> tuple:
+    """Return (best wall seconds, tracemalloc peak bytes) for func(spec)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(spec)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(spec)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark staged vs fused openapi_utils pipelines.")
+    parser.add_argument("--paths", type=int, default=2000, help="Number of paths (default: 2000)")
+    parser.add_argument("--definitions", type=int, default=1000, help="Number of definitions (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per variant (default: 5)")
+    args = parser.parse_args()
+
+    spec = make_aws_export(args.paths, args.definitions)
+    variants = (("staged", staged), ("fused", fused), ("fused-cow", fused_cow))
+    expected = staged(spec)
+    for name, func in variants[1:]:
+        if func(spec) != expected:
+            sys.exit(f"ERROR: {name} pipeline output differs from the staged pipeline")
+
+    print(f"Synthetic export: {args.paths} paths, {args.definitions} definitions")
+    results = {name: measure(func, spec, args.repeat) for name, func in variants}
+    staged_wall, staged_peak = results["staged"]
+    for name, (wall, peak) in results.items():
+        print(
+            f"  {name:<10} wall {wall * 1000:9.1f} ms ({wall / staged_wall:.2f}x)"
+            f"   peak {peak / 1_048_576:8.1f} MiB ({peak / staged_peak:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
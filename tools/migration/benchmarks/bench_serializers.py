@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+bench_serializers.py
+
+Compare the serializer backends behind load_spec()/save_spec() on a
+converted synthetic AWS export: parse and emit times for YAML (libyaml vs
+pure Python) and JSON (orjson vs stdlib), plus a check that every backend
+writes the same bytes.
+
+Usage:
+  python3 benchmarks/bench_serializers.py [--paths N] [--definitions N] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Allow importing the migration modules from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_serializers as serializers
+import openapi_utils as utils
+from bench_pipeline import make_aws_export
+
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark openapi_utils serializer backends.")
+    parser.add_argument("--paths", type=int, default=2000, help="Number of paths (default: 2000)")
+    parser.add_argument("--definitions", type=int, default=1000, help="Number of definitions (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per backend (default: 3)")
+    args = parser.parse_args()
+
+    spec, _ = utils.process_spec(make_aws_export(args.paths, args.definitions))
+    candidates = {
+        "yaml": [name for name in ("python", "libyaml") if name != "libyaml" or serializers.HAS_LIBYAML],
+        "json": [name for name in ("stdlib", "orjson") if name != "orjson" or serializers.HAS_ORJSON],
+    }
+    for fmt, names in candidates.items():
+        outputs = {}
+        for name in names:
+            serializer = serializers.Serializer(**{f"{fmt}_backend": name})
+            text = outputs[name] = serializer.dumps(spec, fmt)
+            dump = best_of(lambda s=serializer, f=fmt: s.dumps(spec, f), args.repeat)
+            load = best_of(lambda s=serializer, t=text, f=fmt: s.loads(t, f), args.repeat)
+            print(f"  {fmt:<4} {name:<8} dump {dump * 1000:9.1f} ms   load {load * 1000:9.1f} ms   {len(text) / 1_048_576:6.1f} MiB")
+        if len(set(outputs.values())) != 1:
+            sys.exit(f"ERROR: {fmt} backends produced different output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+bench_walkers.py
+
+Compare the explicit-stack tree walkers in openapi_utils.py with their
+recursive reference implementations on wide and deep synthetic specs.
+
+  wide  — many definitions, each a few levels deep (typical large export)
+  deep  — a single schema nested --depth levels (protobuf-derived exports)
+
+For each shape the copying and copy-on-write walkers are timed (best of
+--repeat runs) and their tracemalloc peak recorded. The recursive walkers
+are reported as RecursionError when the shape is deeper than the
+interpreter recursion limit.
+
+Usage:
+  python3 benchmarks/bench_walkers.py [--width N] [--depth N] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+# Allow importing openapi_utils from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_utils as utils
+
+PREFIX = "x-amazon-"
+
+
+def make_wide_spec(width: int) -> dict:
+    """Spec with width definitions, each with nested properties, refs and an extension."""
+    return {
+        "swagger": "2.0",
+        "info": {"title": "Wide", "version": "1.0"},
+        "definitions": {
+            f"Model{i}": {
+                "type": "object",
+                "x-amazon-apigateway-schema": {"generated": True},
+                "properties": {
+                    "id": {"type": "string"},
+                    "owner": {"$ref": f"#/definitions/Model{(i + 1) % width}"},
+                    "items": {"type": "array", "items": {"type": "object", "properties": {"n": {"type": "integer"}}}},
+                },
+            }
+            for i in range(width)
+        },
+    }
+
+
+def make_deep_spec(depth: int) -> dict:
+    """Spec with one schema nested depth levels, extension and $ref at the bottom."""
+    node: dict = {"$ref": "#/definitions/Leaf", "x-amazon-leaf": True}
+    for _ in range(depth):
+        node = {"type": "object", "properties": {"child": node}}
+    return {"swagger": "2.0", "info": {"title": "Deep", "version": "1.0"}, "definitions": {"Root": node}}
+
+
+WALKERS = (
+    ("iterative copy", lambda spec: utils._transform_node(spec, PREFIX, True)),
+    ("recursive copy", lambda spec: utils._transform_node_recursive(spec, PREFIX, True)),
+    ("iterative cow", lambda spec: utils._transform_node(spec, PREFIX, True, copy_on_write=True)),
+    ("recursive cow", lambda spec: utils._transform_node_shared_recursive(spec, PREFIX, True)),
+)
+
+
+def measure(func, spec: dict, repeat: int) -> str:
+    """Format best wall time and tracemalloc peak for func(spec), or the error it raised."""
+    best = float("inf")
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(spec)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func(spec)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except RecursionError:
+        return "RecursionError"
+    return f"{best * 1000:9.1f} ms   peak {peak / 1_048_576:7.2f} MiB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark iterative vs recursive openapi_utils walkers.")
+    parser.add_argument("--width", type=int, default=20000, help="Definitions in the wide spec (default: 20000)")
+    parser.add_argument("--depth", type=int, default=150, help="Nesting levels in the deep spec (default: 150)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per walker (default: 5)")
+    args = parser.parse_args()
+
+    shapes = (
+        (f"wide ({args.width} definitions)", make_wide_spec(args.width)),
+        (f"deep ({args.depth} levels)", make_deep_spec(args.depth)),
+        (f"deep ({args.depth * 100} levels)", make_deep_spec(args.depth * 100)),
+    )
+    for label, spec in shapes:
+        print(label)
+        for name, func in WALKERS:
+            print(f"  {name:<15} {measure(func, spec, args.repeat)}")
+
+
+if __name__ == "__main__":
+    main()
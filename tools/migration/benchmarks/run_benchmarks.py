@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py
+
+Timed benchmarks for the public openapi_utils API on specs from specgen.py:
+
+  convert_swagger_to_openapi3   Swagger 2.0 → OpenAPI 3.0
+  ensure_operation_ids          on the converted spec (every operation lacks an ID)
+  validate_apim_requirements    on the converted spec with IDs
+  clean_aws_extensions          on an AWS-flavoured Swagger 2.0 spec
+  clean_google_extensions       on a Google-flavoured Swagger 2.0 spec
+  load_spec / save_spec         YAML and JSON, through a temporary directory
+
+Each benchmark runs once untimed, then --repeat timed runs; inputs a function
+modifies in place are deep-copied outside the timed region. Results are
+printed as a table and, with --output, written as JSON. --compare reads an
+earlier JSON result and prints each benchmark's best time relative to it;
+--max-slowdown turns that into a regression check (exit code 1).
+
+Usage:
+  python3 benchmarks/run_benchmarks.py [--paths N] [--definitions N] [--depth N]
+      [--extension-density F] [--ref-density F] [--repeat N] [--seed N]
+      [--output results.json] [--compare baseline.json [--max-slowdown 1.25]]
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+
+# Allow importing openapi_utils from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import openapi_utils as utils
+from specgen import generate_spec
+
+# Bump when the result layout or the benchmark set changes meaning
+RESULTS_SCHEMA = 1
+
+
+def time_call(func, setup, repeat: int) -> dict:
+    """
+    Time func(setup()) repeat times after one warm-up call.
+
+    Returns:
+        {"best_s": ..., "median_s": ..., "mean_s": ..., "runs": repeat}
+    """
+    func(setup())
+    timings = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return {
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "runs": repeat,
+    }
+
+
+def build_benchmarks(params: dict, workdir: str) -> list:
+    """
+    Generate the input specs and return [(name, func, setup), ...].
+
+    Args:
+        params:  generate_spec() keyword arguments except version and vendor.
+        workdir: Directory for the load_spec/save_spec files.
+    """
+    swagger = generate_spec("2.0", vendor="aws", **params)
+    google = generate_spec("2.0", vendor="google", **params)
+    oas3 = utils.convert_swagger_to_openapi3(swagger)
+    with_ids = utils.ensure_operation_ids(copy.deepcopy(oas3))
+
+    benchmarks = [
+        ("convert_swagger_to_openapi3", utils.convert_swagger_to_openapi3, lambda: swagger),
+        ("ensure_operation_ids", utils.ensure_operation_ids, lambda: copy.deepcopy(oas3)),
+        ("validate_apim_requirements", utils.validate_apim_requirements, lambda: with_ids),
+        ("clean_aws_extensions", utils.clean_aws_extensions, lambda: swagger),
+        ("clean_google_extensions", utils.clean_google_extensions, lambda: google),
+    ]
+    for fmt in ("yaml", "json"):
+        path = os.path.join(workdir, f"spec.{fmt}")
+        utils.save_spec(with_ids, path)
+        benchmarks.append((f"load_spec[{fmt}]", utils.load_spec, lambda p=path: p))
+        benchmarks.append((
+            f"save_spec[{fmt}]",
+            lambda p, s=with_ids: utils.save_spec(s, p),
+            lambda p=os.path.join(workdir, f"out.{fmt}"): p,
+        ))
+    return benchmarks
+
+
+def run(params: dict, repeat: int) -> dict:
+    """Run every benchmark and return the JSON-serialisable result document."""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, func, setup in build_benchmarks(params, workdir):
+            results[name] = time_call(func, setup, repeat)
+    return {
+        "schema": RESULTS_SCHEMA,
+        "tool_version": utils.tool_version(),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "machine": platform.machine(),
+        "params": params,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Return {benchmark: current best / baseline best} for benchmarks present in both."""
+    ratios = {}
+    for name, values in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous and previous["best_s"] > 0:
+            ratios[name] = values["best_s"] / previous["best_s"]
+    return ratios
+
+
+def main() -> None:
+    """Parse arguments, run the suite and report (or fail on) the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the openapi_utils public API on synthetic specs.")
+    parser.add_argument("--paths", type=int, default=1000, help="Number of paths (default: 1000)")
+    parser.add_argument("--definitions", type=int, default=500, help="Number of named schemas (default: 500)")
+    parser.add_argument("--depth", type=int, default=2, help="Inline nesting depth per schema (default: 2)")
+    parser.add_argument("--extension-density", type=float, default=0.2, help="Fraction with vendor extensions (default: 0.2)")
+    parser.add_argument("--ref-density", type=float, default=0.5, help="Fraction of schema slots that are $refs (default: 0.5)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (default: 5)")
+    parser.add_argument("--output", help="Write results as JSON to FILE")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument(
+        "--max-slowdown", type=float,
+        help="With --compare: exit 1 if any benchmark is more than this many times slower than the baseline",
+    )
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.max_slowdown is not None and not args.compare:
+        parser.error("--max-slowdown requires --compare")
+
+    params = {
+        "paths": args.paths,
+        "definitions": args.definitions,
+        "depth": args.depth,
+        "extension_density": args.extension_density,
+        "ref_density": args.ref_density,
+        "seed": args.seed,
+    }
+    try:
+        report = run(params, args.repeat)
+    except ValueError as exc:
+        sys.exit(f"ERROR: {exc}")
+
+    ratios = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("params") != params:
+            print(f"WARNING: baseline was run with different parameters: {baseline.get('params')}")
+        ratios = compare(report, baseline)
+
+    print(", ".join(f"{key}={value}" for key, value in params.items()))
+    for name, values in report["results"].items():
+        line = f"  {name:<30} best {values['best_s'] * 1000:9.2f} ms   median {values['median_s'] * 1000:9.2f} ms"
+        if name in ratios:
+            line += f"   {ratios[name]:.2f}x baseline"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+        print(f"Results written to: {args.output}")
+
+    if args.max_slowdown is not None:
+        slower = sorted(name for name, ratio in ratios.items() if ratio > args.max_slowdown)
+        if slower:
+            sys.exit(f"ERROR: slower than {args.max_slowdown}x baseline: {', '.join(slower)}")
+
+
+if __name__ == "__main__":
+    main()
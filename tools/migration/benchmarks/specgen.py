@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+specgen.py
+
+Parametric generator for synthetic Swagger 2.0 and OpenAPI 3.0 specs, used
+by the benchmark suite and the scaling tests.
+
+Parameters:
+  version            "2.0" (Swagger, #/definitions) or "3.0" (OpenAPI, #/components/schemas)
+  paths              Path items; each has a get and a post operation without operationId
+  definitions        Named schemas
+  depth              Levels of inline object nesting below each named schema
+  extension_density  Fraction of schemas and operations carrying a vendor extension (0-1)
+  ref_density        Fraction of schema slots that are $ref instead of inline schemas (0-1)
+  vendor             "aws" (x-amazon-apigateway-*) or "google" (x-google-*) extensions
+  seed               Random seed; the same parameters always produce the same spec
+
+Usage:
+  python3 benchmarks/specgen.py [--version 2.0|3.0] [--paths N] ... [--output FILE]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+VERSIONS = ("2.0", "3.0")
+
+# Extension keys per vendor: (schema-level, operation-level, root-level)
+VENDOR_EXTENSIONS = {
+    "aws": ("x-amazon-apigateway-schema-hint", "x-amazon-apigateway-integration", "x-amazon-apigateway-policy"),
+    "google": ("x-google-schema-hint", "x-google-backend", "x-google-management"),
+}
+
+# Path segments mixing the separators _path_to_camel() splits on
+_SEGMENTS = ("users", "orders", "inventory-items", "billing_accounts", "v2")
+
+
+def generate_spec(
+    version: str = "2.0",
+    paths: int = 100,
+    definitions: int = 50,
+    depth: int = 2,
+    extension_density: float = 0.2,
+    ref_density: float = 0.5,
+    vendor: str = "aws",
+    seed: int = 0,
+) -> dict:
+    """
+    Build a synthetic spec shaped like a gateway export.
+
+    Args:
+        See the module docstring.
+
+    Returns:
+        A new spec dict with no shared nodes.
+
+    Raises:
+        ValueError: If a parameter is out of range.
+    """
+    if version not in VERSIONS:
+        raise ValueError(f"Unknown spec version '{version}'. Expected one of: {', '.join(VERSIONS)}")
+    if vendor not in VENDOR_EXTENSIONS:
+        raise ValueError(f"Unknown vendor '{vendor}'. Expected one of: {', '.join(VENDOR_EXTENSIONS)}")
+    if min(paths, definitions, depth) < 0:
+        raise ValueError("paths, definitions and depth must be non-negative")
+    for name, density in (("extension_density", extension_density), ("ref_density", ref_density)):
+        if not 0 <= density <= 1:
+            raise ValueError(f"{name} must be between 0 and 1, got {density}")
+
+    rng = random.Random(seed)
+    swagger2 = version == "2.0"
+    ref_base = "#/definitions/" if swagger2 else "#/components/schemas/"
+    schema_ext, operation_ext, root_ext = VENDOR_EXTENSIONS[vendor]
+
+    def slot(inline: dict) -> dict:
+        """A $ref to a random named schema (ref_density of the time) or the inline schema."""
+        if definitions and rng.random() < ref_density:
+            return {"$ref": f"{ref_base}Model{rng.randrange(definitions)}"}
+        return inline
+
+    def extend(node: dict, key: str, value: dict) -> dict:
+        if rng.random() < extension_density:
+            node[key] = value
+        return node
+
+    def schema(level: int) -> dict:
+        properties = {
+            "id": {"type": "string", "format": "uuid"},
+            "count": {"type": "integer", "format": "int32"},
+            "items": {"type": "array", "items": slot({"type": "string"})},
+        }
+        if level < depth:
+            properties["nested"] = schema(level + 1)
+        else:
+            properties["related"] = slot({"type": "object", "properties": {"name": {"type": "string"}}})
+        node = {"type": "object", "required": ["id"], "properties": properties}
+        return extend(node, schema_ext, {"generated": True, "level": level})
+
+    def operation(index: int, method: str, path_params: list) -> dict:
+        body_schema = slot({"type": "object", "properties": {"value": {"type": "string"}}})
+        response_schema = slot({"type": "array", "items": {"type": "string"}})
+        query = {"in": "query", "name": "limit", "required": False}
+        if swagger2:
+            parameters = [dict(param, type="string") for param in path_params] + [dict(query, type="integer")]
+            if method == "post":
+                parameters.append({"in": "body", "name": "body", "required": True, "schema": body_schema})
+            responses = {"200": {"description": "OK", "schema": response_schema}, "400": {"description": "Bad request"}}
+            op = {"summary": f"{method} resource {index}", "parameters": parameters, "responses": responses}
+        else:
+            parameters = [dict(param, schema={"type": "string"}) for param in path_params]
+            parameters.append(dict(query, schema={"type": "integer"}))
+            responses = {
+                "200": {"description": "OK", "content": {"application/json": {"schema": response_schema}}},
+                "400": {"description": "Bad request"},
+            }
+            op = {"summary": f"{method} resource {index}", "parameters": parameters, "responses": responses}
+            if method == "post":
+                op["requestBody"] = {"required": True, "content": {"application/json": {"schema": body_schema}}}
+        op["tags"] = [_SEGMENTS[index % len(_SEGMENTS)]]
+        return extend(op, operation_ext, {"type": "http_proxy", "uri": f"https://backend.example.com/r{index}"})
+
+    spec: dict = {"info": {"title": "Synthetic export", "version": "1.0"}}
+    if swagger2:
+        spec.update({
+            "swagger": "2.0",
+            "host": "api.example.com",
+            "basePath": "/v1",
+            "schemes": ["https"],
+            "consumes": ["application/json"],
+            "produces": ["application/json"],
+            "securityDefinitions": {"api_key": {"type": "apiKey", "name": "x-api-key", "in": "header"}},
+        })
+    else:
+        spec.update({
+            "openapi": "3.0.3",
+            "servers": [{"url": "https://api.example.com/v1"}],
+        })
+    spec["security"] = [{"api_key": []}]
+    if extension_density:
+        spec[root_ext] = {"generated": True}
+
+    schemas = {f"Model{i}": schema(0) for i in range(definitions)}
+    spec["paths"] = {}
+    for i in range(paths):
+        segment = _SEGMENTS[i % len(_SEGMENTS)]
+        if i % 2:
+            path, path_params = f"/{segment}{i}/{{id}}", [{"in": "path", "name": "id", "required": True}]
+        else:
+            path, path_params = f"/{segment}{i}", []
+        spec["paths"][path] = {method: operation(i, method, path_params) for method in ("get", "post")}
+
+    if swagger2:
+        spec["definitions"] = schemas
+    else:
+        spec["components"] = {
+            "schemas": schemas,
+            "securitySchemes": {"api_key": {"type": "apiKey", "name": "x-api-key", "in": "header"}},
+        }
+    return spec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Swagger 2.0 / OpenAPI 3.0 spec.")
+    parser.add_argument("--version", choices=VERSIONS, default="2.0", help="Spec version (default: 2.0)")
+    parser.add_argument("--paths", type=int, default=100, help="Number of paths (default: 100)")
+    parser.add_argument("--definitions", type=int, default=50, help="Number of named schemas (default: 50)")
+    parser.add_argument("--depth", type=int, default=2, help="Inline nesting depth per schema (default: 2)")
+    parser.add_argument("--extension-density", type=float, default=0.2, help="Fraction with vendor extensions (default: 0.2)")
+    parser.add_argument("--ref-density", type=float, default=0.5, help="Fraction of schema slots that are $refs (default: 0.5)")
+    parser.add_argument("--vendor", choices=sorted(VENDOR_EXTENSIONS), default="aws", help="Extension vendor (default: aws)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", help="Write to FILE (.json, .yaml or .yml) instead of JSON on stdout")
+    args = parser.parse_args()
+
+    try:
+        spec = generate_spec(
+            args.version, args.paths, args.definitions, args.depth,
+            args.extension_density, args.ref_density, args.vendor, args.seed,
+        )
+    except ValueError as exc:
+        sys.exit(f"ERROR: {exc}")
+    if args.output:
+        # Allow importing openapi_utils from the parent directory
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+        import openapi_utils  # pylint: disable=import-outside-toplevel
+        openapi_utils.save_spec(spec, args.output)
+    else:
+        json.dump(spec, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
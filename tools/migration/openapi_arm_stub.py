@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+openapi_arm_stub.py
+
+Local stand-in for the Azure Resource Manager API-import endpoints, so
+that openapi_import.py can be tested and tried out without an Azure
+subscription. It speaks HTTP/1.1 with keep-alive on 127.0.0.1 and
+emulates:
+
+  PUT  .../providers/Microsoft.ApiManagement/service/{service}/apis/{id}?api-version=...
+       Checks the bearer token and the body ({"properties": {"format",
+       "value", "path", ...}}; an "openapi+json" value must parse as
+       JSON), then answers 201 with the API, or 202 with
+       Azure-AsyncOperation and Location headers when async_polls is set.
+  GET  .../operations/{operation}?api-version=...
+       {"status": "InProgress"} for async_polls - 1 polls, then
+       "Succeeded" (the API is stored only then).
+  GET  .../apis/{id}?api-version=...
+       The stored API, or 404.
+
+Throttling is emulated by answering the first throttle PUTs of every API
+with 429 and Retry-After: 0. The stub counts connections, requests and
+the most requests in flight at once, which tests use to check pooling and
+bounded concurrency. With keepalive_requests it closes each connection
+after that many requests without saying so, like a load balancer dropping
+idle connections.
+
+Usage:
+  python3 openapi_arm_stub.py [--port N] [--throttle N] [--async-polls N] [--delay SECONDS]
+  python3 openapi_import.py --endpoint http://127.0.0.1:N --subscription s --resource-group rg --service apim ...
+  (with AZURE_ACCESS_TOKEN set to the --token value, default 'stub-token')
+
+Used by:
+  - tests/test_openapi_import.py
+"""
+
+import re
+import json
+import asyncio
+import itertools
+import urllib.parse
+from typing import Any, Optional
+
+# Import formats the stub accepts
+FORMATS = ("openapi", "openapi+json", "openapi-link", "openapi+json-link", "swagger-json", "swagger-link-json")
+
+_API = re.compile(
+    r"^/subscriptions/[^/]+/resourceGroups/[^/]+/providers/Microsoft\.ApiManagement/service/([^/]+)/apis/([^/]+)$"
+)
+_OPERATION = re.compile(
+    r"^/subscriptions/[^/]+/resourceGroups/[^/]+/providers/Microsoft\.ApiManagement/service/[^/]+/operations/([^/]+)$"
+)
+
+_REASONS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized",
+            404: "Not Found", 405: "Method Not Allowed", 429: "Too Many Requests"}
+
+
+def _error(code: str, message: str) -> dict:
+    return {"error": {"code": code, "message": message}}
+
+
+class ArmStub:
+    """
+    Asyncio HTTP server emulating the ARM API-import endpoints (see the module docstring).
+
+    Args:
+        token:       Accepted bearer token.
+        throttle:    429 responses sent to the first PUTs of every API.
+        async_polls: Polls a long-running import takes; 0 imports synchronously.
+        delay:       Seconds each request takes.
+        keepalive_requests: Requests answered per connection before it is
+                     silently closed; 0 keeps connections open.
+
+    Attributes:
+        apis:         (service, api id) → stored API properties (without the spec text).
+        connections:  Connections accepted.
+        requests:     Requests answered.
+        max_inflight: Most requests handled at once.
+    """
+
+    def __init__(
+        self, token: str = "stub-token", throttle: int = 0, async_polls: int = 0, delay: float = 0.0,
+        keepalive_requests: int = 0,
+    ):
+        self.token = token
+        self.keepalive_requests = keepalive_requests
+        self.throttle = throttle
+        self.async_polls = async_polls
+        self.delay = delay
+        self.apis: dict = {}
+        self.connections = 0
+        self.requests = 0
+        self.max_inflight = 0
+        self._inflight = 0
+        self._puts: dict = {}        # (service, api id) → PUTs received
+        self._operations: dict = {}  # operation id → [polls left, key, properties]
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.url = ""
+
+    async def start(self, port: int = 0) -> str:
+        """Listen on 127.0.0.1:port (0 picks a free port); returns the endpoint URL."""
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", port)
+        self.url = f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    async def close(self) -> None:
+        """Stop listening and drop open connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer requests on one connection until the client closes it."""
+        self.connections += 1
+        answered = 0
+        try:
+            while not self.keepalive_requests or answered < self.keepalive_requests:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self._inflight += 1
+                self.max_inflight = max(self.max_inflight, self._inflight)
+                try:
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    status, response_headers, payload = self.handle(method, target, headers, body)
+                finally:
+                    self._inflight -= 1
+                self.requests += 1
+                data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Status')}", f"Content-Length: {len(data)}"]
+                if data:
+                    head.append("Content-Type: application/json")
+                head.extend(f"{name}: {value}" for name, value in response_headers.items())
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                answered += 1
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            return
+        finally:
+            writer.close()
+
+    def handle(self, method: str, target: str, headers: dict, body: bytes) -> tuple:
+        """Answer one request: (status, headers, JSON payload or None)."""
+        parts = urllib.parse.urlsplit(target)
+        if "api-version" not in urllib.parse.parse_qs(parts.query):
+            return 400, {}, _error("MissingApiVersionParameter", "The api-version query parameter is required.")
+        if headers.get("authorization") != f"Bearer {self.token}":
+            return 401, {}, _error("AuthenticationFailed", "Missing or invalid bearer token.")
+
+        operation = _OPERATION.match(parts.path)
+        if operation and method == "GET":
+            return self._poll(operation.group(1))
+        api = _API.match(parts.path)
+        if not api:
+            return 404, {}, _error("NotFound", f"No resource at {parts.path}.")
+        key = (urllib.parse.unquote(api.group(1)), urllib.parse.unquote(api.group(2)))
+        if method == "GET":
+            if key not in self.apis:
+                return 404, {}, _error("ResourceNotFound", f"API '{key[1]}' was not found.")
+            return 200, {}, {"name": key[1], "properties": self.apis[key]}
+        if method != "PUT":
+            return 405, {}, _error("MethodNotAllowed", f"{method} is not supported by the stub.")
+        return self._put(key, parts, body)
+
+    def _put(self, key: tuple, parts: Any, body: bytes) -> tuple:
+        self._puts[key] = self._puts.get(key, 0) + 1
+        if self._puts[key] <= self.throttle:
+            return 429, {"Retry-After": "0"}, _error("TooManyRequests", "Throttled by the stub.")
+        try:
+            properties = json.loads(body)["properties"]
+            fmt, value, path = properties["format"], properties["value"], properties["path"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {}, _error("ValidationError", "Body must be {\"properties\": {\"format\", \"value\", \"path\"}}.")
+        if fmt not in FORMATS:
+            return 400, {}, _error("ValidationError", f"Unsupported format '{fmt}'.")
+        if fmt == "openapi+json":
+            try:
+                json.loads(value)
+            except ValueError as exc:
+                return 400, {}, _error("ValidationError", f"Parsing error(s): {exc}")
+        stored = {name: item for name, item in properties.items() if name != "value"}
+        stored["path"] = path
+        if not self.async_polls:
+            self.apis[key] = stored
+            return 201, {}, {"name": key[1], "properties": stored}
+        operation = str(next(self._ids))
+        self._operations[operation] = [self.async_polls, key, stored]
+        base = parts.path.rsplit("/apis/", 1)[0]
+        url = f"{self.url}{base}/operations/{operation}?api-version=2022-08-01"
+        return 202, {"Azure-AsyncOperation": url, "Location": url, "Retry-After": "0"}, None
+
+    def _poll(self, operation: str) -> tuple:
+        if operation not in self._operations:
+            return 404, {}, _error("NotFound", f"Operation '{operation}' was not found.")
+        state = self._operations[operation]
+        state[0] -= 1
+        if state[0] > 0:
+            return 200, {"Retry-After": "0"}, {"status": "InProgress"}
+        self.apis[state[1]] = state[2]
+        return 200, {}, {"status": "Succeeded"}
+
+
+def main() -> None:
+    """Run the stub until interrupted."""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the ARM API Management import endpoints.")
+    parser.add_argument("--port", type=int, default=0, help="Port on 127.0.0.1 (default: a free one)")
+    parser.add_argument("--token", default="stub-token", help="Accepted bearer token (default: stub-token)")
+    parser.add_argument("--throttle", type=int, default=0, help="429 responses to the first PUTs of every API")
+    parser.add_argument("--async-polls", type=int, default=0, help="Polls each import takes (default: 0, synchronous)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds each request takes")
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        stub = ArmStub(args.token, args.throttle, args.async_polls, args.delay)
+        print(f"ARM stub listening on {await stub.start(args.port)}", flush=True)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+openapi_bundle.py
+
+Multi-file $ref bundler for openapi_utils.py: turns a spec whose schemas,
+parameters and responses live in other files ('./models/user.yaml#/User')
+into one self-contained document that the conversion can take as is.
+
+Every external reference target is copied into the root document's
+component maps — 'components/<type>' for OpenAPI 3.x, 'definitions',
+'parameters' or 'responses' for Swagger 2.0 — and the $ref is rewritten to
+point there. The component type follows from where the $ref sits (a
+parameter list entry, a response, a request body, a schema, ...); targets
+that have no component map (path items, and Swagger 2.0 headers or
+examples) are inlined instead. References inside a loaded file resolve
+against that file, '#/...' ones included, and references back into the
+root file become local ones.
+
+Files are loaded at most once, through a memoising loader backed by a
+thread pool: all the files a document refers to are requested before any
+of them is needed, so they are read and parsed concurrently. Each target
+is copied once however often it is referenced, so recursive schemas turn
+into recursive component $refs. What cannot be bundled raises ValueError:
+an unreadable file or pointer, a cycle of path items that would have to be
+inlined into themselves, or components that only refer to each other
+('A: {$ref: B}', 'B: {$ref: A}').
+
+Component names come from the last pointer token ('#/User' → User) or the
+file name ('user.yaml' → user). A name already taken by a different target
+— in the root document or by an earlier bundled target — gets the file
+name as a prefix (user_User), then a numeric suffix; these renames are
+listed in the report. Names are assigned in document order, so they are
+the same on every run.
+
+URLs ('https://...') are left as they are.
+
+Used by:
+  - openapi_utils.py <input> <output> --bundle
+"""
+
+import os
+import re
+from typing import Any, Optional
+
+# Keys whose list items or dict values are objects of one component type
+_CONTAINER_KINDS = {
+    "definitions": "schemas", "schemas": "schemas", "parameters": "parameters", "responses": "responses",
+    "headers": "headers", "examples": "examples", "links": "links", "callbacks": "callbacks",
+    "requestBodies": "requestBodies", "securitySchemes": "securitySchemes", "paths": "pathItems",
+    "pathItems": "pathItems",
+}
+
+# Keys whose value is itself an object of one component type
+_DIRECT_KINDS = {"schema": "schemas", "requestBody": "requestBodies"}
+
+# Swagger 2.0 component maps; other types are inlined
+_SWAGGER2_LOCATIONS = {"schemas": ("definitions",), "parameters": ("parameters",), "responses": ("responses",)}
+
+# Free-form values, copied without looking for $refs (except as names in a map, such as a property 'example')
+_LITERAL_KEYS = frozenset(("example", "x-example"))
+
+# Schema keywords whose value maps names to schemas
+_SCHEMA_MAPS = frozenset(("properties", "patternProperties", "definitions", "$defs", "dependentSchemas"))
+
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+_SPEC_SUFFIX = re.compile(r"(\.(json|ya?ml))?(\.gz)?$")
+
+
+def _child_context(context: Any, key: Any) -> Any:
+    """
+    Context of the child at key of a node with the given context.
+
+    A context is 'schemas' inside a schema (all descendants are schemas),
+    a component type for an object of that type, ('items', type) for a map
+    or list of such objects, or None for structural nodes.
+    """
+    if context == "schemas":
+        return "schemas"
+    if isinstance(context, tuple):
+        return context[1]
+    if context == "callbacks":
+        return "pathItems"
+    if key in _DIRECT_KINDS:
+        return _DIRECT_KINDS[key]
+    if key in _CONTAINER_KINDS:
+        return ("items", _CONTAINER_KINDS[key])
+    return None
+
+
+def _decode_pointer(fragment: str) -> list:
+    """'/a~1b/0' → ['a/b', '0']; '' → [] (the whole document)."""
+    if not fragment:
+        return []
+    if not fragment.startswith("/"):
+        raise ValueError(f"unsupported fragment '#{fragment}' (expected a JSON pointer)")
+    return [token.replace("~1", "/").replace("~0", "~") for token in fragment[1:].split("/")]
+
+
+def _resolve_pointer(document: Any, tokens: list) -> Any:
+    node = document
+    for token in tokens:
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+            node = node[int(token)]
+        else:
+            raise ValueError(f"'{token}' not found")
+    return node
+
+
+def _file_stem(file_path: str) -> str:
+    """'models/user.yaml.gz' → 'user'."""
+    return _SPEC_SUFFIX.sub("", os.path.basename(file_path)) or "spec"
+
+
+def _merge_components(spec: dict, location: tuple, components: dict) -> None:
+    """Add components to the map at location in spec (a bundle copy), creating the maps on the way."""
+    container = spec
+    for key in location:
+        if not isinstance(container.get(key), dict):
+            container[key] = {}
+        container = container[key]
+    container.update(components)
+
+
+class _SpecLoader:
+    """Loads each spec file once; load requests run concurrently on a thread pool."""
+
+    def __init__(self, serializer: Any = None, jobs: Optional[int] = None):
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+        self._serializer = serializer
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+        self._futures: dict = {}
+
+    def prefetch(self, file_path: str) -> None:
+        """Start loading file_path unless it was requested before."""
+        if file_path not in self._futures:
+            import openapi_utils  # pylint: disable=import-outside-toplevel
+            # pylint: disable-next=protected-access
+            self._futures[file_path] = self._pool.submit(openapi_utils._read_spec, file_path, self._serializer)
+
+    def get(self, file_path: str) -> Any:
+        """The parsed document of file_path; raises the loader's ValueError."""
+        self.prefetch(file_path)
+        return self._futures[file_path].result()
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def close(self) -> None:
+        """Wait for running loads and drop the ones not started."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+class _Bundler:
+    """State of one bundle_spec() run."""
+
+    def __init__(self, root_file: str, loader: _SpecLoader):
+        self.root_file = root_file
+        self.loader = loader
+        self.root = loader.get(root_file)
+        if not isinstance(self.root, dict):
+            raise ValueError(f"'{root_file}' does not contain an OpenAPI document")
+        self.swagger2 = str(self.root.get("swagger", "")).startswith("2") and not self.root.get("openapi")
+        self.names: dict = {}      # (file, fragment, location) → name
+        self.taken: dict = {}      # location → names in use
+        self.added: dict = {}      # location → {name: bundled component}
+        self.pending: list = []    # (file, fragment, location, name, kind, ref, base) still to copy
+        self.inlining: list = []   # (file, fragment) of the targets being inlined, outermost first
+        self.inlined = 0
+        self.renamed: list = []
+
+    def location(self, kind: str) -> Optional[tuple]:
+        """Component map for an object of kind; None when it has to be inlined."""
+        if self.swagger2:
+            return _SWAGGER2_LOCATIONS.get(kind)
+        return None if kind == "pathItems" else ("components", kind)
+
+    def run(self) -> dict:
+        """The bundled document: the rewritten root plus every target copied into its component map."""
+        result = self.rewrite(self.root, self.root_file, None)
+        # pending grows while it is worked through: targets refer to further targets
+        index = 0
+        while index < len(self.pending):
+            file_path, fragment, location, name, kind, ref, base = self.pending[index]
+            index += 1
+            target = self.resolve(file_path, fragment, ref, base)
+            self.added.setdefault(location, {})[name] = self.rewrite(target, file_path, kind)
+        self.check_alias_cycles()
+        for location, components in self.added.items():
+            _merge_components(result, location, components)
+        return result
+
+    def resolve(self, file_path: str, fragment: str, ref: str, base: str) -> Any:
+        """The value ref (found in base) points to, as loaded from file_path."""
+        try:
+            return _resolve_pointer(self.loader.get(file_path), _decode_pointer(fragment))
+        except ValueError as exc:
+            raise ValueError(f"Cannot resolve $ref '{ref}' in '{base}': {exc}") from exc
+
+    def rewrite(self, node: Any, base: str, context: Any) -> Any:
+        """Copy of node, a value from file base, with every $ref rewritten into the bundle."""
+        holder = [None]
+        # names: value is a map whose keys are names rather than keywords
+        stack = [(node, holder, 0, context, False)]
+        while stack:
+            value, parent, key, context, names = stack.pop()
+            if isinstance(value, dict):
+                ref = value.get("$ref")
+                if isinstance(ref, str):
+                    replacement = self.rewrite_ref(value, ref, base, context)
+                    if replacement is not None:
+                        parent[key] = replacement
+                        continue
+                copied = parent[key] = dict(value)
+                literal = () if names else _LITERAL_KEYS
+                # Pushed in reverse so that $refs are met (and named) in document order
+                for child_key, child in reversed(value.items()):
+                    if isinstance(child, (dict, list)) and child_key not in literal:
+                        child_context = _child_context(context, child_key)
+                        child_names = not names and (
+                            isinstance(child_context, tuple) or (context == "schemas" and child_key in _SCHEMA_MAPS)
+                        )
+                        stack.append((child, copied, child_key, child_context, child_names))
+            elif isinstance(value, list):
+                copied = parent[key] = list(value)
+                child_context = _child_context(context, None)
+                for index in range(len(value) - 1, -1, -1):
+                    if isinstance(value[index], (dict, list)):
+                        stack.append((value[index], copied, index, child_context, False))
+            else:
+                parent[key] = value
+        return holder[0]
+
+    def rewrite_ref(self, node: dict, ref: str, base: str, context: Any) -> Any:
+        """Replacement for a $ref object of file base, or None to keep it as it is."""
+        if "://" in ref:
+            return None
+        file_part, _, fragment = ref.partition("#")
+        if not file_part and base == self.root_file:
+            return None
+        if file_part:
+            from urllib.parse import unquote  # pylint: disable=import-outside-toplevel
+            file_path = os.path.normpath(os.path.join(os.path.dirname(base), unquote(file_part)))
+        else:
+            file_path = base
+        if file_path == self.root_file:
+            return {**node, "$ref": "#" + fragment}
+
+        kind = context if isinstance(context, str) else "schemas"
+        location = self.location(kind)
+        if location is None:
+            return self.inline(file_path, fragment, kind, ref, base)
+        name = self.component_name(file_path, fragment, location, kind, ref, base)
+        return {**node, "$ref": "#/" + "/".join(location + (name,))}
+
+    def inline(self, file_path: str, fragment: str, kind: str, ref: str, base: str) -> Any:
+        """Rewritten copy of a target that has no component map; raises ValueError on a cycle."""
+        target = (file_path, fragment)
+        if target in self.inlining:
+            chain = " → ".join(f"{path}#{pointer}" for path, pointer in self.inlining[self.inlining.index(target):])
+            raise ValueError(f"Circular $ref '{ref}' in '{base}': {chain} → {file_path}#{fragment}")
+        self.inlining.append(target)
+        try:
+            content = self.rewrite(self.resolve(file_path, fragment, ref, base), file_path, kind)
+        finally:
+            self.inlining.pop()
+        self.inlined += 1
+        return content
+
+    def component_name(self, file_path: str, fragment: str, location: tuple, kind: str, ref: str, base: str) -> str:
+        """Name of the bundled copy of a target, registering (and prefetching) new targets."""
+        key = (file_path, fragment, location)
+        if key in self.names:
+            return self.names[key]
+        taken = self.taken.get(location)
+        if taken is None:
+            try:
+                existing = _resolve_pointer(self.root, list(location))
+            except ValueError:
+                existing = {}
+            taken = self.taken[location] = set(existing) if isinstance(existing, dict) else set()
+
+        tokens = _decode_pointer(fragment)
+        stem = _UNSAFE_NAME.sub("_", _file_stem(file_path))
+        name = _UNSAFE_NAME.sub("_", tokens[-1]) if tokens and tokens[-1] else stem
+        candidate = name
+        if candidate in taken:
+            base_name = candidate = name if name == stem else f"{stem}_{name}"
+            suffix = 2
+            while candidate in taken:
+                candidate = f"{base_name}_{suffix}"
+                suffix += 1
+            self.renamed.append((f"{file_path}#{fragment}", "/".join(location + (candidate,))))
+        taken.add(candidate)
+        self.names[key] = candidate
+        self.loader.prefetch(file_path)
+        self.pending.append((file_path, fragment, location, candidate, kind, ref, base))
+        return candidate
+
+    def check_alias_cycles(self) -> None:
+        """Raise ValueError if bundled components only refer to each other in a loop."""
+        aliases = {}
+        for location, components in self.added.items():
+            prefix = "#/" + "/".join(location) + "/"
+            for name, component in components.items():
+                if isinstance(component, dict) and isinstance(component.get("$ref"), str):
+                    target = component["$ref"]
+                    if target.startswith(prefix):
+                        aliases[prefix + name] = target
+        for start, current in aliases.items():
+            seen = [start]
+            while current in aliases:
+                if current in seen:
+                    loop = seen[seen.index(current):] + [current]
+                    raise ValueError(f"Circular $ref chain: {' → '.join(loop)}")
+                seen.append(current)
+                current = aliases[current]
+
+
+def bundle_spec(file_path: str, serializer: Any = None, jobs: Optional[int] = None) -> tuple:
+    """
+    Load file_path and every file its $refs reach into one document (see the module docstring).
+
+    Args:
+        file_path:  Root spec (YAML or JSON, optionally gzipped).
+        serializer: openapi_serializers.Serializer used for every file.
+        jobs:       Loader threads (default: ThreadPoolExecutor's default).
+
+    Returns:
+        (spec, report) where report is {"files": files loaded (root included),
+        "components": components added, "inlined": targets inlined,
+        "renamed": [(target, new location), ...]}.
+
+    Raises:
+        ValueError: If a file or $ref cannot be resolved, or the references
+                    form a cycle that cannot be expressed (see above).
+    """
+    loader = _SpecLoader(serializer, jobs)
+    try:
+        bundler = _Bundler(os.path.normpath(os.path.abspath(file_path)), loader)
+        spec = bundler.run()
+    finally:
+        loader.close()
+    return spec, {
+        "files": len(loader),
+        "components": sum(len(components) for components in bundler.added.values()),
+        "inlined": bundler.inlined,
+        "renamed": bundler.renamed,
+    }
+
+
+def describe(report: dict) -> str:
+    """Summary of a bundle_spec() report for the CLI, one line plus one per renamed target."""
+    lines = [
+        f"[bundle] {report['files']} file(s) loaded, {report['components']} component(s) added, "
+        f"{report['inlined']} reference(s) inlined."
+    ]
+    lines.extend(f"  ⚠️  Name collision: {target} bundled as {location}" for target, location in report["renamed"])
+    return "\n".join(lines)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+openapi_cache.py
+
+Content-addressed on-disk cache for openapi_utils.py conversion results.
+
+An entry is keyed by a SHA-256 of the input file bytes, the CLI options that
+affect the result (--source, --no-convert, --no-operationid, output format,
+gzip, --compact)
+and the tool version. It stores the exact bytes that were written to the
+output file together with the validation issues, so a cache hit can replay
+a run without parsing, transforming or serialising anything.
+
+Layout:
+  <cache-dir>/<key[:2]>/<key>.out    output file bytes (absent for validate-only runs)
+  <cache-dir>/<key[:2]>/<key>.json   metadata: issues, output size
+
+The metadata file is written last and acts as the commit marker; its mtime
+is refreshed on every hit and drives least-recently-used eviction once the
+cache grows beyond its size bound.
+
+Used by:
+  - openapi_utils.py --cache-dir DIR [--cache-max-mb N]
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Optional
+
+# Default upper bound for the total size of cached entries
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write data to path via a temporary file and rename, so readers never see partial files."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ConversionCache:
+    """
+    Persistent, size-bounded LRU cache of conversion results.
+
+    The cache is safe to share between concurrent runs: entries are written
+    atomically and a reader that loses a race with eviction simply sees a miss.
+
+    Args:
+        cache_dir:    Directory holding the entries (created if missing).
+        max_bytes:    Total size bound; least recently used entries are evicted beyond it.
+        tool_version: Version fingerprint of the converter, mixed into every key.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES, tool_version: str = ""):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.tool_version = tool_version
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._total_bytes: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, input_bytes: bytes, options: dict) -> str:
+        """Return the content address for input_bytes processed with options."""
+        digest = hashlib.sha256()
+        header = json.dumps({"tool": self.tool_version, "options": options}, sort_keys=True)
+        digest.update(header.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(input_bytes)
+        return digest.hexdigest()
+
+    def _entry_paths(self, key: str) -> tuple:
+        shard = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(shard, key + ".out"), os.path.join(shard, key + ".json")
+
+    def get(self, key: str) -> Optional[tuple]:
+        """
+        Look up an entry and mark it as recently used.
+
+        Returns:
+            (output_bytes_or_None, issues) on a hit, None on a miss.
+        """
+        output_path, meta_path = self._entry_paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            output = None
+            if meta.get("has_output"):
+                with open(output_path, "rb") as fh:
+                    output = fh.read()
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return output, meta.get("issues", [])
+
+    def put(self, key: str, output: Optional[bytes], issues: list) -> None:
+        """Store the output bytes (None for validate-only runs) and issues under key."""
+        output_path, meta_path = self._entry_paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        if output is not None:
+            _atomic_write(output_path, output)
+        meta = {"has_output": output is not None, "size": len(output or b""), "issues": issues}
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        _atomic_write(meta_path, meta_bytes)
+        self.stores += 1
+        if self._total_bytes is not None:
+            self._total_bytes += len(output or b"") + len(meta_bytes)
+        self._evict_if_needed()
+
+    def _scan(self) -> list:
+        """Return [(mtime, size, output_path, meta_path)] for every committed entry."""
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                if not item.name.endswith(".json"):
+                    continue
+                output_path = item.path[:-len(".json")] + ".out"
+                try:
+                    size = item.stat().st_size
+                    if os.path.exists(output_path):
+                        size += os.path.getsize(output_path)
+                    entries.append((item.stat().st_mtime, size, output_path, item.path))
+                except OSError:
+                    continue
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+            return
+        entries = self._scan()
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, output_path, meta_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, output_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this cache instance."""
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "evictions": self.evictions}
+
+    def summary(self) -> str:
+        """One-line hit/miss report printed at the end of a CLI run."""
+        lookups = self.hits + self.misses
+        rate = f" ({self.hits / lookups:.0%} hit rate)" if lookups else ""
+        return (
+            f"Cache: {self.hits} hit(s), {self.misses} miss(es){rate}, "
+            f"{self.stores} stored, {self.evictions} evicted"
+        )
+
+
+def read_bytes(file_path: str) -> bytes:
+    """Read a whole input file for hashing; raises ValueError in openapi_utils' message style."""
+    try:
+        with open(file_path, "rb") as fh:
+            return fh.read()
+    except OSError as exc:
+        raise ValueError(f"Cannot read file '{file_path}': {exc}") from exc
+
+
+def cache_options(options: dict, output_file: Any, compact_json: bool = False, canonical: bool = False) -> dict:
+    """
+    Key options for a run: process_spec() options plus the output encoding.
+
+    format is None for validate-only runs; gzip, compact JSON output
+    (--compact) and canonical output (--canonical) change the stored bytes
+    and therefore the key.
+    """
+    if output_file is None:
+        return {**options, "format": None}
+    name = str(output_file)
+    gzipped = name.endswith(".gz")
+    if gzipped:
+        name = name[:-len(".gz")]
+    output_format = "json" if name.endswith(".json") else "yaml"
+    key = {
+        **options,
+        "format": output_format,
+        "gzip": gzipped,
+        "compact": bool(compact_json) and output_format == "json",
+    }
+    if canonical:
+        # Only set when used, so keys of earlier runs stay valid
+        key["canonical"] = True
+    return key
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+openapi_canonical.py
+
+Canonical form and semantic hash of a spec, so that two exports of the
+same API give the same output bytes and the same hash even when they
+differ in key order, layout or scalar spelling.
+
+Key order:
+
+  - The document root, Info, Path Item and Operation objects list the
+    fields the OpenAPI / Swagger 2.0 specification defines in its own
+    order (HTTP methods in openapi_utils.HTTP_METHODS order), then any
+    other keys sorted, vendor extensions ('x-...') last.
+  - Every other mapping — paths, component maps, responses, schemas,
+    properties — is sorted the same way: plain keys first, then 'x-' keys,
+    each group by code point.
+  - Lists keep their order: parameters, enums, tags and server lists are
+    ordered in the spec, and reordering them may change meaning.
+
+Scalars:
+
+  - Mapping keys become strings ('200:' read from YAML as the integer 200
+    is written as '"200"').
+  - Integral floats become integers (1.0 → 1, -0.0 → 0): JSON Schema does
+    not tell them apart. The version fields — 'swagger' and 'openapi' at
+    the root and 'version' in Info — are kept as they are, since an
+    unquoted 'swagger: 2.0' or 'version: 1.0' is a version, not a number.
+  - '\\r\\n' line breaks in strings become '\\n'.
+
+semantic_hash() is the SHA-256 of the canonical form as compact JSON, so
+it only changes when something an import would see changes. Shared
+subtrees are canonicalised once and stay shared (YAML output keeps its
+anchors).
+
+Used by:
+  - openapi_utils.py --canonical
+  - openapi_canonical.py <spec>...            Print the semantic hash of each spec
+  - scripts/import-openapi.sh SKIP_IF_UNCHANGED=true
+"""
+
+import sys
+import math
+from typing import Any
+
+# Field order of the objects whose layout the specification defines
+_ROOT_FIELDS = (
+    "openapi", "swagger", "info", "jsonSchemaDialect", "host", "basePath", "schemes", "consumes", "produces",
+    "servers", "tags", "paths", "webhooks", "components", "definitions", "parameters", "responses",
+    "securityDefinitions", "security", "externalDocs",
+)
+_INFO_FIELDS = ("title", "summary", "description", "termsOfService", "contact", "license", "version")
+# openapi_utils.HTTP_METHODS, which this module does not import
+_HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+_PATH_ITEM_FIELDS = ("$ref", "summary", "description", *_HTTP_METHODS, "servers", "parameters")
+_OPERATION_FIELDS = (
+    "tags", "summary", "description", "externalDocs", "operationId", "consumes", "produces", "parameters",
+    "requestBody", "responses", "callbacks", "schemes", "deprecated", "security", "servers",
+)
+
+# Object kinds; GENERIC mappings are sorted
+_GENERIC, _ROOT, _INFO, _PATH_ITEMS, _PATH_ITEM, _OPERATION, _CALLBACKS, _COMPONENTS = range(8)
+
+# Kind → {field: position}
+_RANKS = {
+    kind: {field: position for position, field in enumerate(fields)}
+    for kind, fields in ((_ROOT, _ROOT_FIELDS), (_INFO, _INFO_FIELDS), (_PATH_ITEM, _PATH_ITEM_FIELDS),
+                         (_OPERATION, _OPERATION_FIELDS))
+}
+
+
+# (kind, field) whose value is kept as written
+_VERBATIM = {(_ROOT, "swagger"), (_ROOT, "openapi"), (_INFO, "version")}
+
+
+def _child_kind(kind: int, key: str) -> int:
+    """Kind of the value under key in a mapping of kind."""
+    if kind == _ROOT:
+        if key == "info":
+            return _INFO
+        if key in ("paths", "webhooks"):
+            return _PATH_ITEMS
+        if key == "components":
+            return _COMPONENTS
+    elif kind == _COMPONENTS:
+        if key == "pathItems":
+            return _PATH_ITEMS
+        if key == "callbacks":
+            return _CALLBACKS
+    elif kind == _PATH_ITEMS:
+        return _PATH_ITEM
+    elif kind == _PATH_ITEM and key in _HTTP_METHODS:
+        return _OPERATION
+    elif kind == _OPERATION and key == "callbacks":
+        return _CALLBACKS
+    elif kind == _CALLBACKS:
+        # Callback name → {expression: Path Item}
+        return _PATH_ITEMS
+    return _GENERIC
+
+
+def _key(key: Any) -> str:
+    """Mapping key as the string JSON would write."""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, bool) or key is None:
+        return {True: "true", False: "false", None: "null"}[key]
+    return str(_scalar(key))
+
+
+def _scalar(value: Any) -> Any:
+    """Normalised leaf value."""
+    if isinstance(value, float) and math.isfinite(value) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and "\r\n" in value:
+        return value.replace("\r\n", "\n")
+    return value
+
+
+def _order(kind: int, keys: list) -> list:
+    """keys in canonical order for a mapping of kind."""
+    rank = _RANKS.get(kind, {})
+    return sorted(keys, key=lambda key: (rank.get(key, len(rank)), key.startswith("x-"), key))
+
+
+def canonicalize(spec: Any) -> Any:
+    """
+    Canonical form of spec (see the module docstring).
+
+    spec is not modified. The walk is iterative, so deeply nested schemas
+    do not hit the recursion limit.
+
+    Args:
+        spec: Parsed OpenAPI 3.x or Swagger 2.0 document.
+
+    Returns:
+        A new document with the same content in canonical form.
+
+    Raises:
+        ValueError: If two keys of one mapping become the same string
+                    (200 and '200'), or the document contains itself.
+    """
+    done: dict = {}  # (id, kind) → canonical node
+    active: set = set()
+    # (node, kind, expanded): children are pushed before the node is built
+    stack = [(spec, _ROOT, False)]
+    while stack:
+        node, kind, expanded = stack.pop()
+        memo = (id(node), kind)
+        if not isinstance(node, (dict, list)) or (memo in done and not expanded):
+            continue
+        if not expanded:
+            if memo in active:
+                raise ValueError("The document contains itself and has no canonical form")
+            active.add(memo)
+            stack.append((node, kind, True))
+            if isinstance(node, dict):
+                stack.extend((value, _child_kind(kind, _key(key)), False) for key, value in node.items())
+            else:
+                stack.extend((value, _GENERIC, False) for value in node)
+            continue
+        active.discard(memo)
+        if isinstance(node, list):
+            done[memo] = [
+                done[(id(value), _GENERIC)] if isinstance(value, (dict, list)) else _scalar(value) for value in node
+            ]
+            continue
+        items: dict = {}
+        for key, value in node.items():
+            text = _key(key)
+            if text in items:
+                raise ValueError(f"Keys {key!r} and {text!r} are the same once written as JSON")
+            child = _child_kind(kind, text)
+            if isinstance(value, (dict, list)):
+                items[text] = done[(id(value), child)]
+            else:
+                items[text] = value if (kind, text) in _VERBATIM else _scalar(value)
+        done[memo] = {key: items[key] for key in _order(kind, list(items))}
+    return done[(id(spec), _ROOT)] if isinstance(spec, (dict, list)) else _scalar(spec)
+
+
+def semantic_hash(spec: Any) -> str:
+    """
+    SHA-256 hex digest of spec's canonical form as compact UTF-8 JSON.
+
+    Equal for specs that only differ in key order, layout, YAML vs JSON,
+    quoting of keys or integral float spelling.
+
+    Raises:
+        ValueError: As canonicalize().
+    """
+    import json  # pylint: disable=import-outside-toplevel
+    import hashlib  # pylint: disable=import-outside-toplevel
+    # Unquoted YAML timestamps load as date / datetime, which JSON has no type for
+    text = json.dumps(canonicalize(spec), ensure_ascii=False, separators=(",", ":"), allow_nan=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def main() -> None:
+    """
+    Print '<semantic hash>  <file>' for each spec file, like sha256sum.
+
+    Usage:
+        python3 openapi_canonical.py <spec-file>...
+    """
+    import argparse  # pylint: disable=import-outside-toplevel
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        description="Print the semantic hash of OpenAPI specs: equal for specs that differ only in "
+        "key order, formatting or scalar spelling."
+    )
+    parser.add_argument("files", nargs="+", metavar="SPEC", help="Spec file (YAML or JSON, optionally .gz)")
+    args = parser.parse_args()
+
+    failed = False
+    for file_path in args.files:
+        try:
+            print(f"{semantic_hash(openapi_utils._read_spec(file_path))}  {file_path}")  # pylint: disable=protected-access
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
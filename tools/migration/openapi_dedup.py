@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+openapi_dedup.py
+
+Inline schema deduplication for openapi_utils.py: hoists structurally
+identical inline schemas into 'components/schemas' and replaces every
+copy with a $ref.
+
+The Swagger 2.0 → OpenAPI 3.0 conversion puts the body and response schema
+of an operation under every 'consumes'/'produces' media type, and exports
+repeat the same inline schema across hundreds of operations. Each copy is
+serialised again (JSON), or shared through anchors and aliases that APIM's
+importer and human readers handle poorly (YAML).
+
+The schemas considered are the top-level inline schemas of parameters,
+headers, request bodies and responses — every 'schema' member outside
+'components/schemas' that is not already a $ref. Each is fingerprinted by
+the SHA-256 of its canonical JSON (sorted keys, compact), so key order does
+not matter. A fingerprint is hoisted when it occurs at least twice, its
+canonical JSON is at least min_bytes long and replacing the copies with
+$refs makes the document smaller.
+
+Hoisted schemas are named InlineSchema<first 8 hex digits of the
+fingerprint> (more digits on a clash with an existing name), so the same
+input produces the same names on every run and an edit to one schema
+renames only that schema.
+
+Used by:
+  - openapi_utils.py <input> <output> --dedup-schemas [MIN_BYTES]
+"""
+
+from typing import Any
+
+# Smallest canonical JSON size of an inline schema worth hoisting
+DEFAULT_MIN_BYTES = 256
+
+# Name of a hoisted schema: prefix + leading hex digits of its fingerprint
+SCHEMA_NAME_PREFIX = "InlineSchema"
+_NAME_HASH_LENGTH = 8
+
+# Members holding free-form example values, which may contain a 'schema' key of their own
+_FREE_FORM_KEYS = frozenset(("example", "examples"))
+
+
+def _schema_slots(spec: dict) -> list:
+    """
+    (path, schema) for every inline schema slot of an OpenAPI 3.x spec, in document order.
+
+    path is the tuple of keys and list indexes leading to the 'schema'
+    member, e.g. ('paths', '/pets', 'get', 'responses', '200', 'content',
+    'application/json', 'schema'). Schemas are not descended into.
+    """
+    stack = [(spec[key], (key,)) for key in ("paths", "webhooks") if isinstance(spec.get(key), (dict, list))]
+    components = spec.get("components")
+    if isinstance(components, dict):
+        stack.extend(
+            (value, ("components", key)) for key, value in components.items()
+            if key != "schemas" and key not in _FREE_FORM_KEYS and isinstance(value, (dict, list))
+        )
+    stack.reverse()
+
+    slots = []
+    while stack:
+        node, path = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        children = []
+        for key, value in items:
+            if key == "schema" and isinstance(node, dict):
+                if isinstance(value, dict) and "$ref" not in value:
+                    slots.append((path + (key,), value))
+            elif key not in _FREE_FORM_KEYS and isinstance(value, (dict, list)):
+                children.append((value, path + (key,)))
+        stack.extend(reversed(children))
+    return slots
+
+
+def _fingerprint(schema: dict, memo: dict) -> Any:
+    """(sha256 hex digest, size in bytes) of schema's canonical JSON; None if it has no JSON form."""
+    key = id(schema)
+    if key not in memo:
+        import json  # pylint: disable=import-outside-toplevel
+        import hashlib  # pylint: disable=import-outside-toplevel
+        try:
+            text = json.dumps(schema, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        except TypeError:
+            # Mixed key types (YAML allows integer keys) cannot be sorted
+            memo[key] = None
+        else:
+            data = text.encode("utf-8")
+            memo[key] = (hashlib.sha256(data).hexdigest(), len(data))
+    return memo[key]
+
+
+def _schema_name(digest: str, taken: set) -> str:
+    """SCHEMA_NAME_PREFIX + the shortest digest prefix (from _NAME_HASH_LENGTH digits) not in taken."""
+    for length in range(_NAME_HASH_LENGTH, len(digest) + 1):
+        name = SCHEMA_NAME_PREFIX + digest[:length]
+        if name not in taken:
+            return name
+    suffix = 2
+    while f"{SCHEMA_NAME_PREFIX}{digest}_{suffix}" in taken:
+        suffix += 1
+    return f"{SCHEMA_NAME_PREFIX}{digest}_{suffix}"
+
+
+def _ref_size(name: str) -> int:
+    """Compact JSON size of {"$ref": "#/components/schemas/<name>"}."""
+    return len('{"$ref":"#/components/schemas/"}') + len(name.encode("utf-8"))
+
+
+def _copied_parent(result: dict, path: tuple, copies: dict) -> Any:
+    """
+    The container at path in result, shallow-copying every container on the way.
+
+    copies maps the path prefixes already copied to their copies, so
+    containers shared by several replaced slots are copied once and the
+    input spec is never modified.
+    """
+    node = result
+    for depth in range(1, len(path) + 1):
+        prefix = path[:depth]
+        copied = copies.get(prefix)
+        if copied is None:
+            child = node[path[depth - 1]]
+            copied = copies[prefix] = dict(child) if isinstance(child, dict) else list(child)
+            node[path[depth - 1]] = copied
+        node = copied
+    return node
+
+
+def dedup_inline_schemas(spec: dict, min_bytes: int = DEFAULT_MIN_BYTES) -> tuple:
+    """
+    Hoist repeated inline schemas into components/schemas (see the module docstring).
+
+    spec is not modified: only the containers on the way to a replaced
+    schema are copied, everything else is shared with spec. Swagger 2.0
+    specs (not converted) are returned unchanged.
+
+    Args:
+        spec:      OpenAPI 3.x spec, typically the output of the conversion.
+        min_bytes: Smallest canonical JSON size of a schema to hoist.
+
+    Returns:
+        (deduplicated_spec, report) where report is
+        {"hoisted": {name: copies replaced, ...}, "schemas_hoisted": int,
+         "references": int, "bytes_saved": int}; bytes_saved is the
+        compact JSON size saved. deduplicated_spec is spec itself when
+        nothing is hoisted.
+    """
+    report: dict = {"hoisted": {}, "schemas_hoisted": 0, "references": 0, "bytes_saved": 0}
+    if not str(spec.get("openapi", "")).startswith("3"):
+        return spec, report
+
+    memo: dict = {}
+    groups: dict = {}
+    for path, schema in _schema_slots(spec):
+        fingerprint = _fingerprint(schema, memo)
+        if fingerprint is None or fingerprint[1] < min_bytes:
+            continue
+        group = groups.setdefault(fingerprint[0], (schema, fingerprint[1], []))
+        group[2].append(path)
+
+    components = spec.get("components")
+    existing = components.get("schemas") if isinstance(components, dict) else None
+    taken = set(existing) if isinstance(existing, dict) else set()
+    hoisted = []
+    for digest, (schema, size, paths) in groups.items():
+        if len(paths) < 2:
+            continue
+        name = _schema_name(digest, taken)
+        # Every copy becomes a $ref; one copy moves into components/schemas as ',"<name>":<schema>'
+        saved = size * (len(paths) - 1) - _ref_size(name) * len(paths) - len(f',"{name}":'.encode("utf-8"))
+        if saved <= 0:
+            continue
+        taken.add(name)
+        hoisted.append((name, schema, paths))
+        report["hoisted"][name] = len(paths)
+        report["references"] += len(paths)
+        report["bytes_saved"] += saved
+    if not hoisted:
+        return spec, report
+    report["schemas_hoisted"] = len(hoisted)
+    # Separators and containers the first hoisted schema adds or spares
+    if not existing:
+        report["bytes_saved"] += 1
+        if not isinstance(existing, dict):
+            report["bytes_saved"] -= len(',"schemas":{}')
+            if not components:
+                report["bytes_saved"] += 1
+                if not isinstance(components, dict):
+                    report["bytes_saved"] -= len(',"components":{}')
+
+    result = dict(spec)
+    components = result["components"] = dict(components) if isinstance(components, dict) else {}
+    schemas = components["schemas"] = dict(existing) if isinstance(existing, dict) else {}
+    copies: dict = {("components",): components}
+    for name, schema, paths in hoisted:
+        schemas[name] = schema
+        for path in paths:
+            _copied_parent(result, path[:-1], copies)[path[-1]] = {"$ref": f"#/components/schemas/{name}"}
+    return result, report
+
+
+def describe(report: dict) -> str:
+    """One-line summary of a dedup_inline_schemas() report for the CLI."""
+    if not report["schemas_hoisted"]:
+        return "[dedup] No repeated inline schemas to hoist."
+    return (
+        f"[dedup] Hoisted {report['schemas_hoisted']} inline schema(s) into components/schemas, "
+        f"replacing {report['references']} copies ({report['bytes_saved']:,} bytes saved)."
+    )
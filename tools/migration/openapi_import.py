@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""
+openapi_import.py
+
+Bulk importer: uploads many specs into Azure API Management through the
+ARM REST API instead of one `az apim api import` per API. The az CLI
+costs seconds of start-up and a new TLS connection per call; this
+importer runs in one process, asks az for an access token once, and sends
+every import over a small pool of keep-alive HTTPS connections.
+
+  - Imports run concurrently, at most --concurrency at a time; the pool
+    never opens more connections than that.
+  - 429 and 5xx responses and dropped connections are retried with
+    exponential backoff and jitter, honouring Retry-After.
+  - Long-running imports (202 Accepted) are polled through their
+    Azure-AsyncOperation or Location URL until they finish.
+  - With --skip-if-unchanged, an API whose semantic hash, path and display
+    name match its last successful import is skipped. The state is shared
+    with scripts/import-openapi.sh (see openapi_canonical.py).
+
+Each import is a PUT of
+  {endpoint}/subscriptions/{sub}/resourceGroups/{rg}/providers/
+  Microsoft.ApiManagement/service/{service}/apis/{api-id}?api-version=...
+with the spec text inline ("openapi+json" for .json files, "openapi" for
+YAML). Convert Swagger 2.0 specs with openapi_utils.py first.
+
+The HTTP client only uses the standard library (asyncio streams and ssl).
+openapi_arm_stub.py is a local stand-in for the ARM endpoints, for tests
+and dry runs (--endpoint http://127.0.0.1:PORT).
+
+Usage:
+  python3 openapi_import.py --subscription SUB --resource-group RG --service APIM SPEC [SPEC ...]
+  python3 openapi_import.py --subscription SUB --resource-group RG --service APIM \\
+      --manifest apim-api.manifest.json --api-id sample-api --api-path sample
+
+Used by:
+  - scripts/import-openapi.sh BULK_IMPORT=true
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import urllib.parse
+from typing import Any, Optional
+
+# ARM endpoint and API version of the API Management resource provider
+DEFAULT_ENDPOINT = "https://management.azure.com"
+DEFAULT_API_VERSION = "2022-08-01"
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
+
+# Statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Import format by spec file extension
+IMPORT_FORMATS = {".json": "openapi+json", ".yaml": "openapi", ".yml": "openapi"}
+
+# Longest accepted HTTP status line or header line
+_MAX_LINE = 64 * 1024
+
+
+# ---------------------------------------------------------------------------
+# HTTP/1.1 connection pool
+# ---------------------------------------------------------------------------
+
+class HttpPool:
+    """
+    Keep-alive HTTP/1.1 connections to one host, shared by concurrent requests.
+
+    At most size requests run at a time, each on an idle connection when
+    there is one, so no more than size connections are ever opened. A
+    request that fails on a reused connection (the server closed it while
+    idle) is retried once on a new one.
+
+    Args:
+        endpoint: 'https://host[:port]' or 'http://host[:port]'.
+        size:     Most concurrent requests and open connections.
+        timeout:  Seconds allowed for connecting and for each request.
+
+    Raises:
+        ValueError: For an endpoint that is not an http(s) URL.
+    """
+
+    def __init__(self, endpoint: str, size: int = DEFAULT_CONCURRENCY, timeout: float = 60.0):
+        parts = urllib.parse.urlsplit(endpoint)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Endpoint must be an http(s) URL, not '{endpoint}'")
+        if size < 1:
+            raise ValueError("The pool size must be at least 1")
+        self.tls = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.tls else 80)
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self._size = size
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: list = []
+        self.opened = 0
+        self.requests = 0
+
+    async def _open(self) -> tuple:
+        ssl_context = None
+        if self.tls:
+            import ssl  # pylint: disable=import-outside-toplevel
+            ssl_context = ssl.create_default_context()
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=ssl_context, limit=_MAX_LINE), self.timeout
+        )
+        self.opened += 1
+        return connection
+
+    @staticmethod
+    def _discard(connection: tuple) -> None:
+        connection[1].close()
+
+    async def request(self, method: str, target: str, headers: Optional[dict] = None, body: bytes = b"") -> tuple:
+        """
+        Send one request and read the whole response.
+
+        Args:
+            method:  HTTP method.
+            target:  Path and query ('/subscriptions/...?api-version=...').
+            headers: Extra request headers.
+            body:    Request body.
+
+        Returns:
+            (status, {lower-case header: value}, body bytes)
+
+        Raises:
+            ConnectionError / OSError: If the server cannot be reached or
+                                       drops the connection.
+            asyncio.TimeoutError:      If the request takes longer than timeout.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._size)
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host_header}", f"Content-Length: {len(body)}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        data = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._open()
+                try:
+                    status, response_headers, response_body, keep = await asyncio.wait_for(
+                        self._exchange(connection, data, method), self.timeout
+                    )
+                except (OSError, EOFError, ConnectionError) as exc:
+                    self._discard(connection)
+                    if reused:
+                        continue  # Closed by the server while idle
+                    raise ConnectionError(f"{method} {target}: {exc}") from exc
+                except BaseException:
+                    self._discard(connection)
+                    raise
+                self.requests += 1
+                if keep:
+                    self._idle.append(connection)
+                else:
+                    self._discard(connection)
+                return status, response_headers, response_body
+
+    @staticmethod
+    async def _exchange(connection: tuple, data: bytes, method: str) -> tuple:
+        """Write one request and read its response: (status, headers, body, keep_alive)."""
+        reader, writer = connection
+        writer.write(data)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed before the response")
+        try:
+            version, status = status_line.decode("latin-1").split(None, 2)[:2]
+            status = int(status)
+        except ValueError as exc:
+            raise ConnectionError(f"malformed status line {status_line[:80]!r}") from exc
+        headers: dict = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep = False
+        return status, headers, body, keep
+
+    async def close(self) -> None:
+        """Close every idle connection."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Import plan
+# ---------------------------------------------------------------------------
+
+def _job(api_id: str, api_path: str, file_path: str, display_name: str) -> dict:
+    return {"api_id": api_id, "path": api_path.strip("/"), "file": file_path, "display_name": display_name}
+
+
+def plan_files(files: list, api_path: str = "") -> list:
+    """
+    One import per spec file: API id and URL suffix from the file name.
+
+    'specs/orders.yaml' with api_path 'shop' becomes API 'orders' at 'shop/orders'.
+    """
+    import openapi_shard  # pylint: disable=import-outside-toplevel
+    jobs = []
+    taken: set = set()
+    for file_path in files:
+        name = os.path.basename(file_path)
+        name = name[:-len(".gz")] if name.endswith(".gz") else name
+        api_id = openapi_shard._safe_name(os.path.splitext(name)[0], taken)  # pylint: disable=protected-access
+        jobs.append(_job(api_id, "/".join(p for p in (api_path.strip("/"), api_id) if p), file_path, api_id))
+    return jobs
+
+
+def plan_manifest(manifest_file: str, api_id: str, api_path: str = "") -> list:
+    """
+    One import per shard of an openapi_utils.py --shard manifest, named like
+    scripts/import-openapi.sh does: API '<api_id>-<shard>' at '<api_path>/<api_path of the shard>'.
+
+    Raises:
+        ValueError: If the manifest cannot be read.
+    """
+    import json  # pylint: disable=import-outside-toplevel
+    try:
+        with open(manifest_file, encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        shards = manifest["shards"]
+        directory = os.path.dirname(manifest_file)
+        return [
+            _job(
+                f"{api_id}-{shard['name']}",
+                "/".join(p for p in (api_path.strip("/"), shard["api_path"]) if p),
+                os.path.join(directory, shard["file"]),
+                shard["display_name"],
+            )
+            for shard in shards
+        ]
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        raise ValueError(f"Cannot read shard manifest '{manifest_file}': {exc}") from exc
+
+
+def read_spec_text(file_path: str) -> tuple:
+    """
+    (import format, spec text) of a spec file.
+
+    Raises:
+        ValueError: If the file cannot be read or has an unknown extension.
+    """
+    name = file_path[:-len(".gz")] if file_path.endswith(".gz") else file_path
+    fmt = IMPORT_FORMATS.get(os.path.splitext(name)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Cannot import '{file_path}': expected a .json, .yaml or .yml file")
+    try:
+        if file_path.endswith(".gz"):
+            import gzip  # pylint: disable=import-outside-toplevel
+            with gzip.open(file_path, "rt", encoding="utf-8") as fh:
+                return fmt, fh.read()
+        with open(file_path, encoding="utf-8") as fh:
+            return fmt, fh.read()
+    except (OSError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Cannot read file '{file_path}': {exc}") from exc
+
+
+def import_state(job: dict) -> str:
+    """State line of a job, as scripts/import-openapi.sh writes it: '<semantic hash> <path> <display name>'."""
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+    import openapi_canonical  # pylint: disable=import-outside-toplevel
+    digest = openapi_canonical.semantic_hash(openapi_utils._read_spec(job["file"]))  # pylint: disable=protected-access
+    return f"{digest} {job['path']} {job['display_name']}"
+
+
+# ---------------------------------------------------------------------------
+# Importer
+# ---------------------------------------------------------------------------
+
+def _error_message(status: int, body: bytes) -> str:
+    """'HTTP 400 ValidationError: ...' from an ARM error response."""
+    import json  # pylint: disable=import-outside-toplevel
+    try:
+        error = json.loads(body)["error"]
+        return f"HTTP {status} {error.get('code', '')}: {error.get('message', '')}".replace(" :", ":")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}".rstrip(": ")
+
+
+def _retry_after(headers: dict) -> Optional[float]:
+    """Retry-After in seconds, or None when missing or given as an HTTP date."""
+    try:
+        return max(0.0, float(headers["retry-after"]))
+    except (KeyError, ValueError):
+        return None
+
+
+class BulkImporter:
+    """
+    Imports specs into one API Management service over an HttpPool.
+
+    Args:
+        pool:           HttpPool to the ARM endpoint; its size should be at least concurrency.
+        subscription:   Azure subscription id.
+        resource_group: Resource group of the service.
+        service:        API Management service name.
+        token:          ARM bearer token.
+        concurrency:    Most imports in flight at once.
+        max_retries:    Retries of a request after 429, 5xx or a dropped connection.
+        backoff:        First retry delay in seconds; doubled per retry, with jitter.
+        poll_interval:  Delay between polls of a long-running import without Retry-After.
+        lro_timeout:    Seconds a long-running import may take.
+        api_version:    ARM api-version.
+        state_dir:      Skip APIs whose import state is unchanged (see import_state()).
+    """
+
+    def __init__(
+        self,
+        pool: HttpPool,
+        subscription: str,
+        resource_group: str,
+        service: str,
+        token: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = 1.0,
+        poll_interval: float = 2.0,
+        lro_timeout: float = 600.0,
+        api_version: str = DEFAULT_API_VERSION,
+        state_dir: Optional[str] = None,
+    ):  # pylint: disable=too-many-arguments
+        self.pool = pool
+        self.service_path = (
+            f"/subscriptions/{urllib.parse.quote(subscription)}/resourceGroups/{urllib.parse.quote(resource_group)}"
+            f"/providers/Microsoft.ApiManagement/service/{urllib.parse.quote(service)}"
+        )
+        self.service = service
+        self.headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.lro_timeout = lro_timeout
+        self.api_version = api_version
+        self.state_dir = state_dir
+
+    def _target(self, url: str) -> str:
+        """Request target of a URL on the pool's host (ARM returns absolute polling URLs)."""
+        parts = urllib.parse.urlsplit(url)
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+
+    async def _send(self, method: str, target: str, body: bytes, result: dict) -> tuple:
+        """Send with retries; counts the attempts in result["attempts"]."""
+        attempt = 0
+        while True:
+            result["attempts"] += 1
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+            try:
+                status, headers, response = await self.pool.request(method, target, self.headers, body)
+            except (ConnectionError, OSError, asyncio.TimeoutError) as exc:
+                if attempt >= self.max_retries:
+                    raise ValueError(f"{exc or 'request timed out'} (after {attempt + 1} attempts)") from exc
+            else:
+                if status not in RETRY_STATUSES:
+                    return status, headers, response
+                if attempt >= self.max_retries:
+                    raise ValueError(f"{_error_message(status, response)} (after {attempt + 1} attempts)")
+                retry_after = _retry_after(headers)
+                if retry_after is not None:
+                    delay = retry_after
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _wait(self, headers: dict, result: dict) -> None:
+        """Poll a long-running import (202 Accepted) until it succeeds; raises ValueError otherwise."""
+        import json  # pylint: disable=import-outside-toplevel
+        url = headers.get("azure-asyncoperation") or headers.get("location")
+        if not url:
+            raise ValueError("HTTP 202 without an Azure-AsyncOperation or Location header")
+        status_url = "azure-asyncoperation" in headers
+        deadline = time.monotonic() + self.lro_timeout
+        interval = _retry_after(headers)
+        while True:
+            if time.monotonic() >= deadline:
+                raise ValueError(f"Import still running after {self.lro_timeout:g}s")
+            await asyncio.sleep(self.poll_interval if interval is None else interval)
+            result["polls"] += 1
+            status, headers, body = await self._send("GET", self._target(url), b"", result)
+            interval = _retry_after(headers)
+            if status >= 400:
+                raise ValueError(_error_message(status, body))
+            if not status_url:
+                if status != 202:
+                    return
+                continue
+            try:
+                operation = json.loads(body)
+                state = operation["status"]
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ValueError(f"Malformed operation status: {body[:200]!r}") from exc
+            if state == "Succeeded":
+                return
+            if state in ("Failed", "Canceled"):
+                error = operation.get("error") or {}
+                raise ValueError(f"Import {state.lower()}: {error.get('code', '')} {error.get('message', '')}".strip())
+
+    def _state_file(self, api_id: str) -> str:
+        return os.path.join(self.state_dir, f"{self.service}.{api_id}.state")
+
+    async def import_api(self, job: dict) -> dict:
+        """
+        Import one job ({"api_id", "path", "file", "display_name"}).
+
+        Returns:
+            {"api_id", "status": "imported" | "skipped" | "failed", "error",
+             "attempts", "polls", "seconds"}; never raises for a failed import.
+        """
+        import json  # pylint: disable=import-outside-toplevel
+        result = {"api_id": job["api_id"], "status": "failed", "error": None, "attempts": 0, "polls": 0}
+        start = time.perf_counter()
+        try:
+            state = None
+            if self.state_dir is not None:
+                state = await asyncio.to_thread(import_state, job)
+                try:
+                    with open(self._state_file(job["api_id"]), encoding="utf-8") as fh:
+                        unchanged = fh.read().strip() == state
+                except OSError:
+                    unchanged = False
+                if unchanged:
+                    result["status"] = "skipped"
+                    return result
+            fmt, text = await asyncio.to_thread(read_spec_text, job["file"])
+            body = json.dumps({"properties": {
+                "format": fmt,
+                "value": text,
+                "path": job["path"],
+                "displayName": job["display_name"],
+                "protocols": ["https"],
+            }}).encode("utf-8")
+            target = f"{self.service_path}/apis/{urllib.parse.quote(job['api_id'])}?api-version={self.api_version}"
+            status, headers, response = await self._send("PUT", target, body, result)
+            if status == 202:
+                await self._wait(headers, result)
+            elif status >= 300:
+                raise ValueError(_error_message(status, response))
+            if state is not None:
+                state_file = self._state_file(job["api_id"])
+                try:
+                    os.makedirs(self.state_dir, exist_ok=True)
+                    with open(state_file, "w", encoding="utf-8") as fh:
+                        fh.write(state + "\n")
+                except OSError as exc:
+                    raise ValueError(f"Imported, but cannot write import state '{state_file}': {exc}") from exc
+            result["status"] = "imported"
+        except ValueError as exc:
+            result["error"] = str(exc)
+        finally:
+            result["seconds"] = time.perf_counter() - start
+        return result
+
+    async def run(self, jobs: list, progress: Any = None) -> list:
+        """
+        Import every job, at most concurrency at a time.
+
+        Args:
+            jobs:     Jobs from plan_files() / plan_manifest().
+            progress: Called with each result as it completes.
+
+        Returns:
+            The results of import_api(), in job order.
+        """
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(job: dict) -> dict:
+            async with slots:
+                result = await self.import_api(job)
+            if progress is not None:
+                progress(result)
+            return result
+
+        return list(await asyncio.gather(*(bounded(job) for job in jobs)))
+
+
+def import_all(jobs: list, endpoint: str = DEFAULT_ENDPOINT, progress: Any = None, **options) -> tuple:
+    """
+    Run a BulkImporter over jobs on a fresh event loop and pool.
+
+    Args:
+        jobs:     Jobs from plan_files() / plan_manifest().
+        endpoint: ARM endpoint.
+        progress: As for BulkImporter.run().
+        options:  BulkImporter arguments (subscription, resource_group, service, token, ...).
+
+    Returns:
+        (results, {"connections": opened, "requests": sent})
+    """
+    async def run() -> tuple:
+        pool = HttpPool(endpoint, options.get("concurrency", DEFAULT_CONCURRENCY))
+        try:
+            results = await BulkImporter(pool, **options).run(jobs, progress)
+        finally:
+            await pool.close()
+        return results, {"connections": pool.opened, "requests": pool.requests}
+
+    return asyncio.run(run())
+
+
+def _access_token(endpoint: str) -> str:
+    """AZURE_ACCESS_TOKEN, or a token from one `az account get-access-token` call."""
+    import subprocess  # pylint: disable=import-outside-toplevel
+    token = os.environ.get("AZURE_ACCESS_TOKEN")
+    if token:
+        return token
+    try:
+        completed = subprocess.run(
+            ["az", "account", "get-access-token", "--resource", endpoint.rstrip("/") + "/",
+             "--query", "accessToken", "-o", "tsv"],
+            check=True, capture_output=True, text=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        raise ValueError(f"Cannot get an access token from the az CLI (run az login or set AZURE_ACCESS_TOKEN): {exc}") from exc
+    return completed.stdout.strip()
+
+
+def main() -> None:
+    """Command-line interface; see the module docstring."""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description="Import many specs into Azure API Management concurrently.")
+    parser.add_argument("specs", nargs="*", metavar="SPEC", help="Spec files to import, one API each")
+    parser.add_argument("--manifest", help="Import the shards of an openapi_utils.py --shard manifest instead")
+    parser.add_argument("--subscription", default=os.environ.get("AZURE_SUBSCRIPTION_ID"),
+                        help="Subscription id (default: $AZURE_SUBSCRIPTION_ID)")
+    parser.add_argument("--resource-group", required=True, help="Resource group of the API Management service")
+    parser.add_argument("--service", required=True, help="API Management service name")
+    parser.add_argument("--api-id", help="--manifest: API id prefix, shards become <api-id>-<shard>")
+    parser.add_argument("--api-path", default="", help="Base URL suffix the API paths are placed under")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Imports in flight and pooled connections (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f"Retries after 429, 5xx or a dropped connection (default: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument("--backoff", type=float, default=1.0, help="First retry delay in seconds (default: 1)")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between polls of a long-running import without Retry-After (default: 2)")
+    parser.add_argument("--lro-timeout", type=float, default=600.0,
+                        help="Seconds a long-running import may take (default: 600)")
+    parser.add_argument("--endpoint", default=DEFAULT_ENDPOINT, help=f"ARM endpoint (default: {DEFAULT_ENDPOINT})")
+    parser.add_argument("--api-version", default=DEFAULT_API_VERSION,
+                        help=f"ARM api-version (default: {DEFAULT_API_VERSION})")
+    parser.add_argument("--skip-if-unchanged", action="store_true",
+                        help="Skip APIs whose semantic hash, path and display name match their last import")
+    parser.add_argument("--state-dir", default=".apim-import-state",
+                        help="--skip-if-unchanged: import state directory (default: .apim-import-state)")
+    args = parser.parse_args()
+
+    if not args.subscription:
+        parser.error("--subscription (or AZURE_SUBSCRIPTION_ID) is required")
+    if bool(args.manifest) == bool(args.specs):
+        parser.error("pass either spec files or --manifest")
+    if args.manifest and not args.api_id:
+        parser.error("--manifest requires --api-id")
+    if args.concurrency < 1 or args.max_retries < 0:
+        parser.error("--concurrency must be at least 1 and --max-retries at least 0")
+
+    try:
+        HttpPool(args.endpoint)
+        jobs = plan_manifest(args.manifest, args.api_id, args.api_path) if args.manifest \
+            else plan_files(args.specs, args.api_path)
+        token = _access_token(args.endpoint)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Importing {len(jobs)} API(s) into {args.service}, {args.concurrency} at a time...")
+
+    def progress(result: dict) -> None:
+        if result["status"] == "failed":
+            print(f"  ❌ {result['api_id']}: {result['error']}")
+        elif result["status"] == "skipped":
+            print(f"  ⏭️  {result['api_id']}: unchanged since its last import")
+        else:
+            retries = result["attempts"] - 1 - result["polls"]
+            notes = [f"{result['seconds']:.1f}s"]
+            if retries:
+                notes.append(f"{retries} retr{'y' if retries == 1 else 'ies'}")
+            print(f"  ✅ {result['api_id']} ({', '.join(notes)})")
+
+    start = time.perf_counter()
+    results, stats = import_all(
+        jobs, args.endpoint, progress,
+        subscription=args.subscription, resource_group=args.resource_group, service=args.service, token=token,
+        concurrency=args.concurrency, max_retries=args.max_retries, backoff=args.backoff,
+        poll_interval=args.poll_interval, lro_timeout=args.lro_timeout, api_version=args.api_version,
+        state_dir=args.state_dir if args.skip_if_unchanged else None,
+    )
+    counts = {status: sum(r["status"] == status for r in results) for status in ("imported", "skipped", "failed")}
+    print(
+        f"\n{counts['imported']} imported, {counts['skipped']} skipped, {counts['failed']} failed in "
+        f"{time.perf_counter() - start:.1f}s ({stats['requests']} request(s) over {stats['connections']} connection(s))."
+    )
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
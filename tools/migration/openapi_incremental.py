@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+openapi_incremental.py
+
+Incremental re-conversion for openapi_utils.py: after an edit to a few
+endpoints of a large spec, only the edited parts go through extension
+removal and Swagger 2.0 → OpenAPI 3.0 conversion again.
+
+The input is split into subtrees — every path item under 'paths' and every
+schema under 'definitions' (Swagger 2.0) or 'components/schemas' — and a
+context: the rest of the document with those two containers emptied.
+Each subtree and the context are hashed (SHA-256 of the pickled value)
+and combined into a Merkle tree:
+
+  root = H(context, H(paths: [(path, item hash), ...]), H(schemas: [(name, schema hash), ...]))
+
+A state file keeps the hashes of the previous run together with the
+transformed form of every subtree, pickled one subtree at a time so that
+unchanged ones are copied into the next state without re-encoding. On the next run only subtrees whose
+hash changed are run through the 'transform' stage of process_spec(); the
+others are taken from the state and spliced into place in input order.
+A changed context, source platform, --no-convert or tool version
+invalidates every subtree (the conversion of a path item depends on the
+global consumes/produces, for instance).
+
+operationId generation and validation always run over the spliced spec:
+generated IDs must be unique across all operations, and the APIM checks
+are document-level (info, servers, security schemes, duplicate IDs). Both
+are a small fraction of the transform. The result is identical to
+process_spec() on the same input, down to the objects the conversion
+shares between media types, which YAML output renders as anchors.
+
+The state file is a pickle; only point --incremental at files this tool
+wrote.
+
+Used by:
+  - openapi_utils.py <input> <output> --incremental STATE
+"""
+
+import gc
+import pickle
+import hashlib
+import contextlib
+from typing import Any, Optional
+
+# Bump when the state layout or the meaning of a stored subtree changes
+STATE_SCHEMA = 1
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def subtree_hash(node: Any) -> str:
+    """SHA-256 hex digest of a parsed subtree (of its pickled form)."""
+    return hashlib.sha256(_dumps(node)).hexdigest()
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Suspend the cyclic garbage collector.
+
+    Unpickling thousands of stored subtrees and re-indexing the operations
+    allocate enough containers to trigger collections over the whole (large
+    and long-lived) spec, which cost more than the work itself; none of the
+    new objects form reference cycles, so nothing is lost by waiting.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _lookup(spec: dict, location: tuple) -> Any:
+    """The value at a key path such as ('components', 'schemas'), or None if absent."""
+    node: Any = spec
+    for key in location:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def _replace(spec: dict, location: tuple, value: Any) -> dict:
+    """A copy of spec with the value at location replaced; only the dicts on the way are copied."""
+    result = dict(spec)
+    head, rest = location[0], location[1:]
+    result[head] = _replace(spec[head], rest, value) if rest else value
+    return result
+
+
+def _containers(spec: dict, convert: bool) -> dict:
+    """
+    The containers whose members are hashed and processed individually.
+
+    Returns:
+        {"paths" | "schemas": (location in spec, location in the processed spec)},
+        limited to the containers that exist and are mappings.
+    """
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    is_swagger2 = str(spec.get("swagger", "")).startswith("2")
+    schemas_in = ("definitions",) if is_swagger2 else ("components", "schemas")
+    # pylint: disable-next=protected-access
+    schemas_out = ("components", "schemas") if openapi_utils._restructures_swagger2(spec, convert) else schemas_in
+    candidates = {"paths": (("paths",), ("paths",)), "schemas": (schemas_in, schemas_out)}
+    return {name: locations for name, locations in candidates.items() if isinstance(_lookup(spec, locations[0]), dict)}
+
+
+def state_key(source: str, convert: bool) -> dict:
+    """What a stored subtree depends on besides its own content and the context."""
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    return {
+        "schema": STATE_SCHEMA,
+        "tool": openapi_utils.tool_version(),
+        "pickle": pickle.HIGHEST_PROTOCOL,
+        "source": source,
+        "convert": convert,
+    }
+
+
+def load_state(state_file: str, key: dict) -> Optional[dict]:
+    """Read a state file; None if it is missing, unreadable or was written with a different key."""
+    try:
+        with open(state_file, "rb") as fh:
+            state = pickle.load(fh)
+    except Exception:  # pylint: disable=broad-exception-caught
+        # Missing, truncated or foreign files all mean a full run
+        return None
+    if not isinstance(state, dict) or state.get("key") != key:
+        return None
+    return state
+
+
+def process_incremental(
+    spec: dict,
+    state_file: str,
+    source: str = "aws",
+    convert: bool = True,
+    generate_ids: bool = True,
+    max_id_length: Any = None,
+    metrics: Any = None,
+) -> tuple:
+    """
+    process_spec() that re-transforms only the subtrees changed since the run that wrote state_file.
+
+    Args:
+        spec:          Parsed OpenAPI specification dict (not modified).
+        state_file:    State of the previous run. Used if it exists and matches
+                       source, convert and the tool version; always replaced
+                       with the state of this run.
+        source, convert, generate_ids, max_id_length, metrics: As for process_spec().
+                       metrics also records an 'incremental' stage (hashing and
+                       state I/O) with 'subtrees' and 'reused' counters.
+
+    Returns:
+        (processed_spec, issues, stats) where processed_spec and issues equal
+        process_spec()'s, and stats is {"subtrees": N, "reused": N,
+        "previous": bool (a usable state was found), "unchanged": bool
+        (the Merkle root matched the previous run)}.
+
+    Raises:
+        ValueError: Unsupported source, or the state file cannot be written.
+    """
+    with _gc_paused():
+        return _process_incremental(spec, state_file, source, convert, generate_ids, max_id_length, metrics)
+
+
+def _process_incremental(
+    spec: dict,
+    state_file: str,
+    source: str,
+    convert: bool,
+    generate_ids: bool,
+    max_id_length: Any,
+    metrics: Any,
+) -> tuple:
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    prefix = openapi_utils._source_prefix(source)  # pylint: disable=protected-access
+    stage = metrics.stage if metrics is not None else openapi_utils._untimed_stage  # pylint: disable=protected-access
+    key = state_key(source, convert)
+
+    with stage("incremental") as counters:
+        containers = _containers(spec, convert)
+        hashed: dict = {}
+        skeleton = spec
+        for name, (location, _) in containers.items():
+            hashed[name] = {
+                member: (subtree_hash(value), value)
+                for member, value in _lookup(spec, location).items()
+                if not openapi_utils._is_extension(member, prefix)  # pylint: disable=protected-access
+            }
+            skeleton = _replace(skeleton, location, {})
+        context = subtree_hash(skeleton)
+        root = subtree_hash([context] + [
+            (name, subtree_hash([(member, digest) for member, (digest, _) in members.items()]))
+            for name, members in hashed.items()
+        ])
+
+        previous = load_state(state_file, key)
+        stored = previous["subtrees"] if previous is not None and previous["context"] == context else {}
+        changed: dict = {}
+        partial = skeleton
+        for name, (location, _) in containers.items():
+            old = stored.get(name, {})
+            changed[name] = {
+                member: value for member, (digest, value) in hashed[name].items()
+                if member not in old or old[member][0] != digest
+            }
+            partial = _replace(partial, location, changed[name])
+        total = sum(len(members) for members in hashed.values())
+        reused = total - sum(len(members) for members in changed.values())
+        counters["subtrees"] = total
+        counters["reused"] = reused
+
+    with stage("transform"):
+        result = openapi_utils._transform_spec(partial, prefix, convert)  # pylint: disable=protected-access
+    if metrics is not None:
+        metrics.add_nodes("transform", partial)
+
+    with stage("incremental"):
+        subtrees: dict = {}
+        for name, (_, location) in containers.items():
+            fresh = _lookup(result, location)
+            spliced = {}
+            entries = subtrees[name] = {}
+            for member, (digest, _) in hashed[name].items():
+                if member in changed[name]:
+                    # Pickled before operationIds are assigned: the state holds transformed subtrees only
+                    spliced[member] = fresh[member]
+                    entries[member] = (digest, _dumps(fresh[member]))
+                else:
+                    entries[member] = stored[name][member]
+                    spliced[member] = pickle.loads(entries[member][1])
+            _lookup(result, location[:-1])[location[-1]] = spliced
+        state = {"key": key, "context": context, "root": root, "subtrees": subtrees}
+        openapi_utils._write_bytes(state_file, _dumps(state))  # pylint: disable=protected-access
+
+    result, issues = openapi_utils._finish_spec(  # pylint: disable=protected-access
+        result, generate_ids, False, max_id_length, stage
+    )
+    stats = {
+        "subtrees": total,
+        "reused": reused,
+        "previous": previous is not None,
+        "unchanged": previous is not None and previous.get("root") == root,
+    }
+    return result, issues, stats
+
+
+def describe(stats: dict, state_file: str) -> str:
+    """One-line summary of a process_incremental() run for the CLI."""
+    if not stats["previous"]:
+        return f"[incremental] No usable state in {state_file}: full run over {stats['subtrees']:,} subtree(s)."
+    if stats["unchanged"]:
+        return f"[incremental] Spec unchanged since the last run: all {stats['subtrees']:,} subtree(s) reused."
+    changed = stats["subtrees"] - stats["reused"]
+    return f"[incremental] {changed:,} of {stats['subtrees']:,} subtree(s) changed and re-converted; {stats['reused']:,} reused."
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+openapi_lazy.py
+
+Memory-mapped, lazily parsed view of a .json spec for validation and
+inventory scans that only need a few parts of a large document (info,
+servers, security schemes, operationIds).
+
+open_lazy_spec() maps the file and records the byte offsets of the
+top-level members and of the members of a few large containers:
+
+  paths                one entry per path item
+  components           one entry per component type, with
+  components/schemas   one entry per schema
+  definitions          one entry per schema (Swagger 2.0)
+
+The spec is a read-only Mapping. A member is parsed with json.loads() the
+first time it is read, and the containers above are indexed views
+themselves, so reading one path item or schema parses only that one.
+validate_apim_requirements() and OperationIndex accept the view in place
+of a dict: they read info, servers, the security schemes and the path
+items, and no schema is ever built.
+
+While indexing, each member is run through the standard library's C
+scanner over a decoded window of the mapping and dropped at once: the
+whole document is syntax-checked, but at most one member and one window
+of text are in memory on top of the offsets. Parsed values are cached,
+so the view is meant for reading; use load_spec() to modify a spec.
+
+Usage:
+  python3 openapi_lazy.py spec.json [spec.json ...]   inventory and APIM validation of each spec as written
+"""
+
+import os
+import re
+import sys
+import json
+import json.scanner
+import mmap
+import collections.abc
+from typing import Any
+
+# Members that are indexed instead of parsed in one piece, and the layout of their own members
+_LAZY_LAYOUT = {"paths": {}, "components": {"schemas": {}}, "definitions": {}}
+
+# Bytes of the mapping decoded at a time; a member longer than the window doubles it
+WINDOW_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# A number or literal: everything scan_once() might read of one
+_BARE = re.compile(r"[-+.0-9A-Za-z]*")
+# Everything up to the next bracket or unterminated quote, strings included
+_NO_BRACKETS = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*', re.DOTALL)
+
+
+class _Truncated(Exception):
+    """A member runs past the end of the decoded window."""
+
+
+class LazyObject(collections.abc.Mapping):
+    """
+    Read-only Mapping over a JSON object between two byte offsets of a LazyJsonSpec.
+
+    Values are parsed (and cached) when first read. Members listed in
+    layout whose value is an object are returned as nested LazyObjects.
+    """
+
+    def __init__(self, spec: "LazyJsonSpec", start: int, end: int, index: dict, layout: dict):
+        self._spec = spec
+        self._start = start
+        self._end = end
+        self._index = index
+        self._layout = layout
+        self._values: dict = {}
+
+    @property
+    def index(self) -> dict:
+        """{key: (start, end)} byte offsets of every member value, in document order."""
+        return self._index
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._values:
+            return self._values[key]
+        start, end = self._index[key]
+        child = self._spec._children.get(start) if key in self._layout else None  # pylint: disable=protected-access
+        if child is not None:
+            value: Any = LazyObject(self._spec, start, end, child, self._layout[key])
+        else:
+            value = self._spec.parse(start, end)
+        self._values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def raw(self, key: str) -> bytes:
+        """The undecoded JSON text of a member's value."""
+        start, end = self._index[key]
+        return self._spec.buffer[start:end]
+
+    def to_dict(self) -> dict:
+        """Parse the whole object into a plain dict."""
+        return self._spec.parse(self._start, self._end)
+
+
+class LazyJsonSpec(LazyObject):
+    """
+    The root object of a memory-mapped .json spec (see open_lazy_spec()).
+
+    Usable as a context manager; close() unmaps the file. Members already
+    parsed stay valid after closing, nested LazyObjects do not.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        try:
+            with open(file_path, "rb") as fh:
+                size = os.fstat(fh.fileno()).st_size
+                self.buffer: Any = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        except OSError as exc:
+            raise ValueError(f"Cannot read file '{file_path}': {exc}") from exc
+        self._scan_once = json.scanner.make_scanner(json.JSONDecoder())
+        # Decoded window: text of buffer[_base:_limit], and a char/byte position pair inside it
+        self._text = ""
+        self._base = self._limit = self._byte = 0
+        self._char = 0
+        self._ascii = True
+        self._eof = False
+        # Indexes of the layout containers, by the byte offset of their value
+        self._children: dict = {}
+        try:
+            start, index, end = self._index_root()
+        except UnicodeDecodeError as exc:
+            self.close()
+            raise ValueError(f"Cannot read file '{file_path}': {exc}") from exc
+        except ValueError:
+            self.close()
+            raise
+        super().__init__(self, start, end, index, _LAZY_LAYOUT)
+        self._text = ""
+
+    def close(self) -> None:
+        """Unmap the file."""
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __enter__(self) -> "LazyJsonSpec":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _error(self, message: str, pos: int) -> ValueError:
+        """ValueError for byte offset pos, worded like load_spec()'s (line, column and character)."""
+        text = bytes(self.buffer[:pos]).decode("utf-8", "replace")
+        detail = json.JSONDecodeError(message, text, len(text))
+        return ValueError(f"Invalid JSON in '{self.file_path}': {detail}")
+
+    def parse(self, start: int, end: int) -> Any:
+        """json.loads() of the value between two byte offsets."""
+        chunk = self.buffer[start:end]
+        try:
+            return json.loads(chunk)
+        except json.JSONDecodeError as exc:
+            raise self._error(exc.msg, start + len(exc.doc[:exc.pos].encode("utf-8"))) from exc
+        except UnicodeDecodeError as exc:
+            raise ValueError(f"Cannot read file '{self.file_path}': {exc}") from exc
+
+    # -- decoded window ----------------------------------------------------
+
+    def _load(self, pos: int, size: int) -> None:
+        """Decode buffer[pos:pos + size], cut back to a character boundary."""
+        buffer = self.buffer
+        limit = min(pos + size, len(buffer))
+        while limit < len(buffer) and buffer[limit] & 0xC0 == 0x80:
+            limit -= 1
+        self._text = buffer[pos:limit].decode("utf-8")
+        self._base = self._byte = pos
+        self._limit = limit
+        self._char = 0
+        self._ascii = self._text.isascii()
+        self._eof = limit == len(buffer)
+
+    def _char_at(self, pos: int, size: int) -> int:
+        """Window index of byte offset pos, reloading the window at pos if needed."""
+        if not self._byte <= pos <= self._limit or (pos == self._limit and not self._eof):
+            self._load(pos, size)
+        if self._ascii:
+            return pos - self._base
+        self._char += len(self.buffer[self._byte:pos].decode("utf-8"))
+        self._byte = pos
+        return self._char
+
+    def _byte_at(self, index: int) -> int:
+        """Byte offset of window index index (not before the last position converted)."""
+        if self._ascii:
+            return self._base + index
+        self._byte += len(self._text[self._char:index].encode("utf-8"))
+        self._char = index
+        return self._byte
+
+    def _scan(self, index: int) -> tuple:
+        """scan_once() at a window index: (value, end index)."""
+        # A number or literal running to the window end may continue after it;
+        # scan_once() would stop early at a trailing '.', 'e' or '-'
+        if not self._eof and _BARE.match(self._text, index).end() == len(self._text):
+            raise _Truncated()
+        try:
+            value, end = self._scan_once(self._text, index)
+        except StopIteration as exc:
+            if not self._eof:
+                raise _Truncated() from exc
+            raise self._error("Expecting value", self._byte_at(exc.value)) from None
+        except json.JSONDecodeError as exc:
+            if not self._eof:
+                raise _Truncated() from exc
+            raise self._error(exc.msg, self._byte_at(exc.pos)) from None
+        return value, end
+
+    # -- indexing ------------------------------------------------------------
+
+    def _skip_whitespace(self, pos: int) -> int:
+        """Window index of the first non-whitespace character at or after byte offset pos."""
+        while True:
+            index = self._char_at(pos, WINDOW_SIZE)
+            index = _WHITESPACE.match(self._text, index).end()
+            if index < len(self._text) or self._eof:
+                return index
+            pos = self._byte_at(index)
+
+    def _index_root(self) -> tuple:
+        """Index the top-level object; returns (start, index, end)."""
+        if self.buffer[:3] == b"\xef\xbb\xbf":
+            raise self._error("Unexpected UTF-8 BOM (decode using utf-8-sig)", 0)
+        index = self._skip_whitespace(0)
+        start = self._byte_at(index)
+        if index == len(self._text):
+            raise self._error("Expecting value", start)
+        if self._text[index] != "{":
+            raise self._error("Expecting a JSON object", start)
+        members, end = self._index_object(start, _LAZY_LAYOUT)
+        index = self._skip_whitespace(end)
+        if index != len(self._text):
+            raise self._error("Extra data", self._byte_at(index))
+        return start, members, end
+
+    def _index_object(self, start: int, layout: dict) -> tuple:
+        """
+        Index the object whose '{' is at byte offset start.
+
+        Returns:
+            ({key: (start, end)}, end of the object); later duplicate keys win, as in json.loads().
+        """
+        members: dict = {}
+        pos = start + 1
+        first = True
+        while True:
+            # The end of the object or a separator, then one member
+            index = self._skip_whitespace(pos)
+            char = self._text[index:index + 1]
+            if char == "}":
+                return members, self._byte_at(index + 1)
+            if not first:
+                if char != ",":
+                    raise self._error("Expecting ',' delimiter", self._byte_at(index))
+                index = self._skip_whitespace(self._byte_at(index + 1))
+            member = self._byte_at(index)
+            size = WINDOW_SIZE
+            while True:
+                try:
+                    key, value_start, pos = self._member(self._char_at(member, size), layout)
+                    break
+                except _Truncated:
+                    # Decode a window twice as large starting at the member
+                    self._load(member, size)
+                    size *= 2
+            members[key] = (value_start, pos)
+            first = False
+
+    def _member(self, index: int, layout: dict) -> tuple:
+        """Read '"key": value' at window index; returns (key, value start, value end) in bytes."""
+        text = self._text
+        if text[index:index + 1] != '"':
+            if index == len(text) and not self._eof:
+                raise _Truncated()
+            raise self._error("Expecting property name enclosed in double quotes", self._byte_at(index))
+        key, index = self._scan(index)
+        index = _WHITESPACE.match(text, index).end()
+        if text[index:index + 1] != ":":
+            if index == len(text) and not self._eof:
+                raise _Truncated()
+            raise self._error("Expecting ':' delimiter", self._byte_at(index))
+        index = _WHITESPACE.match(text, index + 1).end()
+        if index == len(text) and not self._eof:
+            raise _Truncated()
+        value_start = self._byte_at(index)
+        if key in layout and text[index:index + 1] == "{":
+            self._children[value_start], value_end = self._index_object(value_start, layout[key])
+            return key, value_start, value_end
+        try:
+            _, end = self._scan(index)
+        except RecursionError:
+            return key, value_start, self._walk(value_start)
+        return key, value_start, self._byte_at(end)
+
+    def _walk(self, start: int) -> int:
+        """End of the container at byte offset start, found by counting brackets (for nesting too deep to scan)."""
+        buffer = self.buffer
+        pos = start
+        depth = 0
+        while True:
+            char = buffer[pos:pos + 1]
+            if char in (b"{", b"["):
+                depth += 1
+            elif char in (b"}", b"]"):
+                depth -= 1
+                if not depth:
+                    return pos + 1
+            elif char == b'"':
+                raise self._error("Unterminated string starting at", pos)
+            else:
+                raise self._error("Expecting value", start)
+            pos = _NO_BRACKETS.match(buffer, pos + 1).end()
+
+
+def open_lazy_spec(file_path: str) -> LazyJsonSpec:
+    """
+    Map a .json spec and index its top-level members.
+
+    Args:
+        file_path: Uncompressed .json file whose top-level value is an object.
+
+    Returns:
+        LazyJsonSpec, a read-only Mapping that parses members on first access.
+
+    Raises:
+        ValueError: The file is not an uncompressed .json file, cannot be
+                    read, or its top-level structure is not valid JSON.
+    """
+    if not file_path.endswith(".json"):
+        raise ValueError(f"Memory-mapped access needs an uncompressed .json file, got '{file_path}'")
+    return LazyJsonSpec(file_path)
+
+
+def inventory(spec: Any) -> dict:
+    """
+    Summary of a spec (dict or LazyJsonSpec) for inventory listings.
+
+    Returns:
+        {"title", "version", "format" ('swagger 2.0' / 'openapi 3.0.1' / None),
+         "paths", "operations", "security_schemes": [names]}
+    """
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    info = spec.get("info")
+    info = info if isinstance(info, dict) else {}
+    if "swagger" in spec:
+        fmt: Any = f"swagger {spec['swagger']}"
+        schemes = spec.get("securityDefinitions", {})
+    elif "openapi" in spec:
+        fmt = f"openapi {spec['openapi']}"
+        schemes = spec.get("components", {}).get("securitySchemes", {})
+    else:
+        fmt, schemes = None, {}
+    return {
+        "title": info.get("title"),
+        "version": info.get("version"),
+        "format": fmt,
+        "paths": len(spec.get("paths", {})),
+        "operations": sum(1 for _ in openapi_utils._iter_operations(spec)),  # pylint: disable=protected-access
+        "security_schemes": list(schemes) if isinstance(schemes, collections.abc.Mapping) else [],
+    }
+
+
+def main() -> None:
+    """Command-line interface: inventory and APIM validation of .json specs without loading them."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        description="List and validate .json OpenAPI specs through a memory-mapped index (no conversion)."
+    )
+    parser.add_argument("files", nargs="+", metavar="SPEC", help="Uncompressed .json spec files")
+    args = parser.parse_args()
+
+    failed = False
+    for file_path in args.files:
+        try:
+            with open_lazy_spec(file_path) as spec:
+                summary = inventory(spec)
+                issues = openapi_utils.validate_apim_requirements(spec)
+        except ValueError as exc:
+            print(f"{file_path}: 💥 {exc}")
+            failed = True
+            continue
+        schemes = ", ".join(summary["security_schemes"]) or "none"
+        print(
+            f"{file_path}: {summary['title']!r} {summary['version']!r} ({summary['format'] or 'unknown format'}), "
+            f"{summary['paths']} path(s), {summary['operations']} operation(s), security: {schemes}"
+        )
+        openapi_utils._print_issues(issues, indent="    ")  # pylint: disable=protected-access
+        failed = failed or any(issue.startswith("ERROR") for issue in issues)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
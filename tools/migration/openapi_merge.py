@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+openapi_merge.py
+
+Multi-spec merge for openapi_utils.py: combines the specs of several
+services into the one OpenAPI 3.x document that a single APIM API is
+imported from.
+
+Each input is loaded, cleaned of vendor extensions and converted to
+OpenAPI 3.0 with the same stages as a single-file run, merged, and then
+dropped: the merged document holds (without copying) only the parts of
+every input it keeps, so memory grows with the merged output rather than
+with the number of inputs.
+
+'paths', 'webhooks', the component maps, 'tags' and the operationIds are
+merged through dicts keyed by path, component name, tag name and
+operationId. Path items that several specs share are combined method by
+method; the same method on the same path in two specs is an error. A
+component name defined again with the same content is shared; with
+different content, or referring to a component that had to be renamed,
+it is a conflict, as is an operationId used by an earlier spec. Conflicts
+are resolved by the on_conflict policy:
+
+  fail    Raise ValueError naming both specs (default).
+  prefix  Rename the later one to <service>_<name> (<service>_<id>).
+  rename  Rename the later one to <name>_2, <name>_3, ...
+
+where <service> is the name the spec was merged under. Renamed
+components have their $refs, discriminator mappings and security
+requirements rewritten, renamed operationIds the Link Objects that name
+them, within the spec they come from.
+
+'info', 'servers', 'security' and other top-level members come from the
+first spec. When a later spec declares different servers or top-level
+security, they are set on its operations, so they keep their backend and
+requirements. Likewise, when two specs share a path item but not its
+path-level 'servers' or 'parameters', those move onto the operations.
+
+Used by:
+  - openapi_utils.py --merge <dir-or-glob> [--merge ...] <output> [--on-conflict fail|prefix|rename]
+"""
+
+import os
+import re
+from typing import Any, Iterable
+
+# Ways to resolve a colliding component name or operationId
+CONFLICT_POLICIES = ("fail", "prefix", "rename")
+
+# Characters not used in service prefixes
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Top-level members merged by key; every other member comes from the first spec
+_MERGED_KEYS = frozenset(("paths", "webhooks", "components", "tags", "servers", "security"))
+
+# Path Item members that apply to every operation of the item
+_PATH_LEVEL_KEYS = ("servers", "parameters")
+
+# Free-form values, not searched for $refs or names (except as names in a map, such as a property 'example')
+_LITERAL_KEYS = frozenset(("example", "x-example"))
+
+# Keys whose value maps names to objects, so an 'example' key inside is a name
+_NAME_MAPS = frozenset((
+    "properties", "patternProperties", "definitions", "$defs", "dependentSchemas", "schemas", "responses",
+    "parameters", "examples", "requestBodies", "headers", "securitySchemes", "links", "callbacks", "pathItems",
+    "content", "encoding", "variables",
+))
+
+
+def _children(node: dict, names: bool) -> list:
+    """(key, value, value is a name map) of the members of node to search; names: node is a name map."""
+    return [
+        (key, value, not names and key in _NAME_MAPS)
+        for key, value in node.items()
+        if names or key not in _LITERAL_KEYS
+    ]
+
+
+def service_name(relative_path: str) -> str:
+    """Merge name for an input file: 'orders/api.yaml' → 'orders_api', 'users.json.gz' → 'users'."""
+    name = relative_path
+    if name.endswith(".gz"):
+        name = name[:-len(".gz")]
+    name = os.path.splitext(name)[0]
+    return _UNSAFE_NAME.sub("_", name.replace(os.sep, "_").replace("/", "_")).strip("_") or "spec"
+
+
+def _operations(spec: dict, key: str = "paths") -> Iterable:
+    """(path, method, operation) for every Operation Object under spec[key]."""
+    from openapi_utils import HTTP_METHODS  # pylint: disable=import-outside-toplevel
+    items = spec.get(key)
+    if not isinstance(items, dict):
+        return
+    for path, item in items.items():
+        if isinstance(item, dict):
+            for method in HTTP_METHODS:
+                if isinstance(item.get(method), dict):
+                    yield path, method, item[method]
+
+
+def _push_down(item: dict, key: str) -> dict:
+    """
+    Copy of path item without key, its value moved onto every operation.
+
+    'servers' is set on operations without their own; path-level
+    'parameters' are prepended to each operation's, except those the
+    operation overrides (same name and location).
+    """
+    from openapi_utils import HTTP_METHODS  # pylint: disable=import-outside-toplevel
+    item = dict(item)
+    value = item.pop(key, None)
+    if value is None:
+        return item
+    for method in HTTP_METHODS:
+        operation = item.get(method)
+        if not isinstance(operation, dict):
+            continue
+        if key == "servers":
+            if "servers" not in operation:
+                item[method] = {**operation, "servers": value}
+            continue
+        own = operation.get("parameters") if isinstance(operation.get("parameters"), list) else []
+        overridden = {(p.get("name"), p.get("in")) for p in own if isinstance(p, dict)}
+        inherited = [p for p in value if not isinstance(p, dict) or (p.get("name"), p.get("in")) not in overridden]
+        if inherited:
+            item[method] = {**operation, "parameters": inherited + own}
+    return item
+
+
+def _component_refs(node: Any) -> set:
+    """(type, name) of every component node refers to through a local $ref."""
+    import openapi_prune  # pylint: disable=import-outside-toplevel
+    found = set()
+    stack = [(node, False)]
+    while stack:
+        node, names = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                target = openapi_prune._ref_target(ref)  # pylint: disable=protected-access
+                if target is not None and target[0][0] == "components":
+                    found.add((target[0][1], target[1]))
+            stack.extend((value, child_names) for _, value, child_names in _children(node, names))
+        elif isinstance(node, list):
+            stack.extend((value, False) for value in node)
+    return found
+
+
+def _escape(name: str) -> str:
+    """JSON pointer token for name."""
+    return name.replace("~", "~0").replace("/", "~1")
+
+
+class _Edits:
+    """Replacements at key paths of one spec, applied with path copying so the spec itself is never modified."""
+
+    def __init__(self):
+        self.edits: list = []
+
+    def set(self, path: tuple, value: Any) -> None:
+        """Replace the value at path (a tuple of keys and list indexes)."""
+        self.edits.append((path, value))
+
+    def apply(self, spec: dict) -> dict:
+        """spec with every edit applied; spec itself when there is none."""
+        if not self.edits:
+            return spec
+        import openapi_dedup  # pylint: disable=import-outside-toplevel
+        result = dict(spec)
+        copies: dict = {}
+        for path, value in self.edits:
+            parent = openapi_dedup._copied_parent(result, path[:-1], copies)  # pylint: disable=protected-access
+            parent[path[-1]] = value
+        return result
+
+
+class _Renames:
+    """New names of one spec's components and operationIds, and the rewrites of the references to them."""
+
+    def __init__(self):
+        self.components: dict = {}     # (type, name) → new name
+        self.operation_ids: dict = {}  # operationId → new operationId
+
+    def __bool__(self) -> bool:
+        return bool(self.components or self.operation_ids)
+
+    def ref(self, ref: str) -> Any:
+        """ref pointing at the renamed component, or None if it is not affected."""
+        prefix = "#/components/"
+        if not ref.startswith(prefix):
+            return None
+        import openapi_prune  # pylint: disable=import-outside-toplevel
+        target = openapi_prune._ref_target(ref)  # pylint: disable=protected-access
+        if target is None:
+            return None
+        new_name = self.components.get((target[0][1], target[1]))
+        if new_name is None:
+            return None
+        tokens = ref[len(prefix):].split("/")
+        return prefix + "/".join([tokens[0], _escape(new_name)] + tokens[2:])
+
+    def collect(self, node: Any, path: tuple, edits: _Edits) -> None:
+        """Record in edits every rewrite the renames need inside node (found at path)."""
+        schemes = {name: new for (kind, name), new in self.components.items() if kind == "securitySchemes"}
+        schemas = {name: new for (kind, name), new in self.components.items() if kind == "schemas"}
+        stack = [(node, path, False)]
+        while stack:
+            node, path, names = stack.pop()
+            if isinstance(node, list):
+                stack.extend((child, path + (index,), False) for index, child in enumerate(node))
+                continue
+            if not isinstance(node, dict):
+                continue
+            for key, value, child_names in _children(node, names):
+                if key == "$ref" and isinstance(value, str):
+                    new_ref = self.ref(value)
+                    if new_ref is not None:
+                        edits.set(path + (key,), new_ref)
+                elif key == "security" and isinstance(value, list) and schemes:
+                    for index, requirement in enumerate(value):
+                        if isinstance(requirement, dict) and any(name in schemes for name in requirement):
+                            renamed = {schemes.get(name, name): scopes for name, scopes in requirement.items()}
+                            edits.set(path + (key, index), renamed)
+                elif key == "discriminator" and isinstance(value, dict) and isinstance(value.get("mapping"), dict):
+                    mapping = {
+                        entry: (self.ref(target) or schemas.get(target, target)) if isinstance(target, str) else target
+                        for entry, target in value["mapping"].items()
+                    }
+                    if mapping != value["mapping"]:
+                        edits.set(path + (key, "mapping"), mapping)
+                    stack.append((value, path + (key,), child_names))
+                elif key == "links" and isinstance(value, dict) and self.operation_ids:
+                    for name, link in value.items():
+                        if isinstance(link, dict) and link.get("operationId") in self.operation_ids:
+                            edits.set(path + (key, name, "operationId"), self.operation_ids[link["operationId"]])
+                    stack.append((value, path + (key,), child_names))
+                elif isinstance(value, (dict, list)):
+                    stack.append((value, path + (key,), child_names))
+
+
+class SpecMerger:
+    """
+    Merges OpenAPI 3.x specs one at a time (see the module docstring).
+
+    Args:
+        on_conflict: One of CONFLICT_POLICIES.
+
+    Raises:
+        ValueError: For an unknown on_conflict policy.
+    """
+
+    def __init__(self, on_conflict: str = "fail"):
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy {on_conflict!r}; expected one of {', '.join(CONFLICT_POLICIES)}")
+        self.on_conflict = on_conflict
+        self.top: dict = {}
+        self.paths: dict = {}
+        self.webhooks: dict = {}
+        self.components: dict = {}     # type → {name: component}
+        self.owners: dict = {}         # (type, name), (path, method) or operationId → service
+        self.tags: dict = {}
+        self.merged_items: set = set()  # paths whose item is already a merge-owned copy
+        self.specs = 0
+        self.operations = 0
+        self.shared = 0
+        self.renamed: list = []        # (service, old location, new location)
+
+    def add(self, spec: dict, service: str) -> None:
+        """
+        Merge spec under the name service; spec is not modified.
+
+        Raises:
+            ValueError: If spec is not OpenAPI 3.x, its minor version
+                        differs from the first spec's, an operation is
+                        defined by an earlier spec, or a conflict cannot
+                        be resolved under the policy.
+        """
+        version = str(spec.get("openapi", ""))
+        if not version.startswith("3"):
+            raise ValueError(f"'{service}' is not an OpenAPI 3.x document (merge inputs are converted first)")
+        if self.specs and version[:3] != str(self.top["openapi"])[:3]:
+            raise ValueError(f"Cannot merge OpenAPI {version} ('{service}') into OpenAPI {self.top['openapi']}")
+
+        renames = self._renames(spec, service)
+        edits = _Edits()
+        if renames:
+            for key in ("paths", "webhooks", "components"):
+                if isinstance(spec.get(key), (dict, list)):
+                    renames.collect(spec[key], (key,), edits)
+            for path, method, operation in _operations(spec):
+                if operation.get("operationId") in renames.operation_ids:
+                    edits.set(("paths", path, method, "operationId"), renames.operation_ids[operation["operationId"]])
+        if self.specs:
+            self._keep_top_level(spec, renames, edits)
+        spec = edits.apply(spec)
+
+        if not self.specs:
+            self.top = {key: value for key, value in spec.items() if key not in _MERGED_KEYS - {"servers", "security"}}
+        self._merge_paths(spec, service)
+        self._merge_components(spec, service, renames)
+        for tag in spec.get("tags") or ():
+            if isinstance(tag, dict) and tag.get("name") is not None:
+                self.tags.setdefault(tag["name"], tag)
+        self.specs += 1
+
+    # -- Conflicts -------------------------------------------------------------
+
+    def _new_name(self, name: str, service: str, taken: Any) -> str:
+        """Name for a colliding name under the policy, not in taken."""
+        base = f"{service}_{name}" if self.on_conflict == "prefix" else name
+        candidate, suffix = base, 2
+        while candidate == name or candidate in taken:
+            candidate = f"{base}_{suffix}"
+            suffix += 1
+        return candidate
+
+    def _conflict(self, message: str) -> None:
+        if self.on_conflict == "fail":
+            raise ValueError(f"{message} (use --on-conflict prefix or rename to merge them)")
+
+    def _renames(self, spec: dict, service: str) -> _Renames:
+        """The components and operationIds of spec that collide with the merged ones, with their new names."""
+        renames = _Renames()
+        components = spec.get("components") if isinstance(spec.get("components"), dict) else {}
+        colliding, shared = [], {}
+        for kind, members in components.items():
+            existing = self.components.get(kind)
+            if not isinstance(members, dict) or not existing:
+                continue
+            for name, component in members.items():
+                if name in existing:
+                    if existing[name] == component:
+                        shared[(kind, name)] = component
+                    else:
+                        colliding.append((kind, name))
+        # Identical text that refers to a renamed component no longer means the same
+        changed = True
+        while changed and colliding and shared:
+            changed = False
+            renamed = set(colliding)
+            for key, component in list(shared.items()):
+                if _component_refs(component) & renamed:
+                    del shared[key]
+                    colliding.append(key)
+                    changed = True
+        for kind, name in colliding:
+            self._conflict(
+                f"Component 'components/{kind}/{name}' is defined differently by '{self.owners[(kind, name)]}' and '{service}'"
+            )
+            taken = set(self.components[kind]) | set(components[kind]) | {
+                new for (other, _), new in renames.components.items() if other == kind
+            }
+            renames.components[(kind, name)] = new_name = self._new_name(name, service, taken)
+            self.renamed.append((service, f"components/{kind}/{name}", f"components/{kind}/{new_name}"))
+
+        own_ids = {operation.get("operationId") for _, _, operation in _operations(spec)}
+        for path, method, operation in _operations(spec):
+            op_id = operation.get("operationId")
+            if op_id and op_id in self.owners and op_id not in renames.operation_ids:
+                self._conflict(f"operationId '{op_id}' is used by both '{self.owners[op_id]}' and '{service}'")
+                new_id = self._new_name(op_id, service, set(self.owners) | own_ids | set(renames.operation_ids.values()))
+                renames.operation_ids[op_id] = new_id
+                self.renamed.append((service, f"operationId {op_id} ({method.upper()} {path})", new_id))
+        return renames
+
+    # -- Merging ---------------------------------------------------------------
+
+    def _keep_top_level(self, spec: dict, renames: _Renames, edits: _Edits) -> None:
+        """Record edits that move spec's servers and security onto its paths when they differ from the merged ones."""
+        servers = spec.get("servers")
+        if servers and servers != self.top.get("servers"):
+            paths = spec["paths"] if isinstance(spec.get("paths"), dict) else {}
+            for path, method, operation in _operations(spec):
+                if "servers" not in operation and "servers" not in paths[path]:
+                    edits.set(("paths", path, method, "servers"), servers)
+        # No top-level security means none, not the first spec's
+        security = spec.get("security", [])
+        schemes = {name: new for (kind, name), new in renames.components.items() if kind == "securitySchemes"}
+        if schemes and isinstance(security, list):
+            security = [
+                {schemes.get(name, name): scopes for name, scopes in requirement.items()}
+                if isinstance(requirement, dict) else requirement
+                for requirement in security
+            ]
+        if security != self.top.get("security", []):
+            for path, method, operation in _operations(spec):
+                if "security" not in operation:
+                    edits.set(("paths", path, method, "security"), security)
+
+    def _merge_paths(self, spec: dict, service: str) -> None:
+        from openapi_utils import HTTP_METHODS  # pylint: disable=import-outside-toplevel
+        for path, item in (spec.get("paths") or {}).items():
+            existing = self.paths.get(path)
+            if existing is None:
+                self.paths[path] = item
+                for method in HTTP_METHODS:
+                    if isinstance(item, dict) and method in item:
+                        self._own_operation(path, method, item[method], service)
+                continue
+            if not isinstance(existing, dict) or not isinstance(item, dict) or "$ref" in existing or "$ref" in item:
+                raise ValueError(f"Path '{path}' is defined by both '{self.owners[path]}' and '{service}'")
+            if path not in self.merged_items:
+                existing = self.paths[path] = dict(existing)
+                self.merged_items.add(path)
+            for key in _PATH_LEVEL_KEYS:
+                if key in existing and existing.get(key) != item.get(key) or key in item and key not in existing:
+                    # Each spec's path-level value must keep applying to its own operations only
+                    existing = self.paths[path] = _push_down(existing, key)
+                    item = _push_down(item, key)
+            for key, value in item.items():
+                if key in HTTP_METHODS:
+                    if key in existing:
+                        raise ValueError(
+                            f"{key.upper()} {path} is defined by both '{self.owners[(path, key)]}' and '{service}'"
+                        )
+                    existing[key] = value
+                    self._own_operation(path, key, value, service)
+                else:
+                    existing.setdefault(key, value)
+        for name, item in (spec.get("webhooks") or {}).items():
+            if name in self.webhooks and self.webhooks[name] != item:
+                raise ValueError(f"Webhook '{name}' is defined by both '{self.owners[('webhooks', name)]}' and '{service}'")
+            self.webhooks.setdefault(name, item)
+            self.owners.setdefault(("webhooks", name), service)
+
+    def _own_operation(self, path: str, method: str, operation: Any, service: str) -> None:
+        self.owners.setdefault(path, service)
+        self.owners[(path, method)] = service
+        self.operations += 1
+        if isinstance(operation, dict) and operation.get("operationId"):
+            self.owners.setdefault(operation["operationId"], service)
+
+    def _merge_components(self, spec: dict, service: str, renames: _Renames) -> None:
+        components = spec.get("components")
+        if not isinstance(components, dict):
+            return
+        for kind, members in components.items():
+            if not isinstance(members, dict):
+                self.components.setdefault(kind, members)
+                continue
+            merged = self.components.setdefault(kind, {})
+            for name, component in members.items():
+                new_name = renames.components.get((kind, name), name)
+                if new_name in merged:
+                    self.shared += 1
+                    continue
+                merged[new_name] = component
+                self.owners[(kind, new_name)] = service
+
+    def result(self) -> tuple:
+        """
+        The merged spec and a report of the merge.
+
+        Returns:
+            (spec, report) where report is {"specs", "paths", "operations",
+            "components", "shared": identical components merged into one,
+            "renamed": [(service, old, new), ...]}.
+        """
+        spec = dict(self.top)
+        if self.tags:
+            spec["tags"] = list(self.tags.values())
+        spec["paths"] = self.paths
+        if self.webhooks:
+            spec["webhooks"] = self.webhooks
+        if self.components:
+            spec["components"] = self.components
+        report = {
+            "specs": self.specs,
+            "paths": len(self.paths),
+            "operations": self.operations,
+            "components": sum(len(m) for m in self.components.values() if isinstance(m, dict)),
+            "shared": self.shared,
+            "renamed": self.renamed,
+        }
+        return spec, report
+
+
+def merge_specs(specs: Iterable, on_conflict: str = "fail") -> tuple:
+    """
+    Merge OpenAPI 3.x specs into one (see the module docstring).
+
+    Args:
+        specs:       (service name, spec) pairs, in merge order; an iterator
+                     is consumed one spec at a time.
+        on_conflict: 'fail', 'prefix' or 'rename'.
+
+    Returns:
+        (merged_spec, report) as SpecMerger.result().
+
+    Raises:
+        ValueError: See SpecMerger.add().
+    """
+    merger = SpecMerger(on_conflict)
+    for service, spec in specs:
+        merger.add(spec, service)
+    if not merger.specs:
+        raise ValueError("No specs to merge")
+    return merger.result()
+
+
+def merge_files(
+    inputs: list,
+    source: str = "aws",
+    on_conflict: str = "fail",
+    serializer: Any = None,
+    stream: bool = False,
+    bundle: bool = False,
+) -> tuple:
+    """
+    Load, clean, convert and merge spec files one at a time.
+
+    Args:
+        inputs:      (path, relative_path) pairs as from
+                     openapi_utils.expand_batch_inputs(); service names
+                     come from the relative paths (service_name()).
+        source:      'aws' or 'google' — which vendor extensions to remove.
+        on_conflict: 'fail', 'prefix' or 'rename'.
+        serializer:  openapi_serializers.Serializer used to parse the files.
+        stream:      Load with openapi_stream.stream_spec().
+        bundle:      Load with openapi_bundle.bundle_spec().
+
+    Returns:
+        (merged_spec, report) as SpecMerger.result().
+
+    Raises:
+        ValueError: If a file cannot be read or the merge fails.
+    """
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+    prefix = openapi_utils._source_prefix(source)  # pylint: disable=protected-access
+
+    def converted():
+        for path, relative in inputs:
+            spec = openapi_utils._read_input(path, source, serializer, stream, bundle)  # pylint: disable=protected-access
+            yield service_name(relative), openapi_utils._transform_spec(  # pylint: disable=protected-access
+                spec, prefix, True, copy_on_write=True
+            )
+
+    return merge_specs(converted(), on_conflict)
+
+
+def describe(report: dict) -> str:
+    """Summary of a merge report for the CLI, one line plus one per rename."""
+    lines = [
+        f"[merge] {report['specs']} spec(s) merged: {report['paths']} path(s), {report['operations']} operation(s), "
+        f"{report['components']} component(s) ({report['shared']} identical definition(s) shared)."
+    ]
+    lines.extend(f"  ⚠️  {service}: {old} renamed to {new}" for service, old, new in report["renamed"])
+    return "\n".join(lines)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+openapi_metrics.py
+
+Per-stage instrumentation for openapi_utils.py runs.
+
+Each stage (load, transform, operation_ids, validate, save, and
+incremental for --incremental runs) records:
+  - wall time (time.perf_counter) and CPU time (time.process_time)
+  - tracemalloc peak allocated during the stage, above what was live when it started
+  - stage counters: nodes walked, operations, issues, bytes read / written / pruned
+
+Extension removal and Swagger 2.0 → OpenAPI 3.0 conversion run as one
+fused walk in process_spec(), so they are reported together as
+'transform'. Optionally every stage is also run under cProfile and its
+stats dumped to <dir>/<label>.<stage>.prof (inspect with
+'python3 -m pstats FILE' or snakeviz).
+
+Used by:
+  - openapi_utils.py --profile / --metrics-json PATH / --profile-dir DIR
+"""
+
+import os
+import re
+import time
+import cProfile
+import contextlib
+import tracemalloc
+from typing import Any, Optional
+
+# Order stages are reported in
+STAGES = ("load", "transform", "operation_ids", "validate", "save")
+
+
+def count_nodes(obj: Any) -> int:
+    """Count dicts, lists and scalars in a parsed spec the way the walkers visit them."""
+    count = 0
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return count
+
+
+class RunMetrics:
+    """
+    Metrics for processing one spec.
+
+    Args:
+        label:        Name of the run (the input file), used in reports and .prof file names.
+        cprofile_dir: If set, dump a cProfile of every stage into this directory.
+    """
+
+    def __init__(self, label: str, cprofile_dir: Optional[str] = None):
+        self.label = label
+        self.cprofile_dir = cprofile_dir
+        self.cached = False
+        self.stages: dict = {}
+        self._started_tracing = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def close(self) -> None:
+        """Stop tracemalloc if this instance started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Measure the enclosed block as stage name; yields the stage's counter dict."""
+        record = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0})
+        profiler = cProfile.Profile() if self.cprofile_dir else None
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record["wall_s"] += time.perf_counter() - wall
+            record["cpu_s"] += time.process_time() - cpu
+            _, peak = tracemalloc.get_traced_memory()
+            record["peak_bytes"] = max(record["peak_bytes"], peak - base)
+            if profiler is not None:
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.cprofile_dir, f"{_safe_label(self.label)}.{name}.prof"))
+
+    def add(self, name: str, **counters: int) -> None:
+        """Add counters (e.g. nodes=..., bytes_read=...) to a stage."""
+        record = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0})
+        for key, value in counters.items():
+            record[key] = record.get(key, 0) + value
+
+    def add_nodes(self, name: str, obj: Any) -> None:
+        """Add the node count of obj (see count_nodes()) to a stage; call outside stage() so it is not timed."""
+        self.add(name, nodes=count_nodes(obj))
+
+    def to_dict(self) -> dict:
+        """Plain-dict form, picklable for batch workers and JSON-serialisable."""
+        return {
+            "input": self.label,
+            "cached": self.cached,
+            "stages": {name: dict(values) for name, values in self.stages.items()},
+        }
+
+
+def _safe_label(label: str) -> str:
+    """File-name-safe form of a run label: 'specs/a b.yaml' → 'specs_a_b.yaml'."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", label).strip("_") or "spec"
+
+
+def aggregate(runs: list) -> dict:
+    """
+    Combine per-run dicts (RunMetrics.to_dict()) into one report.
+
+    Times and counters are summed per stage, peaks take the maximum.
+
+    Returns:
+        {"files": N, "cached": N, "stages": {stage: {...}}, "runs": runs}
+    """
+    totals: dict = {}
+    for run in runs:
+        for name, values in run.get("stages", {}).items():
+            total = totals.setdefault(name, {"runs": 0})
+            total["runs"] += 1
+            for key, value in values.items():
+                if key == "peak_bytes":
+                    total[key] = max(total.get(key, 0), value)
+                else:
+                    total[key] = total.get(key, 0) + value
+    ordered = {name: totals[name] for name in STAGES if name in totals}
+    ordered.update((name, values) for name, values in totals.items() if name not in ordered)
+    return {
+        "files": len(runs),
+        "cached": sum(1 for run in runs if run.get("cached")),
+        "stages": ordered,
+        "runs": runs,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Render aggregate() output as the --profile table."""
+    lines = [
+        f"Profile ({report['files']} file(s), {report['cached']} from cache):",
+        f"  {'stage':<14}{'wall ms':>10}{'cpu ms':>10}{'peak MiB':>10}{'nodes':>10}{'ops':>8}  bytes",
+    ]
+    for name, values in report["stages"].items():
+        io_parts = []
+        if values.get("bytes_read"):
+            io_parts.append(f"{values['bytes_read']:,} read")
+        if values.get("bytes_written"):
+            io_parts.append(f"{values['bytes_written']:,} written")
+        if values.get("bytes_removed"):
+            io_parts.append(f"{values['bytes_removed']:,} removed")
+        lines.append(
+            f"  {name:<14}{values.get('wall_s', 0) * 1000:>10.1f}{values.get('cpu_s', 0) * 1000:>10.1f}"
+            f"{values.get('peak_bytes', 0) / 1_048_576:>10.2f}{values.get('nodes', '-'):>10}"
+            f"{values.get('operations', '-'):>8}  {', '.join(io_parts) or '-'}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+openapi_prune.py
+
+Dead-component pruning for openapi_utils.py: drops the reusable
+components that nothing in the API refers to, so 'az apim api import'
+(scripts/import-openapi.sh) uploads and parses only what the operations
+use. AWS and Google exports often carry hundreds of such definitions.
+
+A component is kept when it is reachable from the rest of the document —
+'paths', 'webhooks', top-level 'security' and everything else outside the
+component containers — through:
+
+  - local $refs ('#/components/schemas/Pet', '#/definitions/Pet', or a
+    pointer into one, which keeps the whole component),
+  - discriminator mappings (a $ref or a bare schema name),
+  - security requirements, which name entries of 'securitySchemes'
+    (OpenAPI 3.x) or 'securityDefinitions' (Swagger 2.0).
+
+Reachability is a worklist walk from those roots with one visited set
+per container, so reference cycles terminate and every kept
+component is walked once: the cost is linear in the size of the document.
+External references ('common.yaml#/...') are left alone.
+
+Used by:
+  - openapi_utils.py <input> <output> --prune-unused
+"""
+
+from typing import Any, Optional
+
+# OpenAPI 3.x component maps that are pruned; other keys under 'components'
+# (extensions, for instance) are kept and their references followed.
+COMPONENT_TYPES = (
+    "schemas", "responses", "parameters", "examples", "requestBodies",
+    "headers", "securitySchemes", "links", "callbacks", "pathItems",
+)
+
+# Top-level component maps of a Swagger 2.0 spec
+SWAGGER2_CONTAINERS = ("definitions", "parameters", "responses", "securityDefinitions")
+
+
+def _is_swagger2(spec: dict) -> bool:
+    return str(spec.get("swagger", "")).startswith("2") and not spec.get("openapi")
+
+
+def _containers(spec: dict) -> dict:
+    """{location: map} for the component maps of spec; location is the key path, e.g. ('components', 'schemas')."""
+    containers: dict = {}
+    if _is_swagger2(spec):
+        for key in SWAGGER2_CONTAINERS:
+            if isinstance(spec.get(key), dict):
+                containers[(key,)] = spec[key]
+    components = spec.get("components")
+    if isinstance(components, dict):
+        for key in COMPONENT_TYPES:
+            if isinstance(components.get(key), dict):
+                containers[("components", key)] = components[key]
+    return containers
+
+
+def _ref_target(ref: str) -> Optional[tuple]:
+    """
+    (location, name) of the component a local $ref points into, or None.
+
+    '#/components/schemas/Pet/properties/id' → (('components', 'schemas'), 'Pet');
+    '#/definitions/a~1b' → (('definitions',), 'a/b').
+    """
+    if not ref.startswith("#/"):
+        return None
+    tokens = ref[2:].split("/")
+    if "%" in ref:
+        from urllib.parse import unquote  # pylint: disable=import-outside-toplevel
+        tokens = [unquote(token) for token in tokens]
+    if tokens[0] == "components":
+        if len(tokens) < 3:
+            return None
+        location, name = ("components", tokens[1]), tokens[2]
+    elif len(tokens) >= 2:
+        location, name = (tokens[0],), tokens[1]
+    else:
+        return None
+    return location, name.replace("~1", "/").replace("~0", "~")
+
+
+def _collect_targets(node: Any, schemas: tuple, schemes: tuple) -> list:
+    """
+    Every (location, name) that node refers to, in no particular order.
+
+    Args:
+        node:    Subtree to walk (iteratively, so nesting depth is unbounded).
+        schemas: Location of the schema map, for bare discriminator mapping names.
+        schemes: Location of the security scheme map, for security requirements.
+    """
+    targets = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                target = _ref_target(ref)
+                if target is not None:
+                    targets.append(target)
+            discriminator = node.get("discriminator")
+            if isinstance(discriminator, dict) and isinstance(discriminator.get("mapping"), dict):
+                for value in discriminator["mapping"].values():
+                    if not isinstance(value, str):
+                        continue
+                    if value.startswith("#"):
+                        target = _ref_target(value)
+                        if target is not None:
+                            targets.append(target)
+                    elif "/" not in value and "#" not in value:
+                        targets.append((schemas, value))
+            security = node.get("security")
+            if isinstance(security, list):
+                for requirement in security:
+                    if isinstance(requirement, dict):
+                        targets.extend((schemes, name) for name in requirement)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return targets
+
+
+def _roots(spec: dict, containers: dict) -> dict:
+    """spec without its component maps (a shallow view, so top-level 'security' is still seen as such)."""
+    roots = {key: value for key, value in spec.items() if (key,) not in containers}
+    if isinstance(roots.get("components"), dict):
+        roots["components"] = {
+            key: value for key, value in roots["components"].items() if ("components", key) not in containers
+        }
+    return roots
+
+
+def _encoded_size(obj: Any) -> int:
+    """Size in bytes of obj as compact UTF-8 JSON (non-JSON scalars such as YAML dates as strings)."""
+    import json  # pylint: disable=import-outside-toplevel
+
+    return len(json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def reachable_components(spec: dict) -> dict:
+    """
+    The components of spec that the rest of the document refers to, directly or transitively.
+
+    Returns:
+        {location: set of names} for every component map of spec, where
+        location is its key path (e.g. ('components', 'schemas')).
+    """
+    containers = _containers(spec)
+    swagger2 = _is_swagger2(spec)
+    schemas = ("definitions",) if swagger2 else ("components", "schemas")
+    schemes = ("securityDefinitions",) if swagger2 else ("components", "securitySchemes")
+    reachable: dict = {location: set() for location in containers}
+
+    pending = _collect_targets(_roots(spec, containers), schemas, schemes)
+    while pending:
+        location, name = pending.pop()
+        names = reachable.get(location)
+        if names is None or name in names or name not in containers[location]:
+            continue
+        names.add(name)
+        pending.extend(_collect_targets(containers[location][name], schemas, schemes))
+    return reachable
+
+
+def prune_components(spec: dict) -> tuple:
+    """
+    Remove the components nothing refers to (see the module docstring).
+
+    spec is not modified: the result is a shallow copy with new component
+    maps; kept components are shared with spec. A map left empty is
+    dropped, and so is an emptied 'components' object.
+
+    Args:
+        spec: Swagger 2.0 or OpenAPI 3.x spec, typically the output of process_spec().
+
+    Returns:
+        (pruned_spec, report) where report is
+        {"removed": {"components/schemas": [names, ...], ...},
+         "components_removed": int, "bytes_removed": int}; bytes_removed is
+        the size of the removed components as compact JSON. pruned_spec is
+        spec itself when nothing is removed.
+    """
+    containers = _containers(spec)
+    reachable = reachable_components(spec)
+    report: dict = {"removed": {}, "components_removed": 0, "bytes_removed": 0}
+    result = spec
+    for location, container in containers.items():
+        kept = reachable[location]
+        if len(kept) == len(container):
+            continue
+        removed = {name: value for name, value in container.items() if name not in kept}
+        report["removed"]["/".join(location)] = list(removed)
+        report["components_removed"] += len(removed)
+        report["bytes_removed"] += _encoded_size(removed)
+
+        if result is spec:
+            result = dict(spec)
+        parent = result
+        if location[0] == "components":
+            if result["components"] is spec["components"]:
+                result["components"] = dict(spec["components"])
+            parent = result["components"]
+        if kept:
+            parent[location[-1]] = {name: value for name, value in container.items() if name in kept}
+        else:
+            del parent[location[-1]]
+            if parent is not result and not parent:
+                del result["components"]
+    return result, report
+
+
+def describe(report: dict) -> str:
+    """One-line summary of a prune_components() report for the CLI."""
+    if not report["components_removed"]:
+        return "[prune] No unreferenced components."
+    per_map = ", ".join(f"{location} {len(names)}" for location, names in report["removed"].items())
+    return (
+        f"[prune] Removed {report['components_removed']} unreferenced component(s), "
+        f"{report['bytes_removed']:,} bytes ({per_map})."
+    )
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+openapi_routes.py
+
+Path-template trie over the operations of a spec: finds the URL templates
+APIM cannot tell apart, and maps a concrete request path back to its
+template and operation.
+
+Each template is split into '/' segments and stored one segment per trie
+level. A segment is keyed by its shape — the text with every '{name}'
+replaced by '{}' — so '/users/{id}' and '/users/{userId}' end on the same
+node, while literal segments ('me') and partly templated ones
+('{name}.json') get their own children. AWS greedy parameters
+('{proxy+}', a whole segment) match one or more remaining segments.
+
+Two checks use the trie, each a single walk per template instead of a
+comparison of every pair of paths:
+
+  conflicts()  Templates that differ only in parameter names and share an
+               HTTP method. APIM refuses the second operation or routes
+               both to one of them.
+  shadowed()   Templates whose every request also matches another,
+               more general template with the same method: '/users/me'
+               under '/users/{id}', '/files/{name}.json' under
+               '/files/{name}', anything under '/{proxy+}'.
+
+lookup() and match() resolve a request path, preferring at each segment a
+literal, then a partly templated, then a plain template, then a greedy
+segment.
+
+Used by:
+  - openapi_utils.validate_apim_requirements()
+"""
+
+import re
+from typing import Any, Iterable, Optional
+
+# '{name}' parameter in a path template
+_PARAMETER = re.compile(r"\{([^{}/]*)\}")
+
+# Shape of a segment that is one plain parameter
+_WILDCARD = "{}"
+
+
+def _segments(path: str) -> list:
+    """'/' segments of a path or template, without the leading empty one."""
+    return path[1:].split("/") if path.startswith("/") else path.split("/")
+
+
+def _shape(segment: str) -> str:
+    """segment with every parameter name removed: '{id}.json' → '{}.json'."""
+    return _PARAMETER.sub(_WILDCARD, segment)
+
+
+def _is_greedy(segment: str) -> bool:
+    """True for an AWS greedy parameter segment such as '{proxy+}'."""
+    return segment.startswith("{") and segment.endswith("+}") and _shape(segment) == _WILDCARD
+
+
+def _shape_pattern(shape: str) -> Any:
+    """Compiled regex matching the concrete segments of a partly templated shape, one group per parameter."""
+    return re.compile("([^/]+?)".join(re.escape(part) for part in shape.split(_WILDCARD)))
+
+
+class _Node:
+    """One trie level: children by segment shape, and the templates ending here."""
+
+    __slots__ = ("literals", "partial", "wildcard", "greedy", "routes")
+
+    def __init__(self):
+        self.literals: dict = {}               # literal segment → _Node
+        self.partial: dict = {}                # partly templated shape → (pattern, _Node)
+        self.wildcard: Optional[_Node] = None  # '{name}'
+        self.greedy: Optional[_Node] = None    # '{name+}', always a leaf
+        self.routes: dict = {}                 # template → {method: operation}
+
+
+class RouteTrie:
+    """
+    Path-template trie built from (path, method, operation) entries.
+
+    Args:
+        operations: (path, method, operation) entries, e.g.
+                    OperationIndex.operations; more can be added with add().
+
+    Attributes:
+        templates: template → [parameter names], in the order they were added.
+    """
+
+    def __init__(self, operations: Iterable = ()):
+        self.root = _Node()
+        self.templates: dict = {}
+        self._methods: dict = {}  # template → {method: operation}
+        for path, method, operation in operations:
+            self.add(path, method, operation)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def add(self, path: str, method: str, operation: Any = None) -> None:
+        """Register operation under template path for method (lower case)."""
+        node = self.root
+        for segment in _segments(path):
+            if _is_greedy(segment):
+                node.greedy = node.greedy or _Node()
+                node = node.greedy
+                break
+            shape = _shape(segment)
+            if shape == segment:
+                node = node.literals.setdefault(segment, _Node())
+            elif shape == _WILDCARD:
+                node.wildcard = node.wildcard or _Node()
+                node = node.wildcard
+            else:
+                if shape not in node.partial:
+                    node.partial[shape] = (_shape_pattern(shape), _Node())
+                node = node.partial[shape][1]
+        if path not in self.templates:
+            self.templates[path] = [name.rstrip("+") for name in _PARAMETER.findall(path)]
+            self._methods[path] = node.routes[path] = {}
+        self._methods[path][method.lower()] = operation
+
+    # -- Request path lookup -------------------------------------------------
+
+    def _find(self, path: str, method: Optional[str]) -> Optional[tuple]:
+        """(template, captured values) of the best route for path (and method), or None."""
+        segments = _segments(path.split("?", 1)[0])
+        # Depth-first with backtracking; alternatives pushed least preferred first
+        stack = [(self.root, 0, ())]
+        while stack:
+            node, depth, values = stack.pop()
+            if node is None:
+                continue
+            if depth == len(segments):
+                for template, methods in node.routes.items():
+                    if method is None or method in methods:
+                        return template, values
+                continue
+            segment = segments[depth]
+            rest = "/".join(segments[depth:])
+            if node.greedy is not None and rest:
+                stack.append((node.greedy, len(segments), values + (rest,)))
+            if segment:
+                stack.append((node.wildcard, depth + 1, values + (segment,)))
+            for pattern, child in reversed(node.partial.values()):
+                found = pattern.fullmatch(segment)
+                if found:
+                    stack.append((child, depth + 1, values + found.groups()))
+            stack.append((node.literals.get(segment), depth + 1, values))
+        return None
+
+    def match(self, path: str) -> Optional[tuple]:
+        """
+        Template a concrete request path resolves to, for any method.
+
+        Args:
+            path: Request path such as '/users/42/orders' (a query string is ignored).
+
+        Returns:
+            (template, {parameter: value}) or None when no template matches.
+        """
+        found = self._find(path, None)
+        if found is None:
+            return None
+        template, values = found
+        return template, dict(zip(self.templates[template], values))
+
+    def lookup(self, method: str, path: str) -> Optional[tuple]:
+        """
+        Operation a request (method and concrete path) is routed to.
+
+        Returns:
+            (template, operation, {parameter: value}) or None when no
+            template with that method matches.
+        """
+        method = method.lower()
+        found = self._find(path, method)
+        if found is None:
+            return None
+        template, values = found
+        return template, self._methods[template][method], dict(zip(self.templates[template], values))
+
+    # -- Ambiguity checks ----------------------------------------------------
+
+    def _nodes(self) -> list:
+        """Every node of the trie, parents before children."""
+        nodes = [self.root]
+        index = 0
+        while index < len(nodes):
+            node = nodes[index]
+            index += 1
+            nodes.extend(node.literals.values())
+            nodes.extend(child for _, child in node.partial.values())
+            nodes.extend(child for child in (node.wildcard, node.greedy) if child is not None)
+        return nodes
+
+    def conflicts(self) -> list:
+        """
+        Templates that only differ in parameter names, per shared method.
+
+        Returns:
+            [([template, ...], [method, ...]), ...] — the templates in the
+            order they were added, the methods they have in common sorted.
+        """
+        order = {template: position for position, template in enumerate(self.templates)}
+        groups: dict = {}
+        for node in self._nodes():
+            if len(node.routes) < 2:
+                continue
+            by_method: dict = {}
+            for template, methods in node.routes.items():
+                for method in methods:
+                    by_method.setdefault(method, []).append(template)
+            for method, templates in by_method.items():
+                if len(templates) > 1:
+                    key = tuple(sorted(templates, key=order.__getitem__))
+                    groups.setdefault(key, []).append(method)
+        return sorted(
+            ((list(templates), sorted(methods)) for templates, methods in groups.items()),
+            key=lambda group: order[group[0][0]],
+        )
+
+    def shadowed(self) -> list:
+        """
+        Templates whose requests all match a more general template with the same method.
+
+        Each template is walked through the trie once, following its own
+        segment and every more general sibling (a plain or greedy
+        parameter for a literal or partly templated segment, a matching
+        partly templated segment for a literal one).
+
+        Returns:
+            [(template, shadowing template, [methods]), ...] in the order the
+            templates were added.
+        """
+        found = []
+        for template in self.templates:
+            methods = set(self._methods[template])
+            # node → True once the walk generalised a segment to reach it
+            frontier = {self.root: False}
+            general: list = []
+            segments = _segments(template)
+            for depth, segment in enumerate(segments):
+                following: dict = {}
+                greedy = _is_greedy(segment)
+                # A greedy parameter needs a non-empty rest of the path
+                covered = greedy or any(segments[depth:])
+                for node, generalised in frontier.items():
+                    if node.greedy is not None and covered and (generalised or not greedy):
+                        general.append(node.greedy)
+                    if greedy:
+                        continue
+                    shape = _shape(segment)
+                    if shape == segment:
+                        exact = node.literals.get(segment)
+                        for pattern, child in node.partial.values():
+                            if pattern.fullmatch(segment):
+                                following[child] = True
+                    elif shape == _WILDCARD:
+                        exact = node.wildcard
+                    else:
+                        exact = node.partial.get(shape, (None, None))[1]
+                    if shape != _WILDCARD and segment and node.wildcard is not None:
+                        following[node.wildcard] = True
+                    if exact is not None:
+                        following[exact] = following.get(exact, False) or generalised
+                frontier = following
+                if greedy:
+                    break
+            general.extend(node for node, generalised in frontier.items() if generalised)
+            seen = set()
+            for node in general:
+                for other, other_methods in node.routes.items():
+                    shared = sorted(methods.intersection(other_methods))
+                    if other != template and shared and other not in seen:
+                        seen.add(other)
+                        found.append((template, other, shared))
+        return found
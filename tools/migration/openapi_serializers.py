@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+openapi_serializers.py
+
+Pluggable YAML/JSON serializer backends for openapi_utils.py load/save.
+
+  YAML   libyaml  yaml.CSafeLoader / yaml.CSafeDumper (PyYAML built with LibYAML)
+         python   yaml.SafeLoader / yaml.SafeDumper
+  JSON   orjson   json.loads / orjson.dumps (optional: pip install orjson)
+         stdlib   json.loads / json.dumps
+
+"auto" selects the fastest backend that is installed. Output is
+byte-identical across backends. The C emitters differ from the pure-Python
+ones on a few inputs: libyaml escapes and folds quoted scalars differently
+and measures the simple-key limit in bytes, and orjson formats exponent
+floats differently. Each document is checked for such values first and
+handed to the pure-Python codec when it contains any, so the fast path is
+only taken where the two produce the same bytes.
+
+JSON is always parsed with json.loads: its C scanner is as fast as
+orjson.loads once the latter is guarded against reading integers beyond
+64 bits as floats.
+
+PyYAML and orjson are imported on first use, and "auto" is resolved then,
+so importing this module (and openapi_utils) stays cheap for callers that
+never parse or write YAML. HAS_YAML, HAS_LIBYAML and HAS_ORJSON are computed
+on first access.
+
+With canonical=True every document is put into the canonical form of
+openapi_canonical.py before it is written, so exports that differ only in
+key order or scalar spelling give identical bytes.
+
+Used by:
+  - openapi_utils.py --yaml-backend / --json-backend / --canonical
+"""
+
+import io
+import sys
+import functools
+from typing import Any, TextIO
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_module() -> Any:
+    """Import PyYAML on first use; None if it is not installed."""
+    try:
+        import yaml  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return yaml
+
+
+@functools.lru_cache(maxsize=None)
+def orjson_module() -> Any:
+    """Import orjson on first use; None if it is not installed."""
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return orjson
+
+
+def __getattr__(name: str) -> bool:
+    """Compute the HAS_YAML / HAS_LIBYAML / HAS_ORJSON flags on first access."""
+    if name == "HAS_YAML":
+        value = yaml_module() is not None
+    elif name == "HAS_LIBYAML":
+        value = bool(getattr(yaml_module(), "__with_libyaml__", False))
+    elif name == "HAS_ORJSON":
+        value = orjson_module() is not None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def _flag(name: str) -> bool:
+    """Read a HAS_* flag through the module, so it is computed once and can be patched."""
+    return getattr(sys.modules[__name__], name)
+
+
+YAML_BACKENDS = ("auto", "libyaml", "python")
+JSON_BACKENDS = ("auto", "orjson", "stdlib")
+
+# Characters PyYAML's emitter writes verbatim with allow_unicode=True. Any
+# other character (including line breaks and tabs) forces a quoted style in
+# which libyaml's escaping and line folding differ from PyYAML's.
+_LIBYAML_UNSAFE_CHARS = "[^\x20-\x7e\xa0-\ud7ff\ue000-\ufffd]|\ufeff"
+
+# Longest keys written as simple keys ('key:' rather than '? key'). PyYAML's
+# check_simple_key() counts the characters of the key plus its '!!str' tag and
+# needs fewer than 128; libyaml counts the bytes of the key and allows 128.
+_PYYAML_SIMPLE_KEY_CHARS = 128 - len("!!str") - 1
+_LIBYAML_SIMPLE_KEY_BYTES = 128
+
+# Scalar types orjson serialises exactly like json.dumps (floats are checked separately)
+_ORJSON_EXACT_TYPES = (str, int, bool, type(None))
+
+_JSON_DUMP_KWARGS = {"indent": 2, "ensure_ascii": False}
+_JSON_COMPACT_KWARGS = {"separators": (",", ":"), "ensure_ascii": False}
+_YAML_DUMP_KWARGS = {"allow_unicode": True, "default_flow_style": False, "sort_keys": False}
+
+
+def _iter_scalars(obj: Any):
+    """Yield (scalar, is_key) for every mapping key and leaf value; shared containers are visited once."""
+    seen = set()
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (dict, list)):
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    yield key, True
+                    stack.append(value)
+            else:
+                stack.extend(node)
+        else:
+            yield node, False
+
+
+@functools.lru_cache(maxsize=None)
+def _libyaml_unsafe_pattern() -> Any:
+    """Compiled _LIBYAML_UNSAFE_CHARS; built on first use so importing this module skips re."""
+    import re  # pylint: disable=import-outside-toplevel
+    return re.compile(_LIBYAML_UNSAFE_CHARS)
+
+
+def libyaml_emits_identically(spec: Any) -> bool:
+    """Return True if CSafeDumper writes spec byte-for-byte like SafeDumper."""
+    unsafe = _libyaml_unsafe_pattern()
+    for scalar, is_key in _iter_scalars(spec):
+        if not isinstance(scalar, str):
+            continue
+        if unsafe.search(scalar):
+            return False
+        if is_key and (
+            # PyYAML writes an empty key as "? ''", libyaml as "'':"
+            not scalar
+            or len(scalar) > _PYYAML_SIMPLE_KEY_CHARS
+            or len(scalar.encode("utf-8")) > _LIBYAML_SIMPLE_KEY_BYTES
+        ):
+            return False
+    return True
+
+
+def orjson_emits_identically(spec: Any) -> bool:
+    """Return True if spec contains only scalars orjson formats exactly like json.dumps."""
+    for scalar, _ in _iter_scalars(spec):
+        if type(scalar) in _ORJSON_EXACT_TYPES:
+            continue
+        if not isinstance(scalar, float):
+            return False
+        text = repr(scalar)
+        # Exponent notation, nan and inf are formatted differently
+        if "e" in text or "n" in text:
+            return False
+    return True
+
+
+class Serializer:
+    """
+    A pair of YAML and JSON backends used to parse and write specs.
+
+    Instances only hold backend names and output options, so they can be
+    pickled into batch worker processes.
+
+    Args:
+        yaml_backend: One of YAML_BACKENDS.
+        json_backend: One of JSON_BACKENDS.
+        compact_json: Write minified JSON (no indentation or spaces) instead of indent=2.
+        canonical:    Write the canonical form of every document (openapi_canonical.canonicalize()).
+
+    Raises:
+        ValueError: If a backend is unknown or explicitly requested but not installed.
+    """
+
+    def __init__(
+        self, yaml_backend: str = "auto", json_backend: str = "auto", compact_json: bool = False, canonical: bool = False
+    ):
+        if yaml_backend not in YAML_BACKENDS:
+            raise ValueError(f"Unknown YAML backend '{yaml_backend}'. Expected one of: {', '.join(YAML_BACKENDS)}")
+        if json_backend not in JSON_BACKENDS:
+            raise ValueError(f"Unknown JSON backend '{json_backend}'. Expected one of: {', '.join(JSON_BACKENDS)}")
+        if yaml_backend == "libyaml" and not _flag("HAS_LIBYAML"):
+            raise ValueError("The libyaml backend requires PyYAML built with LibYAML (yaml.CSafeLoader)")
+        if json_backend == "orjson" and not _flag("HAS_ORJSON"):
+            raise ValueError("The orjson backend requires orjson. Install with: pip install orjson")
+        # "auto" is resolved on first use so that constructing a Serializer imports nothing
+        self._yaml_backend = yaml_backend
+        self._json_backend = json_backend
+        self.compact_json = compact_json
+        self.canonical = canonical
+
+    @property
+    def yaml_backend(self) -> str:
+        """Selected YAML backend ("libyaml" or "python")."""
+        if self._yaml_backend == "auto":
+            self._yaml_backend = "libyaml" if _flag("HAS_LIBYAML") else "python"
+        return self._yaml_backend
+
+    @property
+    def json_backend(self) -> str:
+        """Selected JSON backend ("orjson" or "stdlib")."""
+        if self._json_backend == "auto":
+            self._json_backend = "orjson" if _flag("HAS_ORJSON") else "stdlib"
+        return self._json_backend
+
+    def describe(self) -> str:
+        """Human-readable backend summary for --verbose output."""
+        if self.yaml_backend == "libyaml":
+            yaml_text = "libyaml (CSafeLoader/CSafeDumper)"
+        else:
+            yaml_text = "python (SafeLoader/SafeDumper)"
+        if not _flag("HAS_YAML"):
+            yaml_text = "unavailable (PyYAML not installed)"
+        if self.json_backend == "orjson":
+            json_text = f"orjson {getattr(orjson_module(), '__version__', '')}".rstrip() + " (json.loads to parse)"
+        else:
+            json_text = "stdlib json"
+        return f"YAML {yaml_text}, JSON {json_text}"
+
+    def loads(self, content: str, fmt: str) -> Any:
+        """
+        Parse content as fmt ("json" or "yaml").
+
+        Raises:
+            json.JSONDecodeError / yaml.YAMLError: With the pure-Python codec's
+            message, whichever backend is selected.
+        """
+        if fmt == "json":
+            import json  # pylint: disable=import-outside-toplevel
+            return json.loads(content)
+
+        yaml = yaml_module()
+        if self.yaml_backend == "libyaml":
+            try:
+                return yaml.load(content, Loader=yaml.CSafeLoader)
+            except yaml.YAMLError:
+                pass  # Re-parse below for PyYAML's error message
+        return yaml.load(content, Loader=yaml.SafeLoader)
+
+    def dump(self, spec: Any, fmt: str, stream: TextIO) -> None:
+        """
+        Serialise spec as fmt ("json" or "yaml") onto a text stream in the openapi_utils output style.
+
+        The pure-Python JSON encoder and both YAML emitters write the document
+        in small chunks as they go, so the full text is never held in memory;
+        orjson renders into one UTF-8 buffer first.
+
+        Raises:
+            ValueError: With canonical, for a spec without a canonical form.
+        """
+        if self.canonical:
+            import openapi_canonical  # pylint: disable=import-outside-toplevel
+            spec = openapi_canonical.canonicalize(spec)
+        if fmt == "json":
+            if self.json_backend == "orjson" and orjson_emits_identically(spec):
+                orjson = orjson_module()
+                option = orjson.OPT_NON_STR_KEYS
+                if not self.compact_json:
+                    option |= orjson.OPT_INDENT_2
+                try:
+                    stream.write(orjson.dumps(spec, option=option).decode("utf-8"))
+                    return
+                except orjson.JSONEncodeError:
+                    pass  # Big integers, lone surrogates, very deep nesting
+            import json  # pylint: disable=import-outside-toplevel
+            encoder = json.JSONEncoder(**(_JSON_COMPACT_KWARGS if self.compact_json else _JSON_DUMP_KWARGS))
+            stream.writelines(encoder.iterencode(spec))
+            return
+
+        yaml = yaml_module()
+        if self.yaml_backend == "libyaml" and libyaml_emits_identically(spec):
+            dumper = yaml.CSafeDumper
+        else:
+            dumper = yaml.SafeDumper
+        yaml.dump(spec, stream, Dumper=dumper, **_YAML_DUMP_KWARGS)
+
+    def dumps(self, spec: Any, fmt: str) -> str:
+        """dump() into a string."""
+        buffer = io.StringIO()
+        self.dump(spec, fmt, buffer)
+        return buffer.getvalue()
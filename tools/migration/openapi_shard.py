@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+openapi_shard.py
+
+Size-aware sharding for openapi_utils.py: splits one large spec into
+several self-contained specs, imported as separate APIM APIs, plus a
+manifest that tells scripts/import-openapi.sh which API each one becomes.
+Imports of huge specs are slow and can exceed the import payload limit;
+smaller shards import in parallel.
+
+Operations are assigned to shards by one of three strategies:
+
+  tag     The operation's first tag ('untagged' without one).
+  prefix  The first path segment ('/users/{id}' → users).
+  size    Path items in document order, whole first-segment groups where
+          they fit, packed into shards of at most max_bytes (a single
+          path item larger than that gets a shard of its own).
+
+Every shard keeps the spec's top-level members (info, servers, security,
+...), the tags its operations use, its path items (split by method when
+the operations of one path item go to different shards) and only the
+components they reach — the walk of openapi_prune.py. A shard's size is
+its compact JSON size.
+
+APIM needs a distinct API URL suffix per API. When all paths of a shard
+share a literal first segment that no other shard uses, it becomes the
+shard's API path and is removed from its paths and appended to its server
+URLs (basePath for Swagger 2.0; a spec without servers gets one at
+'/<segment>'), so neither client nor backend URLs change. Any other shard
+is published under its shard name as an extra URL segment, flagged with
+"url_changed" in the manifest.
+
+Used by:
+  - openapi_utils.py <input> <output> --shard tag|prefix|size [--shard-max-kb N]
+"""
+
+import os
+import re
+from typing import Any, Optional
+
+# Ways to assign operations to shards
+STRATEGIES = ("tag", "prefix", "size")
+
+# Shard name of operations without a tag, and of paths without a first segment
+UNTAGGED = "untagged"
+ROOT = "root"
+
+# Characters not used in shard names, which end up in file names, API ids and API paths
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Path Item members that are not operations
+_PATH_ITEM_KEYS = ("summary", "description", "servers", "parameters", "$ref")
+
+# Manifest format version
+MANIFEST_VERSION = 1
+
+
+def _safe_name(name: str, taken: set) -> str:
+    """name made safe for file names and API ids, unique against taken (which it is added to)."""
+    base = _UNSAFE_NAME.sub("-", name).strip("-.").lower() or ROOT
+    candidate, suffix = base, 2
+    while candidate in taken:
+        candidate = f"{base}-{suffix}"
+        suffix += 1
+    taken.add(candidate)
+    return candidate
+
+
+def _first_segment(path: str) -> str:
+    return path.lstrip("/").split("/", 1)[0]
+
+
+def _operations(item: Any) -> list:
+    """(method, operation) of a path item."""
+    from openapi_utils import HTTP_METHODS  # pylint: disable=import-outside-toplevel
+    if not isinstance(item, dict):
+        return []
+    return [(method, item[method]) for method in HTTP_METHODS if isinstance(item.get(method), dict)]
+
+
+def _part(item: dict, methods: list) -> dict:
+    """item with only the operations in methods (and every non-operation member)."""
+    from openapi_utils import HTTP_METHODS  # pylint: disable=import-outside-toplevel
+    return {key: value for key, value in item.items() if key not in HTTP_METHODS or key in methods}
+
+
+class _Reach:
+    """Components reached from path items, walked once per shard (see openapi_prune.reachable_components())."""
+
+    def __init__(self, spec: dict):
+        import openapi_prune  # pylint: disable=import-outside-toplevel
+        self.prune = openapi_prune
+        self.containers = openapi_prune._containers(spec)
+        swagger2 = openapi_prune._is_swagger2(spec)
+        self.schemas = ("definitions",) if swagger2 else ("components", "schemas")
+        self.schemes = ("securityDefinitions",) if swagger2 else ("components", "securitySchemes")
+        self.sizes: dict = {}
+
+    def walk(self, node: Any, reached: dict) -> int:
+        """
+        Add the components node reaches to reached ({location: {name: None}});
+        returns the compact JSON size of the newly added ones.
+        """
+        added = 0
+        pending = self.prune._collect_targets(node, self.schemas, self.schemes)  # pylint: disable=protected-access
+        while pending:
+            location, name = pending.pop()
+            container = self.containers.get(location)
+            if container is None or name not in container:
+                continue
+            names = reached.setdefault(location, {})
+            if name in names:
+                continue
+            names[name] = None
+            key = (location, name)
+            if key not in self.sizes:
+                self.sizes[key] = self.prune._encoded_size({name: container[name]})  # pylint: disable=protected-access
+            added += self.sizes[key]
+            pending.extend(
+                self.prune._collect_targets(container[name], self.schemas, self.schemes)  # pylint: disable=protected-access
+            )
+        return added
+
+    def components(self, reached: dict) -> dict:
+        """{location: {name: component}} of reached, in the spec's own order."""
+        return {
+            location: {name: value for name, value in container.items() if name in reached[location]}
+            for location, container in self.containers.items()
+            if reached.get(location)
+        }
+
+
+def _assign(spec: dict, by: str, max_bytes: Optional[int], reach: _Reach) -> dict:
+    """{shard key: {path: [methods]}} in document order."""
+    shards: dict = {}
+    paths = spec.get("paths") or {}
+    if by == "tag":
+        for path, item in paths.items():
+            for method, operation in _operations(item):
+                tags = operation.get("tags")
+                tag = tags[0] if isinstance(tags, list) and tags and isinstance(tags[0], str) else UNTAGGED
+                shards.setdefault(tag, {}).setdefault(path, []).append(method)
+        return shards
+    groups: dict = {}
+    for path, item in paths.items():
+        # '' (paths like '/') becomes the shard name 'root' in shard_spec()
+        groups.setdefault(_first_segment(path), {})[path] = [method for method, _ in _operations(item)]
+    if by == "prefix":
+        return groups
+
+    # size: first-segment groups in order, split into path items when a group does not fit
+    base = reach.prune._encoded_size(  # pylint: disable=protected-access
+        {key: value for key, value in spec.items() if key not in ("paths", "components", "definitions")}
+    )
+    current: dict = {}
+    reached: dict = {}
+    size = base
+
+    def close() -> None:
+        nonlocal current, reached, size
+        if current:
+            shards[len(shards) + 1] = current
+        current, reached, size = {}, {}, base
+
+    for group in groups.values():
+        group_reached = {location: dict(names) for location, names in reached.items()}
+        group_size = sum(reach.prune._encoded_size({p: paths[p]}) for p in group)  # pylint: disable=protected-access
+        group_size += sum(reach.walk(paths[p], group_reached) for p in group)
+        if current and size + group_size <= max_bytes:
+            current.update(group)
+            reached, size = group_reached, size + group_size
+            continue
+        close()
+        for path, methods in group.items():
+            item_reached = {location: dict(names) for location, names in reached.items()}
+            item_size = reach.prune._encoded_size({path: paths[path]}) + reach.walk(  # pylint: disable=protected-access
+                paths[path], item_reached
+            )
+            if current and size + item_size > max_bytes:
+                close()
+                item_reached = {}
+                item_size = reach.prune._encoded_size({path: paths[path]}) + reach.walk(  # pylint: disable=protected-access
+                    paths[path], item_reached
+                )
+            current[path] = methods
+            reached, size = item_reached, size + item_size
+    close()
+    return shards
+
+
+def _rebase_servers(servers: Any, prefix: str) -> Any:
+    """servers with prefix appended to every URL."""
+    if not isinstance(servers, list):
+        return servers
+    return [
+        {**server, "url": str(server.get("url", "")).rstrip("/") + prefix} if isinstance(server, dict) else server
+        for server in servers
+    ]
+
+
+def _rebase_item(item: dict, prefix: str) -> dict:
+    """Path item whose own (and its operations') servers get prefix appended."""
+    if "servers" in item:
+        item = {**item, "servers": _rebase_servers(item["servers"], prefix)}
+    for method, operation in _operations(item):
+        if "servers" in operation:
+            item = {**item, method: {**operation, "servers": _rebase_servers(operation["servers"], prefix)}}
+    return item
+
+
+def shard_spec(spec: dict, by: str = "tag", max_bytes: Optional[int] = None) -> tuple:
+    """
+    Split spec into self-contained shards (see the module docstring).
+
+    spec is not modified; shards share unchanged subtrees with it.
+
+    Args:
+        spec:      OpenAPI 3.x (or Swagger 2.0) spec, typically the output of process_spec().
+        by:        'tag', 'prefix' or 'size'.
+        max_bytes: Largest shard (compact JSON) for 'size' (required there);
+                   with the other strategies larger shards are only flagged.
+
+    Returns:
+        (shards, manifest) where shards is [(name, spec), ...] and manifest
+        is {"version", "strategy", "max_bytes", "shards": [{"name",
+        "api_path", "path_prefix", "url_changed", "display_name",
+        "paths", "operations", "components", "bytes", "oversized"}, ...]}.
+
+    Raises:
+        ValueError: For an unknown strategy or a missing/invalid max_bytes.
+    """
+    if by not in STRATEGIES:
+        raise ValueError(f"Unknown shard strategy {by!r}; expected one of {', '.join(STRATEGIES)}")
+    if by == "size" and not max_bytes:
+        raise ValueError("Sharding by size needs a maximum shard size")
+    if max_bytes is not None and max_bytes < 1:
+        raise ValueError("The maximum shard size must be positive")
+
+    reach = _Reach(spec)
+    assigned = _assign(spec, by, max_bytes, reach)
+    paths = spec.get("paths") or {}
+    swagger2 = reach.schemas == ("definitions",)
+
+    # First segment → shards whose paths all start with it; a unique one becomes the API path
+    segments: dict = {}
+    for key, shard_paths in assigned.items():
+        firsts = {_first_segment(path) for path in shard_paths}
+        segment = firsts.pop() if len(firsts) == 1 else ""
+        rebased = {path[len(segment) + 1:] or "/" for path in shard_paths}
+        if segment and "{" not in segment and len(rebased) == len(shard_paths):
+            segments.setdefault(segment, []).append(key)
+    unique = {keys[0]: segment for segment, keys in segments.items() if len(keys) == 1}
+
+    # Containers replaced by the reached components; 'components' is rebuilt member by member
+    dropped = {location[0] for location in reach.containers if len(location) == 1}
+    dropped.update(("paths", "tags"))
+    shards, entries = [], []
+    names: set = set()
+    api_paths = set(unique.values())
+    info = spec.get("info") if isinstance(spec.get("info"), dict) else {}
+    for key, shard_paths in assigned.items():
+        name = _safe_name(f"part{key:0{len(str(len(assigned)))}d}" if by == "size" else str(key), names)
+        segment = unique.get(key, "")
+        prefix = f"/{segment}" if segment else ""
+
+        shard_items = {}
+        for path, methods in shard_paths.items():
+            item = paths[path]
+            if isinstance(item, dict) and len(methods) != len(_operations(item)):
+                item = _part(item, methods)
+            if prefix:
+                item = _rebase_item(item, prefix) if isinstance(item, dict) else item
+                path = path[len(prefix):] or "/"
+            shard_items[path] = item
+
+        shard = {k: v for k, v in spec.items() if k not in dropped}
+        shard["info"] = {**info, "title": f"{info.get('title', 'API')} ({name})"}
+        if prefix:
+            if swagger2:
+                shard["basePath"] = str(spec.get("basePath", "")).rstrip("/") + prefix
+            elif spec.get("servers") in (None, []):
+                # No servers means a single server at '/'
+                shard["servers"] = [{"url": prefix}]
+            else:
+                shard["servers"] = _rebase_servers(spec["servers"], prefix)
+        shard["paths"] = shard_items
+        used_tags = {
+            tag for item in shard_items.values() for _, operation in _operations(item)
+            for tag in operation.get("tags") or () if isinstance(tag, str)
+        }
+        if isinstance(spec.get("tags"), list):
+            tags = [tag for tag in spec["tags"] if isinstance(tag, dict) and tag.get("name") in used_tags]
+            if tags:
+                shard["tags"] = tags
+
+        reached: dict = {}
+        reach.walk({k: v for k, v in shard.items() if k != "components"}, reached)
+        components = reach.components(reached)
+        if isinstance(shard.get("components"), dict):
+            shard["components"] = {
+                k: v for k, v in shard["components"].items() if ("components", k) not in reach.containers
+            }
+        for location, members in components.items():
+            if location[0] == "components":
+                shard.setdefault("components", {})[location[1]] = members
+            else:
+                shard[location[0]] = members
+        if shard.get("components") == {}:
+            del shard["components"]
+        # The spec's own member order, new members last
+        shard = {**{k: shard[k] for k in spec if k in shard}, **shard}
+
+        size = reach.prune._encoded_size(shard)  # pylint: disable=protected-access
+        shards.append((name, shard))
+        entries.append({
+            "name": name,
+            "api_path": segment or _safe_name(name, api_paths),
+            "path_prefix": prefix,
+            "url_changed": not segment,
+            "display_name": shard["info"]["title"],
+            "paths": len(shard_items),
+            "operations": sum(len(methods) for methods in shard_paths.values()),
+            "components": sum(len(members) for members in components.values()),
+            "bytes": size,
+            "oversized": max_bytes is not None and size > max_bytes,
+        })
+    manifest = {"version": MANIFEST_VERSION, "strategy": by, "max_bytes": max_bytes, "shards": entries}
+    return shards, manifest
+
+
+def manifest_path(output_file: str) -> str:
+    """Manifest written next to the shards of output_file: 'out/api.yaml' → 'out/api.manifest.json'."""
+    base = output_file[:-len(".gz")] if output_file.endswith(".gz") else output_file
+    return os.path.splitext(base)[0] + ".manifest.json"
+
+
+def shard_file(output_file: str, name: str) -> str:
+    """File of shard name for output_file: 'out/api.yaml' → 'out/api.<name>.yaml' (.gz kept)."""
+    gzipped = output_file.endswith(".gz")
+    base = output_file[:-len(".gz")] if gzipped else output_file
+    stem, extension = os.path.splitext(base)
+    return f"{stem}.{name}{extension}" + (".gz" if gzipped else "")
+
+
+def write_shards(shards: list, manifest: dict, output_file: str, serializer: Any = None) -> str:
+    """
+    Write every shard next to output_file, then the manifest (with each shard's "file").
+
+    Args:
+        shards:      [(name, spec), ...] from shard_spec().
+        manifest:    Manifest from shard_spec(); its entries get a "file"
+                     member relative to the manifest's directory.
+        output_file: Output path the shard files are named after; its
+                     extension picks the format.
+        serializer:  openapi_serializers.Serializer to write with.
+
+    Returns:
+        Path of the manifest.
+
+    Raises:
+        ValueError: If a file cannot be written.
+    """
+    import json  # pylint: disable=import-outside-toplevel
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    for (name, shard), entry in zip(shards, manifest["shards"]):
+        path = shard_file(output_file, name)
+        openapi_utils._write_spec(shard, path, serializer)  # pylint: disable=protected-access
+        entry["file"] = os.path.basename(path)
+    path = manifest_path(output_file)
+    openapi_utils._write_bytes(path, (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))  # pylint: disable=protected-access
+    return path
+
+
+def describe(manifest: dict) -> str:
+    """Summary of a shard_spec() manifest for the CLI, one line plus one per shard."""
+    lines = [f"[shard] {len(manifest['shards'])} shard(s) by {manifest['strategy']}:"]
+    for entry in manifest["shards"]:
+        notes = []
+        if entry["url_changed"]:
+            notes.append(f"served under /{entry['api_path']}")
+        if entry["oversized"]:
+            notes.append("⚠️  larger than the maximum")
+        lines.append(
+            f"  {entry['name']}: {entry['operations']} operation(s), {entry['components']} component(s), "
+            f"{entry['bytes']:,} bytes" + (f" ({'; '.join(notes)})" if notes else "")
+        )
+    return "\n".join(lines)
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+openapi_stream.py
+
+Streaming spec loader for openapi_utils.py --stream.
+
+load_spec() reads the whole file into one string, parses it into a node
+graph (YAML) or a dict, and process_spec() then copies the result while
+dropping vendor extensions: three document-sized structures alive at once.
+stream_spec() instead reads the file in fixed-size chunks, turns it into
+parse events and builds the spec dict directly from them, dropping every
+vendor-extension key as it is read. The subtree under a dropped key is
+parsed (so malformed input is still rejected) but never built.
+
+Besides the returned spec, the loader holds one chunk of input text and
+one frame per open container, so its working memory grows with nesting
+depth rather than document size. The result is equal to
+process_spec()'s extension removal applied to load_spec()'s result;
+$ref rewriting stays in process_spec(), because which $refs a Swagger 2.0
+conversion rewrites depends on where they sit in the restructured
+document. Run process_spec() with copy_on_write=True on a streamed spec:
+it is already clean, so every subtree the conversion does not change is
+shared instead of copied.
+
+  JSON  A small tokenizer drives the standard library's C scanner: a
+        container that fits in the buffer and holds no extension key is
+        decoded in one C call, anything else is walked token by token.
+        Values and error messages follow json.loads().
+  YAML  PyYAML's event parser (the libyaml one when the Serializer uses
+        libyaml), with scalars resolved and constructed exactly as
+        SafeLoader does, including anchors, aliases and merge keys ('<<').
+        Collections with explicit non-default tags (!!set, !!omap) are
+        rejected.
+
+Used by:
+  - openapi_utils.py --stream (single-file and --batch runs)
+"""
+
+import copy
+import collections.abc
+from typing import Any
+
+from openapi_serializers import yaml_module
+
+# Characters of input text read per chunk. A single token longer than the
+# buffer (a huge string) doubles the read size until it fits.
+CHUNK_SIZE = 1 << 20
+
+# Marks a container that could not be decoded in one piece
+_INCOMPLETE = object()
+
+# Mapping frame states: expecting a key / the value of a merge key ('<<')
+_KEY = object()
+_MERGE = object()
+
+_MERGE_TAG = "tag:yaml.org,2002:merge"
+_VALUE_TAG = "tag:yaml.org,2002:value"
+_STR_TAG = "tag:yaml.org,2002:str"
+_MAP_TAG = "tag:yaml.org,2002:map"
+_SEQ_TAG = "tag:yaml.org,2002:seq"
+
+
+def stream_spec(file_path: str, prefix: str = "", serializer: Any = None) -> Any:
+    """
+    Load a spec file incrementally, dropping keys that start with prefix at every level.
+
+    Args:
+        file_path:  .json, .yaml or .yml file, optionally gzip-compressed (.gz).
+        prefix:     Vendor extension prefix to drop (e.g. 'x-amazon-'); '' keeps every key.
+        serializer: openapi_serializers.Serializer whose YAML backend to parse
+                    with (default: openapi_utils.DEFAULT_SERIALIZER).
+
+    Returns:
+        The parsed spec without extension keys.
+
+    Raises:
+        ValueError: The file cannot be read or parsed (same messages as load_spec()).
+    """
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    serializer = serializer or openapi_utils.DEFAULT_SERIALIZER
+    fmt, gzipped = openapi_utils._spec_format(file_path)  # pylint: disable=protected-access
+    if fmt == "yaml" and yaml_module() is None:
+        raise ValueError("PyYAML is required for YAML files. Install with: pip install pyyaml")
+
+    def open_text() -> Any:
+        if gzipped:
+            import gzip  # pylint: disable=import-outside-toplevel
+            return gzip.open(file_path, "rt", encoding="utf-8")
+        return open(file_path, "rt", encoding="utf-8")
+
+    def parse(parser: Any) -> Any:
+        try:
+            with open_text() as fh:
+                return parser(fh)
+        except (OSError, EOFError) as exc:
+            raise ValueError(f"Cannot read file '{file_path}': {exc}") from exc
+
+    if fmt == "json":
+        try:
+            return parse(lambda fh: _JsonStream(fh, prefix).parse())
+        except _JsonError as exc:
+            raise ValueError(f"Invalid JSON in '{file_path}': {exc}") from exc
+
+    yaml = yaml_module()
+    if serializer.yaml_backend == "libyaml":
+        try:
+            return parse(lambda fh: _YamlBuilder(yaml.CSafeLoader(fh), prefix).build())
+        except yaml.YAMLError:
+            pass  # Re-parse below for PyYAML's error message, as Serializer.loads() does
+    try:
+        return parse(lambda fh: _YamlBuilder(yaml.SafeLoader(fh), prefix).build())
+    except yaml.YAMLError as exc:
+        raise ValueError(f"Invalid YAML in '{file_path}': {exc}") from exc
+
+
+def _has_extension_key(obj: Any, prefix: str) -> bool:
+    """True if any dict in obj has a key starting with prefix."""
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if any(isinstance(key, str) and key.startswith(prefix) for key in node):
+                return True
+            stack.extend(value for value in node.values() if isinstance(value, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(item for item in node if isinstance(item, (dict, list)))
+    return False
+
+
+# ---------------------------------------------------------------------------
+# JSON
+# ---------------------------------------------------------------------------
+
+class _JsonError(ValueError):
+    """A JSON syntax error, formatted like json.JSONDecodeError ('msg: line L column C (char N)')."""
+
+
+class _JsonStream:
+    """
+    Incremental JSON parser over a text stream.
+
+    self.buf holds unconsumed input from self.pos on; self.offset, self.line
+    and self.line_start locate self.buf[0] in the whole document for error
+    messages. Containers are decoded by the C scanner when they fit in the
+    buffer and contain no extension key, otherwise one token at a time with
+    an explicit stack of [container, is_object, key, keep_member] frames,
+    where container is None inside a dropped subtree.
+    """
+
+    def __init__(self, fh: Any, prefix: str):
+        import re  # pylint: disable=import-outside-toplevel
+        import json  # pylint: disable=import-outside-toplevel
+        import json.scanner  # pylint: disable=import-outside-toplevel
+
+        self.fh = fh
+        self.prefix = prefix
+        self.marker = '"' + prefix if prefix else ""
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.offset = 0
+        self.line = 1
+        self.line_start = 0
+        self.scan_once = json.scanner.make_scanner(json.JSONDecoder())
+        self.scan_errors = (StopIteration, json.JSONDecodeError)
+        self.whitespace = re.compile(r"[ \t\n\r]*")
+        self.bare = re.compile(r"[-+.0-9A-Za-z]*")
+
+    def _fill(self) -> None:
+        """Drop consumed text and append the next chunk (at least as long as the unconsumed rest)."""
+        newlines = self.buf.count("\n", 0, self.pos)
+        if newlines:
+            self.line += newlines
+            self.line_start = self.offset + self.buf.rindex("\n", 0, self.pos) + 1
+        self.offset += self.pos
+        rest = self.buf[self.pos:]
+        chunk = self.fh.read(max(CHUNK_SIZE, len(rest)))
+        if not chunk:
+            self.eof = True
+        self.buf = rest + chunk
+        self.pos = 0
+
+    def _error(self, message: str, pos: int) -> _JsonError:
+        """Build the error for buffer position pos."""
+        lineno = self.line + self.buf.count("\n", 0, pos)
+        last_newline = self.buf.rfind("\n", 0, pos)
+        colno = pos - last_newline if last_newline != -1 else self.offset + pos - self.line_start + 1
+        return _JsonError(f"{message}: line {lineno} column {colno} (char {self.offset + pos})")
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at the end of input)."""
+        while True:
+            self.pos = self.whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def _scalar(self) -> Any:
+        """Decode the string, number or literal at self.pos."""
+        while True:
+            # A number or literal running to the buffer end may continue in the next chunk
+            if not self.eof and self.buf[self.pos] != '"' and self.bare.match(self.buf, self.pos).end() == len(self.buf):
+                self._fill()
+                continue
+            try:
+                value, end = self.scan_once(self.buf, self.pos)
+            except self.scan_errors as exc:
+                if not self.eof:
+                    self._fill()
+                    continue
+                if isinstance(exc, StopIteration):
+                    raise self._error("Expecting value", self.pos) from None
+                raise self._error(exc.msg, exc.pos) from None
+            self.pos = end
+            return value
+
+    def _container(self) -> Any:
+        """Decode the container at self.pos in one C call, or return _INCOMPLETE."""
+        try:
+            value, end = self.scan_once(self.buf, self.pos)
+        except (*self.scan_errors, RecursionError):
+            return _INCOMPLETE
+        # Keys can only hide the prefix behind \\u escapes
+        if self.marker and (
+            self.buf.find(self.marker, self.pos, end) != -1
+            or (self.buf.find("\\u", self.pos, end) != -1 and _has_extension_key(value, self.prefix))
+        ):
+            return _INCOMPLETE
+        self.pos = end
+        return value
+
+    def _read_key(self, frame: list) -> None:
+        """Read '"key":' into an object frame and decide whether its value is kept."""
+        if self._peek() != '"':
+            raise self._error("Expecting property name enclosed in double quotes", self.pos)
+        key = self._scalar()
+        if self._peek() != ":":
+            raise self._error("Expecting ':' delimiter", self.pos)
+        self.pos += 1
+        frame[2] = key
+        frame[3] = frame[0] is not None and not (self.prefix and key.startswith(self.prefix))
+
+    def parse(self) -> Any:
+        """Parse the whole stream into one value."""
+        self._fill()
+        if self.buf.startswith("﻿"):
+            raise self._error("Unexpected UTF-8 BOM (decode using utf-8-sig)", 0)
+        stack: list = []
+        keep = True
+        while True:
+            char = self._peek()
+            if char in ("{", "["):
+                value = self._container() if keep else _INCOMPLETE
+                if value is _INCOMPLETE:
+                    self.pos += 1
+                    is_object = char == "{"
+                    container: Any = ({} if is_object else []) if keep else None
+                    frame = [container, is_object, None, container is not None]
+                    if self._peek() != ("}" if is_object else "]"):
+                        stack.append(frame)
+                        if is_object:
+                            self._read_key(frame)
+                        keep = frame[3]
+                        continue
+                    self.pos += 1
+                    value = container
+            elif char:
+                value = self._scalar()
+            else:
+                raise self._error("Expecting value", self.pos)
+
+            # Store the value, then close every container that ends after it
+            while True:
+                if not stack:
+                    if self._peek():
+                        raise self._error("Extra data", self.pos)
+                    return value
+                frame = stack[-1]
+                container, is_object, key, keep_member = frame
+                if keep_member:
+                    if is_object:
+                        container[key] = value
+                    else:
+                        container.append(value)
+                char = self._peek()
+                if char == ",":
+                    self.pos += 1
+                    if is_object:
+                        self._read_key(frame)
+                    keep = frame[3]
+                    break
+                if char != ("}" if is_object else "]"):
+                    raise self._error("Expecting ',' delimiter", self.pos)
+                self.pos += 1
+                stack.pop()
+                value = container
+
+
+# ---------------------------------------------------------------------------
+# YAML
+# ---------------------------------------------------------------------------
+
+class _Frame:
+    """An open YAML collection: container is None inside a dropped subtree."""
+
+    __slots__ = ("container", "is_map", "key", "merges", "mark")
+
+    def __init__(self, container: Any, is_map: bool, mark: Any):
+        self.container = container
+        self.is_map = is_map
+        self.key: Any = _KEY
+        self.merges: list = []
+        self.mark = mark
+
+
+class _YamlBuilder:
+    """Build the document of a PyYAML loader from its events, as SafeLoader would, minus extension keys."""
+
+    def __init__(self, loader: Any, prefix: str):
+        self.loader = loader
+        self.prefix = prefix
+        self.yaml = yaml_module()
+        self.constructors = loader.yaml_constructors
+        self.anchors: dict = {}
+        self.stack: list = []
+        self.root: Any = None
+
+    def build(self) -> Any:
+        """Consume every event and return the single document (None for an empty stream)."""
+        yaml = self.yaml
+        document_mark = None
+        try:
+            while True:
+                event = self.loader.get_event()
+                if isinstance(event, yaml.ScalarEvent):
+                    self._scalar(event)
+                elif isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                    self._open(event)
+                elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                    self._close(event)
+                elif isinstance(event, yaml.AliasEvent):
+                    self._alias(event)
+                elif isinstance(event, yaml.DocumentStartEvent):
+                    if document_mark is not None:
+                        raise yaml.composer.ComposerError(
+                            "expected a single document in the stream", document_mark,
+                            "but found another document", event.start_mark,
+                        )
+                    document_mark = event.start_mark
+                elif isinstance(event, yaml.StreamEndEvent):
+                    return self.root
+        finally:
+            self.loader.dispose()
+
+    def _keeps_child(self) -> bool:
+        """Whether the next node is part of the result."""
+        if not self.stack:
+            return True
+        frame = self.stack[-1]
+        if frame.container is None:
+            return False
+        if frame.is_map and frame.key is not _MERGE:
+            return not (self.prefix and isinstance(frame.key, str) and frame.key.startswith(self.prefix))
+        return True
+
+    def _register(self, event: Any, value: Any) -> None:
+        if event.anchor is None:
+            return
+        if event.anchor in self.anchors:
+            raise self.yaml.composer.ComposerError(
+                f"found duplicate anchor {event.anchor!r}; first occurrence", self.anchors[event.anchor][1],
+                "second occurrence", event.start_mark,
+            )
+        self.anchors[event.anchor] = (value, event.start_mark)
+
+    def _scalar(self, event: Any) -> None:
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = self.loader.resolve(self.yaml.ScalarNode, event.value, event.implicit)
+        frame = self.stack[-1] if self.stack else None
+        if frame is not None and frame.is_map and frame.key is _KEY:
+            if tag == _MERGE_TAG:
+                frame.key = _MERGE
+                return
+            if tag == _VALUE_TAG:
+                tag = _STR_TAG
+        node = self.yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+        constructor = self.constructors.get(tag, self.constructors[None])
+        value = constructor(self.loader, node)
+        self._register(event, value)
+        self._attach(value, event.start_mark)
+
+    def _alias(self, event: Any) -> None:
+        if event.anchor not in self.anchors:
+            raise self.yaml.composer.ComposerError(None, None, f"found undefined alias {event.anchor!r}", event.start_mark)
+        value = self.anchors[event.anchor][0]
+        # process_spec() copies every alias occurrence; so does the streamed result
+        self._attach(copy.deepcopy(value) if isinstance(value, (dict, list)) else value, event.start_mark)
+
+    def _open(self, event: Any) -> None:
+        yaml = self.yaml
+        is_map = isinstance(event, yaml.MappingStartEvent)
+        if event.tag not in (None, "!", _MAP_TAG if is_map else _SEQ_TAG):
+            raise yaml.constructor.ConstructorError(
+                None, None, f"cannot stream a collection tagged {event.tag!r}", event.start_mark
+            )
+        if self.stack and self.stack[-1].is_map and self.stack[-1].key is _KEY:
+            raise yaml.constructor.ConstructorError(
+                "while constructing a mapping", self.stack[-1].mark, "found unhashable key", event.start_mark
+            )
+        # A dropped subtree is still built where an alias may refer to it
+        container: Any = None
+        if self._keeps_child() or event.anchor is not None:
+            container = {} if is_map else []
+        self._register(event, container)
+        self.stack.append(_Frame(container, is_map, event.start_mark))
+
+    def _close(self, event: Any) -> None:
+        frame = self.stack.pop()
+        container = frame.container
+        if frame.merges and container is not None:
+            # SafeLoader puts merged pairs before the mapping's own ones, later pairs winning
+            explicit = dict(container)
+            container.clear()
+            for merged in frame.merges:
+                container.update(merged)
+            container.update(explicit)
+        self._attach(container, event.start_mark)
+
+    def _attach(self, value: Any, mark: Any) -> None:
+        if not self.stack:
+            self.root = value
+            return
+        frame = self.stack[-1]
+        if not frame.is_map:
+            if frame.container is not None:
+                frame.container.append(value)
+            return
+        if frame.key is _KEY:
+            if not isinstance(value, collections.abc.Hashable):
+                raise self.yaml.constructor.ConstructorError(
+                    "while constructing a mapping", frame.mark, "found unhashable key", mark
+                )
+            frame.key = value
+            return
+        if frame.key is _MERGE:
+            frame.merges.extend(self._merge_sources(value, frame, mark))
+        elif self._keeps_child():
+            frame.container[frame.key] = value
+        frame.key = _KEY
+
+    def _merge_sources(self, value: Any, frame: _Frame, mark: Any) -> list:
+        """The mappings a '<<' value merges, in SafeLoader's order."""
+        error = self.yaml.constructor.ConstructorError
+        if isinstance(value, dict):
+            return [value]
+        if not isinstance(value, list):
+            raise error(
+                "while constructing a mapping", frame.mark,
+                "expected a mapping or list of mappings for merging, but found scalar", mark,
+            )
+        for item in value:
+            if not isinstance(item, dict):
+                kind = "sequence" if isinstance(item, list) else "scalar"
+                raise error(
+                    "while constructing a mapping", frame.mark, f"expected a mapping for merging, but found {kind}", mark
+                )
+        return value[::-1]
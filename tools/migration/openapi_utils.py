@@ -8,14 +8,17 @@ migration to Azure API Management (APIM).
 Features:
   - Convert OpenAPI 2.0 (Swagger) specifications to OpenAPI 3.0
   - Automatically generate operationId for operations that lack one
-  - Validate APIM-specific requirements (title, version, server URLs, security schemes)
+  - Validate APIM-specific requirements (title, version, server URLs, security schemes,
+    conflicting or shadowed path templates)
   - Remove vendor-specific extensions (AWS x-amazon-*, Google x-google-*)
+  - Run all of the above in a single fused pass (process_spec)
 
 Usage:
   python3 openapi_utils.py <input-file> <output-file> [--source aws|google]
 
 Dependencies:
-  - PyYAML (pip install pyyaml)
+  - PyYAML (pip install pyyaml); built with LibYAML for the fast YAML backend
+  - orjson (optional, pip install orjson) for faster JSON output
 
 See also:
   - translate-openapi.sh / translate-openapi.ps1   (Google API Gateway)
@@ -24,41 +27,244 @@ See also:
   - ../../docs/migration/google-to-apim.md
 """
 
-import re
+# Only modules that are cheap or already loaded by the interpreter are
+# imported here. PyYAML, json, re, argparse, gzip, hashlib, copy, glob and
+# concurrent.futures are imported by the functions that need them, so library
+# callers and '--version' do not pay for them (see tests/test_startup.py).
+import io
+import os
 import sys
-import json
-import copy
-import argparse
-from typing import Any
+import stat
+import functools
+import contextlib
+import itertools
+from typing import Any, Callable
 
-try:
-    import yaml
-    HAS_YAML = True
-except ImportError:
-    HAS_YAML = False
+from openapi_serializers import Serializer, YAML_BACKENDS, JSON_BACKENDS, yaml_module
+
+__version__ = "1.2.0"
+
+
+def __getattr__(name: str) -> Any:
+    """HAS_YAML, computed on first access (it imports PyYAML)."""
+    if name == "HAS_YAML":
+        return yaml_module() is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ---------------------------------------------------------------------------
 # OpenAPI 2.0 (Swagger) → OpenAPI 3.0 conversion
 # ---------------------------------------------------------------------------
 
-def _convert_schema_refs(obj: Any) -> Any:
-    """Recursively rewrite $ref values from '#/definitions/' to '#/components/schemas/'."""
+# HTTP methods that can carry an Operation Object inside a Path Item
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+def _rewrite_ref(ref: str) -> str:
+    """Map a Swagger 2.0 local $ref onto its OpenAPI 3.0 components location."""
+    return (
+        ref.replace("#/definitions/", "#/components/schemas/")
+           .replace("#/parameters/", "#/components/parameters/")
+           .replace("#/responses/", "#/components/responses/")
+    )
+
+
+def _is_extension(key: Any, prefix: str) -> bool:
+    """True if key is a vendor extension for prefix (an empty prefix matches nothing)."""
+    return bool(prefix) and isinstance(key, str) and key.startswith(prefix)
+
+
+def _map_items(
+    obj: dict,
+    prefix: str,
+    transform: Callable[[Any, Any], Any],
+    copy_on_write: bool = False,
+) -> dict:
+    """
+    Return obj without prefix extension keys and with each value passed through transform(key, value).
+
+    With copy_on_write the original dict is returned when no key was dropped
+    and every transformed value is the original object; otherwise a new dict
+    is allocated at the first change and the unchanged leading items are
+    carried over.
+    """
+    if not copy_on_write:
+        return {k: transform(k, v) for k, v in obj.items() if not _is_extension(k, prefix)}
+
+    result = None
+    for index, (k, v) in enumerate(obj.items()):
+        if _is_extension(k, prefix):
+            if result is None:
+                result = dict(itertools.islice(obj.items(), index))
+            continue
+        new = transform(k, v)
+        if result is None and new is not v:
+            result = dict(itertools.islice(obj.items(), index))
+        if result is not None:
+            result[k] = new
+    return obj if result is None else result
+
+
+def _transform_node(obj: Any, prefix: str, rewrite_refs: bool, copy_on_write: bool = False) -> Any:
+    """
+    Return obj with vendor extensions dropped and $refs optionally rewritten.
+
+    This is the single visitor behind _convert_schema_refs(),
+    _remove_extensions_recursive() and the fused process_spec() pipeline.
+    An empty prefix keeps every key.
+
+    By default every dict and list is copied. With copy_on_write the result
+    shares every unchanged subtree with obj and only the containers on the
+    path to a change are allocated, so the result must be treated as
+    read-only wherever it may still alias the input.
+
+    The walk uses an explicit stack of iterators rather than recursion, so
+    nesting depth is not limited by the interpreter recursion limit and the
+    extra memory is one small frame per level of the current branch.
+    """
+    if not isinstance(obj, (dict, list)):
+        return obj
+    if copy_on_write:
+        return _transform_node_shared(obj, prefix, rewrite_refs)
+
+    root: Any = {} if isinstance(obj, dict) else []
+    stack = [(_iter_children(obj), root)]
+    while stack:
+        children, target = stack[-1]
+        is_dict = isinstance(target, dict)
+        for key, value in children:
+            if is_dict and prefix and isinstance(key, str) and key.startswith(prefix):
+                continue
+            descend = isinstance(value, (dict, list))
+            if descend:
+                new: Any = {} if isinstance(value, dict) else []
+            elif rewrite_refs and is_dict and key == "$ref":
+                new = _rewrite_ref(value)
+            else:
+                new = value
+            if is_dict:
+                target[key] = new
+            else:
+                target.append(new)
+            if descend:
+                stack.append((_iter_children(value), new))
+                break
+        else:
+            stack.pop()
+    return root
+
+
+def _iter_children(node: Any):
+    """Iterate (key, value) pairs of a dict or (index, item) pairs of a list."""
+    return iter(node.items()) if isinstance(node, dict) else iter(enumerate(node))
+
+
+def _transform_node_shared(obj: Any, prefix: str, rewrite_refs: bool) -> Any:
+    """
+    Copy-on-write variant of _transform_node(), also driven by an explicit stack.
+
+    Each frame is [source, child iterator, copy or None, children consumed,
+    key in parent]. A frame's copy is only created when one of its children
+    is dropped or comes back as a different object; a finished frame hands
+    either its source or its copy to the parent frame.
+    """
+    def store(frame: list, key: Any, old: Any, new: Any, position: int) -> None:
+        source, _, result = frame[0], frame[1], frame[2]
+        if result is None and new is not old:
+            if isinstance(source, dict):
+                result = frame[2] = dict(itertools.islice(source.items(), position))
+            else:
+                result = frame[2] = source[:position]
+        if result is not None:
+            if isinstance(result, dict):
+                result[key] = new
+            else:
+                result.append(new)
+
+    def open_frame(node: Any, key: Any) -> list:
+        return [node, _iter_children(node), None, 0, key]
+
+    stack = [open_frame(obj, None)]
+    while True:
+        frame = stack[-1]
+        source, children = frame[0], frame[1]
+        is_dict = isinstance(source, dict)
+        descended = False
+        for key, value in children:
+            position = frame[3]
+            frame[3] += 1
+            if is_dict and prefix and isinstance(key, str) and key.startswith(prefix):
+                if frame[2] is None:
+                    frame[2] = dict(itertools.islice(source.items(), position))
+                continue
+            if isinstance(value, (dict, list)):
+                stack.append(open_frame(value, key))
+                descended = True
+                break
+            new = value
+            if rewrite_refs and is_dict and key == "$ref":
+                new = _rewrite_ref(value)
+                if new == value:
+                    new = value
+            store(frame, key, value, new, position)
+        if descended:
+            continue
+        stack.pop()
+        finished = source if frame[2] is None else frame[2]
+        if not stack:
+            return finished
+        parent = stack[-1]
+        store(parent, frame[4], source, finished, parent[3] - 1)
+
+
+def _transform_node_recursive(obj: Any, prefix: str, rewrite_refs: bool) -> Any:
+    """
+    Recursive reference implementation of _transform_node() (copying mode).
+
+    Kept for the equivalence tests and benchmarks/bench_walkers.py; raises
+    RecursionError on documents nested deeper than the recursion limit.
+    """
     if isinstance(obj, dict):
         return {
-            k: _convert_schema_refs(v) for k, v in obj.items()
-        } if "$ref" not in obj else {
-            k: v.replace("#/definitions/", "#/components/schemas/")
-               .replace("#/parameters/", "#/components/parameters/")
-               .replace("#/responses/", "#/components/responses/")
-            if k == "$ref" else _convert_schema_refs(v)
+            k: _rewrite_ref(v) if rewrite_refs and k == "$ref" else _transform_node_recursive(v, prefix, rewrite_refs)
             for k, v in obj.items()
+            if not _is_extension(k, prefix)
         }
     if isinstance(obj, list):
-        return [_convert_schema_refs(item) for item in obj]
+        return [_transform_node_recursive(item, prefix, rewrite_refs) for item in obj]
     return obj
 
 
+def _transform_node_shared_recursive(obj: Any, prefix: str, rewrite_refs: bool) -> Any:
+    """Recursive reference implementation of _transform_node_shared()."""
+    if isinstance(obj, dict):
+        def transform(key: Any, value: Any) -> Any:
+            if rewrite_refs and key == "$ref":
+                rewritten = _rewrite_ref(value)
+                return value if rewritten == value else rewritten
+            return _transform_node_shared_recursive(value, prefix, rewrite_refs)
+        return _map_items(obj, prefix, transform, copy_on_write=True)
+    if isinstance(obj, list):
+        result = None
+        for index, item in enumerate(obj):
+            new = _transform_node_shared_recursive(item, prefix, rewrite_refs)
+            if result is None and new is not item:
+                result = obj[:index]
+            if result is not None:
+                result.append(new)
+        return obj if result is None else result
+    return obj
+
+
+def _identity(obj: Any) -> Any:
+    return obj
+
+
+def _convert_schema_refs(obj: Any, copy_on_write: bool = False) -> Any:
+    """Recursively rewrite $ref values from '#/definitions/' to '#/components/schemas/'."""
+    return _transform_node(obj, "", True, copy_on_write)
+
+
 def _swagger_type_to_content_type(swagger_mime: str) -> str:
     """Map Swagger mime type strings to standard content type strings."""
     mapping = {
@@ -129,7 +335,11 @@ def _convert_security_definitions(sec_defs: dict) -> dict:
     return schemes
 
 
-def _extract_request_body(parameters: list, global_consumes: list) -> tuple:
+def _extract_request_body(
+    parameters: list,
+    global_consumes: list,
+    rewrite: Callable[[Any], Any] = _convert_schema_refs,
+) -> tuple:
     """
     Extract body/formData parameters and return (requestBody, remaining_params).
 
@@ -144,7 +354,7 @@ def _extract_request_body(parameters: list, global_consumes: list) -> tuple:
     if body_params:
         # Take the first body parameter (only one is allowed in Swagger 2.0)
         body_param = body_params[0]
-        schema = _convert_schema_refs(body_param.get("schema", {}))
+        schema = rewrite(body_param.get("schema", {}))
         content_types = global_consumes or ["application/json"]
         content = {}
         for ct in content_types:
@@ -187,7 +397,11 @@ def _extract_request_body(parameters: list, global_consumes: list) -> tuple:
     return request_body, other_params
 
 
-def _convert_responses(swagger_responses: dict, global_produces: list) -> dict:
+def _convert_responses(
+    swagger_responses: dict,
+    global_produces: list,
+    rewrite: Callable[[Any], Any] = _convert_schema_refs,
+) -> dict:
     """Convert Swagger 2.0 operation responses to OpenAPI 3.0 format."""
     oas3_responses: dict = {}
     produces = global_produces or ["application/json"]
@@ -201,14 +415,14 @@ def _convert_responses(swagger_responses: dict, global_produces: list) -> dict:
 
         schema = response.get("schema")
         if schema:
-            converted_schema = _convert_schema_refs(schema)
+            converted_schema = rewrite(schema)
             content = {}
             for ct in produces:
                 content[_swagger_type_to_content_type(ct)] = {"schema": converted_schema}
             oas3_response["content"] = content
 
         if "headers" in response:
-            oas3_response["headers"] = _convert_schema_refs(response["headers"])
+            oas3_response["headers"] = rewrite(response["headers"])
 
         if "examples" in response:
             # Move examples into content per content type
@@ -224,7 +438,7 @@ def _convert_responses(swagger_responses: dict, global_produces: list) -> dict:
     return oas3_responses
 
 
-def convert_swagger_to_openapi3(spec: dict) -> dict:
+def convert_swagger_to_openapi3(spec: dict, copy_on_write: bool = False, dedup_min_bytes: Any = None) -> dict:
     """
     Convert an OpenAPI 2.0 (Swagger) specification dict to OpenAPI 3.0 format.
 
@@ -236,16 +450,26 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
       - Body/formData parameters → requestBody
       - Response schemas with content negotiation
       - $ref path rewrites
+      - Optionally, hoisting repeated inline schemas into components/schemas
 
     Args:
-        spec: Parsed Swagger 2.0 specification as a dict.
+        spec:          Parsed Swagger 2.0 specification as a dict.
+        copy_on_write: Share unchanged subtrees with spec instead of copying them.
+        dedup_min_bytes: Hoist inline schemas of at least this many bytes that
+                       occur more than once (openapi_dedup.dedup_inline_schemas());
+                       None = keep them inline.
 
     Returns:
         OpenAPI 3.0 specification dict.
     """
+    if dedup_min_bytes is not None:
+        import openapi_dedup  # pylint: disable=import-outside-toplevel
+        converted = convert_swagger_to_openapi3(spec, copy_on_write)
+        return openapi_dedup.dedup_inline_schemas(converted, dedup_min_bytes)[0]
+
     if spec.get("openapi", ""):
         # Already OpenAPI 3.x — return as-is (possibly after ref rewrite)
-        return _convert_schema_refs(spec)
+        return _convert_schema_refs(spec, copy_on_write)
 
     if not spec.get("swagger", "").startswith("2"):
         raise ValueError(
@@ -253,10 +477,31 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
             f"swagger={spec.get('swagger')!r}, openapi={spec.get('openapi')!r}"
         )
 
+    if copy_on_write:
+        return _convert_swagger2_structure(
+            spec, lambda node: _convert_schema_refs(node, copy_on_write=True), _identity
+        )
+    import copy  # pylint: disable=import-outside-toplevel
+    return _convert_swagger2_structure(spec, _convert_schema_refs, copy.deepcopy)
+
+
+def _convert_swagger2_structure(
+    spec: dict,
+    rewrite: Callable[[Any], Any],
+    clone: Callable[[Any], Any],
+) -> dict:
+    """
+    Restructure a Swagger 2.0 spec dict into OpenAPI 3.0 form.
+
+    rewrite is applied to every subtree whose $refs must move to components
+    and clone to the blocks that are copied verbatim (info, tags, externalDocs).
+    The fused pipeline passes identity functions for both because its single
+    walk has already produced a private, ref-rewritten tree.
+    """
     oas3: dict = {"openapi": "3.0.0"}
 
     # --- info ---
-    oas3["info"] = copy.deepcopy(spec.get("info", {}))
+    oas3["info"] = clone(spec.get("info", {}))
 
     # --- servers (from host + basePath + schemes) ---
     host = spec.get("host", "")
@@ -273,11 +518,11 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
 
     # --- tags ---
     if "tags" in spec:
-        oas3["tags"] = copy.deepcopy(spec["tags"])
+        oas3["tags"] = clone(spec["tags"])
 
     # --- externalDocs ---
     if "externalDocs" in spec:
-        oas3["externalDocs"] = copy.deepcopy(spec["externalDocs"])
+        oas3["externalDocs"] = clone(spec["externalDocs"])
 
     # --- global consumes/produces ---
     global_consumes = spec.get("consumes", [])
@@ -293,12 +538,11 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
             path_level_params = []
             for param in path_item["parameters"]:
                 if param.get("in") not in ("body", "formData"):
-                    path_level_params.append(_convert_schema_refs(param))
+                    path_level_params.append(rewrite(param))
             if path_level_params:
                 oas3_path["parameters"] = path_level_params
 
-        http_methods = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
-        for method in http_methods:
+        for method in HTTP_METHODS:
             if method not in path_item:
                 continue
             op = path_item[method]
@@ -314,15 +558,15 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
             op_consumes = op.get("consumes", global_consumes)
             op_produces = op.get("produces", global_produces)
 
-            request_body, remaining_params = _extract_request_body(params, op_consumes)
+            request_body, remaining_params = _extract_request_body(params, op_consumes, rewrite)
             if remaining_params:
-                oas3_op["parameters"] = [_convert_schema_refs(p) for p in remaining_params]
+                oas3_op["parameters"] = [rewrite(p) for p in remaining_params]
             if request_body:
                 oas3_op["requestBody"] = request_body
 
             # Responses
             if "responses" in op:
-                oas3_op["responses"] = _convert_responses(op["responses"], op_produces)
+                oas3_op["responses"] = _convert_responses(op["responses"], op_produces, rewrite)
             else:
                 oas3_op["responses"] = {"default": {"description": "Successful operation"}}
 
@@ -343,10 +587,10 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
         )
 
     if "definitions" in spec:
-        components["schemas"] = _convert_schema_refs(spec["definitions"])
+        components["schemas"] = rewrite(spec["definitions"])
 
     if "parameters" in spec:
-        components["parameters"] = _convert_schema_refs(spec["parameters"])
+        components["parameters"] = rewrite(spec["parameters"])
 
     if "responses" in spec:
         # Global responses section
@@ -358,7 +602,7 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
             schema = response.get("schema")
             if schema:
                 oas3_response["content"] = {
-                    "application/json": {"schema": _convert_schema_refs(schema)}
+                    "application/json": {"schema": rewrite(schema)}
                 }
             converted_global_responses[name] = oas3_response
         components["responses"] = converted_global_responses
@@ -373,14 +617,94 @@ def convert_swagger_to_openapi3(spec: dict) -> dict:
     return oas3
 
 
+# ---------------------------------------------------------------------------
+# Operation index
+# ---------------------------------------------------------------------------
+
+def _json_pointer(*tokens: str) -> str:
+    """Build an RFC 6901 JSON pointer: ('paths', '/a/{b}', 'get') → '/paths/~1a~1{b}/get'."""
+    return "".join("/" + token.replace("~", "~0").replace("/", "~1") for token in tokens)
+
+
+class OperationIndex:
+    """
+    Lookup tables over the Operation Objects of a spec, built in one pass.
+
+    Shared by ensure_operation_ids() and validate_apim_requirements() so a
+    spec's operations are collected once and every lookup (existing IDs,
+    duplicates) is a dict access instead of a scan.
+
+    Attributes:
+        operations: [(path, method, operation)] in document order.
+        by_id:      operationId → [(path, method, operation), ...]; more than
+                    one entry means the ID is duplicated.
+        by_route:   (method, path) → operation.
+        by_tag:     tag → [(path, method, operation), ...].
+        by_pointer: JSON pointer ('/paths/~1users/get') → operation.
+
+    The index references the operation dicts, not copies; use
+    set_operation_id() to change an ID so by_id stays in step.
+    """
+
+    def __init__(self, spec: dict):
+        self.operations: list = []
+        self.by_id: dict = {}
+        self.by_route: dict = {}
+        self.by_tag: dict = {}
+        self.by_pointer: dict = {}
+        for entry in _iter_operations(spec):
+            path, method, op = entry
+            self.operations.append(entry)
+            self.by_route[(method, path)] = op
+            self.by_pointer[_json_pointer("paths", path, method)] = op
+            op_id = op.get("operationId")
+            if op_id:
+                self.by_id.setdefault(op_id, []).append(entry)
+            tags = op.get("tags")
+            if isinstance(tags, list):
+                for tag in tags:
+                    if isinstance(tag, str):
+                        self.by_tag.setdefault(tag, []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def missing_ids(self) -> list:
+        """(path, method, operation) entries without an operationId, in document order."""
+        return [entry for entry in self.operations if not entry[2].get("operationId")]
+
+    def duplicate_ids(self) -> list:
+        """Sorted operationIds used by more than one operation."""
+        return sorted(op_id for op_id, entries in self.by_id.items() if len(entries) > 1)
+
+    def set_operation_id(self, entry: tuple, op_id: str) -> None:
+        """Set the operationId of an indexed (path, method, operation) entry."""
+        old_id = entry[2].get("operationId")
+        if old_id:
+            entries = self.by_id[old_id]
+            entries.remove(entry)
+            if not entries:
+                del self.by_id[old_id]
+        entry[2]["operationId"] = op_id
+        self.by_id.setdefault(op_id, []).append(entry)
+
+
 # ---------------------------------------------------------------------------
 # operationId auto-generation
 # ---------------------------------------------------------------------------
 
+# Length of the hex digest appended when a generated operationId is shortened
+_ID_HASH_LENGTH = 8
+
+
+@functools.lru_cache(maxsize=65536)
 def _path_to_camel(path: str) -> str:
     """
     Convert an OpenAPI path string to a camelCase identifier component.
 
+    Memoised: every method on a path, and every spec in a batch that shares
+    the path, reuses the conversion.
+
     Examples:
       /users                    → Users
       /users/{userId}           → UsersByUserId
@@ -400,7 +724,7 @@ def _path_to_camel(path: str) -> str:
         else:
             # Regular segment: capitalize first letter
             # Handle kebab-case and snake_case segments
-            words = re.split(r"[-_]", part)
+            words = part.replace("_", "-").split("-")
             result_parts.append("".join(w.capitalize() for w in words))
     return "".join(result_parts)
 
@@ -433,7 +757,7 @@ def generate_operation_id(method: str, path: str) -> str:
     return method_lower + "Root"
 
 
-def ensure_operation_ids(spec: dict) -> dict:
+def ensure_operation_ids(spec: dict, index: Any = None, max_length: Any = None) -> dict:
     """
     Ensure every operation in the spec has an operationId.
 
@@ -443,38 +767,83 @@ def ensure_operation_ids(spec: dict) -> dict:
     are disambiguated by appending a numeric suffix (_2, _3, ...).
 
     Args:
-        spec: Parsed OpenAPI 2.0 or 3.0 specification dict (modified in place).
+        spec:       Parsed OpenAPI 2.0 or 3.0 specification dict (modified in place).
+        index:      OperationIndex of spec to reuse (built if omitted); kept up to date.
+        max_length: Longest generated operationId; longer ones are shortened
+                    with a hash suffix (see OperationIdGenerator). None = no limit.
 
     Returns:
         The modified spec dict.
     """
-    seen_ids: set = set()
+    _assign_operation_ids(index if index is not None else OperationIndex(spec), max_length)
+    return spec
 
-    # Collect all existing operationIds so we don't clash with them
-    for path_item in spec.get("paths", {}).values():
-        for method in ("get", "put", "post", "delete", "options", "head", "patch", "trace"):
-            if method in path_item and isinstance(path_item[method], dict):
-                existing_id = path_item[method].get("operationId")
-                if existing_id:
-                    seen_ids.add(existing_id)
 
-    # Now assign missing IDs
+def _iter_operations(spec: dict):
+    """Yield (path, method, operation) for every Operation Object in spec['paths']."""
     for path, path_item in spec.get("paths", {}).items():
-        for method in ("get", "put", "post", "delete", "options", "head", "patch", "trace"):
-            if method not in path_item or not isinstance(path_item[method], dict):
-                continue
-            op = path_item[method]
-            if not op.get("operationId"):
-                base_id = generate_operation_id(method, path)
-                candidate = base_id
-                counter = 2
-                while candidate in seen_ids:
-                    candidate = f"{base_id}_{counter}"
-                    counter += 1
-                op["operationId"] = candidate
-                seen_ids.add(candidate)
+        for method in HTTP_METHODS:
+            if method in path_item and isinstance(path_item[method], dict):
+                yield path, method, path_item[method]
 
-    return spec
+
+class OperationIdGenerator:
+    """
+    Allocate unique operationIds: base ID, then base_2, base_3, ...
+
+    Each base remembers the next suffix to try, so N operations sharing a
+    base (e.g. many AWS {proxy+} routes) cost O(N) instead of re-probing
+    from _2 on every clash. Because taken IDs are never released, resuming
+    from the last suffix yields exactly the smallest free suffix.
+
+    Args:
+        taken:      Container of IDs already in use (e.g. OperationIndex.by_id);
+                    checked with 'in', never modified by the generator itself.
+        max_length: Longest ID to emit. A longer candidate is cut to fit and
+                    ends in '_' plus the first 8 hex digits of the SHA-256
+                    of the full candidate, so the result is deterministic.
+                    None disables the limit.
+
+    Raises:
+        ValueError: If max_length is too short to hold the hash suffix.
+    """
+
+    def __init__(self, taken: Any, max_length: Any = None):
+        if max_length is not None and max_length < 2 * (_ID_HASH_LENGTH + 1):
+            raise ValueError(f"Maximum operationId length must be at least {2 * (_ID_HASH_LENGTH + 1)}, got {max_length}")
+        self.taken = taken
+        self.max_length = max_length
+        self._next_suffix: dict = {}
+
+    def _fit(self, candidate: str) -> str:
+        if self.max_length is None or len(candidate) <= self.max_length:
+            return candidate
+        import hashlib  # pylint: disable=import-outside-toplevel
+        digest = hashlib.sha256(candidate.encode("utf-8")).hexdigest()[:_ID_HASH_LENGTH]
+        return f"{candidate[:self.max_length - _ID_HASH_LENGTH - 1]}_{digest}"
+
+    def allocate(self, base_id: str) -> str:
+        """Return the first free ID for base_id; the caller must record it as taken."""
+        candidate = self._fit(base_id)
+        if candidate not in self.taken:
+            return candidate
+        counter = self._next_suffix.get(base_id, 2)
+        while True:
+            candidate = self._fit(f"{base_id}_{counter}")
+            counter += 1
+            if candidate not in self.taken:
+                break
+        self._next_suffix[base_id] = counter
+        return candidate
+
+
+def _assign_operation_ids(index: OperationIndex, max_length: Any = None) -> None:
+    """Fill in missing operationIds of the indexed operations in place."""
+    # index.by_id holds every existing operationId, so new IDs never clash with them
+    generator = OperationIdGenerator(index.by_id, max_length)
+    for entry in index.missing_ids():
+        path, method, _ = entry
+        index.set_operation_id(entry, generator.allocate(generate_operation_id(method, path)))
 
 
 # ---------------------------------------------------------------------------
@@ -488,7 +857,7 @@ APIM_SUPPORTED_SECURITY_TYPES = {"apiKey", "http", "oauth2", "openIdConnect"}
 SWAGGER_SUPPORTED_SECURITY_TYPES = {"apiKey", "basic", "oauth2"}
 
 
-def validate_apim_requirements(spec: dict) -> list:
+def validate_apim_requirements(spec: dict, index: Any = None) -> list:
     """
     Validate that an OpenAPI specification meets Azure APIM import requirements.
 
@@ -497,14 +866,24 @@ def validate_apim_requirements(spec: dict) -> list:
       2. At least one server URL is defined (OpenAPI 3.0) or basePath/host (Swagger 2.0)
       3. Security scheme types are compatible with Azure APIM
       4. Operations have unique operationIds (if defined)
+      5. No two path templates with a common method differ only in parameter
+         names, and none is shadowed by a more general one (openapi_routes.py)
 
     Args:
-        spec: Parsed OpenAPI specification dict.
+        spec:  Parsed OpenAPI specification dict, or a read-only Mapping view
+               of one such as openapi_lazy.LazyJsonSpec (only info, servers,
+               the security schemes and the path items are read).
+        index: OperationIndex of spec to reuse (built if omitted).
 
     Returns:
         A list of validation error/warning message strings.
         An empty list indicates a spec that passes all checks.
     """
+    return _validate_apim_requirements(spec, index if index is not None else OperationIndex(spec))
+
+
+def _validate_apim_requirements(spec: dict, index: OperationIndex) -> list:
+    """validate_apim_requirements() against an already built OperationIndex."""
     errors = []
 
     # 1. Mandatory info fields
@@ -567,18 +946,23 @@ def validate_apim_requirements(spec: dict) -> list:
                 )
 
     # 4. operationId uniqueness
-    all_ids = []
-    for path_item in spec.get("paths", {}).values():
-        for method in ("get", "put", "post", "delete", "options", "head", "patch", "trace"):
-            if method in path_item and isinstance(path_item[method], dict):
-                op_id = path_item[method].get("operationId")
-                if op_id:
-                    all_ids.append(op_id)
-
-    duplicates = {op_id for op_id in all_ids if all_ids.count(op_id) > 1}
-    for dup in sorted(duplicates):
+    for dup in index.duplicate_ids():
         errors.append(f"ERROR: operationId '{dup}' is not unique. APIM requires unique operationIds.")
 
+    # 5. Route conflicts
+    import openapi_routes  # pylint: disable=import-outside-toplevel
+    routes = openapi_routes.RouteTrie(index.operations)
+    for templates, methods in routes.conflicts():
+        errors.append(
+            f"ERROR: Paths {', '.join(repr(t) for t in templates)} differ only in parameter names "
+            f"({', '.join(m.upper() for m in methods)}). APIM cannot route them apart."
+        )
+    for template, other, methods in routes.shadowed():
+        errors.append(
+            f"WARNING: Path '{template}' is shadowed by '{other}' ({', '.join(m.upper() for m in methods)}): "
+            "every request to it also matches the more general template."
+        )
+
     return errors
 
 
@@ -586,20 +970,16 @@ def validate_apim_requirements(spec: dict) -> list:
 # Vendor extension removal
 # ---------------------------------------------------------------------------
 
-def _remove_extensions_recursive(obj: Any, prefix: str) -> Any:
+# Extension key prefix stripped for each --source platform
+VENDOR_EXTENSION_PREFIXES = {"aws": "x-amazon-", "google": "x-google-"}
+
+
+def _remove_extensions_recursive(obj: Any, prefix: str, copy_on_write: bool = False) -> Any:
     """Recursively remove keys that start with the given prefix from dicts."""
-    if isinstance(obj, dict):
-        return {
-            k: _remove_extensions_recursive(v, prefix)
-            for k, v in obj.items()
-            if not (isinstance(k, str) and k.startswith(prefix))
-        }
-    if isinstance(obj, list):
-        return [_remove_extensions_recursive(item, prefix) for item in obj]
-    return obj
+    return _transform_node(obj, prefix, False, copy_on_write)
 
 
-def clean_aws_extensions(spec: dict) -> dict:
+def clean_aws_extensions(spec: dict, copy_on_write: bool = False) -> dict:
     """
     Remove AWS API Gateway-specific extensions from an OpenAPI spec.
 
@@ -608,39 +988,273 @@ def clean_aws_extensions(spec: dict) -> dict:
     recognised (and may cause errors) in Azure APIM.
 
     Args:
-        spec: Parsed OpenAPI specification dict.
+        spec:          Parsed OpenAPI specification dict.
+        copy_on_write: Return unchanged subtrees (or spec itself) instead of copies.
 
     Returns:
         New spec dict with AWS extensions removed.
     """
-    return _remove_extensions_recursive(spec, "x-amazon-")
+    return _remove_extensions_recursive(spec, VENDOR_EXTENSION_PREFIXES["aws"], copy_on_write)
 
 
-def clean_google_extensions(spec: dict) -> dict:
+def clean_google_extensions(spec: dict, copy_on_write: bool = False) -> dict:
     """
     Remove Google API Gateway / Apigee-specific extensions from an OpenAPI spec.
 
     Removes keys starting with 'x-google-' at all levels of the spec.
 
     Args:
-        spec: Parsed OpenAPI specification dict.
+        spec:          Parsed OpenAPI specification dict.
+        copy_on_write: Return unchanged subtrees (or spec itself) instead of copies.
 
     Returns:
         New spec dict with Google extensions removed.
     """
-    return _remove_extensions_recursive(spec, "x-google-")
+    return _remove_extensions_recursive(spec, VENDOR_EXTENSION_PREFIXES["google"], copy_on_write)
+
+
+# ---------------------------------------------------------------------------
+# Fused processing pipeline
+# ---------------------------------------------------------------------------
+
+def _fused_swagger2_walk(spec: dict, prefix: str, copy_on_write: bool = False) -> dict:
+    """
+    Strip vendor extensions from a Swagger 2.0 spec and rewrite $refs in one walk.
+
+    $refs are rewritten only in the subtrees that convert_swagger_to_openapi3()
+    passes through _convert_schema_refs() (definitions, parameters, response
+    schemas and headers); everything else is cleaned but left verbatim, so the
+    result can be restructured with identity rewrite/clone functions.
+    """
+    def clean(node: Any) -> Any:
+        return _transform_node(node, prefix, False, copy_on_write)
+
+    def rewrite(node: Any) -> Any:
+        return _transform_node(node, prefix, True, copy_on_write)
+
+    def walk(node: Any, transform: Callable[[Any, Any], Any]) -> Any:
+        if not isinstance(node, dict):
+            return clean(node)
+        return _map_items(node, prefix, transform, copy_on_write)
+
+    def walk_responses(responses: Any, rewritten_fields: tuple) -> Any:
+        return walk(responses, lambda _, response: walk(
+            response, lambda k, v: rewrite(v) if k in rewritten_fields else clean(v)
+        ))
+
+    def walk_operation(_: Any, op: Any) -> Any:
+        def transform(k: Any, v: Any) -> Any:
+            if k == "parameters":
+                return rewrite(v)
+            if k == "responses":
+                return walk_responses(v, ("schema", "headers"))
+            return clean(v)
+        return walk(op, transform)
+
+    def walk_path_item(_: Any, path_item: Any) -> Any:
+        def transform(k: Any, v: Any) -> Any:
+            if k == "parameters":
+                return rewrite(v)
+            if k in HTTP_METHODS:
+                return walk_operation(k, v)
+            return clean(v)
+        return walk(path_item, transform)
+
+    def walk_root(key: Any, value: Any) -> Any:
+        if key in ("definitions", "parameters"):
+            return rewrite(value)
+        if key == "responses":
+            return walk_responses(value, ("schema",))
+        if key == "paths":
+            return walk(value, walk_path_item)
+        return clean(value)
+
+    return _map_items(spec, prefix, walk_root, copy_on_write)
+
+
+def _detach_operations(spec: dict, index: OperationIndex) -> tuple:
+    """
+    Give every operation that still needs an operationId its own dict.
+
+    Used after a copy-on-write walk, where operations (and the path items
+    and paths object holding them) may still be shared with the input spec.
+    Only the containers on the way to those operations are shallow-copied.
+
+    Returns:
+        (spec, index) with the detached objects substituted.
+    """
+    pending = [(path, method) for path, method, _ in index.missing_ids()]
+    if not pending:
+        return spec, index
+    spec = dict(spec)
+    paths = spec["paths"] = dict(spec["paths"])
+    detached_items: set = set()
+    for path, method in pending:
+        if path not in detached_items:
+            paths[path] = dict(paths[path])
+            detached_items.add(path)
+        paths[path][method] = dict(paths[path][method])
+    return spec, OperationIndex(spec)
+
+
+def process_spec(
+    spec: dict,
+    source: str = "aws",
+    convert: bool = True,
+    generate_ids: bool = True,
+    copy_on_write: bool = False,
+    max_id_length: Any = None,
+    metrics: Any = None,
+    prune: bool = False,
+    dedup_min_bytes: Any = None,
+) -> tuple:
+    """
+    Run the full migration pipeline over a spec in a single traversal.
+
+    Produces exactly what main() used to produce by chaining
+    clean_*_extensions(), convert_swagger_to_openapi3(),
+    ensure_operation_ids() and validate_apim_requirements(), but walks and
+    copies the document only once: extension stripping and $ref rewriting
+    share one visitor, the Swagger 2.0 restructuring reuses the walked
+    subtrees instead of copying them again, and operationId assignment and
+    validation share one OperationIndex.
+
+    Args:
+        spec:          Parsed OpenAPI specification dict (not modified).
+        source:        'aws' or 'google' — which vendor extensions to remove.
+        convert:       Convert Swagger 2.0 specs to OpenAPI 3.0.
+        generate_ids:  Generate missing operationIds.
+        copy_on_write: Share unchanged subtrees with spec instead of copying
+                       them. Cheaper on large, mostly clean specs; the result
+                       may alias spec, so neither should be mutated afterwards.
+        max_id_length: Longest generated operationId (see OperationIdGenerator); None = no limit.
+        metrics:       Optional openapi_metrics.RunMetrics; records the 'transform'
+                       (extension removal + conversion), 'dedup', 'prune',
+                       'operation_ids' and 'validate' stages.
+        prune:         Drop the components no operation refers to
+                       (openapi_prune.prune_components()) before validation.
+        dedup_min_bytes: Hoist repeated inline schemas of at least this many bytes
+                       into components/schemas (openapi_dedup.dedup_inline_schemas());
+                       None = keep them inline.
+
+    Returns:
+        (processed_spec, issues) where issues is the validate_apim_requirements() list.
+    """
+    result, issues, _ = _process_spec(
+        spec, source, convert, generate_ids, copy_on_write, max_id_length, metrics, prune, dedup_min_bytes
+    )
+    return result, issues
+
+
+def _process_spec(
+    spec: dict,
+    source: str = "aws",
+    convert: bool = True,
+    generate_ids: bool = True,
+    copy_on_write: bool = False,
+    max_id_length: Any = None,
+    metrics: Any = None,
+    prune: bool = False,
+    dedup_min_bytes: Any = None,
+) -> tuple:
+    """
+    process_spec() that also returns the reports of its optional stages.
+
+    Returns:
+        (processed_spec, issues, reports) where reports maps 'dedup' and/or
+        'prune', when they ran, to the dedup_inline_schemas() and
+        prune_components() reports.
+    """
+    prefix = _source_prefix(source)
+    stage = metrics.stage if metrics is not None else _untimed_stage
+
+    with stage("transform"):
+        result = _transform_spec(spec, prefix, convert, copy_on_write)
+    if metrics is not None:
+        metrics.add_nodes("transform", spec)
+    reports: dict = {}
+    if dedup_min_bytes is not None:
+        import openapi_dedup  # pylint: disable=import-outside-toplevel
+        with stage("dedup") as counters:
+            result, reports["dedup"] = openapi_dedup.dedup_inline_schemas(result, dedup_min_bytes)
+            counters["schemas_hoisted"] = reports["dedup"]["schemas_hoisted"]
+            counters["bytes_saved"] = reports["dedup"]["bytes_saved"]
+    if prune:
+        import openapi_prune  # pylint: disable=import-outside-toplevel
+        with stage("prune") as counters:
+            result, reports["prune"] = openapi_prune.prune_components(result)
+            counters["components_removed"] = reports["prune"]["components_removed"]
+            counters["bytes_removed"] = reports["prune"]["bytes_removed"]
+    return (*_finish_spec(result, generate_ids, copy_on_write, max_id_length, stage), reports)
+
+
+def _source_prefix(source: str) -> str:
+    """Vendor extension prefix for a --source platform; raises ValueError for unknown platforms."""
+    if source not in VENDOR_EXTENSION_PREFIXES:
+        raise ValueError(f"Unsupported source platform: {source!r}")
+    return VENDOR_EXTENSION_PREFIXES[source]
+
+
+def _restructures_swagger2(spec: dict, convert: bool) -> bool:
+    """True if process_spec() rebuilds spec as OpenAPI 3.0 (Swagger 2.0 without an 'openapi' field)."""
+    return convert and str(spec.get("swagger", "")).startswith("2") and not spec.get("openapi", "")
+
+
+def _transform_spec(spec: dict, prefix: str, convert: bool, copy_on_write: bool = False) -> dict:
+    """The 'transform' stage of process_spec(): extension removal and Swagger 2.0 conversion."""
+    if _restructures_swagger2(spec, convert):
+        return _convert_swagger2_structure(
+            _fused_swagger2_walk(spec, prefix, copy_on_write), _identity, _identity
+        )
+    # A Swagger 2.0 spec that also carries 'openapi' is treated as OpenAPI 3.x
+    # by convert_swagger_to_openapi3(), which only rewrites its $refs
+    rewrite_refs = convert and str(spec.get("swagger", "")).startswith("2")
+    return _transform_node(spec, prefix, rewrite_refs, copy_on_write)
+
+
+def _finish_spec(
+    result: dict, generate_ids: bool, copy_on_write: bool, max_id_length: Any, stage: Callable
+) -> tuple:
+    """The 'operation_ids' and 'validate' stages of process_spec() over a transformed spec."""
+    index = None
+    if generate_ids:
+        with stage("operation_ids") as counters:
+            index = OperationIndex(result)
+            if copy_on_write:
+                result, index = _detach_operations(result, index)
+            counters["operations"] = len(index)
+            counters["generated"] = len(index.missing_ids())
+            _assign_operation_ids(index, max_id_length)
+    with stage("validate") as counters:
+        if index is None:
+            index = OperationIndex(result)
+        issues = _validate_apim_requirements(result, index)
+        counters["operations"] = len(index)
+        counters["issues"] = len(issues)
+    return result, issues
+
+
+def _untimed_stage(_name: str) -> Any:
+    """Stand-in for RunMetrics.stage() when process_spec() runs without metrics."""
+    return contextlib.nullcontext({})
 
 
 # ---------------------------------------------------------------------------
 # File I/O helpers
 # ---------------------------------------------------------------------------
 
-def load_spec(file_path: str) -> dict:
+# Backends used when no Serializer is passed: the fastest installed ones.
+# Output is byte-identical to the pure-Python codecs (see openapi_serializers.py).
+DEFAULT_SERIALIZER = Serializer()
+
+
+def load_spec(file_path: str, serializer: Any = None) -> dict:
     """
     Load an OpenAPI specification from a YAML or JSON file.
 
     Args:
-        file_path: Path to the input file (.yaml, .yml, or .json).
+        file_path:  Path to the input file (.yaml, .yml, or .json).
+        serializer: openapi_serializers.Serializer to parse with (default: DEFAULT_SERIALIZER).
 
     Returns:
         Parsed specification dict.
@@ -649,52 +1263,482 @@ def load_spec(file_path: str) -> dict:
         SystemExit: If the file cannot be read or parsed.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as fh:
-            content = fh.read()
-    except OSError as exc:
-        print(f"ERROR: Cannot read file '{file_path}': {exc}", file=sys.stderr)
+        return _read_spec(file_path, serializer)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
         sys.exit(1)
 
-    if file_path.endswith(".json"):
+
+def _spec_format(file_path: str) -> tuple:
+    """Return (format, gzipped) for a spec path: 'api.json.gz' → ('json', True), 'api.yml' → ('yaml', False)."""
+    gzipped = file_path.endswith(".gz")
+    base = file_path[:-len(".gz")] if gzipped else file_path
+    return ("json" if base.endswith(".json") else "yaml"), gzipped
+
+
+def _read_spec(file_path: str, serializer: Any = None) -> dict:
+    """load_spec() for library and batch use: raises ValueError instead of exiting."""
+    serializer = serializer or DEFAULT_SERIALIZER
+    fmt, gzipped = _spec_format(file_path)
+    try:
+        if gzipped:
+            import gzip  # pylint: disable=import-outside-toplevel
+            opener = gzip.open
+        else:
+            opener = open
+        with opener(file_path, "rt", encoding="utf-8") as fh:
+            content = fh.read()
+    except (OSError, EOFError) as exc:
+        raise ValueError(f"Cannot read file '{file_path}': {exc}") from exc
+
+    if fmt == "json":
+        import json  # pylint: disable=import-outside-toplevel
         try:
-            return json.loads(content)
+            return serializer.loads(content, "json")
         except json.JSONDecodeError as exc:
-            print(f"ERROR: Invalid JSON in '{file_path}': {exc}", file=sys.stderr)
-            sys.exit(1)
+            raise ValueError(f"Invalid JSON in '{file_path}': {exc}") from exc
+        except RecursionError as exc:
+            raise ValueError(f"Cannot read '{file_path}': {_too_deep()}") from exc
 
-    if not HAS_YAML:
-        print("ERROR: PyYAML is required for YAML files. Install with: pip install pyyaml", file=sys.stderr)
-        sys.exit(1)
+    yaml = yaml_module()
+    if yaml is None:
+        raise ValueError("PyYAML is required for YAML files. Install with: pip install pyyaml")
 
     try:
-        return yaml.safe_load(content)
+        return serializer.loads(content, "yaml")
     except yaml.YAMLError as exc:
-        print(f"ERROR: Invalid YAML in '{file_path}': {exc}", file=sys.stderr)
-        sys.exit(1)
+        raise ValueError(f"Invalid YAML in '{file_path}': {exc}") from exc
+    except RecursionError as exc:
+        raise ValueError(f"Cannot read '{file_path}': {_too_deep()}") from exc
+
+
+def _too_deep() -> str:
+    """Error text for documents the recursive JSON / YAML parsers and emitters cannot handle."""
+    return f"nesting deeper than {sys.getrecursionlimit()} levels"
 
 
-def save_spec(spec: dict, file_path: str) -> None:
+def _read_input(
+    file_path: str, source: str, serializer: Any = None, stream: bool = False, bundle: bool = False
+) -> dict:
+    """
+    _read_spec(), or with stream openapi_stream.stream_spec() (vendor extensions of source already removed),
+    or with bundle openapi_bundle.bundle_spec() (external $refs pulled into the document).
+
+    Raises:
+        ValueError: As _read_spec(), or for an unsupported source or an unresolvable $ref.
+    """
+    if bundle:
+        import openapi_bundle  # pylint: disable=import-outside-toplevel
+        return openapi_bundle.bundle_spec(file_path, serializer)[0]
+    if not stream:
+        return _read_spec(file_path, serializer)
+    import openapi_stream  # pylint: disable=import-outside-toplevel
+    return openapi_stream.stream_spec(file_path, _source_prefix(source), serializer)
+
+
+def save_spec(spec: dict, file_path: str, serializer: Any = None) -> None:
     """
     Save an OpenAPI specification to a YAML or JSON file.
 
     Args:
         spec:       Specification dict to write.
-        file_path:  Destination file path (.yaml, .yml, or .json).
+        file_path:  Destination file path (.yaml, .yml, or .json; append .gz for gzip).
+        serializer: openapi_serializers.Serializer to write with (default: DEFAULT_SERIALIZER).
+
+    The document is streamed into a temporary file next to file_path that
+    replaces it only once complete, so an interrupted run never leaves a
+    truncated spec behind.
     """
-    if file_path.endswith(".json"):
-        content = json.dumps(spec, indent=2, ensure_ascii=False)
-    else:
-        if not HAS_YAML:
-            print("ERROR: PyYAML is required for YAML output. Install with: pip install pyyaml", file=sys.stderr)
-            sys.exit(1)
-        content = yaml.dump(spec, allow_unicode=True, default_flow_style=False, sort_keys=False)
+    try:
+        _write_spec(spec, file_path, serializer)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _write_spec(spec: dict, file_path: str, serializer: Any = None) -> None:
+    """save_spec() for library and batch use: raises ValueError instead of exiting."""
+    serializer = serializer or DEFAULT_SERIALIZER
+    fmt, gzipped = _spec_format(file_path)
+    if fmt == "yaml" and yaml_module() is None:
+        raise ValueError("PyYAML is required for YAML output. Install with: pip install pyyaml")
 
     try:
-        with open(file_path, "w", encoding="utf-8") as fh:
-            fh.write(content)
+        with _atomic_output(file_path) as raw:
+            if gzipped:
+                import gzip  # pylint: disable=import-outside-toplevel
+                # Fixed mtime and no embedded name keep .gz output reproducible
+                with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=6, mtime=0) as gz:
+                    _dump_text(serializer, spec, fmt, gz)
+            else:
+                _dump_text(serializer, spec, fmt, raw)
     except OSError as exc:
-        print(f"ERROR: Cannot write file '{file_path}': {exc}", file=sys.stderr)
-        sys.exit(1)
+        raise ValueError(f"Cannot write file '{file_path}': {exc}") from exc
+    except RecursionError as exc:
+        raise ValueError(f"Cannot write file '{file_path}': {_too_deep()}") from exc
+
+
+def _dump_text(serializer: Any, spec: dict, fmt: str, binary: Any) -> None:
+    """Stream spec as UTF-8 text onto a binary file, leaving that file open."""
+    text = io.TextIOWrapper(binary, encoding="utf-8")
+    serializer.dump(spec, fmt, text)
+    text.flush()
+    text.detach()
+
+
+def _write_bytes(file_path: str, data: bytes) -> None:
+    """Write pre-serialised output (e.g. a cache replay) to file_path atomically; raises ValueError."""
+    try:
+        with _atomic_output(file_path) as fh:
+            fh.write(data)
+    except OSError as exc:
+        raise ValueError(f"Cannot write file '{file_path}': {exc}") from exc
+
+
+@contextlib.contextmanager
+def _atomic_output(file_path: str):
+    """
+    Yield a binary file that atomically replaces file_path when the block completes.
+
+    Data goes to a temporary file in the destination directory, which is
+    flushed to disk and renamed over the destination; on error it is
+    removed and the destination is left untouched. A symlink destination is
+    resolved so the link itself survives, an existing file keeps its
+    permission bits, and destinations that are not regular files (such as
+    /dev/null or a pipe) are written directly.
+    """
+    target = os.path.realpath(file_path)
+    try:
+        existing = os.stat(target)
+    except FileNotFoundError:
+        existing = None
+    if existing is not None and not stat.S_ISREG(existing.st_mode):
+        with open(target, "wb") as fh:
+            yield fh
+        return
+
+    directory, name = os.path.split(target)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.{os.urandom(4).hex()}.tmp")
+    # 0o666 lets the umask decide the mode of new files, as open() would
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            yield fh
+            fh.flush()
+            os.fsync(fh.fileno())
+        if existing is not None:
+            os.chmod(tmp_path, stat.S_IMODE(existing.st_mode))
+        os.replace(tmp_path, target)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_output_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as fh:
+        return fh.read()
+
+
+# Modules whose code decides what a conversion writes, hashed into tool_version()
+_PIPELINE_MODULES = (
+    "openapi_utils", "openapi_serializers", "openapi_canonical", "openapi_prune", "openapi_dedup",
+    "openapi_stream", "openapi_lazy", "openapi_routes", "openapi_bundle", "openapi_merge", "openapi_shard",
+    "openapi_incremental",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version() -> str:
+    """
+    Return __version__ plus a digest of the conversion pipeline.
+
+    The digest covers the source of every module in _PIPELINE_MODULES and
+    the installed PyYAML and orjson versions. Used as the tool-version
+    component of conversion cache keys so that cached results never
+    outlive a change to the conversion code or its parsers.
+    """
+    import hashlib  # pylint: disable=import-outside-toplevel
+    from openapi_serializers import orjson_module  # pylint: disable=import-outside-toplevel
+
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in _PIPELINE_MODULES:
+        with open(os.path.join(directory, f"{name}.py"), "rb") as fh:
+            digest.update(name.encode("utf-8") + b"\0" + fh.read() + b"\0")
+    for module in (yaml_module(), orjson_module()):
+        digest.update(str(getattr(module, "__version__", None)).encode("utf-8") + b"\0")
+    return f"{__version__}+{digest.hexdigest()[:12]}"
+
+
+# ---------------------------------------------------------------------------
+# Batch processing
+# ---------------------------------------------------------------------------
+
+# File extensions picked up when a batch input is a directory
+SPEC_FILE_EXTENSIONS = (".json", ".yaml", ".yml", ".json.gz", ".yaml.gz", ".yml.gz")
+
+
+def _glob_root(pattern: str) -> str:
+    """Return the leading directory of a glob pattern that contains no wildcards."""
+    root_parts = []
+    for part in pattern.split(os.sep):
+        if any(ch in part for ch in "*?["):
+            break
+        root_parts.append(part)
+    if len(root_parts) == len(pattern.split(os.sep)):
+        # No wildcard at all: the pattern names a single file
+        root_parts = root_parts[:-1]
+    return os.sep.join(root_parts)
+
+
+def expand_batch_inputs(patterns: list) -> list:
+    """
+    Expand batch input directories and glob patterns into (input_path, relative_path) pairs.
+
+    Directories are searched recursively for .json/.yaml/.yml files; glob
+    patterns are expanded with '**' support. relative_path is the input
+    path relative to the directory (or the wildcard-free root of the
+    pattern) and is used to lay out the output directory.
+
+    Raises:
+        ValueError: If a pattern matches nothing or two inputs map to the same relative path.
+    """
+    import glob  # pylint: disable=import-outside-toplevel
+
+    pairs: list = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            matches = [
+                os.path.join(dirpath, name)
+                for dirpath, _, names in os.walk(pattern)
+                for name in names
+                if name.endswith(SPEC_FILE_EXTENSIONS)
+            ]
+        else:
+            root = _glob_root(pattern)
+            matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+        if not matches:
+            raise ValueError(f"No specification files match '{pattern}'")
+        pairs.extend((path, os.path.relpath(path, root or os.curdir)) for path in sorted(matches))
+
+    # The same file matched by several patterns is processed once
+    unique: dict = {}
+    for path, relative in pairs:
+        previous = unique.setdefault(relative, path)
+        if os.path.abspath(previous) != os.path.abspath(path):
+            raise ValueError(f"Batch inputs '{previous}' and '{path}' both map to output '{relative}'")
+    return [(path, relative) for relative, path in unique.items()]
+
+
+def _process_file(
+    input_file: str,
+    output_file: Any,
+    options: dict,
+    serializer: Any = None,
+    metrics: bool = False,
+    cprofile_dir: Any = None,
+    stream: bool = False,
+    bundle: bool = False,
+) -> dict:
+    """
+    Run load → process_spec → save for one file and report the outcome.
+
+    Top-level so it can be pickled for ProcessPoolExecutor workers. Any
+    exception is captured in the result so one bad spec cannot abort a batch.
+
+    Returns:
+        {"input": ..., "output": ..., "issues": [...], "error": str or None,
+        "reports": the optional stage reports of _process_spec()},
+        plus "metrics" (openapi_metrics.RunMetrics.to_dict()) when metrics is set.
+    """
+    result: dict = {"input": input_file, "output": output_file, "issues": [], "error": None, "reports": {}}
+    run_metrics = None
+    if metrics or cprofile_dir:
+        import openapi_metrics  # pylint: disable=import-outside-toplevel
+        run_metrics = openapi_metrics.RunMetrics(input_file, cprofile_dir)
+    stage = run_metrics.stage if run_metrics is not None else _untimed_stage
+    try:
+        with stage("load") as counters:
+            spec = _read_input(input_file, options["source"], serializer, stream, bundle)
+            counters["bytes_read"] = os.path.getsize(input_file)
+        spec, result["issues"], result["reports"] = _process_spec(
+            spec, copy_on_write=stream, metrics=run_metrics, **options
+        )
+        if output_file is not None:
+            with stage("save") as counters:
+                os.makedirs(os.path.dirname(output_file) or os.curdir, exist_ok=True)
+                _write_spec(spec, output_file, serializer)
+                counters["bytes_written"] = os.path.getsize(output_file)
+    except ValueError as exc:
+        result["error"] = str(exc)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    finally:
+        if run_metrics is not None:
+            run_metrics.close()
+            result["metrics"] = run_metrics.to_dict()
+    return result
+
+
+def _print_issues(issues: list, indent: str = "  ") -> None:
+    for issue in issues:
+        prefix = "⚠️ " if issue.startswith("WARNING") else "❌ "
+        print(f"{indent}{prefix}{issue}")
+
+
+def run_batch(
+    patterns: list,
+    output_dir: Any,
+    options: dict,
+    jobs: int = 1,
+    cache: Any = None,
+    serializer: Any = None,
+    gzip_output: bool = False,
+    metrics: bool = False,
+    cprofile_dir: Any = None,
+    stream: bool = False,
+    bundle: bool = False,
+) -> list:
+    """
+    Process many specs, fanning out across a process pool.
+
+    Each input is handled exactly like a single-file CLI run (same
+    process_spec() options, same writer), so outputs are byte-identical.
+    Progress is printed as files complete and a validation summary at the end.
+
+    Args:
+        patterns:   Directories and/or glob patterns (see expand_batch_inputs()).
+        output_dir: Directory to mirror the inputs into, or None to validate only.
+        options:    Keyword arguments for process_spec().
+        jobs:       Worker processes; 1 processes files in the current process.
+        cache:      Optional openapi_cache.ConversionCache. Lookups and stores
+                    happen in this process; hits are replayed without
+                    dispatching the file to a worker.
+        serializer: openapi_serializers.Serializer used by every worker.
+        gzip_output: Write every output gzip-compressed, adding .gz to its name.
+        metrics:    Record per-stage metrics for every file (result["metrics"]).
+        cprofile_dir: Also dump a cProfile per file and stage into this directory.
+        stream:     Load every input with openapi_stream.stream_spec().
+        bundle:     Load every input with openapi_bundle.bundle_spec().
+
+    Returns:
+        Per-file result dicts (see _process_file()), in input order.
+    """
+    pairs = expand_batch_inputs(patterns)
+    if gzip_output:
+        pairs = [(path, relative if relative.endswith(".gz") else relative + ".gz") for path, relative in pairs]
+    tasks = [
+        (path, None if output_dir is None else os.path.join(output_dir, relative))
+        for path, relative in pairs
+    ]
+    total = len(tasks)
+    results: dict = {}
+
+    def report(result: dict) -> None:
+        results[result["input"]] = result
+        errors = sum(1 for i in result["issues"] if i.startswith("ERROR"))
+        warnings = len(result["issues"]) - errors
+        if result["error"]:
+            status = f"💥 failed: {result['error']}"
+        elif errors:
+            status = f"❌ {errors} error(s), {warnings} warning(s)"
+        elif warnings:
+            status = f"⚠️  {warnings} warning(s)"
+        else:
+            status = "✅"
+        reports = result.get("reports") or {}
+        if reports.get("dedup", {}).get("schemas_hoisted"):
+            status += f" (hoisted {reports['dedup']['schemas_hoisted']} inline schema(s))"
+        if reports.get("prune", {}).get("components_removed"):
+            pruned = reports["prune"]
+            status += f" (pruned {pruned['components_removed']} component(s), {pruned['bytes_removed']:,} bytes)"
+        if result.get("cached"):
+            status += " (cached)"
+        print(f"[{len(results)}/{total}] {result['input']} {status}")
+        _print_issues(result["issues"], indent="    ")
+
+    cache_keys: dict = {}
+    pending = []
+    for input_file, output_file in tasks:
+        if cache is None:
+            pending.append((input_file, output_file))
+            continue
+        replayed = _replay_cached(cache, cache_keys, input_file, output_file, options, serializer)
+        if replayed is None:
+            pending.append((input_file, output_file))
+        else:
+            report(replayed)
+
+    def finish(result: dict) -> None:
+        if cache is not None and not result["error"] and result["input"] in cache_keys:
+            output = None if result["output"] is None else _read_output_bytes(result["output"])
+            cache.put(cache_keys[result["input"]], output, result["issues"])
+        report(result)
+
+    if jobs <= 1 or len(pending) <= 1:
+        for input_file, output_file in pending:
+            finish(_process_file(input_file, output_file, options, serializer, metrics, cprofile_dir, stream, bundle))
+    else:
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            futures = [
+                pool.submit(_process_file, i, o, options, serializer, metrics, cprofile_dir, stream, bundle)
+                for i, o in pending
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                finish(future.result())
+
+    ordered = [results[input_file] for input_file, _ in tasks]
+    failed = [r for r in ordered if r["error"]]
+    with_errors = [r for r in ordered if not r["error"] and any(i.startswith("ERROR") for i in r["issues"])]
+    warnings_only = [r for r in ordered if not r["error"] and r["issues"] and r not in with_errors]
+    print(f"\nBatch summary: {total} file(s)")
+    print(f"  ✅ passed:              {total - len(failed) - len(with_errors) - len(warnings_only)}")
+    print(f"  ⚠️  warnings only:       {len(warnings_only)}")
+    print(f"  ❌ validation errors:   {len(with_errors)}")
+    print(f"  💥 failed to process:   {len(failed)}")
+    for r in failed:
+        print(f"    {r['input']}: {r['error']}")
+    if cache is not None:
+        print(cache.summary())
+    return ordered
+
+
+def _replay_cached(
+    cache: Any, cache_keys: dict, input_file: str, output_file: Any, options: dict, serializer: Any = None
+) -> Any:
+    """
+    Serve one batch input from the cache.
+
+    Returns a result dict on a hit (or when the input cannot even be read),
+    None on a miss; the computed key is recorded in cache_keys so the
+    result can be stored once the file has been processed.
+    """
+    import openapi_cache  # pylint: disable=import-outside-toplevel
+
+    result: dict = {"input": input_file, "output": output_file, "issues": [], "error": None}
+    try:
+        key = cache.make_key(
+            openapi_cache.read_bytes(input_file),
+            openapi_cache.cache_options(
+                options, output_file, (serializer or DEFAULT_SERIALIZER).compact_json,
+                (serializer or DEFAULT_SERIALIZER).canonical,
+            ),
+        )
+        entry = cache.get(key)
+        if entry is None:
+            cache_keys[input_file] = key
+            return None
+        output, result["issues"] = entry
+        if output_file is not None:
+            os.makedirs(os.path.dirname(output_file) or os.curdir, exist_ok=True)
+            _write_bytes(output_file, output)
+    except (OSError, ValueError) as exc:
+        result["error"] = str(exc)
+    result["cached"] = True
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -707,19 +1751,58 @@ def main() -> None:
 
     Usage:
         python3 openapi_utils.py <input-file> <output-file> [--source aws|google]
+        python3 openapi_utils.py --batch <dir-or-glob> [--batch ...] --output-dir <dir> [--jobs N]
+        python3 openapi_utils.py --merge <dir-or-glob> [--merge ...] <output-file> [--on-conflict POLICY]
+        python3 openapi_utils.py <input-file> <output-file> --shard tag|prefix|size [--shard-max-kb N]
 
     Options:
         --source aws     Remove AWS x-amazon-* extensions (default: aws)
         --source google  Remove Google x-google-* extensions
         --no-convert     Skip Swagger 2.0 → OpenAPI 3.0 conversion
         --no-operationid Skip automatic operationId generation
+        --max-operation-id-length N  Cap generated operationIds with a hash suffix
         --validate-only  Only run validation, do not write output file
+        --batch          Process every spec in a directory or glob pattern (repeatable)
+        --output-dir     Directory that mirrors the batch inputs
+        --jobs N         Worker processes for batch mode (default: CPU count)
+        --cache-dir DIR  Reuse results of earlier runs on identical inputs
+        --cache-max-mb N Size bound for --cache-dir (default: 1024)
+        --incremental STATE  Re-convert only the paths and schemas changed since the run that wrote STATE
+        --stream         Parse inputs incrementally, dropping vendor extensions while reading
+        --bundle         Pull schemas and other objects referenced in other files into the spec
+        --merge          Merge every spec in a directory or glob pattern into one API (repeatable)
+        --on-conflict    fail|prefix|rename colliding component names and operationIds (default: fail)
+        --shard          Split the output into one self-contained spec per tag, path prefix or size bucket
+        --shard-max-kb N Largest shard for --shard size (flags larger shards otherwise)
+        --prune-unused   Drop components (schemas, parameters, ...) that no operation refers to
+        --dedup-schemas [MIN_BYTES]  Hoist repeated inline schemas into components/schemas
+        --yaml-backend   auto|libyaml|python (default: auto)
+        --json-backend   auto|orjson|stdlib (default: auto)
+        --verbose        Report the serializer backends in use
+        --compact        Write minified JSON (JSON outputs only)
+        --canonical      Write a canonical key order and normalised scalars (see openapi_canonical.py)
+        --gzip           Gzip the output(s), adding .gz (outputs named *.gz are always gzipped)
+        --profile        Print wall/CPU time, memory peak and counters per stage
+        --metrics-json   Write the per-stage metrics (aggregated over a batch) as JSON
+        --profile-dir    Dump a cProfile per stage (and file) into a directory
+        --version        Print the version and exit
     """
+    # Answer before importing argparse, so shell loops can probe the tool cheaply
+    if sys.argv[1:] in (["--version"], ["-V"]):
+        print(f"openapi_utils.py {__version__}")
+        return
+
+    import argparse  # pylint: disable=import-outside-toplevel
+    import openapi_dedup  # pylint: disable=import-outside-toplevel
+    import openapi_merge  # pylint: disable=import-outside-toplevel
+    import openapi_shard  # pylint: disable=import-outside-toplevel
+
     parser = argparse.ArgumentParser(
         description="OpenAPI specification utility for Azure APIM migration."
     )
-    parser.add_argument("input_file", help="Input OpenAPI specification file (YAML or JSON)")
-    parser.add_argument("output_file", help="Output file path")
+    parser.add_argument("-V", "--version", action="version", version=f"openapi_utils.py {__version__}")
+    parser.add_argument("input_file", nargs="?", help="Input OpenAPI specification file (YAML or JSON)")
+    parser.add_argument("output_file", nargs="?", help="Output file path")
     parser.add_argument(
         "--source",
         choices=["aws", "google"],
@@ -736,61 +1819,535 @@ def main() -> None:
         action="store_true",
         help="Skip automatic operationId generation",
     )
+    parser.add_argument(
+        "--max-operation-id-length",
+        type=int,
+        metavar="N",
+        help="Shorten generated operationIds longer than N characters, ending them in a "
+        "deterministic hash (e.g. 80 for APIM operation names; default: no limit)",
+    )
     parser.add_argument(
         "--validate-only",
         action="store_true",
         help="Run validation only; do not write output file",
     )
+    parser.add_argument(
+        "--batch",
+        action="append",
+        metavar="DIR_OR_GLOB",
+        help="Process every spec in a directory or matching a glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Batch mode: directory to write converted specs into, mirroring the input layout",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Batch mode: number of worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Content-addressed result cache; identical inputs and options replay the stored output",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=1024,
+        help="Upper bound for the cache size in MiB; least recently used entries are evicted (default: 1024)",
+    )
+    parser.add_argument(
+        "--incremental",
+        metavar="STATE",
+        help="Single-file mode: keep per-path and per-schema hashes and results in STATE and re-convert "
+        "only the subtrees that changed since the previous run (output is identical to a full run)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse inputs incrementally and drop vendor extensions while reading, so they are never "
+        "built in memory (for very large specs; output is identical)",
+    )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Follow $refs into other files ('./models/user.yaml#/User'), loading each file once and in "
+        "parallel, and copy their targets into the spec's components before converting it",
+    )
+    parser.add_argument(
+        "--merge",
+        action="append",
+        metavar="DIR_OR_GLOB",
+        help="Merge every spec in a directory or matching a glob pattern (repeatable) into one API, "
+        "written to the only positional argument",
+    )
+    parser.add_argument(
+        "--on-conflict",
+        choices=openapi_merge.CONFLICT_POLICIES,
+        default="fail",
+        help="--merge: what to do when specs define a component name or operationId differently: "
+        "fail, prefix the later one with its file name, or rename it with a numeric suffix (default: fail)",
+    )
+    parser.add_argument(
+        "--shard",
+        choices=openapi_shard.STRATEGIES,
+        help="Write one self-contained spec per tag, first path segment or size bucket instead of the "
+        "output file (<output>.<shard>.<ext>), plus <output>.manifest.json mapping them to APIM API paths",
+    )
+    parser.add_argument(
+        "--shard-max-kb",
+        type=int,
+        metavar="N",
+        help="--shard: largest shard in KiB of compact JSON (required for --shard size; "
+        "larger tag or prefix shards are only flagged)",
+    )
+    parser.add_argument(
+        "--prune-unused",
+        action="store_true",
+        help="Drop definitions/components that no path, security requirement or other "
+        "reachable component refers to, shrinking the APIM import payload",
+    )
+    parser.add_argument(
+        "--dedup-schemas",
+        type=int,
+        nargs="?",
+        const=openapi_dedup.DEFAULT_MIN_BYTES,
+        metavar="MIN_BYTES",
+        help="Hoist inline schemas that occur more than once and are at least MIN_BYTES long as "
+        f"compact JSON into components/schemas, replacing the copies with $refs (default: {openapi_dedup.DEFAULT_MIN_BYTES})",
+    )
+    parser.add_argument(
+        "--yaml-backend",
+        choices=YAML_BACKENDS,
+        default="auto",
+        help="YAML parser/emitter: libyaml C extension or pure Python (default: auto, the fastest installed)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=JSON_BACKENDS,
+        default="auto",
+        help="JSON codec: orjson or the standard library (default: auto, the fastest installed)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write minified JSON without indentation (JSON outputs only)",
+    )
+    parser.add_argument(
+        "--canonical",
+        action="store_true",
+        help="Write the canonical form: fixed key order, string keys, integral floats as integers, "
+        "so exports differing only in order or spelling give identical output",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Gzip-compress the output(s), adding .gz to the file name "
+        "(an output file name that already ends in .gz is always compressed)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-stage wall time, CPU time, tracemalloc peak, nodes walked and bytes read/written",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        help="Write per-stage metrics as JSON (batch mode: per file and aggregated)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        metavar="DIR",
+        help="Dump cProfile statistics for every stage into DIR (<input>.<stage>.prof)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the serializer backends in use",
+    )
     args = parser.parse_args()
 
-    # Load
-    print(f"[1/4] Loading spec: {args.input_file}")
-    spec = load_spec(args.input_file)
+    try:
+        serializer = Serializer(args.yaml_backend, args.json_backend, compact_json=args.compact, canonical=args.canonical)
+        OperationIdGenerator(set(), args.max_operation_id_length)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.dedup_schemas is not None and args.dedup_schemas < 1:
+        parser.error("--dedup-schemas must be at least 1")
+    if args.verbose:
+        print(f"Serializer backends: {serializer.describe()}")
+
+    options = {
+        "source": args.source,
+        "convert": not args.no_convert,
+        "generate_ids": not args.no_operationid,
+        "max_id_length": args.max_operation_id_length,
+    }
+    if args.prune_unused:
+        # Only set when used, so cache keys of runs without it are unchanged
+        options["prune"] = True
+    if args.dedup_schemas is not None:
+        options["dedup_min_bytes"] = args.dedup_schemas
+
+    cache = None
+    if args.cache_dir:
+        import openapi_cache  # pylint: disable=import-outside-toplevel
+        cache = openapi_cache.ConversionCache(
+            args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024, tool_version=tool_version()
+        )
+    collect_metrics = bool(args.profile or args.metrics_json or args.profile_dir)
+
+    if args.bundle and args.stream:
+        parser.error("--bundle cannot be combined with --stream")
+    if args.bundle and args.cache_dir:
+        # Cache keys cover the input file only, not the files it refers to
+        parser.error("--bundle cannot be combined with --cache-dir")
+    if args.incremental and args.prune_unused:
+        parser.error("--prune-unused cannot be combined with --incremental")
+    if args.incremental and args.dedup_schemas is not None:
+        parser.error("--dedup-schemas cannot be combined with --incremental")
+    shard = None
+    if args.shard_max_kb is not None and not args.shard:
+        parser.error("--shard-max-kb requires --shard")
+    if args.shard:
+        if args.batch or args.cache_dir or args.validate_only:
+            parser.error("--shard cannot be combined with --batch, --cache-dir or --validate-only")
+        if args.shard == "size" and args.shard_max_kb is None:
+            parser.error("--shard size requires --shard-max-kb")
+        if args.shard_max_kb is not None and args.shard_max_kb < 1:
+            parser.error("--shard-max-kb must be at least 1")
+        shard = (args.shard, None if args.shard_max_kb is None else args.shard_max_kb * 1024)
+    if args.merge:
+        if args.batch:
+            parser.error("--merge cannot be combined with --batch")
+        if args.incremental or args.cache_dir:
+            parser.error("--merge cannot be combined with --incremental or --cache-dir")
+        if args.no_convert:
+            parser.error("--merge converts every input to OpenAPI 3.0 and cannot be combined with --no-convert")
+        if args.output_file:
+            parser.error("--merge takes the output file as its only positional argument")
+        if not args.input_file and not args.validate_only:
+            parser.error("--merge requires an output file (or --validate-only)")
+        output_file = None if args.validate_only else args.input_file
+        if output_file is not None and args.gzip and not output_file.endswith(".gz"):
+            output_file += ".gz"
+        run_metrics = None
+        if collect_metrics:
+            import openapi_metrics  # pylint: disable=import-outside-toplevel
+            run_metrics = openapi_metrics.RunMetrics(output_file or "merge", args.profile_dir)
+        _main_merge(
+            args.merge, output_file, options, args.on_conflict, serializer, run_metrics, args.stream, args.bundle,
+            shard,
+        )
+        if run_metrics is not None:
+            run_metrics.close()
+            _emit_metrics([run_metrics.to_dict()], args.profile, args.metrics_json)
+        return
+
+    if args.batch:
+        if args.input_file or args.output_file:
+            parser.error("positional input/output files cannot be combined with --batch")
+        if args.incremental:
+            parser.error("--incremental cannot be combined with --batch")
+        if not args.output_dir and not args.validate_only:
+            parser.error("--batch requires --output-dir (or --validate-only)")
+        try:
+            results = run_batch(
+                args.batch,
+                None if args.validate_only else args.output_dir,
+                options,
+                jobs=args.jobs,
+                cache=cache,
+                serializer=serializer,
+                gzip_output=args.gzip,
+                metrics=collect_metrics,
+                cprofile_dir=args.profile_dir,
+                stream=args.stream,
+                bundle=args.bundle,
+            )
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        if collect_metrics:
+            runs = [
+                r.get("metrics") or {"input": r["input"], "cached": bool(r.get("cached")), "stages": {}}
+                for r in results
+            ]
+            _emit_metrics(runs, args.profile, args.metrics_json)
+        if any(r["error"] for r in results):
+            sys.exit(1)
+        return
+
+    if not args.input_file or not args.output_file:
+        parser.error("the following arguments are required: input_file, output_file")
+
+    output_file = None if args.validate_only else args.output_file
+    if output_file is not None and args.gzip and not output_file.endswith(".gz"):
+        output_file += ".gz"
+    run_metrics = None
+    if collect_metrics:
+        import openapi_metrics  # pylint: disable=import-outside-toplevel
+        run_metrics = openapi_metrics.RunMetrics(args.input_file, args.profile_dir)
+    if cache is not None:
+        _main_cached(
+            args.input_file, output_file, options, cache, serializer, run_metrics, args.incremental, args.stream
+        )
+    else:
+        _main_single(
+            args.input_file, output_file, options, serializer, run_metrics, args.incremental, args.stream, args.bundle,
+            shard,
+        )
+    if run_metrics is not None:
+        run_metrics.close()
+        _emit_metrics([run_metrics.to_dict()], args.profile, args.metrics_json)
+
+
+def _emit_metrics(runs: list, profile: bool, metrics_json: Any) -> None:
+    """Print (--profile) and/or write (--metrics-json) the aggregated per-stage metrics."""
+    import json  # pylint: disable=import-outside-toplevel
+    import openapi_metrics  # pylint: disable=import-outside-toplevel
+
+    report = openapi_metrics.aggregate(runs)
+    if profile:
+        print()
+        print(openapi_metrics.format_report(report))
+    if metrics_json:
+        report = {"tool_version": tool_version(), **report}
+        try:
+            _write_bytes(metrics_json, json.dumps(report, indent=2).encode("utf-8"))
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Metrics written to: {metrics_json}")
 
-    # Remove vendor extensions
-    print(f"[2/4] Removing {args.source.upper()} vendor extensions...")
-    if args.source == "aws":
-        spec = clean_aws_extensions(spec)
+
+def _report_validation(issues: list) -> None:
+    if issues:
+        _print_issues(issues)
+        errors_only = [i for i in issues if i.startswith("ERROR")]
+        if errors_only:
+            print(f"\nValidation completed with {len(errors_only)} error(s).")
+        else:
+            print("\nValidation completed with warnings only.")
     else:
-        spec = clean_google_extensions(spec)
+        print("  ✅ All APIM requirements satisfied.")
+
+
+def _main_single(
+    input_file: str,
+    output_file: Any,
+    options: dict,
+    serializer: Any = None,
+    metrics: Any = None,
+    state_file: Any = None,
+    stream: bool = False,
+    bundle: bool = False,
+    shard: Any = None,
+) -> list:
+    """
+    Single-file CLI run; output_file None means --validate-only. Returns the issues.
+
+    With state_file the spec is processed incrementally (see openapi_incremental.py);
+    with stream it is loaded by openapi_stream.stream_spec(), with bundle by
+    openapi_bundle.bundle_spec(). shard is (strategy, max_bytes) to write
+    shards instead of output_file (see openapi_shard.py).
+    """
+    stage = metrics.stage if metrics is not None else _untimed_stage
 
-    # Convert Swagger 2.0 → OpenAPI 3.0
-    if not args.no_convert:
+    # Load
+    print(f"[1/4] Loading spec: {input_file}")
+    with stage("load") as counters:
+        if bundle:
+            import openapi_bundle  # pylint: disable=import-outside-toplevel
+            try:
+                spec, report = openapi_bundle.bundle_spec(input_file, serializer)
+            except ValueError as exc:
+                print(f"ERROR: {exc}", file=sys.stderr)
+                sys.exit(1)
+            counters["files"] = report["files"]
+            print(openapi_bundle.describe(report))
+        elif stream:
+            try:
+                spec = _read_input(input_file, options["source"], serializer, stream)
+            except ValueError as exc:
+                print(f"ERROR: {exc}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            spec = load_spec(input_file, serializer)
+        counters["bytes_read"] = os.path.getsize(input_file)
+    return _process_and_save(spec, output_file, options, serializer, metrics, state_file, stream, shard)
+
+
+def _process_and_save(
+    spec: dict,
+    output_file: Any,
+    options: dict,
+    serializer: Any = None,
+    metrics: Any = None,
+    state_file: Any = None,
+    copy_on_write: bool = False,
+    shard: Any = None,
+) -> list:
+    """
+    Steps 2-4 of a single-file CLI run over a loaded spec: process, report and write it
+    (as shards when shard is (strategy, max_bytes)). Returns the issues.
+    """
+    stage = metrics.stage if metrics is not None else _untimed_stage
+
+    # Remove vendor extensions, convert, generate operationIds and validate
+    # in one fused pass; the step banners describe what process_spec() does.
+    print(f"[2/4] Removing {options['source'].upper()} vendor extensions...")
+    if options["convert"]:
         swagger_version = str(spec.get("swagger", ""))
         if swagger_version.startswith("2"):
             print("[3/4] Converting Swagger 2.0 → OpenAPI 3.0...")
-            spec = convert_swagger_to_openapi3(spec)
         else:
             print("[3/4] Spec is already OpenAPI 3.x, skipping conversion.")
     else:
         print("[3/4] Skipping Swagger → OpenAPI 3.0 conversion (--no-convert).")
 
-    # Auto-generate missing operationIds
-    if not args.no_operationid:
-        print("[3b] Ensuring all operations have operationId...")
-        spec = ensure_operation_ids(spec)
+    if options.get("dedup_min_bytes") is not None:
+        print("[3a] Hoisting repeated inline schemas into components/schemas...")
+    if options.get("prune"):
+        print("[3b] Pruning unreferenced components...")
+    if options["generate_ids"]:
+        print("[3c] Ensuring all operations have operationId...")
 
-    # Validate APIM requirements
     print("[4/4] Validating APIM requirements...")
-    issues = validate_apim_requirements(spec)
-    if issues:
-        for issue in issues:
-            prefix = "⚠️ " if issue.startswith("WARNING") else "❌ "
-            print(f"  {prefix}{issue}")
-        errors_only = [i for i in issues if i.startswith("ERROR")]
-        if errors_only:
-            print(f"\nValidation completed with {len(errors_only)} error(s).")
-        else:
-            print("\nValidation completed with warnings only.")
+    if state_file is None:
+        spec, issues, reports = _process_spec(spec, copy_on_write=copy_on_write, metrics=metrics, **options)
+        if "dedup" in reports:
+            import openapi_dedup  # pylint: disable=import-outside-toplevel
+            print(openapi_dedup.describe(reports["dedup"]))
+        if "prune" in reports:
+            import openapi_prune  # pylint: disable=import-outside-toplevel
+            print(openapi_prune.describe(reports["prune"]))
     else:
-        print("  ✅ All APIM requirements satisfied.")
+        import openapi_incremental  # pylint: disable=import-outside-toplevel
+        try:
+            spec, issues, stats = openapi_incremental.process_incremental(spec, state_file, metrics=metrics, **options)
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(openapi_incremental.describe(stats, state_file))
+    _report_validation(issues)
 
     # Write output
-    if not args.validate_only:
-        save_spec(spec, args.output_file)
-        print(f"\nOutput written to: {args.output_file}")
+    if output_file is not None and shard is not None:
+        import openapi_shard  # pylint: disable=import-outside-toplevel
+        with stage("shard") as counters:
+            try:
+                shards, manifest = openapi_shard.shard_spec(spec, *shard)
+            except ValueError as exc:
+                print(f"ERROR: {exc}", file=sys.stderr)
+                sys.exit(1)
+            counters["shards"] = len(shards)
+        print(openapi_shard.describe(manifest))
+        with stage("save") as counters:
+            try:
+                path = openapi_shard.write_shards(shards, manifest, output_file, serializer)
+            except ValueError as exc:
+                print(f"ERROR: {exc}", file=sys.stderr)
+                sys.exit(1)
+            counters["bytes_written"] = sum(
+                os.path.getsize(os.path.join(os.path.dirname(path), entry["file"])) for entry in manifest["shards"]
+            )
+        print(f"\nShards written next to: {output_file}\nManifest written to: {path}")
+    elif output_file is not None:
+        with stage("save") as counters:
+            save_spec(spec, output_file, serializer)
+            counters["bytes_written"] = os.path.getsize(output_file)
+        print(f"\nOutput written to: {output_file}")
+    else:
+        print("\n(--validate-only: output file not written)")
+    return issues
+
+
+def _main_merge(
+    patterns: list,
+    output_file: Any,
+    options: dict,
+    on_conflict: str = "fail",
+    serializer: Any = None,
+    metrics: Any = None,
+    stream: bool = False,
+    bundle: bool = False,
+    shard: Any = None,
+) -> list:
+    """
+    --merge CLI run: merge the specs matching patterns (openapi_merge.merge_files()),
+    then process and write the result as a single-file run. Returns the issues.
+    """
+    import openapi_merge  # pylint: disable=import-outside-toplevel
+    stage = metrics.stage if metrics is not None else _untimed_stage
+
+    print(f"[1/4] Loading and merging specs: {', '.join(patterns)}")
+    with stage("load") as counters:
+        try:
+            inputs = expand_batch_inputs(patterns)
+            spec, report = openapi_merge.merge_files(
+                inputs, options["source"], on_conflict, serializer, stream=stream, bundle=bundle
+            )
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        counters["files"] = len(inputs)
+        counters["bytes_read"] = sum(os.path.getsize(path) for path, _ in inputs)
+    print(openapi_merge.describe(report))
+    # The merged spec shares its subtrees with the inputs it was built from
+    return _process_and_save(spec, output_file, options, serializer, metrics, copy_on_write=True, shard=shard)
+
+
+def _main_cached(
+    input_file: str,
+    output_file: Any,
+    options: dict,
+    cache: Any,
+    serializer: Any = None,
+    metrics: Any = None,
+    state_file: Any = None,
+    stream: bool = False,
+) -> None:
+    """Single-file CLI run through the conversion cache (see openapi_cache.py)."""
+    import openapi_cache  # pylint: disable=import-outside-toplevel
+
+    try:
+        key = cache.make_key(
+            openapi_cache.read_bytes(input_file),
+            openapi_cache.cache_options(
+                options, output_file, (serializer or DEFAULT_SERIALIZER).compact_json,
+                (serializer or DEFAULT_SERIALIZER).canonical,
+            ),
+        )
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    entry = cache.get(key)
+    if entry is None:
+        issues = _main_single(input_file, output_file, options, serializer, metrics, state_file, stream)
+        output = None if output_file is None else _read_output_bytes(output_file)
+        cache.put(key, output, issues)
+        print(cache.summary())
+        return
+
+    output, issues = entry
+    if metrics is not None:
+        metrics.cached = True
+    print(f"[1/4] Loading spec: {input_file}")
+    print("[cache] Hit: replaying stored output and validation results.")
+    _report_validation(issues)
+    if output_file is not None:
+        try:
+            _write_bytes(output_file, output)
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nOutput written to: {output_file}")
     else:
         print("\n(--validate-only: output file not written)")
+    print(cache.summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+openapi_worker.py
+
+Resident worker for openapi_utils.py. Starting python3 openapi_utils.py once
+per spec pays for interpreter start-up, the PyYAML import and argparse set-up
+every time, which costs more than converting a small spec. A worker keeps
+all of that loaded and converts specs sent to it as JSON lines, on stdin or
+on a local Unix socket.
+
+Requests (one JSON object per line; "id" is echoed back):
+  {"id": 1, "input": "api.yaml", "output": "out.yaml", "source": "aws"}
+  {"id": 2, "input": "api.yaml", "output": null}        validate only
+  {"id": 3, "spec": {...}, "source": "google"}          inline spec, converted spec returned
+  {"id": 4, "op": "ping"}
+  {"op": "shutdown"}                                    finish in-flight requests, then exit
+
+Optional request fields: "convert" (default true), "generate_ids" (default
+true) and "max_id_length" (default null), as for the openapi_utils.py CLI.
+
+Responses (one line per request, in completion order; match them by id):
+  {"id": 1, "ok": true, "input": "api.yaml", "output": "out.yaml", "issues": [...], "error": null}
+  {"id": 3, "ok": true, "spec": {...}, "issues": [...], "error": null}
+
+"ok" is false when a request could not be processed ("error" says why);
+validation issues alone do not make it false. Requests are read while
+earlier ones are still running (pipelining); at most --max-inflight are
+queued or running at a time, and --jobs worker processes run them.
+
+Usage:
+  python3 openapi_worker.py serve [--socket PATH] [--jobs N] [--max-inflight N]
+  python3 openapi_worker.py submit --socket PATH [--source aws|google] INPUT OUTPUT [INPUT OUTPUT ...]
+
+The submit client only imports the standard library, so it starts in a
+fraction of the time a full openapi_utils.py run needs. The translate
+wrappers use it when OPENAPI_WORKER_SOCKET names a running worker's socket.
+"""
+
+import os
+import sys
+import json
+import queue
+import socket
+import argparse
+import threading
+import socketserver
+import concurrent.futures
+from typing import Any, Optional
+
+SOURCES = ("aws", "google")
+
+# Request fields forwarded to process_spec(), with their defaults
+_OPTION_DEFAULTS = {"source": "aws", "convert": True, "generate_ids": True, "max_id_length": None}
+
+
+def parse_request(request: Any) -> tuple:
+    """
+    Validate one conversion request.
+
+    Returns:
+        ("file", (input, output), options) or ("inline", spec, options).
+
+    Raises:
+        ValueError: If the request is malformed.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    unknown = set(request) - set(_OPTION_DEFAULTS) - {"id", "op", "input", "output", "spec"}
+    if unknown:
+        raise ValueError(f"Unknown request field(s): {', '.join(sorted(unknown))}")
+
+    options = {key: request.get(key, default) for key, default in _OPTION_DEFAULTS.items()}
+    if options["source"] not in SOURCES:
+        raise ValueError(f"Unknown source '{options['source']}'. Expected one of: {', '.join(SOURCES)}")
+    for key in ("convert", "generate_ids"):
+        if not isinstance(options[key], bool):
+            raise ValueError(f"'{key}' must be true or false")
+    max_length = options["max_id_length"]
+    if max_length is not None and (not isinstance(max_length, int) or isinstance(max_length, bool)):
+        raise ValueError("'max_id_length' must be an integer or null")
+
+    if ("input" in request) == ("spec" in request):
+        raise ValueError("Request needs exactly one of 'input' (a file path) or 'spec' (an inline spec)")
+    if "spec" in request:
+        if not isinstance(request["spec"], dict):
+            raise ValueError("'spec' must be a JSON object")
+        return "inline", request["spec"], options
+    output = request.get("output")
+    if not isinstance(request["input"], str) or not (output is None or isinstance(output, str)):
+        raise ValueError("'input' must be a path and 'output' a path or null")
+    return "file", (request["input"], output), options
+
+
+def _process_request(kind: str, payload: Any, options: dict, serializer: Any) -> dict:
+    """
+    Run one parsed request; top-level so it can be pickled for worker processes.
+
+    Any exception is captured in the result, as in batch mode.
+    """
+    import openapi_utils  # pylint: disable=import-outside-toplevel
+
+    if kind == "file":
+        input_file, output_file = payload
+        return openapi_utils._process_file(  # pylint: disable=protected-access
+            input_file, output_file, options, serializer
+        )
+    result: dict = {"spec": None, "issues": [], "error": None}
+    try:
+        result["spec"], result["issues"] = openapi_utils.process_spec(payload, **options)
+    except ValueError as exc:
+        result["error"] = str(exc)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    return result
+
+
+class Worker:
+    """
+    Executes conversion requests from any number of JSON-lines streams.
+
+    Args:
+        jobs:         Worker processes; 1 runs requests on a thread of this process.
+        max_inflight: Requests queued or running at once, across all streams
+                      (default: 2 × jobs). Readers stop reading while the limit is reached.
+        serializer:   openapi_serializers.Serializer for file requests.
+    """
+
+    def __init__(self, jobs: int = 1, max_inflight: Optional[int] = None, serializer: Any = None):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+        if max_inflight is not None and max_inflight < 1:
+            raise ValueError("max_inflight must be at least 1")
+        import openapi_utils  # pylint: disable=import-outside-toplevel
+
+        self.jobs = jobs
+        self.max_inflight = max_inflight or 2 * jobs
+        self.serializer = serializer
+        self.version = openapi_utils.tool_version()
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        if jobs > 1:
+            self._executor: Any = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def close(self) -> None:
+        """Wait for running requests and stop the executor."""
+        self._executor.shutdown(wait=True)
+
+    def handle_stream(self, rfile: Any, wfile: Any) -> bool:
+        """
+        Serve requests read from binary stream rfile, writing responses to wfile.
+
+        Returns when rfile reaches EOF or a shutdown request arrives, after every
+        request read so far has been answered.
+
+        Returns:
+            True if a shutdown was requested.
+        """
+        responses: queue.Queue = queue.Queue()
+        writer = threading.Thread(target=_write_responses, args=(responses, wfile), daemon=True)
+        writer.start()
+        pending = []
+        shutdown = False
+        try:
+            for line in rfile:
+                if not line.strip():
+                    continue
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    op = request.get("op", "convert") if isinstance(request, dict) else "convert"
+                    if op == "ping":
+                        responses.put({"id": request_id, "ok": True, "version": self.version})
+                        continue
+                    if op == "shutdown":
+                        responses.put({"id": request_id, "ok": True})
+                        shutdown = True
+                        break
+                    if op != "convert":
+                        raise ValueError(f"Unknown op '{op}'. Expected one of: convert, ping, shutdown")
+                    kind, payload, options = parse_request(request)
+                except ValueError as exc:
+                    responses.put({"id": request_id, "ok": False, "issues": [], "error": f"Invalid request: {exc}"})
+                    continue
+                self._slots.acquire()  # pylint: disable=consider-using-with
+                future = self._executor.submit(_process_request, kind, payload, options, self.serializer)
+                future.add_done_callback(lambda f, rid=request_id: self._finish(f, rid, responses))
+                pending.append(future)
+        finally:
+            concurrent.futures.wait(pending)
+            responses.put(None)
+            writer.join()
+        return shutdown
+
+    def _finish(self, future: Any, request_id: Any, responses: queue.Queue) -> None:
+        """Done-callback: release the request's slot and queue its response."""
+        self._slots.release()
+        try:
+            result = future.result()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            result = {"issues": [], "error": f"{type(exc).__name__}: {exc}"}
+        responses.put({"id": request_id, "ok": result["error"] is None, **result})
+
+
+def _write_responses(responses: queue.Queue, wfile: Any) -> None:
+    """Writer thread: one JSON line per queued response until the None sentinel."""
+    while True:
+        response = responses.get()
+        if response is None:
+            return
+        try:
+            wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            wfile.flush()
+        except OSError:
+            pass  # Client went away; keep draining so the reader can finish
+
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    """One client connection: a JSON-lines request/response stream."""
+
+    def handle(self) -> None:
+        if self.server.worker.handle_stream(self.rfile, self.wfile):
+            # shutdown() waits for serve_forever() to return, so call it off this thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, worker: Worker):
+        self.worker = worker
+        super().__init__(path, _StreamHandler)
+
+
+def serve_unix(path: str, worker: Worker, ready: Optional[threading.Event] = None) -> None:
+    """
+    Serve worker on a Unix socket at path until a shutdown request arrives.
+
+    The socket is created accessible to the current user only and removed on
+    exit. A stale socket file left by a crashed worker is replaced.
+
+    Raises:
+        ValueError: If another worker is already listening on path.
+    """
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)
+            else:
+                raise ValueError(f"A worker is already listening on '{path}'")
+    previous_umask = os.umask(0o177)
+    try:
+        server = _UnixServer(path, worker)
+    finally:
+        os.umask(previous_umask)
+    try:
+        with server:
+            if ready is not None:
+                ready.set()
+            server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def submit(socket_path: str, requests: list) -> list:
+    """
+    Send requests to the worker listening on socket_path over one pipelined connection.
+
+    Requests without an "id" are numbered by position. Relative "input" and
+    "output" paths are made absolute here, since the worker resolves them
+    against its own working directory rather than the caller's.
+
+    Returns:
+        The responses, in request order.
+
+    Raises:
+        ValueError: If the worker cannot be reached or stops answering.
+    """
+    requests = [dict(request, id=request.get("id", index)) for index, request in enumerate(requests)]
+    for request in requests:
+        for field in ("input", "output"):
+            if isinstance(request.get(field), str):
+                request[field] = os.path.abspath(request[field])
+    payload = b"".join(json.dumps(request).encode("utf-8") + b"\n" for request in requests)
+
+    def send(sock: socket.socket) -> None:
+        try:
+            sock.sendall(payload)
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass  # Surfaces below as unanswered requests
+
+    responses: dict = {}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError as exc:
+            raise ValueError(f"Cannot connect to worker at '{socket_path}': {exc}") from exc
+        sender = threading.Thread(target=send, args=(sock,), daemon=True)
+        sender.start()
+        with sock.makefile("rb") as rfile:
+            for line in rfile:
+                response = json.loads(line)
+                responses[response.get("id")] = response
+        sender.join()
+    missing = [request["id"] for request in requests if request["id"] not in responses]
+    if missing:
+        raise ValueError(f"Worker closed the connection with {len(missing)} request(s) unanswered")
+    return [responses[request["id"]] for request in requests]
+
+
+def _print_result(position: str, response: dict) -> None:
+    """Report one submitted file like a batch-mode progress line."""
+    issues = response.get("issues", [])
+    errors = sum(1 for issue in issues if issue.startswith("ERROR"))
+    if response.get("error"):
+        status = f"💥 failed: {response['error']}"
+    elif errors:
+        status = f"❌ {errors} error(s), {len(issues) - errors} warning(s)"
+    elif issues:
+        status = f"⚠️  {len(issues)} warning(s)"
+    else:
+        status = "✅"
+    print(f"[{position}] {response.get('input')} {status}")
+    for issue in issues:
+        print(f"    {'⚠️ ' if issue.startswith('WARNING') else '❌ '}{issue}")
+    if response.get("output") and not response.get("error"):
+        print(f"    Output written to: {response['output']}")
+
+
+def main() -> None:
+    """Command-line interface: serve (stdin or --socket) or submit to a running worker."""
+    parser = argparse.ArgumentParser(description="Resident openapi_utils.py worker (JSON lines).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run a worker on stdin/stdout or a Unix socket")
+    serve_parser.add_argument("--socket", help="Listen on this Unix socket path instead of stdin/stdout")
+    serve_parser.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    serve_parser.add_argument(
+        "--max-inflight", type=int, help="Requests queued or running at once (default: 2 x --jobs)"
+    )
+    serve_parser.add_argument("--yaml-backend", default="auto", help="As for openapi_utils.py (default: auto)")
+    serve_parser.add_argument("--json-backend", default="auto", help="As for openapi_utils.py (default: auto)")
+    serve_parser.add_argument("--compact", action="store_true", help="Write minified JSON outputs")
+
+    submit_parser = commands.add_parser("submit", help="Convert files with a running worker")
+    submit_parser.add_argument(
+        "--socket", default=os.environ.get("OPENAPI_WORKER_SOCKET"),
+        help="Worker socket path (default: $OPENAPI_WORKER_SOCKET)",
+    )
+    submit_parser.add_argument("--source", choices=SOURCES, default="aws", help="Vendor extensions to remove")
+    submit_parser.add_argument("--no-convert", action="store_true", help="Skip Swagger 2.0 → OpenAPI 3.0 conversion")
+    submit_parser.add_argument("--no-operationid", action="store_true", help="Skip operationId generation")
+    submit_parser.add_argument("--max-operation-id-length", type=int, metavar="N", help="Cap generated operationIds")
+    submit_parser.add_argument(
+        "--validate-only", action="store_true", help="Validate only; every positional argument is an input"
+    )
+    submit_parser.add_argument("files", nargs="+", metavar="INPUT OUTPUT", help="Input/output file pairs")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from openapi_serializers import Serializer  # pylint: disable=import-outside-toplevel
+        try:
+            worker = Worker(args.jobs, args.max_inflight, Serializer(args.yaml_backend, args.json_backend, args.compact))
+        except ValueError as exc:
+            parser.error(str(exc))
+        try:
+            if args.socket:
+                print(
+                    f"Worker listening on {args.socket} (jobs {worker.jobs}, max in-flight {worker.max_inflight})",
+                    file=sys.stderr,
+                )
+                serve_unix(args.socket, worker)
+            else:
+                worker.handle_stream(sys.stdin.buffer, sys.stdout.buffer)
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+        return
+
+    if not args.socket:
+        parser.error("submit needs --socket or OPENAPI_WORKER_SOCKET")
+    if args.validate_only:
+        pairs = [(path, None) for path in args.files]
+    elif len(args.files) % 2:
+        parser.error("files must be given as INPUT OUTPUT pairs (or use --validate-only)")
+    else:
+        pairs = list(zip(args.files[::2], args.files[1::2]))
+    options = {
+        "source": args.source,
+        "convert": not args.no_convert,
+        "generate_ids": not args.no_operationid,
+        "max_id_length": args.max_operation_id_length,
+    }
+    try:
+        responses = submit(args.socket, [{"input": i, "output": o, **options} for i, o in pairs])
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(1)
+    for position, response in enumerate(responses, 1):
+        _print_result(f"{position}/{len(responses)}", response)
+    if any(response.get("error") for response in responses):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
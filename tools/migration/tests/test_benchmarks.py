@@ -0,0 +1,114 @@
+"""
+test_benchmarks.py
+
+Unit tests for the benchmark spec generator (benchmarks/specgen.py) and a
+smoke run of benchmarks/run_benchmarks.py.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_benchmarks.py -v
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules and the benchmark scripts
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import openapi_utils as utils
+import run_benchmarks
+import specgen
+
+
+def collect(obj, found=None) -> dict:
+    """Count $refs, vendor extensions and dict nodes in obj."""
+    found = found if found is not None else {"refs": 0, "extensions": 0, "dicts": 0}
+    if isinstance(obj, dict):
+        found["dicts"] += 1
+        for key, value in obj.items():
+            found["refs"] += key == "$ref"
+            found["extensions"] += isinstance(key, str) and key.startswith(("x-amazon-", "x-google-"))
+            collect(value, found)
+    elif isinstance(obj, list):
+        for item in obj:
+            collect(item, found)
+    return found
+
+
+class TestGenerateSpec(unittest.TestCase):
+
+    def test_shape_follows_parameters(self):
+        for version, schemas_of in (("2.0", lambda s: s["definitions"]), ("3.0", lambda s: s["components"]["schemas"])):
+            with self.subTest(version=version):
+                spec = specgen.generate_spec(version, paths=30, definitions=12, depth=3)
+                self.assertEqual(len(spec["paths"]), 30)
+                self.assertEqual(len(schemas_of(spec)), 12)
+                index = utils.OperationIndex(spec)
+                self.assertEqual(len(index), 60)
+                self.assertEqual(len(index.missing_ids()), 60)
+                nested, levels = schemas_of(spec)["Model0"], 0
+                while "nested" in nested["properties"]:
+                    nested, levels = nested["properties"]["nested"], levels + 1
+                self.assertEqual(levels, 3)
+
+    def test_deterministic_per_seed(self):
+        self.assertEqual(specgen.generate_spec(seed=7), specgen.generate_spec(seed=7))
+        self.assertNotEqual(specgen.generate_spec(seed=7), specgen.generate_spec(seed=8))
+
+    def test_densities(self):
+        bare = collect(specgen.generate_spec(extension_density=0, ref_density=0))
+        self.assertEqual((bare["refs"], bare["extensions"]), (0, 0))
+        full = collect(specgen.generate_spec(extension_density=1, ref_density=1))
+        half = collect(specgen.generate_spec(extension_density=0.5, ref_density=0.5))
+        self.assertLess(half["refs"], full["refs"])
+        self.assertLess(half["extensions"], full["extensions"])
+        self.assertGreater(half["refs"], 0)
+
+    def test_refs_resolve_and_vendor_prefix(self):
+        spec = specgen.generate_spec("3.0", vendor="google", ref_density=1, extension_density=1)
+        self.assertEqual(collect(utils.clean_google_extensions(spec))["extensions"], 0)
+        self.assertNotEqual(collect(utils.clean_aws_extensions(spec))["extensions"], 0)
+        text = json.dumps(spec)
+        for ref in set(part.split('"')[0] for part in text.split('"$ref": "')[1:]):
+            self.assertIn(ref.rsplit("/", 1)[1], spec["components"]["schemas"])
+
+    def test_converts_and_validates_cleanly(self):
+        spec, issues = utils.process_spec(specgen.generate_spec("2.0"))
+        self.assertEqual(issues, [])
+        self.assertTrue(spec["openapi"].startswith("3.0"))
+
+    def test_invalid_parameters_raise(self):
+        for kwargs in ({"version": "3.1"}, {"vendor": "azure"}, {"paths": -1}, {"ref_density": 1.5}):
+            with self.assertRaises(ValueError, msg=kwargs):
+                specgen.generate_spec(**kwargs)
+
+
+class TestRunBenchmarks(unittest.TestCase):
+
+    def test_results_json_and_comparison(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            argv = ["run_benchmarks.py", "--paths", "4", "--definitions", "3", "--repeat", "1", "--output", output]
+            with mock.patch.object(sys, "argv", argv), mock.patch("builtins.print"):
+                run_benchmarks.main()
+            with open(output, encoding="utf-8") as fh:
+                report = json.load(fh)
+            self.assertEqual(report["params"]["paths"], 4)
+            self.assertIn("convert_swagger_to_openapi3", report["results"])
+            self.assertIn("save_spec[yaml]", report["results"])
+            self.assertGreater(report["results"]["load_spec[json]"]["best_s"], 0)
+
+            baseline = json.loads(json.dumps(report))
+            for values in baseline["results"].values():
+                values["best_s"] /= 1000
+            ratios = run_benchmarks.compare(report, baseline)
+            self.assertEqual(set(ratios), set(report["results"]))
+            self.assertTrue(all(ratio > 100 for ratio in ratios.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+test_complexity.py
+
+Complexity regression tier: runs the public openapi_utils functions at
+increasing operation counts, fits the growth exponent of their run time
+(least squares on log time vs log size) and fails if any grows faster
+than O(n log n).
+
+The tier needs several GB of memory and about a minute at its default
+sizes, so it only runs when OPENAPI_COMPLEXITY_TESTS=1 is set:
+
+    OPENAPI_COMPLEXITY_TESTS=1 python3 -m pytest tools/migration/tests/test_complexity.py -v
+
+OPENAPI_COMPLEXITY_SIZES overrides the operation counts (default: 1000,10000,100000).
+"""
+
+import os
+import gc
+import sys
+import math
+import time
+import tempfile
+import unittest
+
+# Allow importing the migration modules and the benchmark spec generator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import openapi_dedup
+import openapi_prune
+import openapi_utils as utils
+from specgen import generate_spec
+from test_openapi_routes import make_ambiguous_spec
+from test_openapi_utils import make_colliding_spec, make_many_operations_spec
+
+ENABLED = os.environ.get("OPENAPI_COMPLEXITY_TESTS") == "1"
+SIZES = tuple(int(size) for size in os.environ.get("OPENAPI_COMPLEXITY_SIZES", "1000,10000,100000").split(","))
+
+# Allowance above the n log n exponent for timer noise, cache misses and
+# garbage-collector passes over the (growing) live spec. A quadratic
+# regression fits an exponent close to 2.
+TOLERANCE = 0.3
+
+
+def fit_exponent(sizes: tuple, timings: list) -> float:
+    """Least-squares slope of log(timing) against log(size): t ~ n ** slope."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(timing) for timing in timings]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return covariance / sum((x - mean_x) ** 2 for x in xs)
+
+
+def allowed_exponent(sizes: tuple) -> float:
+    """The fitted exponent of n log n over sizes, plus TOLERANCE."""
+    return fit_exponent(sizes, [size * math.log(size) for size in sizes]) + TOLERANCE
+
+
+def best_time(func, make_input, size: int) -> float:
+    """Best wall time of func(make_input(size)); inputs are built outside the timed region."""
+    best = float("inf")
+    for _ in range(5 if size <= 10_000 else 1):
+        arg = make_input(size)
+        gc.collect()
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+        del arg
+    return best
+
+
+def swagger_spec(operations: int, vendor: str = "aws") -> dict:
+    """Swagger 2.0 spec with the given number of operations (two per path)."""
+    return generate_spec("2.0", paths=operations // 2, definitions=operations // 20, depth=1, vendor=vendor, seed=1)
+
+
+def oas3_spec(operations: int) -> dict:
+    """OpenAPI 3.0 spec with the given number of operations, none with an operationId."""
+    return generate_spec("3.0", paths=operations // 2, definitions=operations // 20, depth=1, seed=1)
+
+
+class TestFitExponent(unittest.TestCase):
+
+    def test_distinguishes_n_log_n_from_quadratic(self):
+        sizes = (1_000, 10_000, 100_000)
+        self.assertAlmostEqual(fit_exponent(sizes, [3e-6 * n for n in sizes]), 1.0)
+        self.assertLess(fit_exponent(sizes, [n * math.log(n) for n in sizes]), allowed_exponent(sizes))
+        self.assertGreater(fit_exponent(sizes, [1e-9 * n * n + 1e-6 * n for n in sizes]), allowed_exponent(sizes))
+
+
+@unittest.skipUnless(ENABLED, "set OPENAPI_COMPLEXITY_TESTS=1 to run the complexity tier")
+class TestScaling(unittest.TestCase):
+    """Each public function must scale no worse than O(n log n) in the number of operations."""
+
+    def assert_scales(self, func, make_input):
+        timings = [best_time(func, make_input, size) for size in SIZES]
+        exponent, limit = fit_exponent(SIZES, timings), allowed_exponent(SIZES)
+        detail = ", ".join(f"{size}: {timing * 1000:.1f} ms" for size, timing in zip(SIZES, timings))
+        self.assertLessEqual(exponent, limit, f"grows as n^{exponent:.2f} (limit n^{limit:.2f}); {detail}")
+
+    def test_convert_swagger_to_openapi3(self):
+        self.assert_scales(utils.convert_swagger_to_openapi3, swagger_spec)
+
+    def test_clean_aws_extensions(self):
+        self.assert_scales(utils.clean_aws_extensions, swagger_spec)
+
+    def test_clean_google_extensions(self):
+        self.assert_scales(utils.clean_google_extensions, lambda size: swagger_spec(size, "google"))
+
+    def test_ensure_operation_ids(self):
+        self.assert_scales(utils.ensure_operation_ids, oas3_spec)
+
+    def test_ensure_operation_ids_with_colliding_paths(self):
+        self.assert_scales(utils.ensure_operation_ids, make_colliding_spec)
+
+    def test_validate_apim_requirements_with_duplicates(self):
+        self.assert_scales(utils.validate_apim_requirements, make_many_operations_spec)
+
+    def test_validate_apim_requirements_with_route_conflicts(self):
+        self.assert_scales(utils.validate_apim_requirements, make_ambiguous_spec)
+
+    def test_operation_index(self):
+        self.assert_scales(utils.OperationIndex, oas3_spec)
+
+    def test_process_spec(self):
+        self.assert_scales(utils.process_spec, swagger_spec)
+
+    def test_dedup_inline_schemas(self):
+        self.assert_scales(openapi_dedup.dedup_inline_schemas, lambda size: utils.process_spec(swagger_spec(size))[0])
+
+    def test_prune_components(self):
+        self.assert_scales(openapi_prune.prune_components, oas3_spec)
+
+    def test_save_and_load_spec(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "spec.json")
+            self.assert_scales(lambda spec: utils.save_spec(spec, path), oas3_spec)
+            self.assert_scales(utils.load_spec, lambda size: utils.save_spec(oas3_spec(size), path) or path)
+
+
+if __name__ == "__main__":
+    unittest.main()
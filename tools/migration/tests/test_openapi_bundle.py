@@ -0,0 +1,259 @@
+"""
+test_openapi_bundle.py
+
+Unit tests for openapi_bundle.py and the openapi_utils.py --bundle option:
+external $refs end up in the component maps (or inlined), every file is
+loaded once and concurrently, and cycles and name collisions are handled.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_bundle.py -v
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_bundle
+import openapi_utils as utils
+from test_openapi_utils import make_oas3_spec, make_swagger2_spec, ref, run_cli
+
+
+def ok_response(schema: dict) -> dict:
+    """A single JSON Response Object of schema (test_openapi_utils.json_response() wraps it in a Responses Object)."""
+    return {"description": "OK", "content": {"application/json": {"schema": schema}}}
+
+
+class BundleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, content) -> str:
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        utils.save_spec(content, path)
+        return path
+
+
+class TestBundleSpec(BundleTestCase):
+
+    def test_targets_become_components(self):
+        root = self.write("api.json", make_oas3_spec(
+            paths={
+                "/users/{id}": {
+                    "get": {
+                        "parameters": [ref("./params.json#/Id")],
+                        "responses": {
+                            "200": ok_response(ref("./models/user.json#/User")),
+                            "404": ref("./responses.json#/NotFound"),
+                        },
+                    },
+                },
+                "/health": ref("./paths/health.json"),
+            },
+            components={"schemas": {"Local": {"type": "string"}}},
+        ))
+        self.write("params.json", {"Id": {"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}})
+        self.write("models/user.json", {
+            "User": {"type": "object", "properties": {
+                "address": ref("#/Address"),
+                "tag": ref("../api.json#/components/schemas/Local"),
+                "error": ref("../common.json#/Error"),
+            }},
+            "Address": {"type": "object", "properties": {"city": {"type": "string"}}},
+        })
+        self.write("common.json", {"Error": {"type": "object", "properties": {"message": {"type": "string"}}}})
+        self.write("responses.json", {"NotFound": ok_response(ref("./common.json#/Error"))})
+        self.write("paths/health.json", {"get": {"responses": {"200": ok_response(ref("../common.json#/Error"))}}})
+
+        with mock.patch.object(utils, "_read_spec", wraps=utils._read_spec) as read:
+            spec, report = openapi_bundle.bundle_spec(root)
+        loaded = sorted(os.path.relpath(call.args[0], self.tmp.name) for call in read.call_args_list)
+        self.assertEqual(loaded, sorted([
+            "api.json", "params.json", os.path.join("models", "user.json"), "common.json", "responses.json",
+            os.path.join("paths", "health.json"),
+        ]))
+        self.assertEqual(report, {"files": 6, "components": 5, "inlined": 1, "renamed": []})
+
+        components = spec["components"]
+        self.assertEqual(list(components["schemas"]), ["Local", "User", "Error", "Address"])
+        self.assertEqual(components["schemas"]["User"]["properties"], {
+            "address": ref("#/components/schemas/Address"),
+            "tag": ref("#/components/schemas/Local"),
+            "error": ref("#/components/schemas/Error"),
+        })
+        self.assertEqual(components["parameters"]["Id"]["name"], "id")
+        self.assertEqual(components["responses"]["NotFound"], ok_response(ref("#/components/schemas/Error")))
+        operation = spec["paths"]["/users/{id}"]["get"]
+        self.assertEqual(operation["parameters"], [ref("#/components/parameters/Id")])
+        self.assertEqual(operation["responses"]["404"], ref("#/components/responses/NotFound"))
+        self.assertEqual(
+            spec["paths"]["/health"]["get"]["responses"]["200"], ok_response(ref("#/components/schemas/Error"))
+        )
+
+    def test_recursive_schemas_across_files(self):
+        root = self.write("api.json", make_oas3_spec(
+            paths={"/a": {"get": {"responses": {"200": ok_response(ref("a.json#/A"))}}}},
+        ))
+        self.write("a.json", {"A": {"type": "object", "properties": {"b": ref("b.json#/B")}}})
+        self.write("b.json", {"B": {"type": "array", "items": ref("a.json#/A")}})
+        spec, _ = openapi_bundle.bundle_spec(root)
+        self.assertEqual(spec["components"]["schemas"], {
+            "A": {"type": "object", "properties": {"b": ref("#/components/schemas/B")}},
+            "B": {"type": "array", "items": ref("#/components/schemas/A")},
+        })
+
+    def test_name_collisions_are_renamed(self):
+        root = self.write("api.json", make_oas3_spec(
+            paths={"/a": {"post": {
+                "requestBody": {"content": {"application/json": {"schema": ref("one.json#/Item")}}},
+                "responses": {"200": ok_response(ref("two.json#/Item")), "201": ok_response(ref("user.json"))},
+            }}},
+            components={"schemas": {"user": {"type": "string"}}},
+        ))
+        self.write("one.json", {"Item": {"type": "integer"}})
+        self.write("two.json", {"Item": {"type": "string"}})
+        self.write("user.json", {"type": "object"})
+        spec, report = openapi_bundle.bundle_spec(root)
+        self.assertEqual(list(spec["components"]["schemas"]), ["user", "Item", "two_Item", "user_2"])
+        self.assertEqual([location for _, location in report["renamed"]],
+                         ["components/schemas/two_Item", "components/schemas/user_2"])
+        self.assertIn("Name collision", openapi_bundle.describe(report))
+
+    def test_swagger2_root_converts(self):
+        root = self.write("api.json", make_swagger2_spec(paths={"/a": {"get": {
+            "parameters": [ref("common.json#/parameters/Limit")],
+            "responses": {"200": {"description": "OK", "schema": ref("common.json#/definitions/Pet"),
+                                  "headers": {"X-Rate": ref("common.json#/headers/Rate")}}},
+        }}}))
+        self.write("common.json", {
+            "parameters": {"Limit": {"name": "limit", "in": "query", "type": "integer"}},
+            "definitions": {"Pet": {"type": "object", "properties": {"owner": ref("#/definitions/Owner")}},
+                            "Owner": {"type": "string"}},
+            "headers": {"Rate": {"type": "integer"}},
+        })
+        bundled, report = openapi_bundle.bundle_spec(root)
+        self.assertEqual(list(bundled["definitions"]), ["Pet", "Owner"])
+        self.assertEqual(bundled["paths"]["/a"]["get"]["parameters"], [ref("#/parameters/Limit")])
+        self.assertEqual(report["inlined"], 1)
+
+        spec, issues = utils.process_spec(bundled)
+        self.assertEqual([i for i in issues if i.startswith("ERROR")], [])
+        self.assertEqual(spec["components"]["schemas"]["Pet"]["properties"]["owner"], ref("#/components/schemas/Owner"))
+        response = spec["paths"]["/a"]["get"]["responses"]["200"]
+        self.assertEqual(response["content"]["application/json"]["schema"], ref("#/components/schemas/Pet"))
+        self.assertEqual(response["headers"]["X-Rate"], {"type": "integer"})
+
+    def test_urls_and_root_local_refs_are_kept(self):
+        root = self.write("api.json", make_oas3_spec(paths={"/a": {"get": {"responses": {
+            "200": ok_response(ref("https://example.com/schemas.json#/Pet")),
+            "201": ok_response(ref("#/components/schemas/Local")),
+        }}}}, components={"schemas": {"Local": {}}}))
+        spec, report = openapi_bundle.bundle_spec(root)
+        self.assertEqual(spec, utils.load_spec(root))
+        self.assertEqual(report["files"], 1)
+
+    def test_properties_named_like_example_keywords_are_walked(self):
+        literal = {"value": ref("./not-a-ref.json#/X")}
+        root = self.write("api.json", make_oas3_spec(paths={"/a": {"get": {"responses": {"200": ok_response({
+            "type": "object",
+            "properties": {"example": ref("./models.json#/Example"), "x-example": ref("./models.json#/Other")},
+            "patternProperties": {"example": ref("./models.json#/Other")},
+            "example": literal,
+            "x-example": literal,
+        })}}}}))
+        self.write("models.json", {"Example": {"type": "string"}, "Other": {"type": "integer"}})
+        spec, _ = openapi_bundle.bundle_spec(root)
+        schema = spec["paths"]["/a"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        self.assertEqual(schema["properties"], {"example": ref("#/components/schemas/Example"),
+                                                "x-example": ref("#/components/schemas/Other")})
+        self.assertEqual(schema["patternProperties"], {"example": ref("#/components/schemas/Other")})
+        # The example keywords themselves are still copied as they are
+        self.assertEqual((schema["example"], schema["x-example"]), (literal, literal))
+        self.assertEqual(set(spec["components"]["schemas"]), {"Example", "Other"})
+
+    def test_unbundleable_inputs(self):
+        cases = {
+            "missing file": ({"s": ref("missing.json#/X")}, {}, "Cannot read file"),
+            "missing pointer": ({"s": ref("other.json#/Nope")}, {"other.json": {}}, "Cannot resolve \\$ref 'other.json#/Nope'"),
+            "alias cycle": ({"s": ref("other.json#/A")}, {"other.json": {"A": ref("#/B"), "B": ref("#/A")}},
+                            "Circular \\$ref chain"),
+            "path item cycle": (None, {"item.json": ref("./item.json")}, "Circular \\$ref"),
+        }
+        for label, (schemas, files, message) in cases.items():
+            with self.subTest(label):
+                if schemas is None:
+                    spec = make_oas3_spec(paths={"/a": ref("item.json")})
+                else:
+                    spec = make_oas3_spec(paths={"/a": {"get": {"responses": {"200": ok_response(schemas["s"])}}}})
+                root = self.write("api.json", spec)
+                for name, content in files.items():
+                    self.write(name, content)
+                with self.assertRaisesRegex(ValueError, message):
+                    openapi_bundle.bundle_spec(root)
+
+    def test_referenced_files_load_concurrently(self):
+        names = ("a.json", "b.json", "c.json")
+        root = self.write("api.json", make_oas3_spec(paths={
+            f"/{name}": {"get": {"responses": {"200": ok_response(ref(f"{name}#/S"))}}} for name in names
+        }))
+        for name in names:
+            self.write(name, {"S": {"title": name}})
+        # Each load of a referenced file waits until all three are being loaded at once
+        barrier = threading.Barrier(len(names), timeout=10)
+        read_spec = utils._read_spec
+
+        def waiting_read(path, serializer=None):
+            if os.path.basename(path) in names:
+                barrier.wait()
+            return read_spec(path, serializer)
+
+        with mock.patch.object(utils, "_read_spec", side_effect=waiting_read):
+            spec, report = openapi_bundle.bundle_spec(root, jobs=len(names))
+        self.assertEqual(report["files"], 4)
+        self.assertEqual(list(spec["components"]["schemas"]), ["S", "b_S", "c_S"])
+
+
+class TestBundleCli(BundleTestCase):
+
+    def test_bundle_and_convert(self):
+        root = self.write("api.json", make_swagger2_spec(paths={"/a": {"get": {
+            "responses": {"200": {"description": "OK", "schema": ref("models.json#/Pet")}},
+        }}}))
+        self.write("models.json", {"Pet": {"type": "object", "x-amazon-apigateway-doc": "drop"}})
+        output_file = os.path.join(self.tmp.name, "out.json")
+        code, output = run_cli(root, output_file, "--bundle")
+        self.assertEqual(code, 0, output)
+        self.assertIn("[bundle] 2 file(s) loaded, 1 component(s) added, 0 reference(s) inlined.", output)
+        self.assertEqual(utils.load_spec(output_file)["components"]["schemas"], {"Pet": {"type": "object"}})
+
+        batch_dir = os.path.join(self.tmp.name, "batch")
+        code, output = run_cli("--batch", root, "--output-dir", batch_dir, "--jobs", "1", "--bundle")
+        self.assertEqual(code, 0, output)
+        with open(output_file, "rb") as single, open(os.path.join(batch_dir, "api.json"), "rb") as batch:
+            self.assertEqual(batch.read(), single.read())
+
+    def test_rejected_combinations(self):
+        root = self.write("api.json", make_oas3_spec())
+        output_file = os.path.join(self.tmp.name, "out.json")
+        self.assertEqual(run_cli(root, output_file, "--bundle", "--stream")[0], 2)
+        self.assertEqual(run_cli(root, output_file, "--bundle", "--cache-dir", self.tmp.name)[0], 2)
+
+    def test_unresolvable_ref_exits(self):
+        root = self.write("api.json", make_oas3_spec(paths={"/a": {"get": {"responses": {
+            "200": ok_response(ref("missing.json#/X")),
+        }}}}))
+        with mock.patch("sys.stderr"):
+            code, _ = run_cli(root, os.path.join(self.tmp.name, "out.json"), "--bundle")
+        self.assertEqual(code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+test_openapi_cache.py
+
+Unit tests for openapi_cache.py and the openapi_utils.py --cache-dir option.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_cache.py -v
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_cache
+import openapi_utils as utils
+from test_openapi_utils import make_vendor_swagger2_spec, run_cli
+
+
+class TestConversionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = openapi_cache.ConversionCache(self.tmp.name, tool_version="1.0")
+
+    def test_miss_then_hit(self):
+        key = self.cache.make_key(b"spec", {"source": "aws"})
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b"output", ["WARNING: x"])
+        self.assertEqual(self.cache.get(key), (b"output", ["WARNING: x"]))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "stores": 1, "evictions": 0})
+
+    def test_validate_only_entry_has_no_output(self):
+        key = self.cache.make_key(b"spec", {})
+        self.cache.put(key, None, [])
+        self.assertEqual(self.cache.get(key), (None, []))
+
+    def test_key_depends_on_input_options_and_version(self):
+        key = self.cache.make_key(b"spec", {"source": "aws"})
+        other_version = openapi_cache.ConversionCache(self.tmp.name, tool_version="2.0")
+        self.assertNotEqual(key, self.cache.make_key(b"spec2", {"source": "aws"}))
+        self.assertNotEqual(key, self.cache.make_key(b"spec", {"source": "google"}))
+        self.assertNotEqual(key, other_version.make_key(b"spec", {"source": "aws"}))
+        self.assertEqual(key, self.cache.make_key(b"spec", {"source": "aws"}))
+
+    def test_tool_version_covers_pipeline_modules_and_parsers(self):
+        self.addCleanup(utils.tool_version.cache_clear)
+        utils.tool_version.cache_clear()
+        version = utils.tool_version()
+        self.assertTrue(version.startswith(f"{utils.__version__}+"))
+        self.assertIn("openapi_canonical", utils._PIPELINE_MODULES)
+        for patch in (
+            mock.patch.object(utils, "_PIPELINE_MODULES", utils._PIPELINE_MODULES[:-1]),
+            mock.patch.object(utils, "yaml_module", lambda: mock.Mock(__version__="0.1")),
+            mock.patch("openapi_serializers.orjson_module", lambda: mock.Mock(__version__="0.1")),
+        ):
+            utils.tool_version.cache_clear()
+            with self.subTest(patch=patch.attribute), patch:
+                self.assertNotEqual(utils.tool_version(), version)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = openapi_cache.ConversionCache(self.tmp.name, max_bytes=2500, tool_version="1.0")
+        keys = [cache.make_key(str(i).encode(), {}) for i in range(3)]
+        for i, key in enumerate(keys[:2]):
+            cache.put(key, b"x" * 1000, [])
+            os.utime(cache._entry_paths(key)[1], (i, i))
+        cache.get(keys[0])  # refresh: keys[1] is now the oldest
+        cache.put(keys[2], b"x" * 1000, [])
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+    def test_cache_options_records_output_format(self):
+        self.assertEqual(openapi_cache.cache_options({"source": "aws"}, "out.json")["format"], "json")
+        self.assertEqual(openapi_cache.cache_options({"source": "aws"}, "out.yaml")["format"], "yaml")
+        self.assertIsNone(openapi_cache.cache_options({"source": "aws"}, None)["format"])
+
+
+class TestCacheCli(unittest.TestCase):
+
+    def setUp(self):
+        import yaml as _yaml
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        self.input_file = os.path.join(self.tmp.name, "api.yaml")
+        spec = make_vendor_swagger2_spec()
+        spec["paths"]["/pets"]["get"].pop("operationId", None)
+        spec["paths"]["/pets"]["get"]["summary"] = ""
+        with open(self.input_file, "w", encoding="utf-8") as fh:
+            _yaml.dump(spec, fh)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def issue_lines(self, output: str) -> list:
+        return [line for line in output.splitlines() if line.startswith(("  ERROR", "  WARNING"))]
+
+    def test_hit_replays_identical_output_and_issues(self):
+        first_out = os.path.join(self.tmp.name, "first.yaml")
+        second_out = os.path.join(self.tmp.name, "second.yaml")
+        code, first = run_cli(self.input_file, first_out, "--cache-dir", self.cache_dir)
+        self.assertEqual(code, 0)
+        self.assertIn("0 hit(s), 1 miss(es)", first)
+
+        with mock.patch.object(utils, "process_spec", side_effect=AssertionError("not cached")):
+            code, second = run_cli(self.input_file, second_out, "--cache-dir", self.cache_dir)
+        self.assertEqual(code, 0)
+        self.assertIn("[cache] Hit", second)
+        self.assertIn("1 hit(s), 0 miss(es)", second)
+        self.assertEqual(self.read(first_out), self.read(second_out))
+        self.assertEqual(self.issue_lines(first), self.issue_lines(second))
+
+    def test_changed_input_or_options_miss(self):
+        out = os.path.join(self.tmp.name, "out.yaml")
+        run_cli(self.input_file, out, "--cache-dir", self.cache_dir)
+        _, output = run_cli(self.input_file, out, "--cache-dir", self.cache_dir, "--no-operationid")
+        self.assertIn("0 hit(s), 1 miss(es)", output)
+        with open(self.input_file, "a", encoding="utf-8") as fh:
+            fh.write("# edited\n")
+        _, output = run_cli(self.input_file, out, "--cache-dir", self.cache_dir)
+        self.assertIn("0 hit(s), 1 miss(es)", output)
+
+    def test_batch_second_run_is_served_from_cache(self):
+        src = os.path.join(self.tmp.name, "src")
+        os.makedirs(src)
+        os.replace(self.input_file, os.path.join(src, "api.yaml"))
+        with open(os.path.join(src, "other.json"), "w", encoding="utf-8") as fh:
+            json.dump({"openapi": "3.0.1", "info": {"title": "t", "version": "1"}, "paths": {}}, fh)
+        out_dir = os.path.join(self.tmp.name, "out")
+        args = ("--batch", src, "--output-dir", out_dir, "--cache-dir", self.cache_dir, "--jobs", "2")
+
+        code, first = run_cli(*args)
+        self.assertEqual(code, 0, first)
+        expected = {name: self.read(os.path.join(out_dir, name)) for name in ("api.yaml", "other.json")}
+        for name in expected:
+            os.unlink(os.path.join(out_dir, name))
+
+        code, second = run_cli(*args)
+        self.assertEqual(code, 0, second)
+        self.assertEqual(second.count("(cached)"), 2)
+        self.assertIn("2 hit(s), 0 miss(es)", second)
+        for name, data in expected.items():
+            self.assertEqual(self.read(os.path.join(out_dir, name)), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
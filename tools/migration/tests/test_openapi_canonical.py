@@ -0,0 +1,182 @@
+"""
+test_openapi_canonical.py
+
+Unit tests for openapi_canonical.py and the openapi_utils.py --canonical
+option: key order, scalar normalisation, shared subtrees and the semantic
+hash of specs that differ only in layout.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_canonical.py -v
+"""
+
+import io
+import os
+import sys
+import copy
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_canonical
+import openapi_utils as utils
+from openapi_serializers import Serializer
+from test_openapi_utils import make_oas3_spec, run_cli
+
+
+def shuffled(obj):
+    """obj with the keys of every mapping in reverse order."""
+    if isinstance(obj, dict):
+        return {key: shuffled(obj[key]) for key in reversed(list(obj))}
+    if isinstance(obj, list):
+        return [shuffled(value) for value in obj]
+    return obj
+
+
+def pets_spec() -> dict:
+    return make_oas3_spec(
+        paths={
+            "/pets": {
+                "x-internal": True,
+                "post": {"responses": {"201": {"description": "Created"}}},
+                "get": {
+                    "responses": {"200": {"description": "OK"}},
+                    "parameters": [{"name": "limit", "in": "query", "schema": {"type": "integer", "maximum": 100}}],
+                    "operationId": "listPets",
+                },
+            },
+            "/owners": {"get": {"responses": {"200": {"description": "OK"}}}},
+        },
+        components={"schemas": {"Pet": {"type": "object", "required": ["name", "id"]}}},
+    )
+
+
+class TestCanonicalize(unittest.TestCase):
+
+    def test_key_order(self):
+        spec = shuffled(pets_spec())
+        result = openapi_canonical.canonicalize(spec)
+        self.assertEqual(list(result), ["openapi", "info", "servers", "paths", "components"])
+        self.assertEqual(list(result["info"]), ["title", "version"])
+        self.assertEqual(list(result["paths"]), ["/owners", "/pets"])
+        self.assertEqual(list(result["paths"]["/pets"]), ["get", "post", "x-internal"])
+        self.assertEqual(list(result["paths"]["/pets"]["get"]), ["operationId", "parameters", "responses"])
+        self.assertEqual(list(result["paths"]["/pets"]["get"]["parameters"][0]), ["in", "name", "schema"])
+        # Lists keep their order
+        self.assertEqual(result["components"]["schemas"]["Pet"]["required"], ["name", "id"])
+        self.assertEqual(result, pets_spec())
+        self.assertEqual(spec, shuffled(pets_spec()))
+
+    def test_scalars(self):
+        spec = make_oas3_spec(paths={"/a": {"get": {
+            "description": "line one\r\nline two",
+            "responses": {200: {"description": "OK"}, "default": {"description": "Error"}},
+            "parameters": [{"name": "n", "in": "query", "schema": {"minimum": 1.0, "maximum": 2.5, "default": -0.0}}],
+        }}})
+        operation = openapi_canonical.canonicalize(spec)["paths"]["/a"]["get"]
+        self.assertEqual(list(operation["responses"]), ["200", "default"])
+        self.assertEqual(operation["description"], "line one\nline two")
+        schema = operation["parameters"][0]["schema"]
+        self.assertEqual(schema, {"default": 0, "maximum": 2.5, "minimum": 1})
+        self.assertIsInstance(schema["minimum"], int)
+        self.assertIs(openapi_canonical.canonicalize({"x-flag": True})["x-flag"], True)
+
+    def test_version_fields_keep_their_spelling(self):
+        # Unquoted in YAML these load as floats; 2.0 must not become 2
+        result = openapi_canonical.canonicalize({"swagger": 2.0, "info": {"title": "T", "version": 1.0}, "paths": {}})
+        self.assertEqual(repr(result["swagger"]), "2.0")
+        self.assertEqual(repr(result["info"]["version"]), "1.0")
+        self.assertEqual(repr(openapi_canonical.canonicalize({"openapi": 3.0})["openapi"]), "3.0")
+        for fmt, text in (("json", '"swagger": 2.0'), ("yaml", "swagger: 2.0")):
+            self.assertIn(text, Serializer(canonical=True).dumps({"swagger": 2.0}, fmt))
+        # Elsewhere a version-named field is an ordinary value
+        self.assertEqual(openapi_canonical.canonicalize({"x-meta": {"version": 1.0}})["x-meta"]["version"], 1)
+        self.assertNotEqual(openapi_canonical.semantic_hash({"swagger": 2.0}),
+                            openapi_canonical.semantic_hash({"swagger": 2}))
+
+    def test_colliding_keys_and_cycles(self):
+        with self.assertRaises(ValueError):
+            openapi_canonical.canonicalize({"responses": {200: {}, "200": {}}})
+        node: dict = {"type": "object"}
+        node["properties"] = {"self": node}
+        with self.assertRaises(ValueError):
+            openapi_canonical.canonicalize({"components": {"schemas": {"Loop": node}}})
+
+    def test_shared_subtrees_stay_shared_and_deep_nesting(self):
+        shared = {"type": "string", "maxLength": 10}
+        result = openapi_canonical.canonicalize({"a": {"schema": shared}, "b": {"schema": shared}})
+        self.assertIs(result["a"]["schema"], result["b"]["schema"])
+
+        deep: dict = {"type": "string"}
+        for _ in range(5000):
+            deep = {"items": deep, "type": "array"}
+        self.assertEqual(list(openapi_canonical.canonicalize(deep)), ["items", "type"])
+
+
+class TestSemanticHash(unittest.TestCase):
+
+    def test_equal_for_layout_differences(self):
+        spec = pets_spec()
+        digest = openapi_canonical.semantic_hash(spec)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(openapi_canonical.semantic_hash(shuffled(spec)), digest)
+
+        respelled = copy.deepcopy(spec)
+        respelled["paths"]["/pets"]["get"]["responses"] = {200: {"description": "OK"}}
+        respelled["paths"]["/pets"]["get"]["parameters"][0]["schema"]["maximum"] = 100.0
+        self.assertEqual(openapi_canonical.semantic_hash(respelled), digest)
+
+        changed = copy.deepcopy(spec)
+        changed["components"]["schemas"]["Pet"]["required"].reverse()
+        self.assertNotEqual(openapi_canonical.semantic_hash(changed), digest)
+
+    def test_yaml_and_json_files_hash_alike(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = [os.path.join(tmp, "a.json"), os.path.join(tmp, "b.yaml")]
+            utils.save_spec(pets_spec(), files[0])
+            utils.save_spec(shuffled(pets_spec()), files[1])
+            stdout = io.StringIO()
+            with mock.patch.object(sys, "argv", ["openapi_canonical.py", *files]), contextlib.redirect_stdout(stdout):
+                openapi_canonical.main()
+        digests = [line.split()[0] for line in stdout.getvalue().splitlines()]
+        self.assertEqual(digests, [openapi_canonical.semantic_hash(pets_spec())] * 2)
+
+    def test_yaml_dates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "api.yaml")
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write("openapi: 3.0.0\ninfo: {title: T, version: '1'}\npaths: {}\ncomponents:\n  schemas:\n"
+                         "    Day: {type: string, format: date, example: 2017-07-21}\n"
+                         "    At: {type: string, example: 2017-07-21T10:00:00Z}\n")
+            stdout = io.StringIO()
+            with mock.patch.object(sys, "argv", ["openapi_canonical.py", path]), contextlib.redirect_stdout(stdout):
+                openapi_canonical.main()
+            digest = openapi_canonical.semantic_hash(utils.load_spec(path))
+        self.assertEqual(stdout.getvalue(), f"{digest}  {path}\n")
+
+
+class TestCanonicalOutput(unittest.TestCase):
+
+    def test_serializer_and_cli(self):
+        serializer = Serializer(canonical=True)
+        for fmt in ("json", "yaml"):
+            with self.subTest(fmt=fmt):
+                self.assertEqual(serializer.dumps(shuffled(pets_spec()), fmt), serializer.dumps(pets_spec(), fmt))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            outputs = []
+            for index, spec in enumerate((pets_spec(), shuffled(pets_spec()))):
+                input_file = os.path.join(tmp, f"in{index}.json")
+                outputs.append(os.path.join(tmp, f"out{index}.json"))
+                utils.save_spec(spec, input_file)
+                code, output = run_cli(input_file, outputs[-1], "--canonical")
+                self.assertEqual(code, 0, output)
+            with open(outputs[0], "rb") as first, open(outputs[1], "rb") as second:
+                self.assertEqual(first.read(), second.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+test_openapi_dedup.py
+
+Unit tests for openapi_dedup.py and the openapi_utils.py --dedup-schemas
+option: repeated inline schemas become one component and $refs, named
+deterministically, above a size threshold, without touching the input.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_dedup.py -v
+"""
+
+import os
+import sys
+import copy
+import json
+import hashlib
+import tempfile
+import unittest
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_dedup
+import openapi_utils as utils
+from test_openapi_utils import make_oas3_spec, make_swagger2_spec, run_cli
+
+# An inline schema well above the test threshold
+ADDRESS = {
+    "type": "object",
+    "required": ["street", "city"],
+    "properties": {
+        "street": {"type": "string", "maxLength": 200},
+        "city": {"type": "string", "maxLength": 100},
+        "postcode": {"type": "string", "pattern": "^[0-9A-Z -]+$"},
+    },
+}
+MIN_BYTES = 64
+
+
+def canonical_name(schema: dict, digits: int = 8) -> str:
+    text = json.dumps(schema, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return openapi_dedup.SCHEMA_NAME_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()[:digits]
+
+
+def compact_size(spec: dict) -> int:
+    return len(json.dumps(spec, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def json_content(schema: dict, *media_types: str) -> dict:
+    return {"content": {media_type: {"schema": schema} for media_type in media_types or ("application/json",)}}
+
+
+def address_spec() -> dict:
+    """Swagger 2.0 spec with ADDRESS inline in two bodies and a response, under two media types."""
+    return make_swagger2_spec(
+        consumes=["application/json", "application/xml"],
+        produces=["application/json", "application/xml"],
+        paths={
+            "/home": {
+                "put": {"parameters": [{"in": "body", "name": "a", "schema": copy.deepcopy(ADDRESS)}],
+                        "responses": {"204": {"description": "Saved"}}},
+                "get": {"responses": {"200": {"description": "OK", "schema": copy.deepcopy(ADDRESS)}}},
+            },
+            "/work": {
+                "put": {"parameters": [{"in": "body", "name": "a", "schema": copy.deepcopy(ADDRESS)}],
+                        "responses": {"204": {"description": "Saved"}}},
+            },
+        },
+    )
+
+
+class TestDedupInlineSchemas(unittest.TestCase):
+
+    def test_converted_copies_become_one_component(self):
+        spec = address_spec()
+        original = copy.deepcopy(spec)
+        plain = utils.convert_swagger_to_openapi3(spec)
+        result = utils.convert_swagger_to_openapi3(spec, dedup_min_bytes=MIN_BYTES)
+        self.assertEqual(spec, original)
+        name = canonical_name(ADDRESS)
+        self.assertEqual(result["components"]["schemas"], {name: ADDRESS})
+        ref = {"$ref": f"#/components/schemas/{name}"}
+        for path, method, field in (("/home", "put", "requestBody"), ("/work", "put", "requestBody")):
+            for media in result["paths"][path][method][field]["content"].values():
+                self.assertEqual(media["schema"], ref)
+        for media in result["paths"]["/home"]["get"]["responses"]["200"]["content"].values():
+            self.assertEqual(media["schema"], ref)
+
+        deduped, report = openapi_dedup.dedup_inline_schemas(plain, MIN_BYTES)
+        self.assertEqual(deduped, result)
+        self.assertEqual(report["hoisted"], {name: 6})
+        self.assertEqual(report["bytes_saved"], compact_size(plain) - compact_size(deduped))
+
+    def test_key_order_does_not_matter(self):
+        reordered = dict(reversed(list(copy.deepcopy(ADDRESS).items())))
+        spec = make_oas3_spec(paths={
+            "/a": {"post": {"requestBody": json_content(copy.deepcopy(ADDRESS))}},
+            "/b": {"post": {"requestBody": json_content(reordered)}},
+        })
+        _, report = openapi_dedup.dedup_inline_schemas(spec, MIN_BYTES)
+        self.assertEqual(report["hoisted"], {canonical_name(ADDRESS): 2})
+
+    def test_threshold_single_use_and_refs_are_left_alone(self):
+        small = {"type": "string"}
+        spec = make_oas3_spec(paths={
+            "/a": {"get": {"responses": {"200": json_content(small, "application/json", "text/plain")}}},
+            "/b": {"post": {"requestBody": json_content(copy.deepcopy(ADDRESS))}},
+            "/c": {"get": {"responses": {"200": json_content({"$ref": "#/components/schemas/X"}, "a/b", "c/d")}}},
+        })
+        result, report = openapi_dedup.dedup_inline_schemas(spec, MIN_BYTES)
+        self.assertIs(result, spec)
+        self.assertEqual(report, {"hoisted": {}, "schemas_hoisted": 0, "references": 0, "bytes_saved": 0})
+        self.assertEqual(openapi_dedup.describe(report), "[dedup] No repeated inline schemas to hoist.")
+        self.assertEqual(openapi_dedup.dedup_inline_schemas(spec, 1)[1]["schemas_hoisted"], 0)
+
+    def test_component_slots_and_examples(self):
+        spec = make_oas3_spec(
+            paths={"/a": {"get": {
+                "parameters": [{"name": "filter", "in": "query", "schema": copy.deepcopy(ADDRESS)}],
+                "responses": {"200": {
+                    "description": "OK",
+                    "headers": {"X-Address": {"schema": copy.deepcopy(ADDRESS)}},
+                    "content": {"application/json": {"schema": {"type": "object"}, "example": {"schema": ADDRESS}}},
+                }},
+            }}},
+            components={
+                "responses": {"Home": {"description": "Home", **json_content(copy.deepcopy(ADDRESS))}},
+                "examples": {"Sample": {"value": {"schema": ADDRESS}}},
+                "schemas": {"Existing": copy.deepcopy(ADDRESS)},
+            },
+        )
+        result, report = openapi_dedup.dedup_inline_schemas(spec, MIN_BYTES)
+        name = canonical_name(ADDRESS)
+        self.assertEqual(report["hoisted"], {name: 3})
+        self.assertEqual(list(result["components"]["schemas"]), ["Existing", name])
+        self.assertEqual(result["components"]["examples"], spec["components"]["examples"])
+        media = result["paths"]["/a"]["get"]["responses"]["200"]["content"]["application/json"]
+        self.assertEqual(media["example"], {"schema": ADDRESS})
+
+    def test_names_are_stable_and_avoid_clashes(self):
+        spec = utils.convert_swagger_to_openapi3(address_spec())
+        clash = canonical_name(ADDRESS)
+        spec["components"] = {"schemas": {clash: {"type": "string"}}}
+        first, report = openapi_dedup.dedup_inline_schemas(spec, MIN_BYTES)
+        second, _ = openapi_dedup.dedup_inline_schemas(copy.deepcopy(spec), MIN_BYTES)
+        self.assertEqual(list(report["hoisted"]), [canonical_name(ADDRESS, 9)])
+        self.assertEqual(first, second)
+
+    def test_swagger2_is_returned_unchanged(self):
+        spec = address_spec()
+        result, report = openapi_dedup.dedup_inline_schemas(spec, MIN_BYTES)
+        self.assertIs(result, spec)
+        self.assertEqual(report["schemas_hoisted"], 0)
+
+    @unittest.skipUnless(utils.HAS_YAML, "PyYAML not installed")
+    def test_yaml_output_has_no_anchors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            plain, deduped = os.path.join(tmp, "plain.yaml"), os.path.join(tmp, "deduped.yaml")
+            utils.save_spec(utils.process_spec(address_spec())[0], plain)
+            utils.save_spec(utils.process_spec(address_spec(), dedup_min_bytes=MIN_BYTES)[0], deduped)
+            with open(plain, encoding="utf-8") as fh:
+                self.assertIn("&id", fh.read())
+            with open(deduped, encoding="utf-8") as fh:
+                self.assertNotIn("&id", fh.read())
+
+
+class TestProcessSpecDedup(unittest.TestCase):
+
+    def test_copy_on_write_matches_and_leaves_input_alone(self):
+        spec = address_spec()
+        original = copy.deepcopy(spec)
+        shared, issues = utils.process_spec(spec, copy_on_write=True, dedup_min_bytes=MIN_BYTES, prune=True)
+        copied, copied_issues = utils.process_spec(spec, dedup_min_bytes=MIN_BYTES, prune=True)
+        self.assertEqual(spec, original)
+        self.assertEqual(shared, copied)
+        self.assertEqual(issues, copied_issues)
+        self.assertEqual(list(shared["components"]["schemas"]), [canonical_name(ADDRESS)])
+
+
+class TestDedupCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_file = os.path.join(self.tmp.name, "api.json")
+        utils.save_spec(address_spec(), self.input_file)
+
+    def test_single_file(self):
+        output_file = os.path.join(self.tmp.name, "out.json")
+        code, output = run_cli(self.input_file, output_file, "--dedup-schemas", str(MIN_BYTES))
+        self.assertEqual(code, 0, output)
+        self.assertIn("[dedup] Hoisted 1 inline schema(s) into components/schemas, replacing 6 copies", output)
+        self.assertEqual(list(utils.load_spec(output_file)["components"]["schemas"]), [canonical_name(ADDRESS)])
+
+    def test_default_threshold_and_batch(self):
+        output_dir = os.path.join(self.tmp.name, "out")
+        code, output = run_cli("--batch", self.input_file, "--output-dir", output_dir, "--jobs", "1", "--dedup-schemas")
+        self.assertEqual(code, 0, output)
+        self.assertNotIn("hoisted", output)
+        self.assertNotIn("components", utils.load_spec(os.path.join(output_dir, "api.json")))
+
+    def test_invalid_combinations(self):
+        output_file = os.path.join(self.tmp.name, "out.json")
+        self.assertEqual(run_cli(self.input_file, output_file, "--dedup-schemas", "0")[0], 2)
+        state = os.path.join(self.tmp.name, "state")
+        self.assertEqual(run_cli(self.input_file, output_file, "--dedup-schemas", "--incremental", state)[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+"""
+test_openapi_import.py
+
+Unit tests for openapi_import.py against the openapi_arm_stub.py stand-in
+for the ARM endpoints: pooled connections, bounded concurrency, retries on
+429 and dropped connections, long-running import polling, skipping
+unchanged APIs and the command line.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_import.py -v
+"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import tempfile
+import threading
+import unittest
+import contextlib
+from unittest import mock
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_import
+import openapi_utils as utils
+from openapi_arm_stub import ArmStub
+from test_openapi_utils import make_oas3_spec
+
+SERVICE = {"subscription": "sub", "resource_group": "rg", "service": "apim", "token": "stub-token"}
+
+
+def run_import(stub: ArmStub, jobs: list, **options) -> tuple:
+    """Start stub, import jobs through a fresh pool, stop both; returns (results, pool)."""
+    async def run() -> tuple:
+        pool = openapi_import.HttpPool(await stub.start(), options.get("concurrency", 4))
+        try:
+            importer = openapi_import.BulkImporter(pool, **{**SERVICE, "backoff": 0.001, "poll_interval": 0, **options})
+            return await importer.run(jobs), pool
+        finally:
+            await pool.close()
+            await stub.close()
+
+    return asyncio.run(run())
+
+
+class ImportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_specs(self, count: int, extension: str = ".json") -> list:
+        files = []
+        for i in range(count):
+            files.append(os.path.join(self.tmp.name, f"api{i:02d}{extension}"))
+            utils.save_spec(make_oas3_spec(paths={f"/r{i}": {"get": {"responses": {"200": {"description": "OK"}}}}}),
+                            files[-1])
+        return files
+
+
+class TestBulkImporter(ImportTestCase):
+
+    def test_pooled_bounded_import(self):
+        stub = ArmStub(delay=0.01)
+        jobs = openapi_import.plan_files(self.write_specs(20) + self.write_specs(1, ".yaml"), "shop")
+        results, pool = run_import(stub, jobs, concurrency=4)
+        self.assertEqual([r["status"] for r in results], ["imported"] * 21)
+        self.assertEqual(len(stub.apis), 21)
+        self.assertEqual(stub.apis[("apim", "api00")]["path"], "shop/api00")
+        self.assertEqual(stub.apis[("apim", "api00")]["format"], "openapi+json")
+        self.assertEqual(stub.apis[("apim", "api00-2")]["format"], "openapi")
+        self.assertLessEqual(stub.max_inflight, 4)
+        self.assertGreater(stub.max_inflight, 1)
+        # Connections are reused: never more than the concurrency
+        self.assertLessEqual(stub.connections, 4)
+        self.assertEqual((pool.opened, pool.requests), (stub.connections, 21))
+
+    def test_retries_throttled_requests(self):
+        stub = ArmStub(throttle=2)
+        results, _ = run_import(stub, openapi_import.plan_files(self.write_specs(3)))
+        self.assertEqual([(r["status"], r["attempts"]) for r in results], [("imported", 3)] * 3)
+
+        results, _ = run_import(ArmStub(throttle=3), openapi_import.plan_files(self.write_specs(1)), max_retries=2)
+        self.assertEqual(results[0]["status"], "failed")
+        self.assertIn("HTTP 429 TooManyRequests: Throttled by the stub. (after 3 attempts)", results[0]["error"])
+
+    def test_polls_long_running_imports(self):
+        stub = ArmStub(async_polls=3)
+        results, _ = run_import(stub, openapi_import.plan_files(self.write_specs(2)))
+        self.assertEqual([(r["status"], r["polls"]) for r in results], [("imported", 3)] * 2)
+        self.assertEqual(len(stub.apis), 2)
+
+    def test_reconnects_when_an_idle_connection_was_closed(self):
+        stub = ArmStub(keepalive_requests=1)
+        results, pool = run_import(stub, openapi_import.plan_files(self.write_specs(5)), concurrency=1)
+        self.assertEqual([r["status"] for r in results], ["imported"] * 5)
+        self.assertEqual(pool.opened, 5)
+
+    def test_failures_are_reported_per_api(self):
+        files = self.write_specs(2)
+        broken = os.path.join(self.tmp.name, "broken.json")
+        with open(broken, "w", encoding="utf-8") as fh:
+            fh.write("{not json")
+        jobs = openapi_import.plan_files([files[0], broken, os.path.join(self.tmp.name, "missing.json"), files[1]])
+        results, _ = run_import(ArmStub(), jobs)
+        self.assertEqual([r["status"] for r in results], ["imported", "failed", "failed", "imported"])
+        self.assertTrue(results[1]["error"].startswith("HTTP 400 ValidationError: Parsing error(s)"))
+        self.assertEqual(results[1]["attempts"], 1)
+        self.assertIn("Cannot read file", results[2]["error"])
+
+        results, _ = run_import(ArmStub(token="other"), jobs[:1])
+        self.assertEqual(results[0]["error"], "HTTP 401 AuthenticationFailed: Missing or invalid bearer token.")
+
+    def test_skip_if_unchanged(self):
+        files = self.write_specs(2)
+        state_dir = os.path.join(self.tmp.name, "state")
+        jobs = openapi_import.plan_files(files)
+        results, _ = run_import(ArmStub(), jobs, state_dir=state_dir)
+        self.assertEqual([r["status"] for r in results], ["imported"] * 2)
+        with open(os.path.join(state_dir, "apim.api00.state"), encoding="utf-8") as fh:
+            self.assertEqual(fh.read().split()[1:], ["api00", "api00"])
+
+        # Same content in another layout: skipped; changed content: imported again
+        spec = utils.load_spec(files[0])
+        with open(files[0], "w", encoding="utf-8") as fh:
+            json.dump(dict(reversed(list(spec.items()))), fh)
+        spec = utils.load_spec(files[1])
+        spec["info"]["version"] = "2.0.0"
+        utils.save_spec(spec, files[1])
+        stub = ArmStub()
+        results, _ = run_import(stub, jobs, state_dir=state_dir)
+        self.assertEqual([r["status"] for r in results], ["skipped", "imported"])
+        self.assertEqual(list(stub.apis), [("apim", "api01")])
+
+    def test_yaml_dates_can_be_skipped_if_unchanged(self):
+        path = os.path.join(self.tmp.name, "dates.yaml")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write("openapi: 3.0.0\ninfo: {title: T, version: '1'}\npaths: {}\ncomponents:\n  schemas:\n"
+                     "    Day: {type: string, format: date, example: 2017-07-21}\n")
+        jobs = openapi_import.plan_files([path] + self.write_specs(1))
+        state_dir = os.path.join(self.tmp.name, "state")
+        results, _ = run_import(ArmStub(), jobs, state_dir=state_dir)
+        self.assertEqual([r["status"] for r in results], ["imported"] * 2)
+        results, _ = run_import(ArmStub(), jobs, state_dir=state_dir)
+        self.assertEqual([r["status"] for r in results], ["skipped"] * 2)
+
+    def test_unwritable_state_is_a_per_api_failure(self):
+        files = self.write_specs(2)
+        # A file where the state directory should be
+        state_dir = os.path.join(self.tmp.name, "state")
+        with open(state_dir, "w", encoding="utf-8") as fh:
+            fh.write("not a directory")
+        stub = ArmStub()
+        results, _ = run_import(stub, openapi_import.plan_files(files), state_dir=state_dir)
+        self.assertEqual([r["status"] for r in results], ["failed"] * 2)
+        self.assertTrue(all(r["error"].startswith("Imported, but cannot write import state") for r in results))
+        self.assertEqual(len(stub.apis), 2)
+
+
+class TestPlans(ImportTestCase):
+
+    def test_manifest(self):
+        manifest = os.path.join(self.tmp.name, "out", "api.manifest.json")
+        os.makedirs(os.path.dirname(manifest))
+        with open(manifest, "w", encoding="utf-8") as fh:
+            json.dump({"shards": [{"name": "users", "file": "api.users.json", "api_path": "users",
+                                   "display_name": "API (users)"}]}, fh)
+        self.assertEqual(openapi_import.plan_manifest(manifest, "sample-api", "/sample/"), [{
+            "api_id": "sample-api-users", "path": "sample/users",
+            "file": os.path.join(self.tmp.name, "out", "api.users.json"), "display_name": "API (users)",
+        }])
+        with self.assertRaises(ValueError):
+            openapi_import.plan_manifest(os.path.join(self.tmp.name, "missing.json"), "x")
+
+
+class TestImportCli(ImportTestCase):
+
+    def run_cli(self, stub: ArmStub, *argv: str) -> tuple:
+        """Run openapi_import.main() against stub served from another thread; returns (exit code, stdout)."""
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(stub.start())
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        started.wait()
+        stdout = io.StringIO()
+        code = 0
+        argv = ["openapi_import.py", "--endpoint", stub.url, "--subscription", "sub", "--resource-group", "rg",
+                "--service", "apim", "--backoff", "0", *argv]
+        try:
+            with mock.patch.object(sys, "argv", argv), mock.patch.dict(os.environ, {"AZURE_ACCESS_TOKEN": "stub-token"}), \
+                    contextlib.redirect_stdout(stdout):
+                try:
+                    openapi_import.main()
+                except SystemExit as exc:
+                    code = exc.code
+        finally:
+            asyncio.run_coroutine_threadsafe(stub.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        return code, stdout.getvalue()
+
+    def test_import_and_summary(self):
+        files = self.write_specs(3)
+        code, output = self.run_cli(ArmStub(throttle=1), "--concurrency", "2", *files)
+        self.assertEqual(code, 0, output)
+        self.assertIn("Importing 3 API(s) into apim, 2 at a time...", output)
+        self.assertIn("1 retry", output)
+        self.assertIn("3 imported, 0 skipped, 0 failed", output)
+
+        with mock.patch("sys.stderr"):
+            code, _ = self.run_cli(ArmStub(), "--manifest", os.path.join(self.tmp.name, "m.json"), "--api-id", "x")
+        self.assertEqual(code, 1)
+        code, output = self.run_cli(ArmStub(token="other"), files[0])
+        self.assertEqual(code, 1)
+        self.assertIn("0 imported, 0 skipped, 1 failed", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
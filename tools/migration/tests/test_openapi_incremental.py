@@ -0,0 +1,174 @@
+"""
+test_openapi_incremental.py
+
+Unit tests for openapi_incremental.py and the openapi_utils.py --incremental
+option: every incremental run must produce exactly what a full
+process_spec() run produces.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_incremental.py -v
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules and the benchmark spec generator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import openapi_incremental
+import openapi_utils as utils
+from specgen import generate_spec
+from test_openapi_utils import make_vendor_swagger2_spec, run_cli
+
+# YAML output also shows shared sub-objects (as anchors); fall back to JSON without PyYAML
+FORMAT = "yaml" if utils.HAS_YAML else "json"
+
+
+def render(spec: dict) -> str:
+    return utils.DEFAULT_SERIALIZER.dumps(spec, FORMAT)
+
+
+class TestProcessIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.state = os.path.join(self.tmp.name, "state.pickle")
+
+    def assert_matches_full_run(self, spec: dict, **options) -> dict:
+        """Run incrementally against self.state; compare with process_spec() and return the stats."""
+        original = copy.deepcopy(spec)
+        result, issues, stats = openapi_incremental.process_incremental(spec, self.state, **options)
+        expected, expected_issues = utils.process_spec(spec, **options)
+        self.assertEqual(render(result), render(expected))
+        self.assertEqual(issues, expected_issues)
+        self.assertEqual(spec, original)
+        return stats
+
+    def test_first_run_is_a_full_run(self):
+        stats = self.assert_matches_full_run(make_vendor_swagger2_spec())
+        self.assertEqual(stats, {"subtrees": 4, "reused": 0, "previous": False, "unchanged": False})
+        self.assertTrue(os.path.exists(self.state))
+
+    def test_unchanged_spec_reuses_everything(self):
+        self.assert_matches_full_run(make_vendor_swagger2_spec())
+        stats = self.assert_matches_full_run(make_vendor_swagger2_spec())
+        self.assertEqual(stats, {"subtrees": 4, "reused": 4, "previous": True, "unchanged": True})
+
+    def test_only_changed_subtrees_are_transformed(self):
+        self.assert_matches_full_run(make_vendor_swagger2_spec())
+        spec = make_vendor_swagger2_spec()
+        spec["paths"]["/pets"]["get"]["summary"] = "List pets"
+        spec["definitions"]["Owner"]["x-amazon-apigateway-note"] = "dropped, but still a change"
+        transformed = []
+        original = utils._transform_spec
+
+        def recording(partial, *args):
+            transformed.append((sorted(partial["paths"]), sorted(partial["definitions"])))
+            return original(partial, *args)
+
+        with mock.patch.object(utils, "_transform_spec", recording):
+            result, _, stats = openapi_incremental.process_incremental(spec, self.state)
+        self.assertEqual(transformed, [(["/pets"], ["Owner"])])
+        self.assertEqual(stats["reused"], 2)
+        self.assertEqual(render(result), render(utils.process_spec(spec)[0]))
+
+    def test_added_removed_and_reordered_members(self):
+        self.assert_matches_full_run(make_vendor_swagger2_spec())
+        spec = make_vendor_swagger2_spec()
+        pets = spec["paths"].pop("/pets")
+        spec["paths"]["/owners"] = {"get": {"responses": {"200": {"description": "OK"}}}}
+        spec["paths"]["/pets"] = pets
+        del spec["definitions"]["Pet"]
+        spec["definitions"]["Tag"] = {"type": "string"}
+        stats = self.assert_matches_full_run(spec)
+        self.assertEqual((stats["subtrees"], stats["reused"]), (5, 3))
+
+    def test_context_change_invalidates_every_subtree(self):
+        self.assert_matches_full_run(make_vendor_swagger2_spec())
+        spec = make_vendor_swagger2_spec()
+        spec["produces"] = ["application/json"]
+        stats = self.assert_matches_full_run(spec)
+        self.assertEqual((stats["previous"], stats["reused"]), (True, 0))
+
+    def test_options_outside_the_state_key_reuse_the_state(self):
+        # Stored subtrees predate operationId generation, so they serve runs without it
+        self.assert_matches_full_run(make_vendor_swagger2_spec())
+        stats = self.assert_matches_full_run(make_vendor_swagger2_spec(), generate_ids=False, max_id_length=20)
+        self.assertEqual(stats["reused"], 4)
+
+    def test_source_or_convert_change_discards_the_state(self):
+        self.assert_matches_full_run(make_vendor_swagger2_spec())
+        self.assertFalse(self.assert_matches_full_run(make_vendor_swagger2_spec(), source="google")["previous"])
+        self.assertFalse(self.assert_matches_full_run(make_vendor_swagger2_spec(), source="google", convert=False)["previous"])
+
+    def test_new_path_colliding_with_a_generated_id(self):
+        spec = {
+            "openapi": "3.0.0",
+            "info": {"title": "T", "version": "1"},
+            "paths": {"/users": {"get": {}}},
+        }
+        self.assert_matches_full_run(spec)
+        spec["paths"]["/other"] = {"get": {"operationId": "getUsers"}}
+        self.assert_matches_full_run(spec)
+
+    def test_generated_oas3_spec_with_edits(self):
+        spec = generate_spec("3.0", paths=60, definitions=30, depth=2, vendor="google", seed=3)
+        self.assert_matches_full_run(spec, source="google")
+        first_path = next(iter(spec["paths"]))
+        spec["paths"][first_path]["get"]["description"] = "edited"
+        first_schema = next(iter(spec["components"]["schemas"]))
+        spec["components"]["schemas"][first_schema] = {"type": "integer"}
+        stats = self.assert_matches_full_run(spec, source="google")
+        self.assertEqual(stats["reused"], stats["subtrees"] - 2)
+
+    def test_corrupt_state_falls_back_to_a_full_run(self):
+        with open(self.state, "wb") as fh:
+            fh.write(b"not a pickle")
+        self.assertFalse(self.assert_matches_full_run(make_vendor_swagger2_spec())["previous"])
+        self.assertTrue(self.assert_matches_full_run(make_vendor_swagger2_spec())["unchanged"])
+
+    def test_unwritable_state_raises(self):
+        with self.assertRaisesRegex(ValueError, "Cannot write file"):
+            openapi_incremental.process_incremental(
+                make_vendor_swagger2_spec(), os.path.join(self.tmp.name, "missing", "state.pickle")
+            )
+
+
+class TestIncrementalCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_file = os.path.join(self.tmp.name, "api.json")
+        self.state = os.path.join(self.tmp.name, "api.state")
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_output_is_byte_identical_to_a_full_run(self):
+        spec = make_vendor_swagger2_spec()
+        for run, summary in enumerate(("No usable state", "unchanged", "1 of 4 subtree(s) changed")):
+            if run == 2:
+                spec["paths"]["/pets/{petId}"]["get"]["summary"] = "Fetch"
+            utils.save_spec(spec, self.input_file)
+            full, incremental = (os.path.join(self.tmp.name, f"{name}{run}.yaml") for name in ("full", "inc"))
+            self.assertEqual(run_cli(self.input_file, full)[0], 0)
+            code, stdout = run_cli(self.input_file, incremental, "--incremental", self.state)
+            self.assertEqual(code, 0)
+            self.assertIn(summary, stdout)
+            self.assertEqual(self.read(incremental), self.read(full))
+
+    def test_rejected_in_batch_mode(self):
+        code, _ = run_cli("--batch", self.tmp.name, "--validate-only", "--incremental", self.state)
+        self.assertEqual(code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
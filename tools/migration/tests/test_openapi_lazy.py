@@ -0,0 +1,221 @@
+"""
+test_openapi_lazy.py
+
+Unit tests for openapi_lazy.py: the memory-mapped view must read like the
+dict load_spec() returns, report the same syntax errors, and let
+validate_apim_requirements() run without decoding any schema.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_lazy.py -v
+"""
+
+import io
+import os
+import sys
+import json
+import tempfile
+import tracemalloc
+import contextlib
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules and the benchmark spec generator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import openapi_lazy
+import openapi_utils as utils
+from specgen import generate_spec
+from test_openapi_utils import make_oas3_spec
+
+# Window sizes that cut members, keys and multi-byte characters at every position, plus the default
+WINDOW_SIZES = (1, 5, 64, openapi_lazy.WINDOW_SIZE)
+
+
+def materialize(value):
+    """Turn a lazy view into plain dicts and lists."""
+    if isinstance(value, openapi_lazy.LazyObject):
+        return {key: materialize(value[key]) for key in value}
+    return value
+
+
+class LazyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, content, name: str = "api.json") -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, indent=2))
+        return path
+
+    def open_each_window(self, path: str):
+        """Yield the spec opened with every window size in WINDOW_SIZES."""
+        for size in WINDOW_SIZES:
+            with self.subTest(window=size), mock.patch.object(openapi_lazy, "WINDOW_SIZE", size):
+                with openapi_lazy.open_lazy_spec(path) as spec:
+                    yield spec
+
+
+class TestLazyJsonSpec(LazyTestCase):
+
+    def test_reads_like_load_spec(self):
+        for version in ("2.0", "3.0"):
+            path = self.write(generate_spec(version, paths=12, definitions=6, depth=3, vendor="aws", seed=4))
+            for spec in self.open_each_window(path):
+                self.assertEqual(materialize(spec), utils._read_spec(path))
+
+    def test_non_ascii_escapes_and_duplicates(self):
+        content = (
+            '{"info": {"title": "Café ☕ \\u00e9 😀", "version": "1"}, "paths": {"/é/{id}": {"get": {}},'
+            ' "/x": {"get": {"operationId": "a"}}, "/x": {"put": {}}}, "n": [1.5e3, -0, null, true],'
+            ' "s": "\\"}{][\\\\", "components": {"schemas": {"Ünïcode": {"type": "string"}}}}'
+        )
+        path = self.write(content)
+        for spec in self.open_each_window(path):
+            self.assertEqual(materialize(spec), json.loads(content))
+            self.assertEqual(list(spec["paths"]), ["/é/{id}", "/x"])
+
+    def test_numbers_split_at_the_window_edge(self):
+        # '{"a": 2.' fills an 8-byte window; 2 alone would be a valid number
+        path = self.write('{"a": 2.5}')
+        with mock.patch.object(openapi_lazy, "WINDOW_SIZE", 8), openapi_lazy.open_lazy_spec(path) as spec:
+            self.assertEqual(spec["a"], 2.5)
+        for content in ('{"a": 1e5}', '{"a": -3}', '{"a": 12.5e-3}', '{"ab": true}'):
+            path = self.write(content)
+            for size in range(1, len(content) + 1):
+                with self.subTest(content=content, window=size), mock.patch.object(openapi_lazy, "WINDOW_SIZE", size):
+                    with openapi_lazy.open_lazy_spec(path) as spec:
+                        self.assertEqual(dict(spec), json.loads(content))
+
+        # A float straddling the default window just after its '.'
+        padding = openapi_lazy.WINDOW_SIZE - len('{"pad": "", "n": 3.')
+        path = self.write('{"pad": "' + "x" * padding + '", "n": 3.25e+2}')
+        with openapi_lazy.open_lazy_spec(path) as spec:
+            self.assertEqual(spec["n"], 325.0)
+
+    def test_indexed_containers_and_raw_access(self):
+        path = self.write(make_oas3_spec(
+            paths={"/a": {"get": {}}, "/b": {"post": {}}},
+            components={"schemas": {"A": {"type": "object"}}, "securitySchemes": {"key": {"type": "apiKey"}}},
+        ))
+        with openapi_lazy.open_lazy_spec(path) as spec:
+            self.assertIsInstance(spec["paths"], openapi_lazy.LazyObject)
+            self.assertIsInstance(spec["components"]["schemas"], openapi_lazy.LazyObject)
+            self.assertIsInstance(spec["components"]["securitySchemes"], dict)
+            self.assertIsInstance(spec["info"], dict)
+            self.assertIs(spec["paths"]["/a"], spec["paths"]["/a"])
+            self.assertEqual(json.loads(spec["paths"].raw("/b")), {"post": {}})
+            self.assertEqual(spec["paths"].to_dict(), {"/a": {"get": {}}, "/b": {"post": {}}})
+            self.assertEqual(len(spec["paths"]), 2)
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        path = self.write('{"paths": {"/a": ' + "[" * depth + "]" * depth + '}, "info": {}}')
+        with openapi_lazy.open_lazy_spec(path) as spec:
+            self.assertEqual(list(spec["paths"]), ["/a"])
+            self.assertEqual(spec["info"], {})
+
+    def test_syntax_errors_match_load_spec(self):
+        for content in (
+            "", "{", '{"a" 1}', '{"a": 1,}', '{"a": 1 "b": 2}', '{"a": 1} x', "{1: 2}",
+            '{"paths": {"/a": {"get": }}}', '{"paths": {"/a": {}, }}', '{"info": "open',
+            '{"s": "é", "t": [1, 2,, 3]}', "﻿{}",
+        ):
+            path = self.write(content)
+            with self.assertRaises(ValueError) as expected:
+                utils._read_spec(path)
+            for size in WINDOW_SIZES:
+                with self.subTest(content=content, window=size), mock.patch.object(openapi_lazy, "WINDOW_SIZE", size):
+                    with self.assertRaises(ValueError) as raised:
+                        openapi_lazy.open_lazy_spec(path)
+                    self.assertEqual(str(raised.exception), str(expected.exception))
+
+    def test_rejected_inputs(self):
+        with self.assertRaisesRegex(ValueError, "Expecting a JSON object"):
+            openapi_lazy.open_lazy_spec(self.write("[]"))
+        with self.assertRaisesRegex(ValueError, "uncompressed .json"):
+            openapi_lazy.open_lazy_spec(self.write("openapi: 3.0.0\n", "api.yaml"))
+        with self.assertRaisesRegex(ValueError, "Cannot read file"):
+            openapi_lazy.open_lazy_spec(os.path.join(self.tmp.name, "missing.json"))
+
+
+class TestLazyValidation(LazyTestCase):
+
+    def test_issues_match_a_full_load(self):
+        specs = [
+            generate_spec("2.0", paths=20, definitions=10, depth=2, vendor="aws", seed=2),
+            generate_spec("3.0", paths=20, definitions=10, depth=2, vendor="google", seed=3),
+            make_oas3_spec(
+                info={"title": "T"},
+                servers=[{"description": "no url"}],
+                paths={"/a": {"get": {"operationId": "dup"}}, "/b": {"get": {"operationId": "dup"}}},
+                components={"securitySchemes": {"mtls": {"type": "mutualTLS"}}},
+            ),
+        ]
+        for spec in specs:
+            path = self.write(spec)
+            with openapi_lazy.open_lazy_spec(path) as lazy:
+                self.assertEqual(utils.validate_apim_requirements(lazy), utils.validate_apim_requirements(spec))
+
+    def test_schemas_are_never_parsed(self):
+        spec = generate_spec("3.0", paths=10, definitions=20, depth=3, vendor="aws", seed=6)
+        path = self.write(spec)
+        with openapi_lazy.open_lazy_spec(path) as lazy:
+            schema_starts = {start for start, _ in lazy["components"]["schemas"].index.values()}
+            with mock.patch.object(lazy, "parse", wraps=lazy.parse) as parse:
+                utils.validate_apim_requirements(lazy)
+                openapi_lazy.inventory(lazy)
+            parsed = {call.args[0] for call in parse.call_args_list}
+        self.assertTrue(parsed)
+        self.assertFalse(parsed & schema_starts)
+
+    def test_header_reads_stay_far_below_file_size(self):
+        spec = generate_spec("3.0", paths=300, definitions=300, depth=4, vendor="aws", seed=8)
+        path = self.write(spec)
+        with mock.patch.object(openapi_lazy, "WINDOW_SIZE", 16 * 1024):
+            tracemalloc.start()
+            try:
+                with openapi_lazy.open_lazy_spec(path) as lazy:
+                    self.assertEqual(lazy["info"], spec["info"])
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peak, os.path.getsize(path) // 4)
+
+
+class TestLazyCli(LazyTestCase):
+
+    def run_main(self, *files: str) -> tuple:
+        stdout = io.StringIO()
+        code = 0
+        with mock.patch.object(sys, "argv", ["openapi_lazy.py", *files]), contextlib.redirect_stdout(stdout):
+            try:
+                openapi_lazy.main()
+            except SystemExit as exc:
+                code = exc.code
+        return code, stdout.getvalue()
+
+    def test_inventory_lines(self):
+        good = self.write(make_oas3_spec(
+            paths={"/a": {"get": {}, "post": {}}},
+            components={"securitySchemes": {"key": {"type": "apiKey"}}},
+        ), "good.json")
+        code, output = self.run_main(good)
+        self.assertEqual(code, 0)
+        self.assertIn(f"{good}: 'Test API' '1.0.0' (openapi 3.0.0)", output)
+        self.assertIn("1 path(s), 2 operation(s), security: key", output)
+
+    def test_errors_set_the_exit_code(self):
+        broken = self.write("{", "broken.json")
+        untitled = self.write(make_oas3_spec(info={"version": "1"}), "untitled.json")
+        code, output = self.run_main(broken, untitled)
+        self.assertEqual(code, 1)
+        self.assertIn("Invalid JSON", output)
+        self.assertIn("info.title", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,281 @@
+"""
+test_openapi_merge.py
+
+Unit tests for openapi_merge.py and the openapi_utils.py --merge option:
+paths, components, tags and operationIds of several specs are merged,
+colliding names are failed, prefixed or renamed with their references,
+and inputs are processed one at a time.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_merge.py -v
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_merge
+import openapi_utils as utils
+from test_openapi_utils import json_response, make_oas3_spec, make_swagger2_spec, run_cli, schema_ref
+
+
+def orders_spec() -> dict:
+    return make_oas3_spec(
+        info={"title": "Orders", "version": "1.0"},
+        servers=[{"url": "https://orders.example.com"}],
+        tags=[{"name": "orders"}, {"name": "shared", "description": "first"}],
+        paths={
+            "/orders": {"get": {"operationId": "list", "responses": json_response(schema_ref("Order"))}},
+            "/health": {"get": {"operationId": "ordersHealth", "responses": {"200": {"description": "OK"}}}},
+        },
+        components={"schemas": {
+            "Order": {"type": "object", "properties": {"customer": schema_ref("Customer")}},
+            "Customer": {"type": "object", "properties": {"name": {"type": "string"}}},
+            "Error": {"type": "object", "properties": {"message": {"type": "string"}}},
+        }},
+    )
+
+
+def customers_spec() -> dict:
+    return make_oas3_spec(
+        info={"title": "Customers", "version": "2.0"},
+        servers=[{"url": "https://orders.example.com"}],
+        tags=[{"name": "customers"}, {"name": "shared", "description": "second"}],
+        paths={
+            "/customers": {"get": {"operationId": "list", "responses": json_response(schema_ref("Page"))}},
+            "/health": {"head": {"operationId": "customersHealth", "responses": {"200": {"description": "OK"}}}},
+        },
+        components={
+            "schemas": {
+                # Same name, different content: a conflict
+                "Customer": {"type": "object", "properties": {"id": {"type": "integer"}}},
+                # Same content as in orders_spec: shared
+                "Error": {"type": "object", "properties": {"message": {"type": "string"}}},
+                # Same content as Order in orders_spec, but its Customer is renamed: a conflict too
+                "Order": {"type": "object", "properties": {"customer": schema_ref("Customer")}},
+                "Page": {
+                    "type": "object",
+                    "properties": {"items": {"type": "array", "items": schema_ref("Customer")}},
+                    "discriminator": {"propertyName": "kind", "mapping": {
+                        "c": "Customer", "o": "#/components/schemas/Order", "e": "Error",
+                    }},
+                },
+            },
+            "links": {"Self": {"operationId": "list"}},
+        },
+    )
+
+
+class TestMergeSpecs(unittest.TestCase):
+
+    def test_disjoint_and_shared_parts(self):
+        customers = customers_spec()
+        del customers["components"]["schemas"]["Customer"], customers["components"]["schemas"]["Order"]
+        customers["paths"]["/customers"]["get"]["operationId"] = "listCustomers"
+        del customers["components"]["links"]
+        inputs = [("orders", orders_spec()), ("customers", customers)]
+        originals = copy.deepcopy(inputs)
+        merged, report = openapi_merge.merge_specs(inputs)
+        self.assertEqual(inputs, originals)
+        self.assertEqual(merged["info"], {"title": "Orders", "version": "1.0"})
+        self.assertEqual(list(merged["paths"]), ["/orders", "/health", "/customers"])
+        self.assertEqual(list(merged["paths"]["/health"]), ["get", "head"])
+        self.assertEqual(merged["tags"], [{"name": "orders"}, {"name": "shared", "description": "first"},
+                                          {"name": "customers"}])
+        self.assertEqual(list(merged["components"]["schemas"]), ["Order", "Customer", "Error", "Page"])
+        self.assertEqual(report, {"specs": 2, "paths": 3, "operations": 4, "components": 4, "shared": 1, "renamed": []})
+        self.assertIs(merged["paths"]["/orders"], inputs[0][1]["paths"]["/orders"])
+
+    def test_fail_policy(self):
+        with self.assertRaisesRegex(ValueError, "'components/schemas/Customer' is defined differently by 'orders' and 'customers'"):
+            openapi_merge.merge_specs([("orders", orders_spec()), ("customers", customers_spec())])
+        with self.assertRaisesRegex(ValueError, "Unknown conflict policy"):
+            openapi_merge.SpecMerger("skip")
+
+    def test_prefix_and_rename_policies(self):
+        for policy, customer, order, list_id in (
+            ("prefix", "customers_Customer", "customers_Order", "customers_list"),
+            ("rename", "Customer_2", "Order_2", "list_2"),
+        ):
+            with self.subTest(policy):
+                merged, report = openapi_merge.merge_specs(
+                    [("orders", orders_spec()), ("customers", customers_spec())], policy
+                )
+                schemas = merged["components"]["schemas"]
+                self.assertEqual(list(schemas), ["Order", "Customer", "Error", customer, order, "Page"])
+                self.assertEqual(schemas["Order"]["properties"]["customer"], schema_ref("Customer"))
+                self.assertEqual(schemas[order]["properties"]["customer"], schema_ref(customer))
+                self.assertEqual(schemas["Page"]["properties"]["items"]["items"], schema_ref(customer))
+                self.assertEqual(schemas["Page"]["discriminator"]["mapping"],
+                                 {"c": customer, "o": f"#/components/schemas/{order}", "e": "Error"})
+                self.assertEqual(merged["paths"]["/customers"]["get"]["operationId"], list_id)
+                self.assertEqual(merged["components"]["links"]["Self"], {"operationId": list_id})
+                self.assertEqual([new for _, _, new in report["renamed"]],
+                                 [f"components/schemas/{customer}", f"components/schemas/{order}", list_id])
+                self.assertIn("customers: components/schemas/Customer renamed to", openapi_merge.describe(report))
+
+    def test_properties_named_like_example_keywords_are_renamed(self):
+        customers = customers_spec()
+        literal = {"value": schema_ref("Customer")}
+        customers["components"]["schemas"]["Page"]["properties"].update(
+            {"example": schema_ref("Customer"), "x-example": {"type": "array", "items": schema_ref("Customer")}}
+        )
+        customers["components"]["schemas"]["Page"]["example"] = literal
+        merged, _ = openapi_merge.merge_specs([("orders", orders_spec()), ("customers", customers)], "prefix")
+        page = merged["components"]["schemas"]["Page"]
+        self.assertEqual(page["properties"]["example"], schema_ref("customers_Customer"))
+        self.assertEqual(page["properties"]["x-example"]["items"], schema_ref("customers_Customer"))
+        # The example keyword itself is copied as it is
+        self.assertEqual(page["example"], literal)
+
+    def test_security_schemes_are_renamed_in_requirements(self):
+        def spec(scheme: dict, path: str) -> dict:
+            return make_oas3_spec(
+                security=[{"auth": []}],
+                paths={path: {"get": {"responses": {"200": {"description": "OK"}}},
+                              "post": {"security": [{"auth": ["write"]}], "responses": {"200": {"description": "OK"}}}}},
+                components={"securitySchemes": {"auth": scheme}},
+            )
+        key = {"type": "apiKey", "name": "k", "in": "header"}
+        oauth = {"type": "oauth2", "flows": {}}
+        merged, _ = openapi_merge.merge_specs([("a", spec(key, "/a")), ("b", spec(oauth, "/b"))], "prefix")
+        self.assertEqual(merged["security"], [{"auth": []}])
+        self.assertEqual(merged["components"]["securitySchemes"], {"auth": key, "b_auth": oauth})
+        self.assertNotIn("security", merged["paths"]["/a"]["get"])
+        self.assertEqual(merged["paths"]["/b"]["get"]["security"], [{"b_auth": []}])
+        self.assertEqual(merged["paths"]["/b"]["post"]["security"], [{"b_auth": ["write"]}])
+
+    def test_servers_and_path_level_members_stay_with_their_operations(self):
+        first = make_oas3_spec(
+            servers=[{"url": "https://one"}],
+            paths={"/items/{id}": {
+                "parameters": [{"name": "id", "in": "path", "required": True}],
+                "get": {"responses": {"200": {"description": "OK"}}},
+            }},
+        )
+        second = make_oas3_spec(
+            servers=[{"url": "https://two"}],
+            paths={
+                "/items/{id}": {"delete": {"responses": {"204": {"description": "Gone"}}}},
+                "/other": {"servers": [{"url": "https://three"}], "get": {"responses": {"200": {"description": "OK"}}}},
+            },
+        )
+        merged, _ = openapi_merge.merge_specs([("one", first), ("two", second)])
+        self.assertEqual(merged["servers"], [{"url": "https://one"}])
+        item = merged["paths"]["/items/{id}"]
+        self.assertNotIn("parameters", item)
+        self.assertEqual(item["get"]["parameters"], first["paths"]["/items/{id}"]["parameters"])
+        self.assertNotIn("parameters", item["delete"])
+        self.assertNotIn("servers", item["get"])
+        self.assertEqual(item["delete"]["servers"], [{"url": "https://two"}])
+        self.assertNotIn("servers", merged["paths"]["/other"]["get"])
+
+    def test_unmergeable_inputs(self):
+        same_operation = make_oas3_spec(paths={"/a": {"get": {}}})
+        cases = {
+            "same operation": ([same_operation, copy.deepcopy(same_operation)], "GET /a is defined by both 'x0' and 'x1'"),
+            "swagger 2.0": ([make_swagger2_spec()], "not an OpenAPI 3.x document"),
+            "minor version": ([make_oas3_spec(), dict(make_oas3_spec(), openapi="3.1.0")], "Cannot merge OpenAPI 3.1.0"),
+            "nothing": ([], "No specs to merge"),
+        }
+        for label, (specs, message) in cases.items():
+            with self.subTest(label):
+                with self.assertRaisesRegex(ValueError, message):
+                    openapi_merge.merge_specs([(f"x{i}", spec) for i, spec in enumerate(specs)], "rename")
+
+    def test_service_names(self):
+        self.assertEqual(openapi_merge.service_name(os.path.join("orders", "api.yaml")), "orders_api")
+        self.assertEqual(openapi_merge.service_name("users.json.gz"), "users")
+        self.assertEqual(openapi_merge.service_name("my service.yml"), "my_service")
+
+
+class TestMergeFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, spec: dict) -> str:
+        path = os.path.join(self.tmp.name, "specs", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        utils.save_spec(spec, path)
+        return path
+
+    def test_swagger2_inputs_are_cleaned_and_converted(self):
+        self.write("legacy.json", make_swagger2_spec(paths={"/legacy": {"get": {
+            "x-amazon-apigateway-integration": {"type": "http"},
+            "responses": {"200": {"description": "OK", "schema": {"$ref": "#/definitions/Item"}}},
+        }}}, definitions={"Item": {"type": "object"}}))
+        self.write("modern.json", make_oas3_spec(paths={"/modern": {"get": {"responses": json_response(schema_ref("Item"))}}},
+                                                 components={"schemas": {"Item": {"type": "object"}}}))
+        inputs = utils.expand_batch_inputs([os.path.join(self.tmp.name, "specs")])
+        merged, report = openapi_merge.merge_files(inputs)
+        self.assertEqual(report["shared"], 1)
+        self.assertEqual(merged["openapi"], "3.0.0")
+        self.assertNotIn("x-amazon-apigateway-integration", merged["paths"]["/legacy"]["get"])
+        self.assertEqual(merged["paths"]["/legacy"]["get"]["responses"], json_response(schema_ref("Item")))
+
+    def test_memory_does_not_grow_with_the_inputs(self):
+        # Each input carries a large vendor extension blob that the merge drops
+        blob = {"x-amazon-apigateway-integration": {"requestTemplates": {f"t{i}": "x" * 200 for i in range(2000)}}}
+
+        def peak(count: int) -> int:
+            for i in range(count):
+                self.write(f"s{count}/svc{i}.json", make_oas3_spec(paths={f"/svc{i}": {"get": dict(blob)}}))
+            inputs = utils.expand_batch_inputs([os.path.join(self.tmp.name, "specs", f"s{count}")])
+            tracemalloc.start()
+            try:
+                merged, _ = openapi_merge.merge_files(inputs)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                self.assertEqual(len(merged["paths"]), count)
+
+        single, many = peak(1), peak(8)
+        self.assertLess(many, single * 2, f"8 inputs peaked at {many:,} bytes, 1 input at {single:,}")
+
+
+class TestMergeCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.specs = os.path.join(self.tmp.name, "specs")
+        os.makedirs(self.specs)
+        utils.save_spec(orders_spec(), os.path.join(self.specs, "orders.json"))
+        utils.save_spec(customers_spec(), os.path.join(self.specs, "customers.json"))
+        self.output_file = os.path.join(self.tmp.name, "merged.json")
+
+    def test_merge_and_process(self):
+        code, output = run_cli("--merge", self.specs, self.output_file, "--on-conflict", "prefix")
+        self.assertEqual(code, 0, output)
+        self.assertIn("[merge] 2 spec(s) merged: 3 path(s), 4 operation(s), 7 component(s)", output)
+        merged = utils.load_spec(self.output_file)
+        # customers.json sorts first, so orders.json is the one renamed
+        self.assertEqual(list(merged["components"]["schemas"]),
+                         ["Customer", "Error", "Order", "Page", "orders_Order", "orders_Customer"])
+        self.assertEqual(merged["paths"]["/orders"]["get"]["operationId"], "orders_list")
+
+    def test_conflict_exits(self):
+        with mock.patch("sys.stderr"):
+            code, _ = run_cli("--merge", self.specs, self.output_file)
+        self.assertEqual(code, 1)
+        self.assertFalse(os.path.exists(self.output_file))
+
+    def test_rejected_combinations(self):
+        for extra in (["--batch", self.specs], ["--no-convert"], [self.output_file], ["--cache-dir", self.tmp.name]):
+            with self.subTest(extra=extra):
+                code, _ = run_cli("--merge", self.specs, self.output_file, *extra)
+                self.assertEqual(code, 2)
+        self.assertEqual(run_cli("--merge", self.specs)[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+test_openapi_metrics.py
+
+Unit tests for openapi_metrics.py and the openapi_utils.py --profile /
+--metrics-json / --profile-dir options.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_metrics.py -v
+"""
+
+import os
+import sys
+import json
+import pstats
+import tempfile
+import unittest
+import tracemalloc
+
+# Allow importing the migration modules from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_metrics
+import openapi_utils as utils
+from test_openapi_utils import make_vendor_swagger2_spec, run_cli
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def test_stage_records_time_memory_and_counters(self):
+        metrics = openapi_metrics.RunMetrics("spec.yaml")
+        try:
+            with metrics.stage("load") as counters:
+                blob = [bytes(1024) for _ in range(256)]
+                counters["bytes_read"] = 10
+            metrics.add("load", bytes_read=5)
+        finally:
+            metrics.close()
+        self.assertFalse(tracemalloc.is_tracing())
+        load = metrics.to_dict()["stages"]["load"]
+        self.assertGreater(load["wall_s"], 0)
+        self.assertGreaterEqual(load["cpu_s"], 0)
+        self.assertGreaterEqual(load["peak_bytes"], 256 * 1024)
+        self.assertEqual(load["bytes_read"], 15)
+        del blob
+
+    def test_count_nodes(self):
+        shared = {"a": 1}
+        self.assertEqual(openapi_metrics.count_nodes({"x": [1, 2], "y": shared, "z": shared}), 8)
+
+    def test_process_spec_stages_and_unchanged_result(self):
+        metrics = openapi_metrics.RunMetrics("spec")
+        try:
+            result = utils.process_spec(make_vendor_swagger2_spec(), metrics=metrics)
+        finally:
+            metrics.close()
+        self.assertEqual(result, utils.process_spec(make_vendor_swagger2_spec()))
+        stages = metrics.to_dict()["stages"]
+        self.assertEqual(list(stages), ["transform", "operation_ids", "validate"])
+        self.assertEqual(stages["transform"]["nodes"], openapi_metrics.count_nodes(make_vendor_swagger2_spec()))
+        self.assertEqual(stages["validate"]["operations"], len(utils.OperationIndex(result[0])))
+        self.assertEqual(stages["validate"]["issues"], len(result[1]))
+
+    def test_aggregate_sums_and_takes_peak_maximum(self):
+        runs = [
+            {"input": "a", "cached": False,
+             "stages": {"save": {"wall_s": 1.0, "cpu_s": 0.5, "peak_bytes": 10, "bytes_written": 3}}},
+            {"input": "b", "cached": False,
+             "stages": {"save": {"wall_s": 2.0, "cpu_s": 1.5, "peak_bytes": 30, "bytes_written": 4}}},
+            {"input": "c", "cached": True, "stages": {}},
+        ]
+        report = openapi_metrics.aggregate(runs)
+        self.assertEqual((report["files"], report["cached"]), (3, 1))
+        self.assertEqual(
+            report["stages"]["save"],
+            {"runs": 2, "wall_s": 3.0, "cpu_s": 2.0, "peak_bytes": 30, "bytes_written": 7},
+        )
+        self.assertIn("7 written", openapi_metrics.format_report(report))
+
+
+class TestMetricsCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, "src")
+        os.makedirs(self.src)
+        for name in ("a.json", "b.yaml"):
+            utils.save_spec(make_vendor_swagger2_spec(), os.path.join(self.src, name))
+
+    def load_json(self, path: str) -> dict:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def test_single_file_profile_and_metrics_json(self):
+        input_file = os.path.join(self.src, "a.json")
+        output_file = os.path.join(self.tmp.name, "out.yaml")
+        metrics_file = os.path.join(self.tmp.name, "metrics.json")
+        profile_dir = os.path.join(self.tmp.name, "prof")
+        code, output = run_cli(
+            input_file, output_file, "--profile", "--metrics-json", metrics_file, "--profile-dir", profile_dir
+        )
+        self.assertEqual(code, 0, output)
+        self.assertIn("Profile (1 file(s), 0 from cache):", output)
+        report = self.load_json(metrics_file)
+        self.assertEqual(list(report["stages"]), list(openapi_metrics.STAGES))
+        self.assertEqual(report["stages"]["load"]["bytes_read"], os.path.getsize(input_file))
+        self.assertEqual(report["stages"]["save"]["bytes_written"], os.path.getsize(output_file))
+        prof_files = sorted(os.listdir(profile_dir))
+        self.assertEqual(len(prof_files), len(openapi_metrics.STAGES))
+        pstats.Stats(os.path.join(profile_dir, prof_files[0]))
+
+    def test_batch_report_is_aggregated_and_counts_cache_hits(self):
+        out_dir = os.path.join(self.tmp.name, "out")
+        metrics_file = os.path.join(self.tmp.name, "metrics.json")
+        args = ("--batch", self.src, "--output-dir", out_dir, "--metrics-json", metrics_file, "--jobs", "2")
+        cache_args = ("--cache-dir", os.path.join(self.tmp.name, "cache"))
+
+        code, output = run_cli(*args, *cache_args)
+        self.assertEqual(code, 0, output)
+        report = self.load_json(metrics_file)
+        self.assertEqual((report["files"], report["cached"]), (2, 0))
+        self.assertEqual(report["stages"]["load"]["runs"], 2)
+        self.assertEqual(
+            report["stages"]["load"]["bytes_read"],
+            sum(os.path.getsize(os.path.join(self.src, name)) for name in ("a.json", "b.yaml")),
+        )
+        self.assertEqual(sorted(run["input"] for run in report["runs"]), sorted(
+            os.path.join(self.src, name) for name in ("a.json", "b.yaml")
+        ))
+
+        code, output = run_cli(*args, *cache_args)
+        self.assertEqual(code, 0, output)
+        report = self.load_json(metrics_file)
+        self.assertEqual((report["files"], report["cached"]), (2, 2))
+        self.assertEqual(report["stages"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+"""
+test_openapi_prune.py
+
+Unit tests for openapi_prune.py and the openapi_utils.py --prune-unused
+option: only components reachable from the operations survive, cycles and
+deep reference chains are handled, and the removed size is reported.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_prune.py -v
+"""
+
+import os
+import sys
+import copy
+import json
+import tempfile
+import unittest
+
+# Allow importing the migration modules and the benchmark spec generator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import openapi_prune
+import openapi_utils as utils
+from specgen import generate_spec
+from test_openapi_utils import json_response, make_oas3_spec, make_swagger2_spec, make_vendor_swagger2_spec, run_cli, schema_ref
+
+
+def compact_size(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def local_refs(node) -> list:
+    """Every local $ref string in node."""
+    refs = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get("$ref"), str) and node["$ref"].startswith("#/"):
+                refs.append(node["$ref"])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return refs
+
+
+def resolve(spec: dict, ref: str):
+    node = spec
+    for token in ref[2:].split("/"):
+        node = node[token.replace("~1", "/").replace("~0", "~")]
+    return node
+
+
+class TestPruneComponents(unittest.TestCase):
+
+    def test_keeps_transitive_refs_and_survives_cycles(self):
+        spec = make_oas3_spec(
+            paths={"/pets": {"get": {"responses": json_response(schema_ref("Pet"))}}},
+            components={"schemas": {
+                "Pet": {"type": "object", "properties": {"owner": schema_ref("Owner")}},
+                "Owner": {"type": "object", "properties": {"pets": {"type": "array", "items": schema_ref("Pet")}}},
+                "Orphan": {"type": "object", "properties": {"self": schema_ref("Orphan")}},
+                "UsedByOrphan": {"type": "string"},
+            }},
+        )
+        spec["components"]["schemas"]["Orphan"]["properties"]["other"] = schema_ref("UsedByOrphan")
+        original = copy.deepcopy(spec)
+        pruned, report = openapi_prune.prune_components(spec)
+        self.assertEqual(spec, original)
+        self.assertEqual(list(pruned["components"]["schemas"]), ["Pet", "Owner"])
+        self.assertEqual(report["removed"], {"components/schemas": ["Orphan", "UsedByOrphan"]})
+        self.assertEqual(report["components_removed"], 2)
+        removed = {name: original["components"]["schemas"][name] for name in ("Orphan", "UsedByOrphan")}
+        self.assertEqual(report["bytes_removed"], compact_size(removed))
+
+    def test_every_component_type_and_reference_kind(self):
+        spec = make_oas3_spec(
+            security=[{"global_key": []}],
+            paths={"/a/{id}": {
+                "parameters": [{"$ref": "#/components/parameters/Id"}],
+                "post": {
+                    "security": [{"oauth": ["read"]}],
+                    "requestBody": {"$ref": "#/components/requestBodies/Body"},
+                    "responses": {"200": {"$ref": "#/components/responses/Ok"}},
+                    "callbacks": {"hook": {"$ref": "#/components/callbacks/Hook"}},
+                },
+            }},
+            components={
+                "schemas": {
+                    "Base": {"discriminator": {"propertyName": "kind", "mapping": {
+                        "cat": "Cat", "dog": "#/components/schemas/Dog", "ext": "other.yaml#/Ext",
+                    }}},
+                    "Cat": {"type": "object"}, "Dog": {"type": "object"}, "Ext": {},
+                    "a/b": {"type": "object", "properties": {"x": {"type": "string"}}},
+                    "with space": {"type": "string"},
+                    "Unused": {"type": "integer"},
+                },
+                "parameters": {"Id": {"name": "id", "in": "path", "required": True}, "Spare": {"name": "q", "in": "query"}},
+                "requestBodies": {"Body": {"content": {"application/json": {"schema": schema_ref("Base")}}}},
+                "responses": {
+                    "Ok": {"description": "OK", "headers": {"X-Rate": {"$ref": "#/components/headers/Rate"}},
+                           "content": {"application/json": {"schema": {
+                               "$ref": "#/components/schemas/a~1b/properties/x"}}},
+                           "links": {"next": {"$ref": "#/components/links/Next"}}},
+                    "Gone": {"description": "gone"},
+                },
+                "headers": {"Rate": {"schema": {"$ref": "#/components/schemas/with%20space"}}},
+                "links": {"Next": {"operationId": "x"}, "Prev": {"operationId": "y"}},
+                "callbacks": {"Hook": {"{$request.body#/url}": {"post": {"responses": {"200": {"description": "ok"}}}}}},
+                "examples": {"Sample": {"value": 1}},
+                "securitySchemes": {
+                    "global_key": {"type": "apiKey", "name": "k", "in": "header"},
+                    "oauth": {"type": "oauth2", "flows": {}},
+                    "unused_key": {"type": "apiKey", "name": "u", "in": "query"},
+                },
+                "x-internal": {"note": schema_ref("Unused")},
+            },
+        )
+        pruned, report = openapi_prune.prune_components(spec)
+        self.assertEqual(report["removed"], {
+            "components/schemas": ["Ext"],
+            "components/parameters": ["Spare"],
+            "components/responses": ["Gone"],
+            "components/links": ["Prev"],
+            "components/examples": ["Sample"],
+            "components/securitySchemes": ["unused_key"],
+        })
+        self.assertNotIn("examples", pruned["components"])
+        self.assertIn("Unused", pruned["components"]["schemas"])
+        self.assertEqual(pruned["components"]["x-internal"], spec["components"]["x-internal"])
+
+    def test_swagger2_containers(self):
+        spec = make_swagger2_spec(
+            paths={"/a": {"get": {
+                "parameters": [{"$ref": "#/parameters/Limit"}],
+                "responses": {"200": {"$ref": "#/responses/Ok"}},
+                "security": [{"key": []}],
+            }}},
+            definitions={"Item": {"type": "object"}, "Unused": {"type": "object"}},
+            parameters={"Limit": {"name": "limit", "in": "query", "type": "integer"}, "Offset": {"name": "o", "in": "query"}},
+            responses={"Ok": {"description": "OK", "schema": {"$ref": "#/definitions/Item"}}},
+            securityDefinitions={"key": {"type": "apiKey", "name": "k", "in": "header"}, "basic": {"type": "basic"}},
+        )
+        pruned, report = openapi_prune.prune_components(spec)
+        self.assertEqual(report["removed"], {
+            "definitions": ["Unused"], "parameters": ["Offset"], "securityDefinitions": ["basic"],
+        })
+        self.assertEqual(pruned["responses"], spec["responses"])
+
+    def test_nothing_to_remove_returns_the_spec(self):
+        spec = make_oas3_spec(
+            paths={"/a": {"get": {"responses": json_response(schema_ref("A"))}}},
+            components={"schemas": {"A": {"type": "string"}}},
+        )
+        pruned, report = openapi_prune.prune_components(spec)
+        self.assertIs(pruned, spec)
+        self.assertEqual(report, {"removed": {}, "components_removed": 0, "bytes_removed": 0})
+        self.assertEqual(openapi_prune.describe(report), "[prune] No unreferenced components.")
+
+    def test_emptied_maps_are_dropped(self):
+        spec = make_oas3_spec(components={"schemas": {"A": {}}, "parameters": {"P": {"name": "p", "in": "query"}}})
+        pruned, report = openapi_prune.prune_components(spec)
+        self.assertNotIn("components", pruned)
+        self.assertEqual(report["components_removed"], 2)
+        self.assertIn("[prune] Removed 2 unreferenced component(s)", openapi_prune.describe(report))
+
+    def test_long_reference_chain(self):
+        length = sys.getrecursionlimit() * 2
+        schemas = {f"S{i}": {"type": "object", "properties": {"next": schema_ref(f"S{i + 1}")}} for i in range(length)}
+        schemas[f"S{length}"] = {"type": "string"}
+        schemas["Dangling"] = {"type": "object", "properties": {"next": schema_ref("S0")}}
+        spec = make_oas3_spec(
+            paths={"/a": {"get": {"responses": json_response(schema_ref("S0"))}}},
+            components={"schemas": schemas},
+        )
+        pruned, report = openapi_prune.prune_components(spec)
+        self.assertEqual(report["removed"], {"components/schemas": ["Dangling"]})
+        self.assertEqual(len(pruned["components"]["schemas"]), length + 1)
+
+
+class TestProcessSpecPrune(unittest.TestCase):
+
+    def test_generated_specs_keep_every_reference_resolvable(self):
+        for version in ("2.0", "3.0"):
+            spec = generate_spec(version, paths=30, definitions=60, depth=2, vendor="aws", seed=7, ref_density=0.2)
+            for copy_on_write in (False, True):
+                with self.subTest(version=version, copy_on_write=copy_on_write):
+                    original = copy.deepcopy(spec)
+                    full, full_issues = utils.process_spec(spec, copy_on_write=copy_on_write)
+                    pruned, issues = utils.process_spec(spec, copy_on_write=copy_on_write, prune=True)
+                    self.assertEqual(spec, original)
+                    self.assertEqual(issues, full_issues)
+                    self.assertLess(len(pruned["components"]["schemas"]), len(full["components"]["schemas"]))
+                    self.assertEqual({k: v for k, v in pruned.items() if k != "components"},
+                                     {k: v for k, v in full.items() if k != "components"})
+                    for ref in local_refs(pruned):
+                        resolve(pruned, ref)
+
+    def test_metrics_counters(self):
+        import openapi_metrics
+        metrics = openapi_metrics.RunMetrics("spec")
+        utils.process_spec(make_vendor_swagger2_spec(), metrics=metrics, prune=True)
+        metrics.close()
+        stages = metrics.to_dict()["stages"]
+        self.assertIn("prune", stages)
+        self.assertIn("bytes_removed", stages["prune"])
+
+
+class TestPruneCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.spec = make_oas3_spec(
+            paths={"/a": {"get": {"responses": json_response(schema_ref("Used"))}}},
+            components={"schemas": {"Used": {"type": "string"}, "Unused": {"type": "integer"}}},
+        )
+        self.input_file = os.path.join(self.tmp.name, "api.json")
+        utils.save_spec(self.spec, self.input_file)
+
+    def test_single_file(self):
+        output_file = os.path.join(self.tmp.name, "out.json")
+        code, output = run_cli(self.input_file, output_file, "--prune-unused")
+        self.assertEqual(code, 0, output)
+        self.assertIn("[prune] Removed 1 unreferenced component(s), 29 bytes (components/schemas 1).", output)
+        self.assertEqual(list(utils.load_spec(output_file)["components"]["schemas"]), ["Used"])
+
+    def test_batch_mode(self):
+        output_dir = os.path.join(self.tmp.name, "out")
+        code, output = run_cli("--batch", self.tmp.name, "--output-dir", output_dir, "--jobs", "1", "--prune-unused")
+        self.assertEqual(code, 0, output)
+        self.assertIn("(pruned 1 component(s), 29 bytes)", output)
+        self.assertEqual(list(utils.load_spec(os.path.join(output_dir, "api.json"))["components"]["schemas"]), ["Used"])
+
+    def test_rejects_incremental(self):
+        state = os.path.join(self.tmp.name, "state")
+        code, _ = run_cli(self.input_file, os.path.join(self.tmp.name, "o.json"), "--prune-unused", "--incremental", state)
+        self.assertEqual(code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+test_openapi_routes.py
+
+Unit tests for openapi_routes.py and the route checks of
+validate_apim_requirements(): templates differing only in parameter names,
+templates shadowed by more general ones, and request path lookup.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_routes.py -v
+"""
+
+import os
+import sys
+import time
+import unittest
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_routes
+import openapi_utils as utils
+from test_openapi_utils import make_oas3_spec
+
+
+def make_ambiguous_spec(count: int) -> dict:
+    """OAS3 spec with count operations on groups of four paths: one conflict and one shadowed literal each."""
+    paths = {}
+    for i in range(count // 4):
+        for template in (f"/r{i}/{{id}}", f"/r{i}/{{key}}", f"/r{i}/me", f"/r{i}/{{id}}/items"):
+            paths[template] = {"get": {"responses": {"200": {"description": "OK"}}}}
+    return make_oas3_spec(paths=paths)
+
+
+def trie(*routes) -> openapi_routes.RouteTrie:
+    """RouteTrie over (path, method) pairs, each operation being its own 'METHOD path' string."""
+    return openapi_routes.RouteTrie((path, method, f"{method.upper()} {path}") for path, method in routes)
+
+
+class TestRouteTrie(unittest.TestCase):
+
+    def test_conflicts_need_a_shared_method(self):
+        routes = trie(
+            ("/users/{id}", "get"), ("/users/{userId}", "get"), ("/users/{userId}", "delete"),
+            ("/users/{name}", "delete"), ("/users/{key}", "put"),
+            ("/files/{name}.json", "get"), ("/files/{file}.json", "get"),
+            ("/a/{rest+}", "get"), ("/a/{proxy+}", "get"),
+        )
+        self.assertEqual(routes.conflicts(), [
+            (["/users/{id}", "/users/{userId}"], ["get"]),
+            (["/users/{userId}", "/users/{name}"], ["delete"]),
+            (["/files/{name}.json", "/files/{file}.json"], ["get"]),
+            (["/a/{rest+}", "/a/{proxy+}"], ["get"]),
+        ])
+
+    def test_shadowed_templates(self):
+        routes = trie(
+            ("/users/me", "get"), ("/users/me", "post"), ("/users/{id}", "get"),
+            ("/files/readme.json", "get"), ("/files/{name}.json", "get"), ("/files/{name}", "get"),
+            ("/proxy/a/b", "put"), ("/proxy/{p+}", "put"),
+            ("/other/me", "patch"), ("/other/{id}", "get"),
+        )
+        self.assertEqual(routes.shadowed(), [
+            ("/users/me", "/users/{id}", ["get"]),
+            ("/files/readme.json", "/files/{name}.json", ["get"]),
+            ("/files/readme.json", "/files/{name}", ["get"]),
+            ("/files/{name}.json", "/files/{name}", ["get"]),
+            ("/proxy/a/b", "/proxy/{p+}", ["put"]),
+        ])
+        self.assertEqual(trie(("/a", "get"), ("/a/", "get"), ("/a/{id}", "get"), ("/a/{p+}", "get")).shadowed(),
+                         [("/a/{id}", "/a/{p+}", ["get"])])
+
+    def test_lookup_prefers_the_most_specific_segment(self):
+        routes = trie(
+            ("/users/me", "get"), ("/users/{id}", "get"), ("/users/{id}", "delete"),
+            ("/users/{id}/orders/{orderId}", "get"), ("/users/me/orders", "get"),
+            ("/files/{name}.{ext}", "get"), ("/{proxy+}", "get"),
+        )
+        self.assertEqual(routes.lookup("GET", "/users/me"), ("/users/me", "GET /users/me", {}))
+        self.assertEqual(routes.lookup("delete", "/users/me"), ("/users/{id}", "DELETE /users/{id}", {"id": "me"}))
+        # Backtracks out of the literal 'me' branch, which has no '{orderId}' child
+        self.assertEqual(routes.lookup("get", "/users/me/orders/7?expand=1"),
+                         ("/users/{id}/orders/{orderId}", "GET /users/{id}/orders/{orderId}",
+                          {"id": "me", "orderId": "7"}))
+        self.assertEqual(routes.match("/files/report.tar.gz"), ("/files/{name}.{ext}", {"name": "report", "ext": "tar.gz"}))
+        self.assertEqual(routes.match("/a/b/c"), ("/{proxy+}", {"proxy": "a/b/c"}))
+        self.assertIsNone(routes.lookup("post", "/users/1"))
+        self.assertIsNone(trie(("/users/{id}", "get")).match("/users/"))
+        self.assertEqual(len(routes), 6)
+
+
+class TestValidateRoutes(unittest.TestCase):
+
+    def test_messages(self):
+        spec = make_oas3_spec(paths={
+            "/users/{id}": {"get": {"operationId": "a"}, "put": {"operationId": "b"}},
+            "/users/{userId}": {"get": {"operationId": "c"}, "put": {"operationId": "d"}},
+            "/users/me": {"get": {"operationId": "e"}},
+            "/orders/{id}": {"get": {"operationId": "f"}},
+            "/orders/latest": {"post": {"operationId": "g"}},
+        })
+        self.assertEqual(utils.validate_apim_requirements(spec), [
+            "ERROR: Paths '/users/{id}', '/users/{userId}' differ only in parameter names (GET, PUT). "
+            "APIM cannot route them apart.",
+            "WARNING: Path '/users/me' is shadowed by '/users/{id}' (GET): "
+            "every request to it also matches the more general template.",
+            "WARNING: Path '/users/me' is shadowed by '/users/{userId}' (GET): "
+            "every request to it also matches the more general template.",
+        ])
+
+    def test_linear_in_the_number_of_paths(self):
+        def best_time(count: int) -> float:
+            spec = make_ambiguous_spec(count)
+            index = utils.OperationIndex(spec)
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                issues = utils.validate_apim_requirements(spec, index)
+                best = min(best, time.perf_counter() - start)
+            self.assertEqual(len(issues), count // 4 * 3)
+            return best
+
+        ratio = best_time(20_000) / best_time(2_000)
+        # Linear work gives ~10x; comparing every pair of paths gives ~100x
+        self.assertLess(ratio, 30, f"20000 vs 2000 paths: {ratio:.1f}x slower")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+test_openapi_serializers.py
+
+Unit tests for openapi_serializers.py and the openapi_utils.py backend options.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_serializers.py -v
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_serializers as serializers
+import openapi_utils as utils
+from openapi_serializers import Serializer
+from test_openapi_utils import make_vendor_swagger2_spec, run_cli
+
+# Strings on which the C emitters and the pure-Python ones disagree
+AWKWARD_STRINGS = [
+    "tab\tseparated",
+    "multi\nline  ",
+    "next line \x85 char",
+    "emoji 😀",
+    "A long description with a tab\t" + "and many words " * 12,
+]
+PLAIN_STRINGS = ["", "yes", "null", "1.0", "~", "@at", "- dash", "a: b", "#c", "'q'", '"d"', " lead", "é" * 100]
+
+
+def make_processed_spec(extra: list) -> dict:
+    spec, _ = utils.process_spec(make_vendor_swagger2_spec())
+    spec["info"]["x-values"] = PLAIN_STRINGS + [1.5, 0.1, 10 ** 12, None, True] + extra
+    return spec
+
+
+def all_serializers() -> list:
+    return [
+        Serializer(yaml_backend, json_backend)
+        for yaml_backend in ("libyaml", "python") if yaml_backend != "libyaml" or serializers.HAS_LIBYAML
+        for json_backend in ("orjson", "stdlib") if json_backend != "orjson" or serializers.HAS_ORJSON
+    ]
+
+
+class TestBackendSelection(unittest.TestCase):
+
+    def test_auto_picks_fastest_installed(self):
+        serializer = Serializer()
+        self.assertEqual(serializer.yaml_backend, "libyaml" if serializers.HAS_LIBYAML else "python")
+        self.assertEqual(serializer.json_backend, "orjson" if serializers.HAS_ORJSON else "stdlib")
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            Serializer(yaml_backend="ruamel")
+        with self.assertRaises(ValueError):
+            Serializer(json_backend="ujson")
+
+    def test_missing_optional_backend_raises_and_auto_falls_back(self):
+        with mock.patch.object(serializers, "HAS_LIBYAML", False), mock.patch.object(serializers, "HAS_ORJSON", False):
+            with self.assertRaisesRegex(ValueError, "LibYAML"):
+                Serializer(yaml_backend="libyaml")
+            with self.assertRaisesRegex(ValueError, "pip install orjson"):
+                Serializer(json_backend="orjson")
+            serializer = Serializer()
+            # "auto" is resolved on first use
+            self.assertEqual((serializer.yaml_backend, serializer.json_backend), ("python", "stdlib"))
+            self.assertIn("stdlib json", serializer.describe())
+
+
+class TestByteIdenticalOutput(unittest.TestCase):
+
+    def assert_identical_dumps(self, spec: dict):
+        for fmt in ("yaml", "json"):
+            reference = Serializer("python", "stdlib").dumps(spec, fmt)
+            for serializer in all_serializers():
+                with self.subTest(fmt=fmt, backends=serializer.describe()):
+                    self.assertEqual(serializer.dumps(spec, fmt), reference)
+
+    def test_plain_spec_takes_fast_path(self):
+        spec = make_processed_spec([])
+        self.assertTrue(serializers.libyaml_emits_identically(spec))
+        self.assertTrue(serializers.orjson_emits_identically(spec))
+        self.assert_identical_dumps(spec)
+
+    def test_awkward_strings_fall_back(self):
+        for text in AWKWARD_STRINGS:
+            spec = make_processed_spec([text])
+            self.assertFalse(serializers.libyaml_emits_identically(spec), text)
+            self.assert_identical_dumps(spec)
+
+    def test_long_non_ascii_key_falls_back(self):
+        spec = make_processed_spec([])
+        spec["info"]["é" * 100] = 1
+        self.assertFalse(serializers.libyaml_emits_identically(spec))
+        self.assert_identical_dumps(spec)
+
+    def test_keys_near_the_simple_key_limit(self):
+        for length in range(120, 131):
+            spec = make_processed_spec([])
+            spec["info"]["k" * length] = 1
+            with self.subTest(length=length):
+                self.assertEqual(serializers.libyaml_emits_identically(spec), length <= 122)
+                self.assert_identical_dumps(spec)
+
+    def test_empty_key_falls_back(self):
+        spec = make_processed_spec([])
+        spec["info"][""] = 1
+        self.assertFalse(serializers.libyaml_emits_identically(spec))
+        self.assertIn("? ''", Serializer().dumps(spec, "yaml"))
+        self.assert_identical_dumps(spec)
+
+    def test_json_values_orjson_formats_differently_fall_back(self):
+        for value in (1e-07, 2.5e-05, 1e16, float("nan"), 2 ** 70, "\ud800"):
+            spec = make_processed_spec([value])
+            expected = json.dumps(spec, indent=2, ensure_ascii=False)
+            for serializer in all_serializers():
+                self.assertEqual(serializer.dumps(spec, "json"), expected, repr(value))
+
+    def test_shared_nodes_keep_yaml_anchors(self):
+        schema = {"type": "object", "properties": {"id": {"type": "string"}}}
+        spec = {"a": schema, "b": schema}
+        for serializer in all_serializers():
+            self.assertIn("&id001", serializer.dumps(spec, "yaml"))
+        self.assert_identical_dumps(spec)
+
+
+class TestLoads(unittest.TestCase):
+
+    def test_json_loads_identical(self):
+        for text in ('{"a": 1, "a": 2}', '[123456789012345678901234567890]', "[NaN, -0.0, 1E5]", '{"u": "é\\u00e9"}'):
+            expected = json.dumps(json.loads(text))
+            for serializer in all_serializers():
+                self.assertEqual(json.dumps(serializer.loads(text, "json")), expected, text)
+
+    def test_errors_use_pure_python_messages(self):
+        for serializer in all_serializers():
+            with self.assertRaises(json.JSONDecodeError) as ctx:
+                serializer.loads("{not json", "json")
+            self.assertEqual(str(ctx.exception), "Expecting property name enclosed in double quotes: line 1 column 2 (char 1)")
+            with self.assertRaises(Exception) as ctx:
+                serializer.loads("a: [1, 2", "yaml")
+            self.assertIn("while parsing a flow sequence", str(ctx.exception))
+
+    def test_yaml_loads_identical(self):
+        text = Serializer("python", "stdlib").dumps(make_processed_spec(AWKWARD_STRINGS), "yaml")
+        expected = Serializer("python", "stdlib").loads(text, "yaml")
+        for serializer in all_serializers():
+            self.assertEqual(serializer.loads(text, "yaml"), expected)
+
+
+class TestBackendCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_file = os.path.join(self.tmp.name, "api.yaml")
+        spec = make_vendor_swagger2_spec()
+        spec["info"]["description"] = AWKWARD_STRINGS[-1]
+        with open(self.input_file, "w", encoding="utf-8") as fh:
+            fh.write(Serializer("python", "stdlib").dumps(spec, "yaml"))
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_verbose_reports_backends(self):
+        code, output = run_cli(self.input_file, "unused.yaml", "--validate-only", "--verbose", "--yaml-backend", "python")
+        self.assertEqual(code, 0)
+        self.assertIn("Serializer backends: YAML python (SafeLoader/SafeDumper)", output)
+
+    def test_outputs_identical_across_backends(self):
+        outputs = {}
+        for yaml_backend in ("python", "auto"):
+            for json_backend in ("stdlib", "auto"):
+                for ext in (".yaml", ".json"):
+                    out = os.path.join(self.tmp.name, f"{yaml_backend}-{json_backend}{ext}")
+                    code, _ = run_cli(self.input_file, out, "--yaml-backend", yaml_backend, "--json-backend", json_backend)
+                    self.assertEqual(code, 0)
+                    outputs.setdefault(ext, set()).add(self.read(out))
+        self.assertEqual(len(outputs[".yaml"]), 1)
+        self.assertEqual(len(outputs[".json"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+test_openapi_shard.py
+
+Unit tests for openapi_shard.py and the openapi_utils.py --shard option:
+operations are split by tag, path prefix or size into self-contained
+specs carrying only the components they reach, and the manifest maps each
+shard to an APIM API path.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_shard.py -v
+"""
+
+import os
+import sys
+import copy
+import json
+import tempfile
+import unittest
+
+# Allow importing the migration modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_prune
+import openapi_shard
+import openapi_utils as utils
+from test_openapi_utils import json_response, make_oas3_spec, make_swagger2_spec, run_cli, schema_ref
+
+
+def shop_spec() -> dict:
+    return make_oas3_spec(
+        tags=[{"name": "users"}, {"name": "orders"}, {"name": "unused"}],
+        paths={
+            "/users/{id}": {
+                "parameters": [{"$ref": "#/components/parameters/Id"}],
+                "get": {"tags": ["users"], "responses": json_response(schema_ref("User"))},
+                "delete": {"tags": ["orders"], "responses": {"204": {"description": "Deleted"}}},
+            },
+            "/orders": {"get": {"tags": ["orders"], "responses": json_response(schema_ref("Order"))}},
+            "/": {"get": {"responses": {"200": {"description": "OK"}}}},
+        },
+        components={
+            "schemas": {
+                "User": {"type": "object"},
+                "Order": {"type": "object", "properties": {"user": schema_ref("User")}},
+                "Unused": {"type": "string"},
+            },
+            "parameters": {"Id": {"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}},
+        },
+    )
+
+
+class TestShardSpec(unittest.TestCase):
+
+    def test_by_tag(self):
+        spec = shop_spec()
+        original = copy.deepcopy(spec)
+        shards, manifest = openapi_shard.shard_spec(spec, "tag")
+        self.assertEqual(spec, original)
+        self.assertEqual([name for name, _ in shards], ["users", "orders", "untagged"])
+        users, orders, untagged = (shard for _, shard in shards)
+
+        # Only the users tag uses /users/*: served at users, paths and servers rebased
+        self.assertEqual(list(users["paths"]), ["/{id}"])
+        self.assertEqual(list(users["paths"]["/{id}"]), ["parameters", "get"])
+        self.assertEqual(users["servers"], [{"url": "https://api.example.com/v1/users"}])
+        self.assertEqual(users["tags"], [{"name": "users"}])
+        self.assertEqual(users["components"], {"schemas": {"User": {"type": "object"}},
+                                               "parameters": spec["components"]["parameters"]})
+        self.assertEqual(users["info"]["title"], "Test API (users)")
+        self.assertEqual(list(users), list(spec))
+
+        # The DELETE of /users/{id} goes with the orders tag, keeping the path-level parameter
+        self.assertEqual(list(orders["paths"]), ["/users/{id}", "/orders"])
+        self.assertEqual(list(orders["paths"]["/users/{id}"]), ["parameters", "delete"])
+        self.assertEqual(list(orders["components"]["schemas"]), ["User", "Order"])
+        self.assertEqual(orders["servers"], spec["servers"])
+        self.assertNotIn("components", untagged)
+        self.assertNotIn("tags", untagged)
+
+        entries = {entry["name"]: entry for entry in manifest["shards"]}
+        self.assertEqual(manifest["strategy"], "tag")
+        self.assertEqual(
+            [(e["api_path"], e["path_prefix"], e["url_changed"]) for e in entries.values()],
+            [("users", "/users", False), ("orders", "", True), ("untagged", "", True)],
+        )
+        self.assertEqual((entries["orders"]["paths"], entries["orders"]["operations"]), (2, 2))
+        self.assertEqual(entries["orders"]["components"], 3)
+        self.assertEqual(entries["orders"]["bytes"], openapi_prune._encoded_size(orders))
+        self.assertFalse(entries["orders"]["oversized"])
+
+    def test_by_prefix(self):
+        shards, manifest = openapi_shard.shard_spec(shop_spec(), "prefix")
+        self.assertEqual([name for name, _ in shards], ["users", "orders", "root"])
+        orders = shards[1][1]
+        self.assertEqual(list(orders["paths"]), ["/"])
+        self.assertEqual(orders["servers"], [{"url": "https://api.example.com/v1/orders"}])
+        self.assertEqual([e["api_path"] for e in manifest["shards"]], ["users", "orders", "root"])
+
+    def test_spec_without_servers_keeps_backend_urls(self):
+        spec = shop_spec()
+        del spec["servers"]
+        shards, manifest = openapi_shard.shard_spec(spec, "prefix")
+        users, orders = shards[0][1], shards[1][1]
+        self.assertEqual(list(users["paths"]), ["/{id}"])
+        self.assertEqual(users["servers"], [{"url": "/users"}])
+        self.assertEqual(orders["servers"], [{"url": "/orders"}])
+        self.assertNotIn("servers", shards[2][1])
+        self.assertEqual([e["url_changed"] for e in manifest["shards"]], [False, False, True])
+
+    def test_by_size(self):
+        paths = {
+            f"/g{group}/{item}": {"get": {"responses": json_response(schema_ref(f"S{group}{item}"))}}
+            for group in range(3) for item in ("a", "b")
+        }
+        schemas = {f"S{group}{item}": {"type": "object", "description": "x" * 400}
+                   for group in range(3) for item in ("a", "b")}
+        spec = make_oas3_spec(paths=paths, components={"schemas": schemas})
+        limit = 1500
+        shards, manifest = openapi_shard.shard_spec(spec, "size", limit)
+        self.assertEqual([name for name, _ in shards], ["part1", "part2", "part3"])
+        # One first segment per shard, so each keeps its client URLs
+        self.assertEqual([e["api_path"] for e in manifest["shards"]], ["g0", "g1", "g2"])
+        for (_, shard), entry in zip(shards, manifest["shards"]):
+            self.assertLessEqual(entry["bytes"], limit)
+            self.assertEqual(len(shard["components"]["schemas"]), 2)
+
+        # A path item that alone exceeds the limit still gets a shard, flagged
+        shards, manifest = openapi_shard.shard_spec(spec, "size", 300)
+        self.assertEqual(len(shards), 6)
+        self.assertTrue(all(entry["oversized"] for entry in manifest["shards"]))
+        self.assertEqual([e["api_path"] for e in manifest["shards"]][:2], ["part1", "part2"])
+
+    def test_swagger2_definitions_and_base_path(self):
+        spec = make_swagger2_spec(
+            paths={"/items": {"get": {"responses": {"200": {"description": "OK", "schema": {"$ref": "#/definitions/Item"}}}}},
+                   "/other": {"get": {"responses": {"200": {"description": "OK"}}}}},
+            definitions={"Item": {"type": "object"}, "Other": {"type": "object"}},
+        )
+        shards, _ = openapi_shard.shard_spec(spec, "prefix")
+        items = shards[0][1]
+        self.assertEqual(items["basePath"], "/v1/items")
+        self.assertEqual(items["definitions"], {"Item": {"type": "object"}})
+        self.assertNotIn("definitions", shards[1][1])
+
+    def test_unique_names_and_api_paths(self):
+        spec = make_oas3_spec(paths={
+            "/a/x": {"get": {"tags": ["Team A"], "responses": {}}},
+            "/team-a": {"get": {"tags": ["team a!"], "responses": {}}},
+            "/b": {"get": {"tags": ["b"], "responses": {}}, "put": {"tags": ["team a!"], "responses": {}}},
+        })
+        _, manifest = openapi_shard.shard_spec(spec, "tag")
+        self.assertEqual([e["name"] for e in manifest["shards"]], ["team-a", "team-a-2", "b"])
+        self.assertEqual([e["api_path"] for e in manifest["shards"]], ["a", "team-a-2", "b"])
+
+    def test_invalid_arguments(self):
+        for by, max_bytes in (("owner", None), ("size", None), ("tag", 0)):
+            with self.subTest(by=by, max_bytes=max_bytes):
+                with self.assertRaises(ValueError):
+                    openapi_shard.shard_spec(shop_spec(), by, max_bytes)
+
+    def test_file_names(self):
+        self.assertEqual(openapi_shard.shard_file("out/api.yaml", "users"), "out/api.users.yaml")
+        self.assertEqual(openapi_shard.shard_file("api.json.gz", "users"), "api.users.json.gz")
+        self.assertEqual(openapi_shard.manifest_path("out/api.json.gz"), "out/api.manifest.json")
+
+
+class TestShardCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_file = os.path.join(self.tmp.name, "shop.json")
+        utils.save_spec(shop_spec(), self.input_file)
+        self.output_file = os.path.join(self.tmp.name, "out", "api.json")
+
+    def test_shards_and_manifest(self):
+        code, output = run_cli(self.input_file, self.output_file, "--shard", "prefix", "--prune-unused")
+        self.assertEqual(code, 0, output)
+        self.assertIn("[shard] 3 shard(s) by prefix:", output)
+        self.assertFalse(os.path.exists(self.output_file))
+        with open(os.path.join(self.tmp.name, "out", "api.manifest.json"), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        self.assertEqual([e["file"] for e in manifest["shards"]], ["api.users.json", "api.orders.json", "api.root.json"])
+        users = utils.load_spec(os.path.join(self.tmp.name, "out", "api.users.json"))
+        self.assertEqual(set(users["paths"]["/{id}"]), {"parameters", "get", "delete"})
+        self.assertTrue(all("operationId" in users["paths"]["/{id}"][m] for m in ("get", "delete")))
+
+    def test_rejected_combinations(self):
+        for extra in (["--shard", "size"], ["--shard-max-kb", "10"], ["--shard", "tag", "--validate-only"],
+                      ["--shard", "tag", "--cache-dir", self.tmp.name], ["--shard", "size", "--shard-max-kb", "0"]):
+            with self.subTest(extra=extra):
+                code, _ = run_cli(self.input_file, self.output_file, *extra)
+                self.assertEqual(code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
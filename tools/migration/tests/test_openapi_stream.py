@@ -0,0 +1,253 @@
+"""
+test_openapi_stream.py
+
+Unit tests for openapi_stream.py and the openapi_utils.py --stream option:
+a streamed spec must equal load_spec() followed by extension removal, with
+the same errors, and the CLI output must not change.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_stream.py -v
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules and the benchmark spec generator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import openapi_stream
+import openapi_serializers
+import openapi_utils as utils
+from openapi_serializers import Serializer
+from specgen import generate_spec
+from test_openapi_utils import make_vendor_swagger2_spec, run_cli
+
+AWS = "x-amazon-"
+
+# Chunk sizes that split tokens at every possible position, plus the default
+CHUNK_SIZES = (1, 3, 7, openapi_stream.CHUNK_SIZE)
+
+
+class StreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with (gzip.open if name.endswith(".gz") else open)(path, "wt", encoding="utf-8") as fh:
+            fh.write(text)
+        return path
+
+    def outcome(self, load) -> tuple:
+        try:
+            return "ok", repr(load())
+        except ValueError as exc:
+            return "error", str(exc)
+
+    def assert_streams_like_load_spec(self, path: str, prefix: str = AWS, serializer=None):
+        """stream_spec() must return what load_spec() + extension removal returns, or raise the same error."""
+        expected = self.outcome(lambda: utils._transform_node(utils._read_spec(path, serializer), prefix, False))
+        for size in CHUNK_SIZES:
+            with self.subTest(chunk_size=size), mock.patch.object(openapi_stream, "CHUNK_SIZE", size):
+                self.assertEqual(self.outcome(lambda: openapi_stream.stream_spec(path, prefix, serializer)), expected)
+
+
+class TestStreamJson(StreamTestCase):
+
+    def test_generated_specs(self):
+        for version in ("2.0", "3.0"):
+            spec = generate_spec(version, paths=15, definitions=8, depth=3, vendor="aws", seed=5)
+            for name in ("api.json", "api.json.gz"):
+                path = os.path.join(self.tmp.name, name)
+                utils.save_spec(spec, path)
+                with self.subTest(version=version, file=name):
+                    self.assert_streams_like_load_spec(path)
+
+    def test_values_escapes_and_dropped_keys(self):
+        for text in (
+            '{"a": 1, "x-amazon-b": {"c": [1, 2, {"d": 3}]}, "e": [1.5e3, -0, 25E-2, true, false, null]}',
+            '{"s": "\\u00e9\\ud83d\\ude00 \\"quoted\\" \\n", "lone": "\\ud83d", "big": 12345678901234567890}',
+            '{"\\u0078-amazon-escaped": 1, "k": {"x-amazon-": [], "x-amazon-e": {}}}',
+            '{"nan": NaN, "inf": [Infinity, -Infinity], "dup": 1, "dup": 2}',
+            '  [ ]  ', '{}', '"top-level string"', '42',
+        ):
+            with self.subTest(text=text):
+                self.assert_streams_like_load_spec(self.write("api.json", text))
+
+    def test_empty_prefix_keeps_everything(self):
+        path = self.write("api.json", '{"x-amazon-a": {"b": [1]}, "c": 2}')
+        self.assertEqual(openapi_stream.stream_spec(path), {"x-amazon-a": {"b": [1]}, "c": 2})
+
+    def test_syntax_errors_match_json_module(self):
+        for text in (
+            "", "{", '{"a": 1,}', '{"a" 1}', '{"a": 1 "b": 2}', "[1 2]", "[1, 2, ]", "{1: 2}",
+            '{"a": 1} x', "[1]]", '{"a": tru}', '{"a": 1e}', '{"a": "\\x"}', '{"a": "open',
+            '{"a": "tab\tinside"}', '{"x-amazon-a": [1, {"b": }]}', '{"a":\n\n [1,\n  2,\n  x]}', "\ufeff{}",
+        ):
+            with self.subTest(text=text):
+                path = self.write("api.json", text)
+                self.assert_streams_like_load_spec(path)
+                with self.assertRaisesRegex(ValueError, "^Invalid JSON in"):
+                    openapi_stream.stream_spec(path, AWS)
+
+    def test_nesting_deeper_than_the_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        path = self.write("api.json", '{"a": ' * depth + "1" + "}" * depth)
+        with mock.patch.object(openapi_stream, "CHUNK_SIZE", 64):
+            node = openapi_stream.stream_spec(path, AWS)
+        for _ in range(depth):
+            node = node["a"]
+        self.assertEqual(node, 1)
+
+    def test_missing_file_raises(self):
+        with self.assertRaisesRegex(ValueError, "Cannot read file"):
+            openapi_stream.stream_spec(os.path.join(self.tmp.name, "missing.json"), AWS)
+
+
+@unittest.skipUnless(utils.HAS_YAML, "PyYAML not installed")
+class TestStreamYaml(StreamTestCase):
+
+    def serializers(self) -> list:
+        backends = ["python"] + (["libyaml"] if openapi_serializers.HAS_LIBYAML else [])
+        return [Serializer(yaml_backend=backend) for backend in backends]
+
+    def assert_all_backends(self, text: str, prefix: str = AWS):
+        path = self.write("api.yaml", text)
+        for serializer in self.serializers():
+            with self.subTest(backend=serializer.yaml_backend):
+                self.assert_streams_like_load_spec(path, prefix, serializer)
+
+    def test_generated_specs(self):
+        for version in ("2.0", "3.0"):
+            spec = generate_spec(version, paths=10, definitions=5, depth=3, vendor="google", seed=9)
+            path = os.path.join(self.tmp.name, "api.yaml.gz")
+            utils.save_spec(spec, path)
+            with self.subTest(version=version):
+                self.assert_streams_like_load_spec(path, "x-google-")
+
+    def test_scalar_resolution(self):
+        self.assert_all_backends(
+            "date: 2024-01-02\nstamp: 2024-01-02T10:00:00Z\n1: int key\ntrue: yes\n~: null\n3.5: f\n"
+            "octal: 0o17\nhex: 0x1F\nsep: 1_000\ninf: .inf\nstr: !!str 123\nbin: !!binary aGVsbG8=\n"
+            "block: |\n  two\n  lines\nquoted: 'x-amazon-not-a-key'\n=: equals\n"
+        )
+
+    def test_anchors_aliases_and_merge_keys(self):
+        self.assert_all_backends(
+            "base: &b {x: 1, y: 2, x-amazon-z: 3}\n"
+            "other: &o {y: 3, w: 4}\n"
+            "use:\n  <<: *b\n  y: 5\n"
+            "multi:\n  <<: [*b, *o]\n  v: 6\n"
+            "list: [*b, *b]\n"
+            "x-amazon-hidden: &h {k: v}\n"
+            "shown: *h\n"
+            "seq: &s [1, 2]\n"
+            "again: *s\n"
+        )
+
+    def test_aliases_are_independent_copies(self):
+        path = self.write("api.yaml", "a: &x {k: [1]}\nb: *x\n")
+        spec = openapi_stream.stream_spec(path, AWS)
+        self.assertIsNot(spec["a"], spec["b"])
+        self.assertIsNot(spec["a"]["k"], spec["b"]["k"])
+
+    def test_errors(self):
+        for text, message in (
+            ("a: *undefined\n", "found undefined alias"),
+            ("a: &x 1\nb: &x 2\n", "found duplicate anchor"),
+            ("--- 1\n--- 2\n", "expected a single document"),
+            ("? [1]\n: x\n", "found unhashable key"),
+            ("a: [1, 2\n", "expected ',' or ']'"),
+            ("a: !custom 1\n", "could not determine a constructor"),
+            ("m:\n  <<: 5\n", "expected a mapping or list of mappings for merging"),
+            ("m:\n  <<: [1]\n", "expected a mapping for merging"),
+            ("s: !!set {a, b}\n", "cannot stream a collection tagged"),
+        ):
+            path = self.write("api.yaml", text)
+            for serializer in self.serializers():
+                with self.subTest(text=text, backend=serializer.yaml_backend):
+                    with self.assertRaisesRegex(ValueError, "^Invalid YAML in (.|\n)*" + message):
+                        openapi_stream.stream_spec(path, AWS, serializer)
+
+    def test_empty_document(self):
+        self.assertIsNone(openapi_stream.stream_spec(self.write("api.yaml", "# nothing\n"), AWS))
+
+
+class TestStreamMemory(StreamTestCase):
+
+    def extension_heavy_file(self, name: str) -> str:
+        spec = make_vendor_swagger2_spec()
+        spec["x-amazon-apigateway-documentation"] = {
+            f"part{i}": {"location": {"path": f"/p{i}"}, "properties": ["lorem ipsum " * 8] * 4}
+            for i in range(3000)
+        }
+        path = os.path.join(self.tmp.name, name)
+        utils.save_spec(spec, path)
+        return path
+
+    def peak(self, load) -> int:
+        tracemalloc.start()
+        try:
+            load()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_dropped_subtrees_are_never_built(self):
+        formats = ["api.json"] + (["api.yaml"] if utils.HAS_YAML else [])
+        for name in formats:
+            path = self.extension_heavy_file(name)
+            size = os.path.getsize(path)
+            with self.subTest(file=name), mock.patch.object(openapi_stream, "CHUNK_SIZE", 16 * 1024):
+                streamed = self.peak(lambda: openapi_stream.stream_spec(path, AWS))
+                self.assertLess(streamed, size // 4)
+                self.assertGreater(self.peak(lambda: utils._read_spec(path)), size)
+
+
+class TestStreamCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_output_is_byte_identical(self):
+        inputs = ["api.json"] + (["api.yaml"] if utils.HAS_YAML else [])
+        spec = generate_spec("2.0", paths=12, definitions=6, depth=2, vendor="aws", seed=1)
+        for name in inputs:
+            input_file = os.path.join(self.tmp.name, name)
+            utils.save_spec(spec, input_file)
+            for ext in (".json", ".yaml") if utils.HAS_YAML else (".json",):
+                with self.subTest(input=name, output=ext):
+                    full, streamed = (os.path.join(self.tmp.name, f"{kind}{ext}") for kind in ("full", "streamed"))
+                    self.assertEqual(run_cli(input_file, full)[0], 0)
+                    self.assertEqual(run_cli(input_file, streamed, "--stream")[0], 0)
+                    self.assertEqual(self.read(streamed), self.read(full))
+
+    def test_batch_mode(self):
+        src = os.path.join(self.tmp.name, "src")
+        os.makedirs(src)
+        utils.save_spec(make_vendor_swagger2_spec(), os.path.join(src, "petstore.json"))
+        with open(os.path.join(src, "broken.json"), "w", encoding="utf-8") as fh:
+            fh.write('{"swagger": "2.0",}')
+        full, streamed = (os.path.join(self.tmp.name, kind) for kind in ("full", "streamed"))
+        run_cli("--batch", src, "--output-dir", full, "--jobs", "1")
+        code, output = run_cli("--batch", src, "--output-dir", streamed, "--jobs", "1", "--stream")
+        self.assertEqual(code, 1)
+        self.assertIn("Invalid JSON", output)
+        self.assertEqual(self.read(os.path.join(streamed, "petstore.json")), self.read(os.path.join(full, "petstore.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,11 +10,15 @@ Or:
     cd tools/migration && python3 -m pytest tests/ -v
 """
 
+import io
 import sys
 import os
+import copy
 import json
 import tempfile
 import unittest
+import contextlib
+from unittest import mock
 
 # Allow importing openapi_utils from the parent directory
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -52,6 +56,21 @@ def make_oas3_spec(**overrides) -> dict:
     return spec
 
 
+def ref(target: str) -> dict:
+    """Reference Object pointing at target."""
+    return {"$ref": target}
+
+
+def schema_ref(name: str) -> dict:
+    """Reference to components/schemas/name."""
+    return ref(f"#/components/schemas/{name}")
+
+
+def json_response(schema: dict) -> dict:
+    """Responses Object with a single JSON 200 response of schema."""
+    return {"200": {"description": "OK", "content": {"application/json": {"schema": schema}}}}
+
+
 # ---------------------------------------------------------------------------
 # Tests: Swagger 2.0 → OpenAPI 3.0 conversion
 # ---------------------------------------------------------------------------
@@ -356,6 +375,119 @@ class TestEnsureOperationIds(unittest.TestCase):
         self.assertEqual(result["paths"], {})
 
 
+
+def assign_ids_by_restarting(spec: dict) -> None:
+    """The original collision loop (restarting at _2 for every clash), kept as the reference."""
+    operations = [
+        (path, method, item[method])
+        for path, item in spec["paths"].items() for method in utils.HTTP_METHODS if method in item
+    ]
+    seen_ids = {op["operationId"] for _, _, op in operations if op.get("operationId")}
+    for path, method, op in operations:
+        if not op.get("operationId"):
+            base_id = utils.generate_operation_id(method, path)
+            candidate, counter = base_id, 2
+            while candidate in seen_ids:
+                candidate = f"{base_id}_{counter}"
+                counter += 1
+            op["operationId"] = candidate
+            seen_ids.add(candidate)
+
+
+def make_colliding_spec(count: int) -> dict:
+    """count GET operations on paths that all map to the base ID 'getAB...' ('/a-b-b', '/a_b-b', ...)."""
+    width = max(count - 1, 1).bit_length()
+    paths = {}
+    for i in range(count):
+        separators = ["-" if i >> bit & 1 else "_" for bit in range(width)]
+        paths["/a" + "".join(sep + "b" for sep in separators)] = {"get": {}}
+    return make_oas3_spec(paths=paths)
+
+
+class TestOperationIdGenerator(unittest.TestCase):
+
+    def test_matches_restarting_loop(self):
+        import random
+        rng = random.Random(7)
+        for _ in range(50):
+            paths = {}
+            for k in range(1, 40):
+                op = {}
+                if rng.random() < 0.3:
+                    op["operationId"] = rng.choice(["getAB", "getAB_2", "getAB_4", "getAB_7", "custom"])
+                paths["/a" + "-" * k + "b"] = {"get": op}
+            spec = make_oas3_spec(paths=paths)
+            expected = copy.deepcopy(spec)
+            assign_ids_by_restarting(expected)
+            self.assertEqual(utils.ensure_operation_ids(spec), expected)
+
+    def test_shared_base_scales_linearly(self):
+        import time
+
+        def best_time(count: int) -> float:
+            best = float("inf")
+            for _ in range(3):
+                spec = make_colliding_spec(count)
+                start = time.perf_counter()
+                utils.ensure_operation_ids(spec)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        spec = make_colliding_spec(3)
+        utils.ensure_operation_ids(spec)
+        self.assertEqual([item["get"]["operationId"] for item in spec["paths"].values()], ["getABB", "getABB_2", "getABB_3"])
+        ratio = best_time(10_000) / best_time(1_000)
+        # Linear allocation gives ~10x; restarting at _2 for every clash gave ~100x
+        self.assertLess(ratio, 30, f"{ratio:.1f}x slower for 10x the colliding operations")
+
+    def test_path_to_camel_is_memoised(self):
+        utils._path_to_camel.cache_clear()
+        for method in ("get", "put", "post"):
+            utils.generate_operation_id(method, "/pets/{petId}/photos")
+        info = utils._path_to_camel.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_max_length_shortens_with_deterministic_hash(self):
+        long_path = "/" + "/".join(f"segment{i}" for i in range(20))
+        spec = make_oas3_spec(paths={long_path: {"get": {}, "post": {}}, "/short": {"get": {}}})
+        twin = copy.deepcopy(spec)
+        utils.ensure_operation_ids(spec, max_length=40)
+        utils.ensure_operation_ids(twin, max_length=40)
+        self.assertEqual(spec, twin)
+        long_ids = [spec["paths"][long_path][m]["operationId"] for m in ("get", "post")]
+        for op_id in long_ids:
+            self.assertEqual(len(op_id), 40)
+            self.assertRegex(op_id, r"_[0-9a-f]{8}$")
+        self.assertNotEqual(long_ids[0], long_ids[1])
+        self.assertEqual(spec["paths"]["/short"]["get"]["operationId"], "getShort")
+
+    def test_max_length_collisions_stay_unique_and_bounded(self):
+        spec = make_colliding_spec(50)
+        for item in spec["paths"].values():
+            item["get"]["summary"] = "x"
+        spec["paths"] = {"/" + "x" * 30 + path: item for path, item in spec["paths"].items()}
+        utils.ensure_operation_ids(spec, max_length=24)
+        ids = [item["get"]["operationId"] for item in spec["paths"].values()]
+        self.assertEqual(len(set(ids)), 50)
+        self.assertTrue(all(len(i) <= 24 for i in ids))
+
+    def test_max_length_too_short_raises(self):
+        with self.assertRaises(ValueError):
+            utils.ensure_operation_ids(make_colliding_spec(1), max_length=10)
+
+    def test_cli_option(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "in.json")
+            output_file = os.path.join(tmp, "out.json")
+            utils.save_spec(make_oas3_spec(paths={"/" + "very-long-segment/" * 6 + "end": {"get": {}}}), input_file)
+            code, _ = run_cli(input_file, output_file, "--max-operation-id-length", "32")
+            self.assertEqual(code, 0)
+            (item,) = utils.load_spec(output_file)["paths"].values()
+            self.assertEqual(len(item["get"]["operationId"]), 32)
+            with contextlib.redirect_stderr(io.StringIO()):
+                code, _ = run_cli(input_file, output_file, "--max-operation-id-length", "5")
+            self.assertEqual(code, 2)
+
 # ---------------------------------------------------------------------------
 # Tests: APIM requirement validation
 # ---------------------------------------------------------------------------
@@ -452,6 +584,93 @@ class TestValidateApimRequirements(unittest.TestCase):
         self.assertTrue(any("host" in e.lower() or "basepath" in e.lower() for e in errors))
 
 
+
+# ---------------------------------------------------------------------------
+# Tests: Operation index
+# ---------------------------------------------------------------------------
+
+def make_many_operations_spec(count: int, duplicate_every: int = 4) -> dict:
+    """OAS3 spec with count operations; every duplicate_every-th shares an ID and a quarter lack one."""
+    paths = {}
+    for i in range(count):
+        op: dict = {"tags": [f"group{i % 10}"], "responses": {"200": {"description": "OK"}}}
+        if i % 4 != 3:
+            op["operationId"] = f"dup{i // duplicate_every}" if i % duplicate_every == 0 else f"op{i}"
+        paths[f"/r{i}/{{id}}"] = {"get": op}
+    return make_oas3_spec(paths=paths)
+
+
+class TestOperationIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.spec = make_oas3_spec(paths={
+            "/users": {
+                "get": {"operationId": "listUsers", "tags": ["users"]},
+                "post": {"tags": ["users", "admin"]},
+                "parameters": [],
+            },
+            "/users/{id}": {"get": {"operationId": "listUsers"}},
+        })
+        self.index = utils.OperationIndex(self.spec)
+
+    def test_lookups(self):
+        users = self.spec["paths"]["/users"]
+        self.assertEqual(len(self.index), 3)
+        self.assertIs(self.index.by_route[("post", "/users")], users["post"])
+        self.assertIs(self.index.by_pointer["/paths/~1users~1{id}/get"], self.spec["paths"]["/users/{id}"]["get"])
+        self.assertEqual([op for _, _, op in self.index.by_tag["users"]], [users["get"], users["post"]])
+        self.assertEqual(len(self.index.by_id["listUsers"]), 2)
+        self.assertEqual(self.index.duplicate_ids(), ["listUsers"])
+        self.assertEqual([(p, m) for p, m, _ in self.index.missing_ids()], [("/users", "post")])
+
+    def test_set_operation_id_keeps_by_id_in_step(self):
+        entry = self.index.by_id["listUsers"][1]
+        self.index.set_operation_id(entry, "getUser")
+        self.assertEqual(entry[2]["operationId"], "getUser")
+        self.assertEqual(self.index.duplicate_ids(), [])
+        self.assertEqual(set(self.index.by_id), {"listUsers", "getUser"})
+
+    def test_shared_index_between_ensure_and_validate(self):
+        utils.ensure_operation_ids(self.spec, self.index)
+        self.assertEqual(self.spec["paths"]["/users"]["post"]["operationId"], "postUsers")
+        self.assertIn("postUsers", self.index.by_id)
+        errors = utils.validate_apim_requirements(self.spec, self.index)
+        self.assertEqual(errors, utils.validate_apim_requirements(self.spec))
+        self.assertTrue(any("listUsers" in e for e in errors))
+
+    def test_results_match_for_many_operations(self):
+        spec = make_many_operations_spec(400)
+        utils.ensure_operation_ids(spec)
+        ids = [op["operationId"] for item in spec["paths"].values() for op in item.values()]
+        self.assertTrue(all(ids))
+        expected = sorted({i for i in ids if ids.count(i) > 1})
+        errors = utils.validate_apim_requirements(spec)
+        self.assertEqual([e.split("'")[1] for e in errors if "not unique" in e], expected)
+
+
+class TestOperationIndexScaling(unittest.TestCase):
+    """ensure_operation_ids + validate must stay linear in the number of operations."""
+
+    SMALL = 2_000
+    LARGE = 20_000
+
+    def best_time(self, count: int) -> float:
+        import time
+        best = float("inf")
+        for _ in range(3):
+            spec = make_many_operations_spec(count)
+            start = time.perf_counter()
+            index = utils.OperationIndex(spec)
+            utils.ensure_operation_ids(spec, index)
+            utils.validate_apim_requirements(spec, index)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_ten_times_the_operations_takes_well_under_a_hundred_times_as_long(self):
+        ratio = self.best_time(self.LARGE) / self.best_time(self.SMALL)
+        # Linear work gives ~10x; the old list.count() duplicate check gave ~100x
+        self.assertLess(ratio, 30, f"{self.LARGE} vs {self.SMALL} operations: {ratio:.1f}x slower")
+
 # ---------------------------------------------------------------------------
 # Tests: Vendor extension removal
 # ---------------------------------------------------------------------------
@@ -529,6 +748,266 @@ class TestCleanExtensions(unittest.TestCase):
         self.assertIn("name", result["tags"][0])
 
 
+# ---------------------------------------------------------------------------
+# Tests: Fused processing pipeline
+# ---------------------------------------------------------------------------
+
+def make_vendor_swagger2_spec() -> dict:
+    """Swagger 2.0 spec with vendor extensions and $refs in converted and verbatim blocks."""
+    return make_swagger2_spec(
+        consumes=["application/json", "application/xml"],
+        produces=["application/json", "application/xml"],
+        tags=[{"name": "pets", "x-amazon-tag": "drop", "description": "#/definitions/NotARef"}],
+        securityDefinitions={
+            "api_key": {"type": "apiKey", "name": "api_key", "in": "header", "x-amazon-apigateway-authtype": "custom"},
+        },
+        definitions={
+            "Pet": {
+                "type": "object",
+                "x-amazon-apigateway-schema": {"$ref": "#/definitions/Hidden"},
+                "properties": {"owner": {"$ref": "#/definitions/Owner"}},
+            },
+            "Owner": {"type": "object", "properties": {"name": {"type": "string"}}},
+        },
+        parameters={"limit": {"in": "query", "name": "limit", "type": "integer"}},
+        responses={"NotFound": {"description": "Missing", "schema": {"$ref": "#/definitions/Pet"}}},
+        paths={
+            "/pets": {
+                "x-amazon-apigateway-any-method": {"responses": {}},
+                "parameters": [{"$ref": "#/parameters/limit"}],
+                "get": {
+                    "tags": ["pets"],
+                    "x-amazon-apigateway-integration": {"type": "aws_proxy"},
+                    "parameters": [{"$ref": "#/parameters/limit"}],
+                    "responses": {
+                        "200": {
+                            "description": "OK",
+                            "schema": {"type": "array", "items": {"$ref": "#/definitions/Pet"}},
+                            "headers": {"X-Rate": {"type": "integer"}},
+                            "examples": {"application/json": {"$ref": "#/definitions/Pet"}},
+                        },
+                        "404": {"$ref": "#/responses/NotFound"},
+                    },
+                },
+                "post": {
+                    "operationId": "createPet",
+                    "parameters": [{"in": "body", "name": "body", "schema": {"$ref": "#/definitions/Pet"}}],
+                    "responses": {"201": {"description": "Created"}},
+                },
+            },
+            "/pets/{petId}": {
+                "get": {
+                    "parameters": [{"in": "path", "name": "petId", "required": True, "type": "string"}],
+                },
+                "put": {
+                    "consumes": ["multipart/form-data"],
+                    "parameters": [{"in": "formData", "name": "photo", "type": "file", "required": True}],
+                    "responses": {"200": {"description": "OK"}},
+                },
+            },
+        },
+    )
+
+
+def run_staged_pipeline(spec: dict, source: str = "aws", convert: bool = True, generate_ids: bool = True) -> tuple:
+    """Replicate the original stage-by-stage main() pipeline."""
+    spec = utils.clean_aws_extensions(spec) if source == "aws" else utils.clean_google_extensions(spec)
+    if convert and str(spec.get("swagger", "")).startswith("2"):
+        spec = utils.convert_swagger_to_openapi3(spec)
+    if generate_ids:
+        spec = utils.ensure_operation_ids(spec)
+    return spec, utils.validate_apim_requirements(spec)
+
+
+class TestProcessSpec(unittest.TestCase):
+
+    def assert_same_as_staged(self, spec: dict, **options):
+        import yaml as _yaml
+        expected, expected_issues = run_staged_pipeline(copy.deepcopy(spec), **options)
+        result, issues = utils.process_spec(spec, **options)
+        self.assertEqual(issues, expected_issues)
+        self.assertEqual(
+            json.dumps(result, indent=2, ensure_ascii=False),
+            json.dumps(expected, indent=2, ensure_ascii=False),
+        )
+        # YAML output also reflects object sharing (anchors), so compare it too
+        self.assertEqual(
+            _yaml.dump(result, allow_unicode=True, default_flow_style=False, sort_keys=False),
+            _yaml.dump(expected, allow_unicode=True, default_flow_style=False, sort_keys=False),
+        )
+        return result
+
+    def test_swagger2_matches_staged_pipeline(self):
+        result = self.assert_same_as_staged(make_vendor_swagger2_spec())
+        self.assertEqual(result["openapi"], "3.0.0")
+        self.assertNotIn("x-amazon-apigateway-schema", result["components"]["schemas"]["Pet"])
+
+    def test_verbatim_blocks_keep_definition_refs(self):
+        """$ref-like values outside converted subtrees must not be rewritten."""
+        result = self.assert_same_as_staged(make_vendor_swagger2_spec())
+        self.assertEqual(result["tags"][0]["description"], "#/definitions/NotARef")
+        example = result["paths"]["/pets"]["get"]["responses"]["200"]["content"]["application/json"]["example"]
+        self.assertEqual(example["$ref"], "#/definitions/Pet")
+
+    def test_oas3_matches_staged_pipeline(self):
+        spec = make_oas3_spec(paths={
+            "/items": {
+                "x-google-backend": {"address": "https://backend"},
+                "get": {"x-google-quota": {}, "responses": {"200": {"$ref": "#/definitions/Legacy"}}},
+            },
+        })
+        result = self.assert_same_as_staged(spec, source="google")
+        self.assertNotIn("x-google-backend", result["paths"]["/items"])
+        self.assertEqual(result["paths"]["/items"]["get"]["responses"]["200"]["$ref"], "#/definitions/Legacy")
+
+    def test_option_combinations_match_staged_pipeline(self):
+        for source in ("aws", "google"):
+            for convert in (True, False):
+                for generate_ids in (True, False):
+                    with self.subTest(source=source, convert=convert, generate_ids=generate_ids):
+                        self.assert_same_as_staged(
+                            make_vendor_swagger2_spec(), source=source, convert=convert, generate_ids=generate_ids
+                        )
+
+    def test_input_spec_not_modified(self):
+        spec = make_vendor_swagger2_spec()
+        snapshot = copy.deepcopy(spec)
+        utils.process_spec(spec)
+        self.assertEqual(spec, snapshot)
+
+    def test_unknown_source_rejected(self):
+        with self.assertRaises(ValueError):
+            utils.process_spec(make_oas3_spec(), source="azure")
+
+
+class TestCopyOnWrite(unittest.TestCase):
+
+    def test_clean_spec_returned_unchanged(self):
+        """With nothing to strip, the input object itself comes back."""
+        spec = make_oas3_spec(paths={"/a": {"get": {"responses": {}}}})
+        self.assertIs(utils.clean_aws_extensions(spec, copy_on_write=True), spec)
+
+    def test_only_modified_path_is_copied(self):
+        spec = make_oas3_spec(
+            tags=[{"name": "a"}],
+            paths={
+                "/clean": {"get": {"responses": {"200": {"description": "OK"}}}},
+                "/dirty": {"get": {"x-amazon-apigateway-integration": {}, "responses": {}}},
+            },
+        )
+        snapshot = copy.deepcopy(spec)
+        result = utils.clean_aws_extensions(spec, copy_on_write=True)
+        self.assertEqual(spec, snapshot)
+        self.assertEqual(result, utils.clean_aws_extensions(spec))
+        self.assertIsNot(result, spec)
+        self.assertIsNot(result["paths"], spec["paths"])
+        self.assertIsNot(result["paths"]["/dirty"]["get"], spec["paths"]["/dirty"]["get"])
+        self.assertIs(result["paths"]["/clean"], spec["paths"]["/clean"])
+        self.assertIs(result["info"], spec["info"])
+        self.assertIs(result["tags"], spec["tags"])
+
+    def test_extensions_inside_lists(self):
+        spec = make_oas3_spec(tags=[{"name": "a"}, {"name": "b", "x-google-tag": 1}])
+        snapshot = copy.deepcopy(spec)
+        result = utils.clean_google_extensions(spec, copy_on_write=True)
+        self.assertEqual(spec, snapshot)
+        self.assertEqual(result["tags"], [{"name": "a"}, {"name": "b"}])
+        self.assertIs(result["tags"][0], spec["tags"][0])
+
+    def test_oas3_ref_rewrite_shares_untouched_subtrees(self):
+        spec = make_oas3_spec(
+            paths={"/a": {"get": {"responses": {"200": {"$ref": "#/responses/Ok"}}}}},
+            components={"schemas": {"Pet": {"type": "object"}}},
+        )
+        snapshot = copy.deepcopy(spec)
+        result = utils.convert_swagger_to_openapi3(spec, copy_on_write=True)
+        self.assertEqual(spec, snapshot)
+        self.assertEqual(result, utils.convert_swagger_to_openapi3(spec))
+        self.assertIs(result["components"], spec["components"])
+        self.assertEqual(result["paths"]["/a"]["get"]["responses"]["200"]["$ref"], "#/components/responses/Ok")
+
+    def test_swagger2_conversion_does_not_mutate_input(self):
+        spec = make_vendor_swagger2_spec()
+        snapshot = copy.deepcopy(spec)
+        result = utils.convert_swagger_to_openapi3(spec, copy_on_write=True)
+        self.assertEqual(spec, snapshot)
+        self.assertEqual(result, utils.convert_swagger_to_openapi3(spec))
+
+    def test_process_spec_matches_copying_pipeline(self):
+        for spec in (make_vendor_swagger2_spec(), make_oas3_spec(paths={"/a": {"get": {}, "post": {}}})):
+            for convert in (True, False):
+                with self.subTest(spec=next(iter(spec)), convert=convert):
+                    snapshot = copy.deepcopy(spec)
+                    result, issues = utils.process_spec(spec, convert=convert, copy_on_write=True)
+                    self.assertEqual(spec, snapshot)
+                    self.assertEqual((result, issues), utils.process_spec(spec, convert=convert))
+
+    def test_operation_id_assignment_does_not_leak_into_input(self):
+        spec = make_oas3_spec(paths={
+            "/a": {"get": {"operationId": "getA"}},
+            "/b": {"get": {"responses": {}}},
+        })
+        snapshot = copy.deepcopy(spec)
+        result, _ = utils.process_spec(spec, copy_on_write=True)
+        self.assertEqual(spec, snapshot)
+        self.assertEqual(result["paths"]["/b"]["get"]["operationId"], "getB")
+        self.assertIs(result["paths"]["/a"], spec["paths"]["/a"])
+        self.assertIs(result["paths"]["/b"]["get"]["responses"], spec["paths"]["/b"]["get"]["responses"])
+
+
+class TestIterativeWalkers(unittest.TestCase):
+
+    DEPTH = sys.getrecursionlimit() * 3
+
+    def make_deep_schema(self, depth: int) -> dict:
+        """Schema nested depth levels through alternating properties/allOf, with extensions at the bottom."""
+        leaf: dict = {"$ref": "#/definitions/Leaf", "x-amazon-leaf": True}
+        node: dict = leaf
+        for level in range(depth):
+            node = {"properties": {"child": node}} if level % 2 else {"allOf": [node], "x-amazon-level": level}
+        return node
+
+    def test_matches_recursive_reference(self):
+        samples = [make_vendor_swagger2_spec(), make_oas3_spec(), self.make_deep_schema(100), [1, [2, {"$ref": "#/parameters/p"}]], "leaf"]
+        for sample in samples:
+            for prefix in ("", "x-amazon-"):
+                for rewrite_refs in (True, False):
+                    with self.subTest(prefix=prefix, rewrite_refs=rewrite_refs):
+                        expected = utils._transform_node_recursive(sample, prefix, rewrite_refs)
+                        self.assertEqual(utils._transform_node(sample, prefix, rewrite_refs), expected)
+                        shared = utils._transform_node(sample, prefix, rewrite_refs, copy_on_write=True)
+                        self.assertEqual(shared, expected)
+                        self.assertEqual(shared, utils._transform_node_shared_recursive(sample, prefix, rewrite_refs))
+
+    def test_key_order_preserved(self):
+        spec = {"b": {"z": 1, "x-amazon-q": 0, "a": [{"y": 1, "x": 2}]}, "a": 2}
+        result = utils.clean_aws_extensions(spec)
+        self.assertEqual(list(result), ["b", "a"])
+        self.assertEqual(list(result["b"]), ["z", "a"])
+        self.assertEqual(list(result["b"]["a"][0]), ["y", "x"])
+
+    def test_nesting_deeper_than_recursion_limit(self):
+        schema = self.make_deep_schema(self.DEPTH)
+        with self.assertRaises(RecursionError):
+            utils._transform_node_recursive(schema, "x-amazon-", True)
+        for copy_on_write in (False, True):
+            with self.subTest(copy_on_write=copy_on_write):
+                result = utils._remove_extensions_recursive(schema, "x-amazon-", copy_on_write)
+                node, depth = result, 0
+                while "$ref" not in node:
+                    node = node["allOf"][0] if "allOf" in node else node["properties"]["child"]
+                    depth += 1
+                self.assertEqual(depth, self.DEPTH)
+                self.assertEqual(node, {"$ref": "#/definitions/Leaf"})
+
+    def test_deep_ref_rewrite_copy_on_write(self):
+        schema = self.make_deep_schema(self.DEPTH)
+        result = utils._convert_schema_refs(schema, copy_on_write=True)
+        self.assertIsNot(result, schema)
+        clean = {"properties": {"a": {"type": "string"}}}
+        self.assertIs(utils._convert_schema_refs(clean, copy_on_write=True), clean)
+
+
 # ---------------------------------------------------------------------------
 # Tests: File I/O helpers
 # ---------------------------------------------------------------------------
@@ -587,6 +1066,217 @@ class TestFileIO(unittest.TestCase):
         finally:
             os.unlink(tmp_path)
 
+    def test_too_deep_spec_is_an_error_not_a_traceback(self):
+        depth = sys.getrecursionlimit() + 500
+        schema = '{"items": ' * depth + "{}" + "}" * depth
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "deep.json")
+            with open(input_file, "w", encoding="utf-8") as fh:
+                fh.write('{"openapi": "3.0.0", "info": {"title": "T", "version": "1"}, "paths": {},'
+                         ' "components": {"schemas": {"Deep": ' + schema + "}}}")
+            for argv, message in (
+                ((), "Cannot read '"),
+                (("--validate-only",), "Cannot read '"),
+                (("--stream",), "Cannot write file '"),
+            ):
+                output = os.path.join(tmp, "out.json")
+                with self.subTest(argv=argv), mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+                    code, _ = run_cli(input_file, output, *argv)
+                    self.assertEqual(code, 1)
+                    self.assertIn(message, stderr.getvalue())
+                    self.assertIn(f"nesting deeper than {sys.getrecursionlimit()} levels", stderr.getvalue())
+                    self.assertFalse(os.path.exists(output))
+
+
+class TestAtomicStreamingWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.spec, _ = utils.process_spec(make_vendor_swagger2_spec())
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_output_matches_one_shot_serialisation(self):
+        import yaml as _yaml
+        utils.save_spec(self.spec, self.path("out.json"))
+        utils.save_spec(self.spec, self.path("out.yaml"))
+        self.assertEqual(self.read(self.path("out.json")).decode("utf-8"), json.dumps(self.spec, indent=2, ensure_ascii=False))
+        self.assertEqual(
+            self.read(self.path("out.yaml")).decode("utf-8"),
+            _yaml.dump(self.spec, allow_unicode=True, default_flow_style=False, sort_keys=False),
+        )
+
+    def test_failed_write_keeps_previous_file_and_leaves_no_temp_file(self):
+        target = self.path("out.json")
+        with open(target, "w", encoding="utf-8") as fh:
+            fh.write("previous")
+
+        def partial_dump(spec, fmt, stream):
+            stream.write('{"openapi": ')
+            raise OSError("disk full")
+
+        serializer = utils.Serializer()
+        with mock.patch.object(serializer, "dump", side_effect=partial_dump):
+            with self.assertRaisesRegex(ValueError, "disk full"):
+                utils._write_spec(self.spec, target, serializer)
+        self.assertEqual(self.read(target), b"previous")
+        self.assertEqual(os.listdir(self.tmp.name), ["out.json"])
+
+    def test_existing_permissions_and_symlinks_are_kept(self):
+        target = self.path("real.json")
+        link = self.path("link.json")
+        utils.save_spec({}, target)
+        os.chmod(target, 0o640)
+        os.symlink(target, link)
+        utils.save_spec(self.spec, link)
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(os.stat(target).st_mode & 0o777, 0o640)
+        self.assertEqual(utils.load_spec(target), json.loads(json.dumps(self.spec)))
+
+    @unittest.skipUnless(os.path.exists(os.devnull), "no null device")
+    def test_non_regular_destination_is_written_directly(self):
+        utils.save_spec(self.spec, os.devnull)
+
+    def test_gzip_output_is_reproducible_and_loadable(self):
+        import gzip as _gzip
+        utils.save_spec(self.spec, self.path("plain.yaml"))
+        utils.save_spec(self.spec, self.path("a.yaml.gz"))
+        utils.save_spec(self.spec, self.path("b.yaml.gz"))
+        self.assertEqual(self.read(self.path("a.yaml.gz")), self.read(self.path("b.yaml.gz")))
+        self.assertEqual(_gzip.decompress(self.read(self.path("a.yaml.gz"))), self.read(self.path("plain.yaml")))
+        self.assertEqual(utils.load_spec(self.path("a.yaml.gz")), utils.load_spec(self.path("plain.yaml")))
+
+    def test_compact_json(self):
+        for json_backend in ("stdlib", "auto"):
+            serializer = utils.Serializer(json_backend=json_backend, compact_json=True)
+            utils.save_spec(self.spec, self.path("min.json"), serializer)
+            self.assertEqual(
+                self.read(self.path("min.json")).decode("utf-8"),
+                json.dumps(self.spec, separators=(",", ":"), ensure_ascii=False),
+            )
+
+    def test_stdlib_json_is_streamed(self):
+        import tracemalloc
+        spec = {"paths": {f"/items{i}": {"get": {"summary": "x" * 50}} for i in range(5000)}}
+        serializer = utils.Serializer(json_backend="stdlib")
+        tracemalloc.start()
+        try:
+            utils.save_spec(spec, self.path("big.json"), serializer)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, os.path.getsize(self.path("big.json")) / 2)
+
+    def test_cli_compact_and_gzip(self):
+        import gzip as _gzip
+        input_file = self.path("in.json")
+        utils.save_spec(make_vendor_swagger2_spec(), input_file)
+        code, output = run_cli(input_file, self.path("out.json"), "--compact", "--gzip")
+        self.assertEqual(code, 0, output)
+        self.assertIn("out.json.gz", output)
+        text = _gzip.decompress(self.read(self.path("out.json.gz"))).decode("utf-8")
+        self.assertNotIn("\n", text)
+        self.assertEqual(json.loads(text), json.loads(json.dumps(self.spec)))
+
+    def test_batch_gzip_outputs(self):
+        src = self.path("src")
+        os.makedirs(src)
+        utils.save_spec(make_vendor_swagger2_spec(), os.path.join(src, "api.yaml"))
+        utils.save_spec(make_vendor_swagger2_spec(), os.path.join(src, "packed.json.gz"))
+        out_dir = self.path("out")
+        code, output = run_cli("--batch", src, "--output-dir", out_dir, "--gzip", "--jobs", "1")
+        self.assertEqual(code, 0, output)
+        self.assertEqual(sorted(os.listdir(out_dir)), ["api.yaml.gz", "packed.json.gz"])
+
+# ---------------------------------------------------------------------------
+# Tests: CLI batch mode
+# ---------------------------------------------------------------------------
+
+def run_cli(*argv: str) -> tuple:
+    """Run openapi_utils.main() with argv; return (exit_code, stdout)."""
+    stdout = io.StringIO()
+    code = 0
+    with mock.patch.object(sys, "argv", ["openapi_utils.py", *argv]), contextlib.redirect_stdout(stdout):
+        try:
+            utils.main()
+        except SystemExit as exc:
+            code = exc.code
+    return code, stdout.getvalue()
+
+
+class TestBatchMode(unittest.TestCase):
+
+    def setUp(self):
+        import yaml as _yaml
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, "src")
+        os.makedirs(os.path.join(self.src, "nested"))
+        with open(os.path.join(self.src, "petstore.yaml"), "w", encoding="utf-8") as fh:
+            _yaml.dump(make_vendor_swagger2_spec(), fh)
+        with open(os.path.join(self.src, "nested", "items.json"), "w", encoding="utf-8") as fh:
+            json.dump(make_oas3_spec(paths={"/items": {"get": {"x-amazon-apigateway-integration": {}}}}), fh)
+        with open(os.path.join(self.src, "notes.txt"), "w", encoding="utf-8") as fh:
+            fh.write("not a spec")
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_batch_output_matches_single_file_runs(self):
+        out_dir = os.path.join(self.tmp.name, "out")
+        code, output = run_cli("--batch", self.src, "--output-dir", out_dir, "--jobs", "2")
+        self.assertEqual(code, 0, output)
+        self.assertIn("[2/2]", output)
+        self.assertIn("Batch summary: 2 file(s)", output)
+        self.assertFalse(os.path.exists(os.path.join(out_dir, "notes.txt")))
+        for relative in ("petstore.yaml", os.path.join("nested", "items.json")):
+            single = os.path.join(self.tmp.name, "single" + os.path.splitext(relative)[1])
+            run_cli(os.path.join(self.src, relative), single)
+            self.assertEqual(self.read(os.path.join(out_dir, relative)), self.read(single))
+
+    def test_glob_pattern_and_in_process_jobs(self):
+        out_dir = os.path.join(self.tmp.name, "out")
+        code, _ = run_cli("--batch", os.path.join(self.src, "**", "*.json"), "--output-dir", out_dir, "--jobs", "1")
+        self.assertEqual(code, 0)
+        self.assertTrue(os.path.exists(os.path.join(out_dir, "nested", "items.json")))
+        self.assertFalse(os.path.exists(os.path.join(out_dir, "petstore.yaml")))
+
+    def test_failing_file_is_isolated(self):
+        with open(os.path.join(self.src, "broken.json"), "w", encoding="utf-8") as fh:
+            fh.write("{not json")
+        out_dir = os.path.join(self.tmp.name, "out")
+        code, output = run_cli("--batch", self.src, "--output-dir", out_dir, "--jobs", "2")
+        self.assertEqual(code, 1)
+        self.assertIn("failed to process:   1", output)
+        self.assertIn("Invalid JSON", output)
+        self.assertTrue(os.path.exists(os.path.join(out_dir, "petstore.yaml")))
+        self.assertTrue(os.path.exists(os.path.join(out_dir, "nested", "items.json")))
+
+    def test_validate_only_summary(self):
+        code, output = run_cli("--batch", self.src, "--validate-only", "--jobs", "1")
+        self.assertEqual(code, 0)
+        self.assertIn("✅ passed:              2", output)
+
+    def test_batch_requires_output_dir(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            code, _ = run_cli("--batch", self.src)
+        self.assertEqual(code, 2)
+
+    def test_output_collisions_rejected(self):
+        other = os.path.join(self.tmp.name, "other")
+        os.makedirs(other)
+        with open(os.path.join(other, "petstore.yaml"), "w", encoding="utf-8") as fh:
+            fh.write("openapi: 3.0.0\n")
+        with self.assertRaises(ValueError):
+            utils.expand_batch_inputs([self.src, other])
+
 
 # ---------------------------------------------------------------------------
 # Integration-style test: end-to-end conversion
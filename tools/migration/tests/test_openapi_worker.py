@@ -0,0 +1,253 @@
+"""
+test_openapi_worker.py
+
+Unit tests for openapi_worker.py: request parsing, pipelined JSON-lines
+streams, the Unix socket server and the submit client.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_openapi_worker.py -v
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import tempfile
+import threading
+import subprocess
+import contextlib
+import unittest
+from unittest import mock
+
+# Allow importing the migration modules from the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import openapi_utils as utils
+import openapi_worker
+from test_openapi_utils import make_vendor_swagger2_spec, run_cli
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "openapi_worker.py")
+
+
+def run_stream(worker: openapi_worker.Worker, requests: list) -> tuple:
+    """Feed requests (dicts or raw lines) through worker.handle_stream; return (responses by id, shutdown)."""
+    lines = [r if isinstance(r, str) else json.dumps(r) for r in requests]
+    rfile = io.BytesIO("\n".join(lines).encode("utf-8") + b"\n")
+    wfile = io.BytesIO()
+    shutdown = worker.handle_stream(rfile, wfile)
+    responses = [json.loads(line) for line in wfile.getvalue().splitlines()]
+    return {response["id"]: response for response in responses}, shutdown
+
+
+class TestParseRequest(unittest.TestCase):
+
+    def test_file_and_inline_requests(self):
+        kind, payload, options = openapi_worker.parse_request({"input": "a.yaml", "output": None, "source": "google"})
+        self.assertEqual((kind, payload), ("file", ("a.yaml", None)))
+        self.assertEqual(options, {"source": "google", "convert": True, "generate_ids": True, "max_id_length": None})
+        kind, payload, _ = openapi_worker.parse_request({"spec": {"openapi": "3.0.0"}, "max_id_length": 40})
+        self.assertEqual((kind, payload), ("inline", {"openapi": "3.0.0"}))
+
+    def test_malformed_requests_raise(self):
+        for request in (
+            [],
+            {"input": "a", "spec": {}},
+            {"output": "b"},
+            {"input": "a", "source": "azure"},
+            {"input": "a", "convert": "yes"},
+            {"input": "a", "max_id_length": "80"},
+            {"input": "a", "outptu": "b"},
+            {"spec": "openapi: 3.0.0"},
+        ):
+            with self.assertRaises(ValueError, msg=request):
+                openapi_worker.parse_request(request)
+
+
+class TestWorkerStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_file = os.path.join(self.tmp.name, "api.json")
+        utils.save_spec(make_vendor_swagger2_spec(), self.input_file)
+        self.worker = openapi_worker.Worker(jobs=1, max_inflight=2)
+        self.addCleanup(self.worker.close)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_file_request_matches_cli_output(self):
+        expected = os.path.join(self.tmp.name, "cli.yaml")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(run_cli(self.input_file, expected)[0], 0)
+        output = os.path.join(self.tmp.name, "worker.yaml")
+        responses, shutdown = run_stream(self.worker, [{"id": "a", "input": self.input_file, "output": output}])
+        self.assertFalse(shutdown)
+        self.assertTrue(responses["a"]["ok"], responses)
+        self.assertEqual(responses["a"]["output"], output)
+        self.assertEqual(self.read(output), self.read(expected))
+
+    def test_inline_request_returns_spec_and_issues(self):
+        responses, _ = run_stream(self.worker, [{"id": 1, "spec": make_vendor_swagger2_spec(), "source": "aws"}])
+        expected_spec, expected_issues = utils.process_spec(make_vendor_swagger2_spec())
+        self.assertEqual(responses[1]["spec"], json.loads(json.dumps(expected_spec)))
+        self.assertEqual(responses[1]["issues"], expected_issues)
+
+    def test_errors_are_reported_per_request(self):
+        responses, _ = run_stream(self.worker, [
+            "{not json",
+            {"id": 2, "input": os.path.join(self.tmp.name, "missing.yaml"), "output": None},
+            {"id": 3, "input": self.input_file, "output": None, "max_id_length": 5},
+            {"id": 4, "op": "reload"},
+            {"id": 5, "input": self.input_file, "output": None},
+        ])
+        self.assertIn("Invalid request", responses[None]["error"])
+        self.assertFalse(responses[2]["ok"])
+        self.assertIn("at least 18", responses[3]["error"])
+        self.assertIn("Unknown op", responses[4]["error"])
+        self.assertTrue(responses[5]["ok"])
+
+    def test_pipelined_requests_all_answered(self):
+        requests = [{"id": i, "input": self.input_file, "output": None} for i in range(20)]
+        responses, _ = run_stream(self.worker, requests)
+        self.assertEqual(sorted(responses), list(range(20)))
+        self.assertTrue(all(response["ok"] for response in responses.values()))
+
+    def test_reading_pauses_at_the_inflight_limit(self):
+        gate = threading.Event()
+        consumed = []
+        original = openapi_worker._process_request
+
+        def blocked(*args):
+            gate.wait(10)
+            return original(*args)
+
+        def lines():
+            for i in range(10):
+                consumed.append(i)
+                yield json.dumps({"id": i, "input": self.input_file, "output": None}).encode("utf-8")
+
+        wfile = io.BytesIO()
+        with mock.patch.object(openapi_worker, "_process_request", blocked):
+            reader = threading.Thread(target=self.worker.handle_stream, args=(lines(), wfile))
+            reader.start()
+            reader.join(0.5)
+            # max_inflight=2 requests submitted, the third waits for a slot
+            self.assertEqual(len(consumed), self.worker.max_inflight + 1)
+            gate.set()
+            reader.join(10)
+        self.assertEqual(len(wfile.getvalue().splitlines()), 10)
+
+    def test_ping_and_shutdown_stop_reading(self):
+        responses, shutdown = run_stream(self.worker, [
+            {"id": "p", "op": "ping"},
+            {"id": "s", "op": "shutdown"},
+            {"id": "late", "input": self.input_file, "output": None},
+        ])
+        self.assertTrue(shutdown)
+        self.assertEqual(responses["p"]["version"], utils.tool_version())
+        self.assertNotIn("late", responses)
+
+    def test_stdin_mode_subprocess(self):
+        output = os.path.join(self.tmp.name, "out.yaml")
+        requests = "".join(json.dumps(r) + "\n" for r in (
+            {"id": 1, "input": self.input_file, "output": output},
+            {"id": 2, "op": "ping"},
+        ))
+        proc = subprocess.run(
+            [sys.executable, WORKER_SCRIPT, "serve", "--jobs", "2"],
+            input=requests, capture_output=True, text=True, timeout=60, check=True,
+        )
+        responses = {r["id"]: r for r in map(json.loads, proc.stdout.splitlines())}
+        self.assertTrue(responses[1]["ok"], proc.stderr)
+        self.assertTrue(os.path.exists(output))
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets not available")
+class TestUnixSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.socket_path = os.path.join(self.tmp.name, "worker.sock")
+        self.input_file = os.path.join(self.tmp.name, "api.yaml")
+        utils.save_spec(make_vendor_swagger2_spec(), self.input_file)
+        self.worker = openapi_worker.Worker(jobs=1)
+        self.addCleanup(self.worker.close)
+        ready = threading.Event()
+        self.server = threading.Thread(
+            target=openapi_worker.serve_unix, args=(self.socket_path, self.worker, ready), daemon=True
+        )
+        self.server.start()
+        self.assertTrue(ready.wait(10))
+
+    def tearDown(self):
+        if self.server.is_alive():
+            openapi_worker.submit(self.socket_path, [{"op": "shutdown"}])
+        self.server.join(10)
+        self.assertFalse(self.server.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_socket_is_private_and_single_instance(self):
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+        with self.assertRaisesRegex(ValueError, "already listening"):
+            openapi_worker.serve_unix(self.socket_path, self.worker)
+
+    def test_submit_pipelines_over_one_connection(self):
+        outputs = [os.path.join(self.tmp.name, f"out{i}.yaml") for i in range(5)]
+        responses = openapi_worker.submit(
+            self.socket_path, [{"input": self.input_file, "output": path, "source": "aws"} for path in outputs]
+        )
+        self.assertEqual([r["id"] for r in responses], list(range(5)))
+        self.assertEqual([r["output"] for r in responses], outputs)
+        self.assertTrue(all(os.path.exists(path) for path in outputs))
+
+    def test_submit_cli_reports_like_batch_mode(self):
+        output = os.path.join(self.tmp.name, "out.json")
+        stdout = io.StringIO()
+        argv = ["openapi_worker.py", "submit", "--socket", self.socket_path, self.input_file, output]
+        with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(stdout):
+            openapi_worker.main()
+        self.assertIn(f"[1/1] {self.input_file} ", stdout.getvalue())
+        self.assertIn(f"Output written to: {output}", stdout.getvalue())
+
+    def test_relative_paths_resolve_against_the_client_cwd(self):
+        client_dir, worker_dir = (os.path.join(self.tmp.name, name) for name in ("client", "worker"))
+        os.makedirs(client_dir)
+        os.makedirs(worker_dir)
+        utils.save_spec(make_vendor_swagger2_spec(), os.path.join(client_dir, "api.yaml"))
+        socket_path = os.path.join(self.tmp.name, "cwd.sock")
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(WORKER_SCRIPT), "serve", "--socket", socket_path],
+            cwd=worker_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self.addCleanup(proc.wait, 10)
+        for _ in range(200):
+            if os.path.exists(socket_path):
+                break
+            proc.poll()
+            self.assertIsNone(proc.returncode)
+            threading.Event().wait(0.05)
+
+        previous = os.getcwd()
+        os.chdir(client_dir)
+        try:
+            responses = openapi_worker.submit(
+                socket_path, [{"input": "api.yaml", "output": "out.json", "source": "aws"}, {"op": "shutdown"}]
+            )
+        finally:
+            os.chdir(previous)
+        self.assertTrue(responses[0]["ok"], responses[0])
+        self.assertEqual(responses[0]["output"], os.path.join(client_dir, "out.json"))
+        self.assertTrue(os.path.exists(os.path.join(client_dir, "out.json")))
+        self.assertEqual(os.listdir(worker_dir), [])
+
+    def test_submit_to_missing_socket_raises(self):
+        with self.assertRaisesRegex(ValueError, "Cannot connect"):
+            openapi_worker.submit(os.path.join(self.tmp.name, "none.sock"), [{"op": "ping"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
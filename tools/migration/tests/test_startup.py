@@ -0,0 +1,123 @@
+"""
+test_startup.py
+
+Start-up cost of openapi_utils.py: heavy modules must stay deferred to the
+code paths that need them, importing the module must fit a time budget
+measured with 'python -X importtime', and '--version' must not build the
+argument parser.
+
+Every check runs in a fresh interpreter. The budget can be raised on slow
+machines with OPENAPI_IMPORT_BUDGET_MS.
+
+Run with:
+    python3 -m pytest tools/migration/tests/test_startup.py -v
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+
+MIGRATION_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Imported only by the functions that need them
+DEFERRED_MODULES = (
+    "yaml", "orjson", "json", "re", "argparse", "gzip", "hashlib", "copy", "glob", "concurrent.futures",
+)
+
+# Import time of openapi_utils and everything it pulls in, excluding typing
+IMPORT_BUDGET_MS = float(os.environ.get("OPENAPI_IMPORT_BUDGET_MS", "20"))
+
+# Loads typing first so modules it imports itself (re on Python < 3.13) are not counted
+_NEW_MODULES_SCRIPT = """
+import sys, json, typing
+before = set(sys.modules)
+import openapi_utils
+{body}
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+def run_python(*args: str, pycache: str = None) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter in the migration directory with bytecode caching on."""
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    prefix = ["-X", f"pycache_prefix={pycache}"] if pycache else []
+    return subprocess.run(
+        [sys.executable, *prefix, *args], cwd=MIGRATION_DIR, env=env,
+        capture_output=True, text=True, timeout=60, check=True,
+    )
+
+
+def new_modules(body: str = "") -> set:
+    """Modules loaded by 'import openapi_utils' followed by body."""
+    return set(json.loads(run_python("-c", _NEW_MODULES_SCRIPT.format(body=body)).stdout.splitlines()[-1]))
+
+
+def import_times(stderr: str) -> dict:
+    """Parse -X importtime output into {module: cumulative microseconds} (first occurrence wins)."""
+    times: dict = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times.setdefault(name.strip(), int(cumulative))
+    return times
+
+
+class TestDeferredImports(unittest.TestCase):
+
+    def assert_not_loaded(self, modules: set, allowed: tuple = ()):
+        loaded = sorted(name for name in DEFERRED_MODULES if name in modules and name not in allowed)
+        self.assertEqual(loaded, [], f"imported eagerly: {loaded}")
+
+    def test_import_loads_no_heavy_modules(self):
+        self.assert_not_loaded(new_modules())
+
+    def test_generate_operation_id_loads_no_heavy_modules(self):
+        self.assert_not_loaded(new_modules(
+            "openapi_utils.generate_operation_id('get', '/users/{id}')\n"
+            "openapi_utils.ensure_operation_ids({'paths': {'/a': {'get': {}}}})"
+        ))
+
+    def test_json_validate_only_skips_yaml(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec_file = os.path.join(tmp, "api.json")
+            with open(spec_file, "w", encoding="utf-8") as fh:
+                json.dump({"openapi": "3.0.0", "info": {"title": "T", "version": "1"}, "paths": {}}, fh)
+            modules = new_modules(
+                "import contextlib, io\n"
+                f"sys.argv = ['openapi_utils.py', {spec_file!r}, 'unused.json', '--validate-only']\n"
+                "with contextlib.redirect_stdout(io.StringIO()):\n"
+                "    openapi_utils.main()"
+            )
+        self.assert_not_loaded(modules, allowed=("json", "re", "argparse", "gzip", "hashlib", "copy", "glob"))
+
+
+class TestStartupBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_import_fits_budget(self):
+        # First run writes the bytecode cache; measure the best of the next runs
+        run_python("-c", "import openapi_utils", pycache=self.tmp.name)
+        best = float("inf")
+        for _ in range(3):
+            times = import_times(run_python("-X", "importtime", "-c", "import openapi_utils", pycache=self.tmp.name).stderr)
+            best = min(best, (times["openapi_utils"] - times.get("typing", 0)) / 1000)
+        self.assertLessEqual(best, IMPORT_BUDGET_MS, f"import openapi_utils took {best:.1f} ms")
+
+    def test_version_skips_argument_parsing(self):
+        result = run_python("-X", "importtime", "openapi_utils.py", "--version", pycache=self.tmp.name)
+        self.assertRegex(result.stdout.strip(), r"^openapi_utils\.py \d+\.\d+\.\d+$")
+        loaded = import_times(result.stderr)
+        self.assertNotIn("argparse", loaded)
+        self.assertNotIn("yaml", loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,8 @@
 #   - Validates APIM-specific requirements (title, version, server URLs, security)
 #
 # Usage: ./translate-openapi.sh <input-file> <output-file>
+#        ./translate-openapi.sh <input-dir> <output-dir>   (batch mode; JOBS=N sets worker count)
+#        OPENAPI_WORKER_SOCKET=<path> ./translate-openapi.sh ...      (use a running openapi_worker.py)
 #
 
 set -euo pipefail
@@ -33,11 +35,26 @@ OUTPUT_FILE="$2"
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # Check if input file exists
-if [ ! -f "$INPUT_FILE" ]; then
+if [ ! -e "$INPUT_FILE" ]; then
     echo "Error: Input file '$INPUT_FILE' not found"
     exit 1
 fi
 
+# A directory input is converted in batch mode: one Python process fans the
+# specs out over a process pool instead of starting an interpreter per spec.
+if [ -d "$INPUT_FILE" ]; then
+    UTILS_ARGS=(--batch "$INPUT_FILE" --output-dir "$OUTPUT_FILE")
+    if [ -n "${JOBS:-}" ]; then
+        UTILS_ARGS+=(--jobs "$JOBS")
+    fi
+    LINT_INPUT="$INPUT_FILE/**/*.{json,yaml,yml}"
+    LINT_OUTPUT="$OUTPUT_FILE/**/*.{json,yaml,yml}"
+else
+    UTILS_ARGS=("$INPUT_FILE" "$OUTPUT_FILE")
+    LINT_INPUT="$INPUT_FILE"
+    LINT_OUTPUT="$OUTPUT_FILE"
+fi
+
 echo "========================================="
 echo "OpenAPI Translation Tool for APIM (Google)"
 echo "========================================="
@@ -48,7 +65,7 @@ echo ""
 # Step 1: Validate input with Spectral
 echo "[1/4] Validating input OpenAPI spec..."
 if command -v spectral &> /dev/null; then
-    spectral lint "$INPUT_FILE" || {
+    spectral lint "$LINT_INPUT" || {
         echo "Warning: Spectral validation found issues. Continuing anyway..."
     }
 else
@@ -59,9 +76,20 @@ fi
 # Step 2: Run openapi_utils.py (removes extensions, converts Swagger→OAS3,
 #         generates missing operationIds, validates APIM requirements)
 echo "[2/4] Processing spec with openapi_utils.py (source: google)..."
-if command -v python3 &> /dev/null; then
+if command -v python3 &> /dev/null && [ -n "${OPENAPI_WORKER_SOCKET:-}" ] && [ -S "$OPENAPI_WORKER_SOCKET" ] \
+    && [ ! -d "$INPUT_FILE" ]; then
+    # A resident worker (openapi_worker.py serve --socket ...) already has the
+    # converter loaded; the submit client skips importing it here.
+    python3 "${SCRIPT_DIR}/openapi_worker.py" submit \
+        --socket "$OPENAPI_WORKER_SOCKET" \
+        --source google \
+        "$INPUT_FILE" "$OUTPUT_FILE" || {
+        echo "Error: openapi_worker.py processing failed."
+        exit 1
+    }
+elif command -v python3 &> /dev/null; then
     python3 "${SCRIPT_DIR}/openapi_utils.py" \
-        "$INPUT_FILE" "$OUTPUT_FILE" \
+        "${UTILS_ARGS[@]}" \
         --source google || {
         echo "Error: openapi_utils.py processing failed."
         exit 1
@@ -72,13 +100,13 @@ else
     echo "  - Swagger 2.0 → OpenAPI 3.0 conversion"
     echo "  - Automatic operationId generation"
     echo "  - APIM requirement validation"
-    cp "$INPUT_FILE" "$OUTPUT_FILE"
+    cp -R "$INPUT_FILE" "$OUTPUT_FILE"
 fi
 
 # Step 3: Validate output with Spectral
 echo "[3/4] Validating output OpenAPI spec..."
 if command -v spectral &> /dev/null; then
-    spectral lint "$OUTPUT_FILE" || {
+    spectral lint "$LINT_OUTPUT" || {
         echo "Warning: Output spec has validation issues."
     }
 fi